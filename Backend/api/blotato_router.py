@@ -31,6 +31,7 @@ from services.blotato_api import (
     WebhookTarget,
     VOICE_IDS,
 )
+from services.job_waiter import publish_job_event
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/blotato", tags=["Blotato"])
@@ -597,6 +598,16 @@ async def wait_for_video(
         return VideoStatusResponse(success=False, error=str(e))
 
 
+@router.post("/videos/{video_id}/webhook")
+async def video_webhook(video_id: str):
+    """
+    Blotato render callback. Wakes any wait_for_video on this id so it
+    re-checks status now instead of at its next scheduled poll.
+    """
+    await publish_job_event("blotato", video_id)
+    return {"success": True, "video_id": video_id}
+
+
 # -------------------------------------------------------------------------
 # UTILITY ENDPOINTS
 # -------------------------------------------------------------------------
@@ -233,7 +233,8 @@ async def run_analysis(
             await session.commit()
             
             # Run analysis
-            analyzer = ContentAnalyzer()
+            # Videos carry no workspace here; reuse frame results within the video
+            analyzer = ContentAnalyzer(tenant=str(video_id))
             analysis = analyzer.analyze_video_complete(
                 video_path,
                 extract_frames=True,
@@ -104,6 +104,37 @@ async def get_calendar_posts(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.get("/view", response_model=dict)
+async def get_calendar_view(
+    view: str = Query("month", description="Calendar view: month or week"),
+    date: Optional[datetime] = Query(None, description="Any date inside the period (defaults to today)"),
+    platforms: Optional[str] = Query(None, description="Comma-separated list of platforms to filter"),
+    status: Optional[str] = Query(None, description="Filter by status (scheduled, published, failed)"),
+    user_id: UUID = Query(UUID("00000000-0000-0000-0000-000000000000"), description="User ID"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get a month or week of scheduled posts grouped by day
+    """
+    try:
+        calendar_service = CalendarService(db)
+
+        platform_list = platforms.split(',') if platforms else None
+
+        return await calendar_service.get_calendar_view(
+            user_id=user_id,
+            view=view,
+            anchor=date,
+            platforms=platform_list,
+            status=status
+        )
+
+    except ServiceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
 @router.post("/schedule", response_model=dict)
 async def schedule_post(
     request: SchedulePostRequest,
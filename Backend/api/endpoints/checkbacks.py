@@ -0,0 +1,55 @@
+"""
+Check-back Scheduling Endpoints
+Explain when and why posts are next checked for metrics
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from database.connection import get_db
+from services.checkback_queue import (
+    PROVIDERS,
+    explain_checkback,
+    provider_budget,
+    upcoming_checkbacks,
+)
+
+router = APIRouter()
+
+
+@router.get("/posts/{post_id}")
+async def explain_post_checkback(
+    post_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Explain a post's check-back schedule
+
+    Returns the post's queue status, the inputs behind its last scheduling
+    decision (age, view velocity, interval) and its provider's budget.
+    """
+    explanation = await explain_checkback(db, post_id)
+    if not explanation:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return explanation
+
+
+@router.get("/upcoming")
+async def get_upcoming_checkbacks(
+    platform: Optional[str] = Query(None, description="Filter by platform"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """List the next posts in the check-back queue"""
+    return {"checkbacks": await upcoming_checkbacks(db, platform, limit)}
+
+
+@router.get("/budget")
+async def get_checkback_budget(db: AsyncSession = Depends(get_db)):
+    """Per-provider API budget available to check-backs right now"""
+    return {
+        "providers": {
+            platform: await provider_budget(db, platform)
+            for platform in PROVIDERS
+        }
+    }
@@ -52,6 +52,7 @@ class SendSegmentEmailRequest(BaseModel):
     goal_type: str
     variant: str = "A"
     personalization_data: Optional[Dict[str, Any]] = None
+    campaign_id: Optional[UUID] = None  # Resume an interrupted campaign
 
 
 class EmailEventRequest(BaseModel):
@@ -106,11 +107,17 @@ async def send_segment_email(
             body_template=request.body_template,
             goal_type=request.goal_type,
             variant=request.variant,
-            personalization_data=request.personalization_data
+            personalization_data=request.personalization_data,
+            campaign_id=request.campaign_id
         )
         
+        # The campaign's own status (completed, ...) must not clobber the
+        # request status, so it is returned as campaign_status
+        stats = dict(stats)
+        campaign_status = stats.pop("status", None)
         return {
             "status": "success",
+            "campaign_status": campaign_status,
             **stats
         }
         
@@ -11,6 +11,7 @@ from pydantic import BaseModel
 
 from database.connection import get_db
 from services.post_social_score import PostSocialScoreCalculator
+from services.post_score_ranks import get_rank_cache
 from loguru import logger
 
 router = APIRouter(prefix="/api/post-social-score", tags=["Post-Social Score"])
@@ -47,6 +48,7 @@ async def get_post_social_score(
         post_query = text("""
             SELECT 
                 smp.id,
+                smp.account_id,
                 smp.platform,
                 smp.media_type,
                 smp.posted_at,
@@ -98,7 +100,8 @@ async def get_post_social_score(
             media_type=post.media_type or 'video',
             follower_count=post.followers_count or 0,
             posted_at=post.posted_at,
-            current_metrics=current_metrics
+            current_metrics=current_metrics,
+            account_id=post.account_id
         )
         
         return PostSocialScoreResponse(
@@ -130,6 +133,7 @@ async def calculate_and_store_post_social_score(
         post_query = text("""
             SELECT 
                 smp.id,
+                smp.account_id,
                 smp.platform,
                 smp.media_type,
                 smp.posted_at,
@@ -181,7 +185,8 @@ async def calculate_and_store_post_social_score(
             media_type=post.media_type or 'video',
             follower_count=post.followers_count or 0,
             posted_at=post.posted_at,
-            current_metrics=current_metrics
+            current_metrics=current_metrics,
+            account_id=post.account_id
         )
         
         # Store in post_metrics table (if it exists)
@@ -205,6 +210,10 @@ async def calculate_and_store_post_social_score(
                 'post_social_score': score_data['post_social_score']
             })
             await db.commit()
+            get_rank_cache().record(
+                (post.account_id, post.platform, post.media_type or 'video'),
+                [(post_id, score_data['post_social_score'])]
+            )
         except Exception as e:
             logger.warning(f"Could not update post_metrics: {e}")
             # Continue even if update fails
@@ -222,6 +231,34 @@ async def calculate_and_store_post_social_score(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/account/{account_id}/calculate")
+async def calculate_account_post_scores(
+    account_id: int,
+    platform: Optional[str] = None,
+    store: bool = True,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Score every post of an account in one call
+    
+    Posts are ranked against each other with their new scores; with
+    store=true the scores are written to each post's latest analytics snapshot
+    """
+    calculator = PostSocialScoreCalculator(db)
+    
+    try:
+        scores = await calculator.score_account_posts(db, account_id, platform=platform, store=store)
+        return {
+            "account_id": account_id,
+            "total_posts": len(scores),
+            "stored": store,
+            "posts": scores
+        }
+    except Exception as e:
+        logger.error(f"Error calculating account post scores: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/account/{account_id}/summary")
 async def get_account_post_scores_summary(
     account_id: int,
@@ -237,38 +274,14 @@ async def get_account_post_scores_summary(
     calculator = PostSocialScoreCalculator(db)
     
     try:
-        # Get all posts for account (with error handling for missing tables)
+        # Score all posts in one pass (with error handling for missing tables)
         try:
-            posts_query = text("""
-                SELECT 
-                    smp.id,
-                    smp.platform,
-                    smp.media_type,
-                    smp.posted_at,
-                    sa.followers_count
-                FROM social_media_posts smp
-                JOIN social_media_accounts sa ON smp.account_id = sa.id
-                WHERE smp.account_id = :account_id
-            """)
-            
-            if platform:
-                posts_query = text(str(posts_query) + " AND smp.platform = :platform")
-            
-            posts_result = await db.execute(
-                posts_query,
-                {"account_id": account_id, "platform": platform} if platform else {"account_id": account_id}
-            )
-            posts = posts_result.fetchall()
+            scored = await calculator.score_account_posts(db, account_id, platform=platform)
         except Exception as table_error:
             logger.warning(f"Table social_media_posts may not exist: {table_error}")
-            return {
-                "account_id": account_id,
-                "total_posts": 0,
-                "average_score": 0,
-                "top_posts": []
-            }
+            scored = []
         
-        if not posts:
+        if not scored:
             return {
                 "account_id": account_id,
                 "total_posts": 0,
@@ -276,58 +289,22 @@ async def get_account_post_scores_summary(
                 "top_posts": []
             }
         
-        # Calculate scores for all posts
-        scores = []
-        for post in posts:
-            # Get metrics
-            metrics_query = text("""
-                SELECT 
-                    views_count,
-                    likes_count,
-                    comments_count,
-                    shares_count,
-                    saves_count
-                FROM social_media_post_analytics
-                WHERE post_id = :post_id
-                ORDER BY snapshot_date DESC, snapshot_hour DESC NULLS LAST
-                LIMIT 1
-            """)
-            
-            metrics_result = await db.execute(metrics_query, {"post_id": post.id})
-            metrics_row = metrics_result.first()
-            
-            if metrics_row:
-                current_metrics = {
-                    'views': metrics_row.views_count or 0,
-                    'likes': metrics_row.likes_count or 0,
-                    'comments': metrics_row.comments_count or 0,
-                    'shares': metrics_row.shares_count or 0,
-                    'saves': metrics_row.saves_count or 0
-                }
-                
-                score_data = await calculator.calculate_post_social_score(
-                    db=db,
-                    post_id=post.id,
-                    platform=post.platform,
-                    media_type=post.media_type or 'video',
-                    follower_count=post.followers_count or 0,
-                    posted_at=post.posted_at,
-                    current_metrics=current_metrics
-                )
-                
-                scores.append({
-                    'post_id': post.id,
-                    'platform': post.platform,
-                    'media_type': post.media_type,
-                    'score': score_data['post_social_score'],
-                    'percentile': score_data['percentile_rank']
-                })
+        scores = [
+            {
+                'post_id': item['post_id'],
+                'platform': item['platform'],
+                'media_type': item['media_type'],
+                'score': item['post_social_score'],
+                'percentile': item['percentile_rank']
+            }
+            for item in scored
+        ]
         
         # Sort by score
         scores.sort(key=lambda x: x['score'], reverse=True)
         
         # Calculate average
-        avg_score = sum(s['score'] for s in scores) / len(scores) if scores else 0
+        avg_score = sum(s['score'] for s in scores) / len(scores)
         
         return {
             "account_id": account_id,
@@ -339,4 +316,3 @@ async def get_account_post_scores_summary(
     except Exception as e:
         logger.error(f"Error getting account post scores summary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-
@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from pydantic import BaseModel
 from datetime import datetime
+import asyncio
 import uuid
 
 from database.connection import get_db
@@ -145,7 +146,9 @@ async def _publish_via_blotato(
     from loguru import logger
     
     try:
-        publisher = ContentPublisher(use_blotato=True, use_cloud_staging=True)
+        # Drive auth, the cloud upload and Blotato calls all block; keep them
+        # off the event loop
+        publisher = await asyncio.to_thread(ContentPublisher, use_blotato=True, use_cloud_staging=True)
         
         # Calculate delay in minutes
         delay_minutes = None
@@ -154,7 +157,8 @@ async def _publish_via_blotato(
             delay_minutes = int(delta.total_seconds() / 60)
         
         # Publish (works for both clips and media projects)
-        result = publisher.publish_clip(
+        result = await asyncio.to_thread(
+            publisher.publish_clip,
             clip_path=Path(media_path),
             platforms=platforms,
             metadata={
@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from database.connection import get_db
+from middleware.workspace_cache import publish_workspace_change
 from middleware.workspace_context import get_current_workspace_id
 
 router = APIRouter()
@@ -126,6 +127,7 @@ async def create_workspace(workspace: WorkspaceCreate, db: AsyncSession = Depend
         
         await db.execute(insert_member, {"workspace_id": workspace_id})
         await db.commit()
+        await publish_workspace_change(workspace_id)
         
         return WorkspaceResponse(
             id=row.id,
@@ -242,6 +244,7 @@ async def update_workspace(
         
         if not row:
             raise HTTPException(status_code=404, detail="Workspace not found")
+        await publish_workspace_change(workspace_id)
         
         return WorkspaceResponse(
             id=row.id,
@@ -283,8 +286,10 @@ async def delete_workspace(workspace_id: UUID, db: AsyncSession = Depends(get_db
             WHERE id = :workspace_id
         """)
         
-        await db.execute(delete_query, {"workspace_id": workspace_id})
+        result = await db.execute(delete_query, {"workspace_id": workspace_id})
         await db.commit()
+        if result.rowcount:
+            await publish_workspace_change(workspace_id)
         
         return None
     except HTTPException:
@@ -4,17 +4,21 @@ Comprehensive image analysis using AI vision models.
 Extracts: people, clothing, emotions, scene, location, time, objects, and more.
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks, Depends
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
+import asyncio
 import uuid
 import base64
 import httpx
 import os
 import json
 
+from middleware.workspace_context import get_current_workspace_id
+from modules.ai_analysis.image_preprocessor import get_vision_cache, prepare_image
+
 router = APIRouter(prefix="/api/image-analysis", tags=["Image Analysis"])
 
 
@@ -433,6 +437,47 @@ async def analyze_with_openai(image_data: str, is_url: bool, custom_fields: List
         return {"raw_analysis": content}
 
 
+def decode_image_base64(value: str) -> bytes:
+    """Decode base64 image data, with or without a data:image/...;base64, prefix"""
+    if value.startswith("data:"):
+        header, _, value = value.partition(",")
+        if not header.endswith(";base64"):
+            raise ValueError("Data URL is not base64-encoded")
+    return base64.b64decode(value)
+
+
+async def analyze_image_bytes(
+    raw: bytes,
+    custom_fields: List[str],
+    focus_areas: List[str],
+    depth: str,
+    tenant: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Analyze raw image bytes with OpenAI, downsized to the model's effective
+    resolution. Near-identical images from the same tenant reuse an earlier
+    analysis; without a tenant nothing is reused.
+    """
+    prepared = await asyncio.to_thread(prepare_image, raw)
+    
+    cache = get_vision_cache()
+    scope = cache.scope_key("gpt-4o", sorted(custom_fields), sorted(focus_areas), depth)
+    cached = cache.get(prepared.phash, scope, tenant=tenant) if tenant else None
+    if cached is not None:
+        return dict(cached)
+    
+    analysis_data = await analyze_with_openai(
+        prepared.base64,
+        is_url=False,
+        custom_fields=custom_fields,
+        focus_areas=focus_areas,
+        depth=depth,
+    )
+    if tenant:
+        cache.put(prepared.phash, scope, dict(analysis_data), tenant=tenant)
+    return analysis_data
+
+
 async def analyze_with_mock(custom_fields: List[str]) -> Dict[str, Any]:
     """Generate mock analysis for testing"""
     import random
@@ -528,10 +573,13 @@ This image would excel on professional networking platforms or lifestyle content
 # ============================================================================
 
 @router.post("/analyze", response_model=ImageAnalysisResult)
-async def analyze_image(request: AnalysisRequest):
+async def analyze_image(
+    request: AnalysisRequest,
+    workspace_id: uuid.UUID = Depends(get_current_workspace_id),
+):
     """
     Analyze an image with comprehensive AI analysis.
-    Provide either image_url or image_base64.
+    Provide either image_url or image_base64 (raw or as a data URL).
     """
     import time
     start_time = time.time()
@@ -539,6 +587,13 @@ async def analyze_image(request: AnalysisRequest):
     if not request.image_url and not request.image_base64:
         raise HTTPException(status_code=400, detail="Either image_url or image_base64 is required")
     
+    raw = None
+    if not request.image_url:
+        try:
+            raw = decode_image_base64(request.image_base64)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid image_base64: {e}")
+    
     try:
         # Check if OpenAI key exists
         if os.getenv("OPENAI_API_KEY"):
@@ -551,12 +606,12 @@ async def analyze_image(request: AnalysisRequest):
                     depth=request.analysis_depth,
                 )
             else:
-                analysis_data = await analyze_with_openai(
-                    request.image_base64,
-                    is_url=False,
+                analysis_data = await analyze_image_bytes(
+                    raw,
                     custom_fields=request.custom_fields,
                     focus_areas=request.focus_areas,
                     depth=request.analysis_depth,
+                    tenant=str(workspace_id),
                 )
         else:
             # Use mock for demo
@@ -590,6 +645,7 @@ async def analyze_uploaded_image(
     custom_fields: str = Form(default=""),
     focus_areas: str = Form(default=""),
     analysis_depth: str = Form(default="detailed"),
+    workspace_id: uuid.UUID = Depends(get_current_workspace_id),
 ):
     """
     Analyze an uploaded image file.
@@ -597,21 +653,19 @@ async def analyze_uploaded_image(
     import time
     start_time = time.time()
     
-    # Read and encode file
     contents = await file.read()
-    image_base64 = base64.b64encode(contents).decode("utf-8")
     
     custom_fields_list = [f.strip() for f in custom_fields.split(",") if f.strip()]
     focus_areas_list = [f.strip() for f in focus_areas.split(",") if f.strip()]
     
     try:
         if os.getenv("OPENAI_API_KEY"):
-            analysis_data = await analyze_with_openai(
-                image_base64,
-                is_url=False,
+            analysis_data = await analyze_image_bytes(
+                contents,
                 custom_fields=custom_fields_list,
                 focus_areas=focus_areas_list,
                 depth=analysis_depth,
+                tenant=str(workspace_id),
             )
         else:
             analysis_data = await analyze_with_mock(custom_fields_list)
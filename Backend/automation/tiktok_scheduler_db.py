@@ -1,7 +1,10 @@
 """
 TikTok Scheduler (Database Version) - Check-back periods with PostgreSQL storage.
 
-Uses the social_media_posts and social_media_post_analytics tables.
+Uses the social_media_posts and social_media_post_analytics tables. Check-back
+times come from services.checkback_queue.plan_next_check (view velocity and
+age), the same rule the collect-post-metrics beat uses for every platform, so
+posts tracked here are also picked up by that shared queue.
 
 Usage:
     from automation.tiktok_scheduler_db import TikTokSchedulerDB
@@ -15,9 +18,10 @@ import os
 import json
 import asyncio
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, List, Dict, Any
-from dataclasses import dataclass, asdict
+
+from services.checkback_queue import plan_next_check
 
 # Try to import asyncpg, fall back to sync version if not available
 try:
@@ -28,32 +32,12 @@ except ImportError:
     print("Warning: asyncpg not installed. Using sync mode.")
 
 
-@dataclass
-class CheckBackSchedule:
-    """Default check-back schedule."""
-    offset_hours: int
-    name: str
-
-
-DEFAULT_SCHEDULE = [
-    CheckBackSchedule(1, "1 hour"),
-    CheckBackSchedule(6, "6 hours"),
-    CheckBackSchedule(12, "12 hours"),
-    CheckBackSchedule(24, "1 day"),
-    CheckBackSchedule(48, "2 days"),
-    CheckBackSchedule(72, "3 days"),
-    CheckBackSchedule(168, "1 week"),
-    CheckBackSchedule(336, "2 weeks"),
-    CheckBackSchedule(720, "30 days"),
-]
-
-
 class TikTokSchedulerDB:
     """
     Database-backed scheduler for tracking post performance.
     
     Uses:
-    - social_media_posts: Track posts with check_schedule
+    - social_media_posts: Track posts with an adaptive next_check_at
     - social_media_post_analytics: Store metrics snapshots
     - tiktok-scraper7 API: Fetch current metrics
     """
@@ -63,8 +47,7 @@ class TikTokSchedulerDB:
     def __init__(
         self,
         db_url: Optional[str] = None,
-        api_key: Optional[str] = None,
-        schedule: Optional[List[CheckBackSchedule]] = None
+        api_key: Optional[str] = None
     ):
         """
         Initialize database scheduler.
@@ -72,11 +55,9 @@ class TikTokSchedulerDB:
         Args:
             db_url: PostgreSQL connection URL
             api_key: RapidAPI key for tiktok-scraper7
-            schedule: Custom check-back schedule
         """
         self.db_url = db_url or os.getenv("DATABASE_URL")
         self.api_key = api_key or os.getenv("RAPIDAPI_KEY")
-        self.schedule = schedule or DEFAULT_SCHEDULE
         self.pool = None
     
     async def connect(self):
@@ -130,13 +111,6 @@ class TikTokSchedulerDB:
             print(f"Fetch error: {e}")
             return None
     
-    def _calculate_schedule(self, posted_at: datetime) -> List[str]:
-        """Calculate check schedule timestamps from posted time."""
-        return [
-            (posted_at + timedelta(hours=s.offset_hours)).isoformat()
-            for s in self.schedule
-        ]
-    
     async def track_post(self, url: str, account_id: Optional[int] = None) -> Dict:
         """
         Start tracking a new post in the database.
@@ -157,7 +131,8 @@ class TikTokSchedulerDB:
         
         author = info.get("author", {})
         now = datetime.now()
-        schedule = self._calculate_schedule(now)
+        posted_at = datetime.fromtimestamp(info.get("create_time", 0)) if info.get("create_time") else now
+        decision = plan_next_check(posted_at, now, info.get("play_count", 0))
         
         async with self.pool.acquire() as conn:
             # Check if already tracking
@@ -198,8 +173,9 @@ class TikTokSchedulerDB:
                 INSERT INTO social_media_posts 
                 (account_id, platform, external_post_id, post_url, caption, 
                  media_type, duration, posted_at, check_schedule, next_check_at,
-                 tracking_started_at, tracking_complete)
-                VALUES ($1, 'tiktok', $2, $3, $4, $5, $6, $7, $8, $9, $10, FALSE)
+                 tracking_started_at, tracking_complete, last_checked_at,
+                 last_check_views, check_velocity, check_decision)
+                VALUES ($1, 'tiktok', $2, $3, $4, $5, $6, $7, '[]', $8, $9, $10, $9, $11, $12, $13)
                 RETURNING id
             """,
                 account_id,
@@ -208,10 +184,13 @@ class TikTokSchedulerDB:
                 info.get("title", "")[:500],
                 "video",
                 info.get("duration"),
-                datetime.fromtimestamp(info.get("create_time", 0)) if info.get("create_time") else now,
-                json.dumps(schedule),
-                datetime.fromisoformat(schedule[0]) if schedule else None,
-                now
+                posted_at,
+                decision.next_check_at,
+                now,
+                decision.next_check_at is None,
+                decision.views,
+                decision.velocity,
+                json.dumps(decision.to_dict())
             )
             
             # Insert initial metrics
@@ -234,7 +213,7 @@ class TikTokSchedulerDB:
         print(f"Now tracking: {video_id}")
         print(f"  Author: @{author.get('unique_id')}")
         print(f"  Likes: {info.get('digg_count', 0)}, Views: {info.get('play_count', 0)}")
-        print(f"  Next check: {schedule[0] if schedule else 'None'}")
+        print(f"  Next check: {decision.next_check_at or 'None'} ({decision.reason})")
         
         return {
             "id": post_id,
@@ -242,7 +221,7 @@ class TikTokSchedulerDB:
             "author": author.get("unique_id"),
             "likes": info.get("digg_count", 0),
             "views": info.get("play_count", 0),
-            "next_check": schedule[0] if schedule else None
+            "next_check": decision.next_check_at.isoformat() if decision.next_check_at else None
         }
     
     async def check_post(self, post_id: int) -> Optional[Dict]:
@@ -258,7 +237,8 @@ class TikTokSchedulerDB:
         async with self.pool.acquire() as conn:
             # Get post info
             post = await conn.fetchrow("""
-                SELECT id, post_url, check_schedule, checks_completed, tracking_complete
+                SELECT id, post_url, posted_at, checks_completed, tracking_complete,
+                       last_checked_at, last_check_views
                 FROM social_media_posts WHERE id = $1
             """, post_id)
             
@@ -302,25 +282,27 @@ class TikTokSchedulerDB:
                 info.get("collect_count", 0)
             )
             
-            # Update post tracking status
-            schedule = json.loads(post['check_schedule']) if post['check_schedule'] else []
-            new_completed = (post['checks_completed'] or 0) + 1
-            
-            if new_completed >= len(schedule):
-                # All checks done
-                await conn.execute("""
-                    UPDATE social_media_posts 
-                    SET checks_completed = $1, tracking_complete = TRUE, next_check_at = NULL
-                    WHERE id = $2
-                """, new_completed, post_id)
-            else:
-                # Schedule next check
-                next_check = datetime.fromisoformat(schedule[new_completed])
-                await conn.execute("""
-                    UPDATE social_media_posts 
-                    SET checks_completed = $1, next_check_at = $2
-                    WHERE id = $3
-                """, new_completed, next_check, post_id)
+            # Schedule the next check from view velocity and age
+            decision = plan_next_check(
+                post['posted_at'], now, info.get("play_count", 0),
+                post['last_check_views'], post['last_checked_at']
+            )
+            await conn.execute("""
+                UPDATE social_media_posts 
+                SET checks_completed = $1, next_check_at = $2, tracking_complete = $3,
+                    last_checked_at = $4, last_check_views = $5, check_velocity = $6,
+                    check_decision = $7, check_failures = 0, check_claimed_until = NULL
+                WHERE id = $8
+            """,
+                (post['checks_completed'] or 0) + 1,
+                decision.next_check_at,
+                decision.next_check_at is None,
+                now,
+                decision.views,
+                decision.velocity,
+                json.dumps(decision.to_dict()),
+                post_id
+            )
             
             # Calculate deltas
             metrics = {
@@ -357,6 +339,7 @@ class TikTokSchedulerDB:
                 AND tracking_complete = FALSE
                 AND next_check_at IS NOT NULL
                 AND next_check_at <= NOW()
+                AND (check_claimed_until IS NULL OR check_claimed_until < NOW())
                 ORDER BY next_check_at ASC
                 LIMIT 10
             """)
@@ -67,12 +67,18 @@ celery_app.conf.update(
             'schedule': 60.0,  # 60 seconds
             'options': {'queue': 'publishing', 'priority': 10}
         },
-        # Collect metrics every 15 minutes
+        # Run due adaptive check-backs every 5 minutes
         'collect-post-metrics': {
             'task': 'tasks.scheduled_publishing.collect_post_metrics',
-            'schedule': 900.0,  # 15 minutes
+            'schedule': 300.0,  # 5 minutes
             'options': {'queue': 'metrics', 'priority': 5}
         },
+        # Rebuild stale or expired AI chat context snapshots every minute
+        'refresh-context-snapshots': {
+            'task': 'tasks.ai_context.refresh_context_snapshots',
+            'schedule': 60.0,
+            'options': {'queue': 'default', 'priority': 3}
+        },
         # Retry failed posts every hour
         'retry-failed-posts': {
             'task': 'tasks.scheduled_publishing.retry_failed_posts',
@@ -76,6 +76,7 @@ class Settings(BaseSettings):
     whisper_model: str = Field(default="medium", env="WHISPER_MODEL")
     gpt_model: str = Field(default="gpt-4-vision-preview", env="GPT_MODEL")
     frame_extraction_fps: int = Field(default=1, env="FRAME_EXTRACTION_FPS")
+    vision_dedup_hamming_threshold: int = Field(default=6, env="VISION_DEDUP_HAMMING_THRESHOLD")  # 0 = exact pHash matches only
     
     # Platform Settings
     default_clip_duration: int = Field(default=45, env="DEFAULT_CLIP_DURATION")
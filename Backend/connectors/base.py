@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 from datetime import datetime
@@ -10,6 +11,7 @@ class PlatformMetricSnapshot(BaseModel):
     snapshot_at: datetime
     views: Optional[int] = None
     impressions: Optional[int] = None
+    reach: Optional[int] = None
     likes: Optional[int] = None
     comments: Optional[int] = None
     shares: Optional[int] = None
@@ -21,6 +23,7 @@ class PlatformMetricSnapshot(BaseModel):
 class ContentVariant(BaseModel):
     content_id: str
     platform: str
+    platform_post_id: Optional[str] = None
     title: Optional[str] = None
     description: Optional[str] = None
     thumbnail_url: Optional[str] = None
@@ -31,6 +34,13 @@ class SourceAdapter(ABC):
     Abstract base class for all social platform connectors.
     """
 
+    # Posts per fetch_metrics_for_variants call. Adapters whose API can read
+    # many posts in one request raise this and override the batched fetch.
+    metrics_batch_size: int = 1
+
+    # Metric requests allowed in flight at once for each supported platform
+    metrics_concurrency: int = 4
+
     @property
     @abstractmethod
     def id(self) -> str:
@@ -52,6 +62,15 @@ class SourceAdapter(ABC):
         """Fetch latest metrics for a specific content variant."""
         pass
 
+    async def fetch_metrics_for_variants(self, variants: List[ContentVariant]) -> List[PlatformMetricSnapshot]:
+        """
+        Fetch latest metrics for several variants of one platform.
+        Snapshots are matched back to variants by platform_post_id.
+        Default: one fetch_metrics_for_variant call per variant.
+        """
+        results = await asyncio.gather(*(self.fetch_metrics_for_variant(v) for v in variants))
+        return [snapshot for snapshots in results for snapshot in snapshots]
+
     async def publish_variant(self, variant: ContentVariant) -> Dict[str, str]:
         """
         Publish content to the platform.
@@ -5,6 +5,9 @@ import httpx
 from ..base import SourceAdapter, PlatformMetricSnapshot, ContentVariant
 
 class MetaConnector(SourceAdapter):
+    # Graph API ?ids= reads up to 50 objects per request
+    metrics_batch_size = 50
+
     def __init__(self):
         self.app_id = os.getenv("META_APP_ID")
         self.app_secret = os.getenv("META_APP_SECRET")
@@ -23,10 +26,14 @@ class MetaConnector(SourceAdapter):
         return ["facebook", "instagram", "threads"]
 
     async def fetch_metrics_for_variant(self, variant: ContentVariant) -> List[PlatformMetricSnapshot]:
+        return await self.fetch_metrics_for_variants([variant])
+
+    async def fetch_metrics_for_variants(self, variants: List[ContentVariant]) -> List[PlatformMetricSnapshot]:
         if not self.is_enabled():
             return []
 
-        if variant.platform not in self.list_supported_platforms():
+        variants = [v for v in variants if v.platform in self.list_supported_platforms()]
+        if not variants:
             return []
 
         # TODO: Implement actual Graph API calls here
@@ -34,13 +41,13 @@ class MetaConnector(SourceAdapter):
         
         # In a real implementation, we would:
         # 1. Determine if it's an IG Media or FB Post based on variant.platform
-        # 2. Call /{object_id}/insights
+        # 2. Call /insights?ids={id1},{id2},... for the whole batch
         # 3. Map fields to PlatformMetricSnapshot
 
         # Mock response
         return [PlatformMetricSnapshot(
             platform=variant.platform,
-            platform_post_id=variant.content_id, # Placeholder
+            platform_post_id=variant.platform_post_id or variant.content_id,
             snapshot_at=datetime.now(),
             views=1000,
             likes=50,
@@ -50,4 +57,4 @@ class MetaConnector(SourceAdapter):
             impressions=1200,
             reach=900,
             raw_payload={"mock": True}
-        )]
+        ) for variant in variants]
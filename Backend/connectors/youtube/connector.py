@@ -4,6 +4,9 @@ from datetime import datetime
 from ..base import SourceAdapter, PlatformMetricSnapshot, ContentVariant
 
 class YouTubeConnector(SourceAdapter):
+    # videos.list accepts up to 50 ids per call
+    metrics_batch_size = 50
+
     def __init__(self):
         self.api_key = os.getenv("YOUTUBE_API_KEY")
         # In real implementation, might use google-auth library with credentials file
@@ -19,19 +22,23 @@ class YouTubeConnector(SourceAdapter):
         return ["youtube"]
 
     async def fetch_metrics_for_variant(self, variant: ContentVariant) -> List[PlatformMetricSnapshot]:
+        return await self.fetch_metrics_for_variants([variant])
+
+    async def fetch_metrics_for_variants(self, variants: List[ContentVariant]) -> List[PlatformMetricSnapshot]:
         if not self.is_enabled():
             return []
 
-        if variant.platform != "youtube":
+        post_ids = [v.platform_post_id or v.content_id for v in variants if v.platform == "youtube"]
+        if not post_ids:
             return []
 
         # In a real implementation:
-        # Call YouTube Data API videos().list(part='statistics')
+        # Call YouTube Data API videos().list(part='statistics', id=','.join(post_ids))
         
         # Mock response
         return [PlatformMetricSnapshot(
             platform="youtube",
-            platform_post_id=variant.content_id, # Placeholder
+            platform_post_id=post_id,
             snapshot_at=datetime.now(),
             views=2500,
             likes=150,
@@ -40,7 +47,7 @@ class YouTubeConnector(SourceAdapter):
             saves=50, # "Watch Later" maybe?
             watch_time_seconds=12000,
             raw_payload={"kind": "youtube#videoStatistics"}
-        )]
+        ) for post_id in post_ids]
 
     async def publish_variant(self, variant: ContentVariant) -> Dict[str, str]:
         if not self.is_enabled():
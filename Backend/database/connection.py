@@ -11,6 +11,7 @@ from loguru import logger
 import asyncio
 
 from config import settings
+from services.instrumentation import instrument_engine
 
 # SQLAlchemy setup
 Base = declarative_base()
@@ -43,6 +44,7 @@ async def init_db():
             pool_size=10,
             max_overflow=20
         )
+        instrument_engine(engine)
         
         async_session_maker = async_sessionmaker(
             engine,
@@ -90,10 +92,11 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             logger.error(f"Failed to reinitialize database: {e}")
             raise RuntimeError("Database not initialized and reinitialization failed.")
     
+    # No per-request probe: the engine's pool_pre_ping checks a connection
+    # when the session first checks one out, so requests that never touch the
+    # DB (e.g. a cached workspace lookup) never pay a round-trip
     async with async_session_maker() as session:
         try:
-            # Test connection with a simple query
-            await session.execute(text("SELECT 1"))
             yield session
             await session.commit()
         except Exception as e:
@@ -126,6 +126,21 @@ class SegmentMember(Base):
     segment = relationship("Segment", back_populates="members")
 
 
+class SegmentMembershipEvent(Base):
+    """Person added to / removed from a dynamic segment (written by SegmentEngine)"""
+    __tablename__ = "segment_membership_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    segment_id = Column(UUID(as_uuid=True), ForeignKey("segments.id", ondelete="CASCADE"), nullable=False)
+    person_id = Column(UUID(as_uuid=True), ForeignKey("people.id", ondelete="CASCADE"), nullable=False)
+    change = Column(String(10), nullable=False)  # 'added' | 'removed'
+    occurred_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_segment_membership_events_segment', 'segment_id', 'id'),
+    )
+
+
 class SegmentInsight(Base):
     """Per-segment analytics"""
     __tablename__ = "segment_insights"
@@ -163,6 +178,8 @@ class OutboundMessage(Base):
     clicked_at = Column(TIMESTAMP(timezone=True))
     replied_at = Column(TIMESTAMP(timezone=True))
     message_metadata = Column(JSONB)  # Renamed from 'metadata' (reserved by SQLAlchemy)
+    campaign_id = Column(UUID(as_uuid=True))  # email_campaigns.id for segment sends
+    delivery_status = Column(Text)  # queued, sent, failed, skipped, interrupted
     
     # Relationships
     person = relationship("Person", back_populates="outbound_messages")
@@ -203,6 +220,9 @@ class ContentVariant(Base):
     platform = Column(Text, nullable=False)
     variant_type = Column(Text)  # video, image, carousel, text
     status = Column(Text, default="draft")
+    platform_post_id = Column(Text)  # set once published
+    published_at = Column(TIMESTAMP(timezone=True))
+    is_paid = Column(Boolean, default=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -241,6 +261,29 @@ class ContentMetric(Base):
     variant = relationship("ContentVariant", back_populates="metrics")
 
 
+class ContentMetricLatest(Base):
+    """Latest metrics snapshot per variant (maintained by trigger on content_metrics)"""
+    __tablename__ = "content_metrics_latest"
+
+    variant_id = Column(UUID(as_uuid=True), ForeignKey("content_variants.id", ondelete="CASCADE"), primary_key=True)
+    snapshot_at = Column(TIMESTAMP(timezone=True), nullable=False)  # per-variant high-water mark
+    traffic_type = Column(String(20), default='organic')
+
+    views = Column(BigInteger)
+    impressions = Column(BigInteger)
+    reach = Column(BigInteger)
+    likes = Column(BigInteger)
+    comments = Column(BigInteger)
+    shares = Column(BigInteger)
+    saves = Column(BigInteger)
+    clicks = Column(BigInteger)
+    watch_time_seconds = Column(Float)
+    sentiment_score = Column(Float)
+
+    rolled_up_snapshot_at = Column(TIMESTAMP(timezone=True))  # last snapshot folded into content_rollups
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+
 class ContentRollup(Base):
 
     """Aggregated cross-platform metrics"""
@@ -980,7 +1023,7 @@ class ScheduledPost(Base):
     scheduled_time = Column(TIMESTAMP(timezone=True), nullable=False)
     
     # Publishing status
-    status = Column(String(50), default='scheduled')  # scheduled, publishing, published, failed, cancelled, max_retries_reached
+    status = Column(String(50), default='scheduled')  # scheduled, publishing, published, failed, cancelled, max_retries_reached, needs_review
     publish_response = Column(JSONB)  # Response from platform API
     error_message = Column(Text)  # Deprecated - use last_error
     
@@ -993,6 +1036,11 @@ class ScheduledPost(Base):
     next_retry_at = Column(TIMESTAMP(timezone=True))
     last_error = Column(Text)
     
+    # Publishing claim: writes by the claim holder are conditional on the token
+    claim_token = Column(UUID(as_uuid=True))
+    publish_started_at = Column(TIMESTAMP(timezone=True))  # Holder called the platform
+    heartbeat_at = Column(TIMESTAMP(timezone=True))  # Refreshed while the upload runs
+    
     # AI recommendation tracking
     is_ai_recommended = Column(Boolean, default=False)
     recommendation_score = Column(Float)
@@ -1006,6 +1054,11 @@ class ScheduledPost(Base):
     # Relationships
     clip = relationship("VideoClip", foreign_keys=[clip_id])
     content_variant = relationship("ContentVariant", foreign_keys=[content_variant_id])
+    
+    __table_args__ = (
+        # Calendar range scans filter on time, then status/platform
+        Index('idx_scheduled_posts_calendar', scheduled_time, status, platform),
+    )
 
 
 # =====================================================
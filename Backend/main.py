@@ -7,11 +7,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from loguru import logger
+import os
 import sys
 
 from config import settings
 from api.endpoints import videos, ingestion, jobs, analytics, analysis, highlights, clips, content, segments, messages, briefs, people, content_metrics, email, app_config, calendar, workspaces
 from database.connection import init_db, close_db
+from middleware.request_metrics import RequestMetricsMiddleware
+from services.instrumentation import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, install_instrumentation
 
 # Configure logging
 logger.remove()
@@ -55,6 +58,27 @@ async def lifespan(app: FastAPI):
             else:
                 logger.critical("✗ Failed to initialize database after all retries. Continuing anyway...")
     
+    # Keep this worker's workspace cache in sync with the others
+    try:
+        from middleware.workspace_cache import start_invalidation_listener
+        start_invalidation_listener()
+    except Exception as e:
+        logger.warning(f"⚠️  Workspace cache invalidation listener not started: {e}")
+    
+    # Let webhooks wake remote job waiters in every worker
+    try:
+        from services.job_waiter import start_job_event_listener
+        start_job_event_listener()
+    except Exception as e:
+        logger.warning(f"⚠️  Remote job event listener not started: {e}")
+    
+    # Renew OAuth tokens before they expire
+    try:
+        from services.oauth_manager import start_token_refresher
+        start_token_refresher()
+    except Exception as e:
+        logger.warning(f"⚠️  OAuth token refresher not started: {e}")
+    
     # Initialize connectors
     try:
         from connectors import initialize_adapters
@@ -67,6 +91,21 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down MediaPoster Backend")
+    try:
+        from middleware.workspace_cache import stop_invalidation_listener
+        await stop_invalidation_listener()
+    except Exception as e:
+        logger.error(f"✗ Error stopping workspace cache listener: {e}")
+    try:
+        from services.job_waiter import stop_job_event_listener
+        await stop_job_event_listener()
+    except Exception as e:
+        logger.error(f"✗ Error stopping remote job event listener: {e}")
+    try:
+        from services.oauth_manager import stop_token_refresher
+        await stop_token_refresher()
+    except Exception as e:
+        logger.error(f"✗ Error stopping OAuth token refresher: {e}")
     try:
         await close_db()
         logger.success("✓ Database connections closed")
@@ -98,6 +137,20 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Latency/SQL/subprocess/LLM instrumentation, exposed at /metrics
+install_instrumentation()
+app.add_middleware(
+    RequestMetricsMiddleware,
+    profiling_enabled=settings.debug or os.getenv("ENABLE_REQUEST_PROFILING", "").lower() == "true",
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    from fastapi.responses import Response
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
 
 # Health check
 @app.get("/health")
@@ -249,6 +302,10 @@ app.include_router(thumbnails.router, prefix="/api/thumbnails", tags=["Thumbnail
 from api.endpoints import api_usage
 app.include_router(api_usage.router, prefix="/api/api-usage", tags=["API Usage"])
 
+# Adaptive Check-backs
+from api.endpoints import checkbacks
+app.include_router(checkbacks.router, prefix="/api/checkbacks", tags=["Check-backs"])
+
 # Clip Management
 from api.endpoints import clip_management
 app.include_router(clip_management.router, prefix="/api/clip-management", tags=["Clip Management"])
@@ -0,0 +1,108 @@
+"""
+Request Metrics Middleware
+Times every HTTP request by route template, attributes SQL / subprocess /
+external-call time to it (services/instrumentation.py) and reports the
+breakdown in a Server-Timing header.
+
+Sending `X-Profile: 1` captures a sampling profile of the request with
+pyinstrument when profiling is enabled (ENABLE_REQUEST_PROFILING=true or
+debug mode). The HTML report is written under PROFILE_DIR and its path is
+returned in `X-Profile-Path`.
+"""
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+from starlette.datastructures import MutableHeaders
+
+from services.instrumentation import end_request_stats, record_request, start_request_stats
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "logs/profiles"))
+UNMATCHED_ROUTE = "unmatched"   # 404s etc.; raw paths would explode cardinality
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path or UNMATCHED_ROUTE
+
+
+def _server_timing(stats, total_seconds: float) -> str:
+    parts = [f"total;dur={total_seconds * 1000:.1f}"]
+    if stats.sql_count:
+        parts.append(f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"')
+    if stats.subprocess_seconds:
+        parts.append(f"subprocess;dur={stats.subprocess_seconds * 1000:.1f}")
+    if stats.external_seconds:
+        parts.append(f"external;dur={stats.external_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware (no per-request task/stream overhead)"""
+
+    def __init__(self, app, profiling_enabled: bool = False):
+        self.app = app
+        self.profiling_enabled = profiling_enabled
+        if profiling_enabled and Profiler is None:
+            logger.warning("Request profiling enabled but pyinstrument is not installed")
+
+    def _wants_profile(self, scope) -> bool:
+        if not self.profiling_enabled or Profiler is None:
+            return False
+        return any(name == PROFILE_HEADER and value not in (b"", b"0") for name, value in scope["headers"])
+
+    def _save_profile(self, profiler, scope) -> Optional[str]:
+        try:
+            profiler.stop()
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            slug = _route_label(scope).strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+            path = PROFILE_DIR / f"{datetime.now():%Y%m%d_%H%M%S_%f}_{scope['method']}_{slug}.html"
+            path.write_text(profiler.output_html())
+            return str(path)
+        except Exception as e:
+            logger.error(f"Failed to save request profile: {e}")
+            return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = start_request_stats()
+        started = time.perf_counter()
+        status_code = 500
+        profiler = None
+        if self._wants_profile(scope):
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+
+        async def send_with_timing(message):
+            nonlocal status_code, profiler
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", _server_timing(stats, time.perf_counter() - started))
+                if profiler is not None:
+                    profile_path = self._save_profile(profiler, scope)
+                    profiler = None
+                    if profile_path:
+                        headers.append("X-Profile-Path", profile_path)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+            record_request(scope["method"], _route_label(scope), status_code, time.perf_counter() - started, stats)
+            end_request_stats(token)
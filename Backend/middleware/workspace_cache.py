@@ -0,0 +1,138 @@
+"""
+Workspace Resolution Cache
+Keeps resolved workspace ids in process memory so the workspace dependency
+doesn't query `workspaces` on every request. Changes are broadcast over a
+Redis pub/sub channel so every API worker drops its copy; if Redis is
+unavailable, entries still expire after the TTL.
+"""
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+import redis.asyncio as aioredis
+from loguru import logger
+
+from config import settings
+
+CACHE_TTL_SECONDS = 60
+NEGATIVE_TTL_SECONDS = 5       # Unknown ids / no workspaces yet
+RECONNECT_DELAY_SECONDS = 5
+INVALIDATION_CHANNEL = "workspace-cache:invalidate"
+DEFAULT_KEY = "default"        # First workspace, used when no header is sent
+
+
+class WorkspaceCache:
+    """TTL cache of workspace id lookups; None records a miss"""
+
+    def __init__(self, ttl_seconds: float = CACHE_TTL_SECONDS, negative_ttl_seconds: float = NEGATIVE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries: Dict[str, Tuple[float, Optional[uuid.UUID]]] = {}
+
+    def get(self, key: str) -> Tuple[bool, Optional[uuid.UUID]]:
+        """
+        Look up a cached resolution
+
+        Returns:
+            (hit, workspace_id) - workspace_id is None for a cached miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, workspace_id = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return False, None
+        return True, workspace_id
+
+    def put(self, key: str, workspace_id: Optional[uuid.UUID]) -> None:
+        ttl = self.ttl_seconds if workspace_id is not None else self.negative_ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, workspace_id)
+
+    def invalidate(self, workspace_id: Optional[uuid.UUID] = None) -> None:
+        """Drop one workspace (and the default, which it may change) or everything"""
+        if workspace_id is None:
+            self._entries.clear()
+            return
+        self._entries.pop(str(workspace_id), None)
+        self._entries.pop(DEFAULT_KEY, None)
+
+
+workspace_cache = WorkspaceCache()
+
+_redis: Optional[aioredis.Redis] = None
+_listener_task: Optional[asyncio.Task] = None
+
+
+def _get_redis() -> aioredis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(settings.redis_url, decode_responses=True)
+    return _redis
+
+
+def handle_invalidation(data: str) -> None:
+    """Apply an invalidation message received from the channel"""
+    try:
+        workspace_id = json.loads(data).get("workspace_id")
+        workspace_cache.invalidate(uuid.UUID(workspace_id) if workspace_id else None)
+    except (ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring malformed workspace invalidation {data!r}: {e}")
+        workspace_cache.invalidate()
+
+
+async def publish_workspace_change(workspace_id: Optional[uuid.UUID] = None) -> None:
+    """
+    Invalidate a workspace in this worker and broadcast it to the others
+
+    Call after committing any change to `workspaces`. Failure to publish is
+    logged, not raised: other workers converge when their entries expire.
+    """
+    workspace_cache.invalidate(workspace_id)
+    message = json.dumps({"workspace_id": str(workspace_id) if workspace_id else None})
+    try:
+        await _get_redis().publish(INVALIDATION_CHANNEL, message)
+    except Exception as e:
+        logger.warning(f"Workspace cache invalidation not broadcast: {e}")
+
+
+async def _listen() -> None:
+    while True:
+        try:
+            pubsub = _get_redis().pubsub()
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Anything published while we were disconnected was missed
+            workspace_cache.invalidate()
+            logger.info(f"Listening for workspace cache invalidations on {INVALIDATION_CHANNEL}")
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    handle_invalidation(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Workspace invalidation listener disconnected: {e}")
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+
+def start_invalidation_listener() -> None:
+    """Subscribe this worker to workspace invalidations (call on startup)"""
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_listen())
+
+
+async def stop_invalidation_listener() -> None:
+    """Cancel the subscription and close the Redis client (call on shutdown)"""
+    global _listener_task, _redis
+    if _listener_task:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
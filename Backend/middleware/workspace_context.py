@@ -3,8 +3,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from database.connection import get_db
 from sqlalchemy import text
 from typing import Optional
+from loguru import logger
 import uuid
 
+from middleware.workspace_cache import DEFAULT_KEY, workspace_cache
+
 # Helper to get user ID from JWT (mocked/simplified for now, assumes auth middleware runs first)
 # In a real app, this would extract from request.state.user or similar
 # For now, we'll rely on the DB function auth.safe_user_id() or similar logic if needed,
@@ -18,24 +21,25 @@ async def get_current_workspace_id(
     Extract workspace_id from header and validate access.
     Returns the workspace UUID if valid.
     Falls back to first available workspace if header not provided (for testing/dev).
+    Lookups are served from workspace_cache; the DB is only queried on a miss.
     """
     if not x_workspace_id:
         # Fallback: Try to get the first available workspace for testing/dev
-        try:
-            query = text("SELECT id FROM workspaces ORDER BY created_at LIMIT 1")
-            result = await db.execute(query)
-            rows = list(result.fetchall())
-            if rows:
-                workspace_id = rows[0][0]
-                from loguru import logger
+        hit, workspace_id = workspace_cache.get(DEFAULT_KEY)
+        if not hit:
+            try:
+                query = text("SELECT id FROM workspaces ORDER BY created_at LIMIT 1")
+                result = await db.execute(query)
+                rows = list(result.fetchall())
+                workspace_id = rows[0][0] if rows else None
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Error getting default workspace: {str(e)}")
+            workspace_cache.put(DEFAULT_KEY, workspace_id)
+            if workspace_id:
                 logger.warning(f"No X-Workspace-Id header provided, using default workspace: {workspace_id}")
-                return workspace_id
-            else:
-                raise HTTPException(status_code=400, detail="No workspaces available and X-Workspace-Id header not provided")
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error getting default workspace: {str(e)}")
+        if not workspace_id:
+            raise HTTPException(status_code=400, detail="No workspaces available and X-Workspace-Id header not provided")
+        return workspace_id
     
     try:
         workspace_id = uuid.UUID(x_workspace_id)
@@ -43,16 +47,17 @@ async def get_current_workspace_id(
         raise HTTPException(status_code=400, detail="Invalid workspace ID format")
     
     # Verify workspace exists
-    try:
-        query = text("SELECT 1 FROM workspaces WHERE id = :id")
-        result = await db.execute(query, {"id": workspace_id})
-        rows = list(result.fetchall())
-        exists = rows[0][0] if rows else None
-        if not exists:
-            raise HTTPException(status_code=404, detail="Workspace not found")
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error verifying workspace: {str(e)}")
+    hit, cached_id = workspace_cache.get(str(workspace_id))
+    if not hit:
+        try:
+            query = text("SELECT 1 FROM workspaces WHERE id = :id")
+            result = await db.execute(query, {"id": workspace_id})
+            rows = list(result.fetchall())
+            cached_id = workspace_id if rows and rows[0][0] else None
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error verifying workspace: {str(e)}")
+        workspace_cache.put(str(workspace_id), cached_id)
+    if not cached_id:
+        raise HTTPException(status_code=404, detail="Workspace not found")
 
     return workspace_id
@@ -2,10 +2,13 @@
 OpenAI Sora video generation implementation
 """
 from typing import Optional, List
+import asyncio
 import time
 from loguru import logger
 from openai import OpenAI
 
+from services.job_waiter import DONE, TIMEOUT, get_job_waiter, video_job_poll
+
 from .video_model_interface import (
     VideoModelInterface,
     VideoGenerationRequest,
@@ -134,24 +137,24 @@ class SoraVideoModel(VideoModelInterface):
             logger.error(f"Download failed: {e}")
             raise
     
-    def create_and_wait(
-        self, 
+    async def create_and_wait_async(
+        self,
         request: VideoGenerationRequest,
         poll_interval: int = 10,
         max_wait: int = 600
     ) -> VideoGenerationJob:
         """
-        Create video and wait for completion
+        Create video and wait for completion without blocking the event loop
         
         Args:
             request: Video generation request
-            poll_interval: Seconds between status checks
+            poll_interval: Base seconds between status checks (backs off from here)
             max_wait: Maximum wait time in seconds
             
         Returns:
             Completed job
         """
-        job = self.create_video(request)
+        job = await asyncio.to_thread(self.create_video, request)
         
         if job.status == VideoStatus.FAILED:
             return job
@@ -159,26 +162,44 @@ class SoraVideoModel(VideoModelInterface):
         logger.info(f"Waiting for job {job.job_id} to complete...")
         
         start_time = time.time()
+        outcome = await get_job_waiter().wait(
+            "sora",
+            job.job_id,
+            lambda: video_job_poll(self, job.job_id),
+            timeout=max_wait,
+            interval=poll_interval,
+        )
         
-        while (time.time() - start_time) < max_wait:
-            job = self.get_status(job.job_id)
-            
-            if job.status == VideoStatus.COMPLETED:
-                logger.success(f"Job completed in {int(time.time() - start_time)}s")
-                return job
-            elif job.status == VideoStatus.FAILED:
-                logger.error(f"Job failed: {job.error_message}")
-                return job
-            
-            if job.progress is not None:
-                logger.info(f"Progress: {job.progress}%")
-            
-            time.sleep(poll_interval)
+        if outcome.state == DONE:
+            logger.success(f"Job completed in {int(time.time() - start_time)}s")
+            return outcome.result
+        
+        if outcome.state == TIMEOUT:
+            logger.warning(f"Job timed out after {max_wait}s")
+            job.error_message = f"Timeout after {max_wait}s"
+            return job
         
-        logger.warning(f"Job timed out after {max_wait}s")
-        job.error_message = f"Timeout after {max_wait}s"
+        if outcome.result is not None:
+            job = outcome.result
+        else:
+            job.status = VideoStatus.FAILED
+            job.error_message = outcome.error
+        logger.error(f"Job failed: {job.error_message}")
         return job
     
+    def create_and_wait(
+        self, 
+        request: VideoGenerationRequest,
+        poll_interval: int = 10,
+        max_wait: int = 600
+    ) -> VideoGenerationJob:
+        """
+        Create video and wait for completion (blocking wrapper for scripts)
+        
+        Use create_and_wait_async from async code.
+        """
+        return asyncio.run(self.create_and_wait_async(request, poll_interval, max_wait))
+    
     def list_jobs(self, limit: int = 20) -> List[VideoGenerationJob]:
         """List recent jobs"""
         try:
@@ -3,7 +3,7 @@ Content Analyzer
 Combines all AI analysis modules for comprehensive video understanding
 """
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from loguru import logger
 import json
 
@@ -22,7 +22,8 @@ class ContentAnalyzer:
     def __init__(
         self,
         openai_api_key: Optional[str] = None,
-        output_dir: Optional[Path] = None
+        output_dir: Optional[Path] = None,
+        tenant: Optional[str] = None
     ):
         """
         Initialize content analyzer with all sub-analyzers
@@ -30,10 +31,11 @@ class ContentAnalyzer:
         Args:
             openai_api_key: OpenAI API key
             output_dir: Directory for temporary files
+            tenant: Scope within which near-duplicate frame results are reused
         """
         self.whisper = WhisperService(api_key=openai_api_key)
         self.frame_extractor = FrameExtractor(output_dir=output_dir)
-        self.vision = VisionAnalyzer(api_key=openai_api_key)
+        self.vision = VisionAnalyzer(api_key=openai_api_key, tenant=tenant)
         self.audio = AudioAnalyzer()
         
         logger.info("Content analyzer initialized with all modules")
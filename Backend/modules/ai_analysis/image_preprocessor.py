@@ -0,0 +1,251 @@
+"""
+Vision Image Preprocessing
+Downsizes images to the vision model's effective resolution before upload and
+dedups near-identical images by perceptual hash
+"""
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageOps
+from loguru import logger
+
+try:
+    import pillow_heif
+    pillow_heif.register_heif_opener()
+except ImportError:
+    logger.debug("pillow-heif not installed, HEIC images cannot be preprocessed")
+
+
+# GPT-4o fits high-detail images inside 2048x2048 and then scales the short
+# side to 768px; low detail is a single 512px tile. Pixels beyond that are
+# uploaded and then thrown away by the API.
+HIGH_DETAIL_MAX_SIDE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+LOW_DETAIL_MAX_SIDE = 512
+JPEG_QUALITY = 85
+
+DEFAULT_HAMMING_THRESHOLD = 6
+DEFAULT_CACHE_ENTRIES = 10000
+
+
+@dataclass
+class PreparedImage:
+    """A resized, re-encoded image ready to send to a vision model"""
+    data: bytes
+    phash: int
+    width: int
+    height: int
+    original_bytes: int
+
+    @property
+    def base64(self) -> str:
+        return base64.b64encode(self.data).decode('utf-8')
+
+    @property
+    def data_url(self) -> str:
+        return f"data:image/jpeg;base64,{self.base64}"
+
+
+def target_size(width: int, height: int, detail: str = "auto") -> Tuple[int, int]:
+    """Largest size the vision model will actually look at for this detail level"""
+    if detail == "low":
+        scale = LOW_DETAIL_MAX_SIDE / max(width, height)
+    else:
+        scale = min(
+            HIGH_DETAIL_MAX_SIDE / max(width, height),
+            HIGH_DETAIL_SHORT_SIDE / min(width, height)
+        )
+    scale = min(scale, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def perceptual_hash(img: Image.Image) -> int:
+    """
+    64-bit pHash: low-frequency 8x8 DCT coefficients of a 32x32 grayscale
+    thumbnail, thresholded at their median
+    """
+    gray = np.asarray(img.convert("L").resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+    low_freq = (_DCT_32 @ gray @ _DCT_32.T)[:8, :8].flatten()
+    bits = low_freq > np.median(low_freq[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count("1")
+
+
+def prepare_image(
+    source: Union[str, Path, bytes],
+    detail: str = "auto",
+    quality: int = JPEG_QUALITY
+) -> PreparedImage:
+    """
+    Decode, orient, hash, resize and JPEG-encode an image for a vision call
+
+    Args:
+        source: Image path or raw bytes (JPEG, PNG, HEIC, ...)
+        detail: Vision detail level the image will be sent with
+        quality: JPEG quality for the re-encoded image
+
+    Returns:
+        PreparedImage with the upload payload and its perceptual hash
+    """
+    raw = source if isinstance(source, bytes) else Path(source).read_bytes()
+
+    img = ImageOps.exif_transpose(Image.open(BytesIO(raw)))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    phash = perceptual_hash(img)
+
+    size = target_size(img.width, img.height, detail)
+    if size != img.size:
+        img = img.resize(size, Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    img.save(buffer, "JPEG", quality=quality, optimize=True)
+
+    return PreparedImage(
+        data=buffer.getvalue(),
+        phash=phash,
+        width=img.width,
+        height=img.height,
+        original_bytes=len(raw)
+    )
+
+
+class _Partition:
+    """One tenant's results for one scope, with a banded index over the hashes"""
+
+    def __init__(self, bands: int):
+        self.entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self.bands: List[Dict[int, Set[int]]] = [{} for _ in range(bands)]
+
+
+class VisionResultCache:
+    """
+    Vision results keyed by perceptual hash
+
+    Results are partitioned by tenant and by scope (model + prompt + detail),
+    so a frame is only reused for the same tenant asking the same question. A
+    lookup hits when a cached hash in the partition is within `threshold`
+    bits of the query.
+
+    Near lookups use a banded index: the 64 bits are split into threshold + 1
+    bands, and any hash within the threshold matches the query exactly in at
+    least one band, so only those buckets are compared.
+    """
+
+    def __init__(
+        self,
+        threshold: int = DEFAULT_HAMMING_THRESHOLD,
+        max_entries: int = DEFAULT_CACHE_ENTRIES
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._partitions: Dict[Tuple[Optional[str], str], _Partition] = {}
+        self._lock = threading.Lock()
+
+        bands = min(threshold + 1, 64)
+        edges = [round(i * 64 / bands) for i in range(bands + 1)]
+        self._bands = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+
+    @staticmethod
+    def scope_key(*parts) -> str:
+        """Stable key for the model/prompt/options a result depends on"""
+        return hashlib.sha1("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+
+    def _band_values(self, phash: int) -> List[int]:
+        return [(phash >> shift) & mask for shift, mask in self._bands]
+
+    def get(self, phash: int, scope: str, tenant: Optional[str] = None) -> Optional[Dict]:
+        """Return the closest cached result within the threshold, if any"""
+        with self._lock:
+            partition = self._partitions.get((tenant, scope))
+            match = None
+            if partition:
+                if phash in partition.entries:
+                    match = phash
+                elif self.threshold > 0:
+                    candidates = set()
+                    for band, value in zip(partition.bands, self._band_values(phash)):
+                        candidates.update(band.get(value, ()))
+                    best_distance = self.threshold + 1
+                    for cached_hash in candidates:
+                        distance = hamming_distance(phash, cached_hash)
+                        if distance < best_distance:
+                            match, best_distance = cached_hash, distance
+
+            if match is None:
+                self.misses += 1
+                return None
+
+            partition.entries.move_to_end(match)
+            self.hits += 1
+            return partition.entries[match]
+
+    def put(self, phash: int, scope: str, result: Dict, tenant: Optional[str] = None):
+        """Store a result, evicting the least recently used entry of the partition"""
+        with self._lock:
+            partition = self._partitions.get((tenant, scope))
+            if partition is None:
+                partition = self._partitions[(tenant, scope)] = _Partition(len(self._bands))
+            if phash not in partition.entries:
+                for band, value in zip(partition.bands, self._band_values(phash)):
+                    band.setdefault(value, set()).add(phash)
+            partition.entries[phash] = result
+            partition.entries.move_to_end(phash)
+            while len(partition.entries) > self.max_entries:
+                evicted, _ = partition.entries.popitem(last=False)
+                for band, value in zip(partition.bands, self._band_values(evicted)):
+                    bucket = band[value]
+                    bucket.discard(evicted)
+                    if not bucket:
+                        del band[value]
+
+    def clear(self):
+        with self._lock:
+            self._partitions.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": sum(len(p.entries) for p in self._partitions.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_vision_cache: Optional[VisionResultCache] = None
+
+
+def get_vision_cache() -> VisionResultCache:
+    """Process-wide cache shared by every vision caller, partitioned by tenant"""
+    global _vision_cache
+    if _vision_cache is None:
+        from config import settings
+        _vision_cache = VisionResultCache(threshold=settings.vision_dedup_hamming_threshold)
+    return _vision_cache
@@ -3,12 +3,12 @@ Vision Analysis Service
 Analyzes video frames using GPT-4 Vision
 """
 import openai
-import base64
 from pathlib import Path
 from typing import List, Dict, Optional
 from loguru import logger
 
 from config import settings
+from .image_preprocessor import VisionResultCache, get_vision_cache, prepare_image
 
 
 class VisionAnalyzer:
@@ -17,7 +17,9 @@ class VisionAnalyzer:
     def __init__(
         self,
         api_key: Optional[str] = None,
-        model: str = "gpt-4-vision-preview"
+        model: str = "gpt-4-vision-preview",
+        cache: Optional[VisionResultCache] = None,
+        tenant: Optional[str] = None
     ):
         """
         Initialize vision analyzer
@@ -25,25 +27,31 @@ class VisionAnalyzer:
         Args:
             api_key: OpenAI API key (defaults to settings)
             model: GPT model to use (must support vision)
+            cache: pHash result cache (defaults to the shared process cache)
+            tenant: Workspace or user whose results may be reused; without
+                one, results are never cached or reused across callers
         """
         self.api_key = api_key or settings.openai_api_key
         self.model = model
         self.client = openai.OpenAI(api_key=self.api_key)
+        self.cache = cache or get_vision_cache()
+        self.tenant = tenant
+        self.stats = {'api_calls': 0, 'cache_hits': 0, 'bytes_original': 0, 'bytes_sent': 0}
         
         logger.info(f"Vision analyzer initialized with model: {model}")
     
-    def encode_image(self, image_path: Path) -> str:
+    def encode_image(self, image_path: Path, detail: str = "auto") -> str:
         """
-        Encode image to base64
+        Encode image to base64, downsized to what the model will look at
         
         Args:
             image_path: Path to image file
+            detail: Image detail level the image will be sent with
             
         Returns:
-            Base64 encoded string
+            Base64 encoded JPEG
         """
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+        return prepare_image(image_path, detail=detail).base64
     
     def analyze_frame(
         self,
@@ -78,8 +86,23 @@ class VisionAnalyzer:
 
 Be concise but thorough."""
         
-        # Encode image
-        base64_image = self.encode_image(image_path)
+        # Resize and hash; near-duplicates of an analyzed image reuse its result
+        prepared = prepare_image(image_path, detail=detail)
+        scope = self.cache.scope_key(self.model, prompt, detail)
+        cached = self.cache.get(prepared.phash, scope, tenant=self.tenant) if self.tenant else None
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            logger.info(f"Reusing vision result of near-duplicate {Path(cached['image_path']).name}")
+            return {
+                **cached,
+                'image_path': str(image_path),
+                'duplicate_of': cached['image_path'],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            }
+        
+        self.stats['api_calls'] += 1
+        self.stats['bytes_original'] += prepared.original_bytes
+        self.stats['bytes_sent'] += len(prepared.data)
         
         try:
             response = self.client.chat.completions.create(
@@ -92,7 +115,7 @@ Be concise but thorough."""
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}",
+                                    "url": prepared.data_url,
                                     "detail": detail
                                 }
                             }
@@ -106,6 +129,7 @@ Be concise but thorough."""
                 'image_path': str(image_path),
                 'description': response.choices[0].message.content,
                 'model': self.model,
+                'phash': f"{prepared.phash:016x}",
                 'usage': {
                     'prompt_tokens': response.usage.prompt_tokens,
                     'completion_tokens': response.usage.completion_tokens,
@@ -113,6 +137,9 @@ Be concise but thorough."""
                 }
             }
             
+            if self.tenant:
+                self.cache.put(prepared.phash, scope, dict(result), tenant=self.tenant)
+            
             logger.success(f"✓ Frame analyzed ({result['usage']['total_tokens']} tokens)")
             return result
             
@@ -168,7 +195,11 @@ Be concise but thorough."""
                     'description': None
                 })
         
-        logger.success(f"✓ Batch analysis complete (total {total_tokens} tokens)")
+        logger.success(
+            f"✓ Batch analysis complete (total {total_tokens} tokens, "
+            f"{self.stats['api_calls']} API calls, {self.stats['cache_hits']} reused, "
+            f"{self.stats['bytes_sent'] / 1e6:.1f}MB sent of {self.stats['bytes_original'] / 1e6:.1f}MB)"
+        )
         return results
     
     def detect_text_in_frame(self, image_path: Path) -> Dict:
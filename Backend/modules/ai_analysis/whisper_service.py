@@ -10,6 +10,7 @@ import subprocess
 import json
 
 from config import settings
+from services.transcription_engine import get_transcription_engine
 
 
 class WhisperService:
@@ -27,6 +28,7 @@ class WhisperService:
         openai.api_key = self.api_key
         self.model = model
         self.client = openai.OpenAI(api_key=self.api_key)
+        self.engine = get_transcription_engine(api_key=self.api_key, model=model)
         
         logger.info(f"Whisper service initialized with model: {model}")
     
@@ -149,24 +151,15 @@ class WhisperService:
         """
         logger.info(f"Starting transcription for: {video_path.name}")
         
-        # Extract audio
-        audio_path = self.extract_audio(video_path)
+        # Audio extraction, chunking and caching are handled by the engine;
+        # the extracted audio is only kept when cleanup is off.
+        result = self.engine.transcribe(video_path, language=language, keep_audio=not cleanup)
         
-        try:
-            # Transcribe
-            result = self.transcribe(audio_path, language=language)
-            
-            # Add metadata
-            result['video_path'] = str(video_path)
-            result['video_name'] = video_path.name
-            
-            return result
-            
-        finally:
-            # Cleanup temporary audio file
-            if cleanup and audio_path.exists():
-                audio_path.unlink()
-                logger.debug(f"Cleaned up temporary audio: {audio_path.name}")
+        # Add metadata
+        result['video_path'] = str(video_path)
+        result['video_name'] = video_path.name
+        
+        return result
     
     def generate_srt(self, transcript: Dict, output_path: Path) -> Path:
         """
@@ -4,8 +4,22 @@ Upload and manage clips in cloud storage
 """
 from .google_drive import GoogleDriveUploader
 from .storage_manager import StorageManager
+from .transfer import (
+    GoogleDriveBackend,
+    LocalFilesystemBackend,
+    StorageBackend,
+    SupabaseBackend,
+    TransferEngine,
+    TransferItem,
+)
 
 __all__ = [
     "GoogleDriveUploader",
     "StorageManager",
+    "StorageBackend",
+    "LocalFilesystemBackend",
+    "GoogleDriveBackend",
+    "SupabaseBackend",
+    "TransferEngine",
+    "TransferItem",
 ]
@@ -21,6 +21,7 @@ class GoogleDriveUploader:
         """
         self.credentials_path = credentials_path or Path("./google_credentials.json")
         self.service = None
+        self.credentials = None
         self.folder_cache = {}
         
         logger.info("Google Drive uploader initialized")
@@ -68,6 +69,7 @@ class GoogleDriveUploader:
                 with open(token_path, 'wb') as token:
                     pickle.dump(creds, token)
             
+            self.credentials = creds
             self.service = build('drive', 'v3', credentials=creds)
             logger.success("✓ Authenticated with Google Drive")
             return True
@@ -2,10 +2,12 @@
 Storage Manager
 Coordinate multiple storage providers
 """
+import asyncio
 from pathlib import Path
 from typing import Dict, Optional, List
 from loguru import logger
 from .google_drive import GoogleDriveUploader
+from .transfer import ProgressCallback, TransferEngine, TransferItem, as_backend
 
 
 class StorageManager:
@@ -82,15 +84,59 @@ class StorageManager:
         metadata_list: Optional[List[Dict]] = None,
         provider: Optional[str] = None
     ) -> List[Dict]:
-        """Upload multiple clips"""
-        results = []
+        """Upload multiple clips (blocking wrapper around upload_batch_async)"""
+        return asyncio.run(self.upload_batch_async(clip_paths, metadata_list, provider))
+    
+    async def upload_batch_async(
+        self,
+        clip_paths: List[Path],
+        metadata_list: Optional[List[Dict]] = None,
+        provider: Optional[str] = None,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> List[Dict]:
+        """
+        Upload multiple clips concurrently
         
-        for i, clip_path in enumerate(clip_paths):
-            metadata = metadata_list[i] if metadata_list else None
+        Clips whose content is already stored are skipped, and every upload
+        is checksum-verified (see transfer.TransferEngine).
+        
+        Args:
+            clip_paths: Paths to clips
+            metadata_list: Per-clip metadata (same order)
+            provider: Provider name (uses default if None)
+            on_progress: Called as (progress, key) while bytes are sent
             
-            result = self.upload_clip(clip_path, metadata, provider)
-            if result:
-                results.append(result)
+        Returns:
+            Upload results with links, for the clips that succeeded
+        """
+        provider_name = provider or self.default_provider
+        if provider_name not in self.providers:
+            logger.error(f"Provider not found: {provider_name}")
+            return []
+        
+        items = [
+            TransferItem(
+                path=Path(clip_path),
+                key=Path(clip_path).name,
+                metadata=metadata_list[i] if metadata_list else {},
+            )
+            for i, clip_path in enumerate(clip_paths)
+        ]
+        backend = as_backend(self.providers[provider_name])
+        transfers = await TransferEngine().upload_many(items, backend, on_progress)
+        
+        results = [
+            {
+                'id': t.remote.id,
+                'name': t.remote.key,
+                'link': t.remote.url,
+                'size': t.remote.size,
+                'sha256': t.sha256,
+                'skipped': t.skipped,
+                'provider': provider_name,
+            }
+            for t in transfers if t.success
+        ]
         
         logger.success(f"✓ Uploaded {len(results)}/{len(clip_paths)} clips")
         return results
@@ -116,5 +162,5 @@ if __name__ == "__main__":
     print("STORAGE MANAGER")
     print("="*60)
     print("\nCoordinates multiple storage providers.")
-    print("Currently supports: Google Drive")
+    print("Currently supports: Google Drive, Supabase Storage, local filesystem")
     print("\nFor testing, use test_phase4.py")
@@ -0,0 +1,242 @@
+"""
+File Stability Tracker
+Decides when newly written files are complete, without blocking the
+file system event threads that report them.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+Signature = Tuple[int, int]  # (size, mtime_ns)
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel: O(1) schedule, and each tick only looks at one
+    slot. Entries can't be cancelled; callers ignore stale ones.
+    """
+
+    def __init__(self, tick: float = 0.05, slots: int = 512, clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self.slots: List[List[Tuple[int, object]]] = [[] for _ in range(slots)]
+        self.current = int(clock() / tick)
+        self.size = 0
+
+    def schedule(self, item, delay: float):
+        if self.size == 0:
+            # Nothing to expire in between, so skip the idle ticks
+            self.current = max(self.current, int(self.clock() / self.tick))
+        ticks = max(1, int(delay / self.tick + 0.999999))
+        due = self.current + ticks
+        self.slots[due % len(self.slots)].append((due, item))
+        self.size += 1
+
+    def advance(self) -> list:
+        """Move the wheel up to the current time; returns items that came due"""
+        now = int(self.clock() / self.tick)
+        expired = []
+        while self.current < now and self.size:
+            self.current += 1
+            slot = self.slots[self.current % len(self.slots)]
+            if not slot:
+                continue
+            keep = []
+            for entry in slot:
+                if entry[0] <= self.current:
+                    expired.append(entry[1])
+                else:
+                    keep.append(entry)
+            self.size -= len(slot) - len(keep)
+            slot[:] = keep
+        return expired
+
+
+@dataclass
+class _TrackedFile:
+    path: Path
+    first_seen: float
+    generation: int = 0
+    closed: bool = False
+    signature: Optional[Signature] = None
+
+
+class FileStabilityTracker:
+    """
+    Tracks files independently until each one is stable, then dispatches it
+    exactly once.
+
+    Event threads call note(), which only updates a dict and schedules a
+    check on the timer wheel. A single timer thread does the stat calls;
+    callbacks run on a small worker pool so a slow one doesn't hold up the
+    others.
+
+    - A close-after-write event (inotify IN_CLOSE_WRITE, where the observer
+      reports it) marks the file done once `settle` seconds pass with no
+      further events.
+    - Otherwise (macOS, moved-in files, network mounts) the file is polled:
+      it is stable once its size and mtime are unchanged across
+      `quiet_period`.
+    - Any new event for a tracked file resets its timer, so the duplicate
+      created/modified/moved bursts collapse into one dispatch.
+    - A file is dispatched once per (size, mtime); later events that leave it
+      unchanged are ignored. Dispatches are remembered for `max_wait`
+      seconds, so the record doesn't grow with every file ever seen.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Path], None],
+        quiet_period: float = 1.0,
+        settle: float = 0.25,
+        max_wait: float = 3600,
+        dispatch_workers: int = 4,
+        tick: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.callback = callback
+        self.quiet_period = quiet_period
+        self.settle = settle
+        self.max_wait = max_wait
+        self.clock = clock
+        self._wheel = TimerWheel(tick=tick, clock=clock)
+        self._pending: Dict[str, _TrackedFile] = {}
+        # key -> (signature, dispatched at), oldest dispatch first
+        self._dispatched: "OrderedDict[str, Tuple[Signature, float]]" = OrderedDict()
+        self._lock = threading.Condition()
+        self._dispatch_workers = dispatch_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # ------------------------------------------------------------------
+    # Event side (called from observer threads; never blocks on I/O)
+    # ------------------------------------------------------------------
+
+    def note(self, path: Path, closed: bool = False, only_if_tracked: bool = False) -> bool:
+        """
+        Record an event for `path`. Returns False if it was ignored
+        (`only_if_tracked` and the file isn't being tracked).
+        """
+        key = str(Path(path).absolute())
+        with self._lock:
+            tracked = self._pending.get(key)
+            if tracked is None:
+                if only_if_tracked:
+                    return False
+                tracked = self._pending[key] = _TrackedFile(Path(path), first_seen=self.clock())
+            tracked.closed = closed
+            tracked.generation += 1
+            self._wheel.schedule((key, tracked.generation), self.settle if closed else self.quiet_period)
+            self._ensure_started()
+            self._lock.notify()
+        return True
+
+    def is_tracking(self, path: Path) -> bool:
+        with self._lock:
+            return str(Path(path).absolute()) in self._pending
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    # ------------------------------------------------------------------
+    # Timer side
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._thread is None and not self._stopping:
+            self._executor = ThreadPoolExecutor(self._dispatch_workers, thread_name_prefix="file-stable")
+            self._thread = threading.Thread(target=self._run, name="file-stability", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+                # Sleep until the next tick, or until note() when nothing is scheduled
+                self._lock.wait(self._wheel.tick if self._wheel.size else None)
+                due = self._wheel.advance()
+                checks = [
+                    (key, self._pending[key], generation) for key, generation in due
+                    if key in self._pending and self._pending[key].generation == generation
+                ]
+            for key, tracked, generation in checks:
+                self._check(key, tracked, generation)
+
+    def _check(self, key: str, tracked: _TrackedFile, generation: int):
+        try:
+            stat = tracked.path.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            signature = None
+
+        with self._lock:
+            if self._pending.get(key) is not tracked or tracked.generation != generation:
+                return  # A newer event rescheduled it
+            if signature is None:
+                # Gone (temp file renamed away, download cancelled)
+                del self._pending[key]
+                logger.debug(f"Stopped tracking vanished file: {tracked.path.name}")
+                return
+            if not tracked.closed and tracked.signature != signature:
+                # Still changing (or first poll): check again after another quiet period
+                if self.clock() - tracked.first_seen > self.max_wait:
+                    del self._pending[key]
+                    logger.warning(f"File not stable after {self.max_wait:.0f}s: {tracked.path}")
+                    return
+                tracked.signature = signature
+                self._wheel.schedule((key, generation), self.quiet_period)
+                return
+            del self._pending[key]
+            now = self.clock()
+            self._forget_dispatched(now)
+            previous = self._dispatched.get(key)
+            if previous is not None and previous[0] == signature:
+                return
+            self._dispatched.pop(key, None)
+            self._dispatched[key] = (signature, now)
+            executor = self._executor
+
+        logger.debug(f"File stable: {tracked.path.name} ({signature[0]} bytes)")
+        executor.submit(self._dispatch, tracked.path)
+
+    def _forget_dispatched(self, now: float):
+        """Drop dispatch records older than max_wait (caller holds the lock)"""
+        while self._dispatched:
+            key, (_, dispatched_at) = next(iter(self._dispatched.items()))
+            if now - dispatched_at <= self.max_wait:
+                break
+            del self._dispatched[key]
+
+    def _dispatch(self, path: Path):
+        try:
+            self.callback(path)
+        except Exception as e:
+            logger.error(f"Error processing {path}: {e}")
+
+    def stop(self, wait: bool = True):
+        """
+        Stop the timer thread and let running callbacks finish. Files still
+        pending are dropped; the next note() starts the tracker again.
+        """
+        with self._lock:
+            self._stopping = True
+            self._lock.notify()
+            thread, executor = self._thread, self._executor
+        if thread is not None:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        with self._lock:
+            self._pending.clear()
+            self._thread = self._executor = None
+            self._stopping = False
@@ -2,14 +2,14 @@
 File System Watcher
 Monitors directories for new video files (AirDrop, Desktop, etc.)
 """
-import os
-import time
 from pathlib import Path
 from typing import List, Callable, Set, Optional
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileMovedEvent
 from loguru import logger
 
+from .file_stability import FileStabilityTracker
+
 
 class VideoFileHandler(FileSystemEventHandler):
     """Handler for video file system events"""
@@ -19,13 +19,12 @@ class VideoFileHandler(FileSystemEventHandler):
         Initialize handler
         
         Args:
-            callback: Function to call when new video detected
+            callback: Function to call when new video detected (once the file is fully written)
             supported_formats: Set of supported file extensions (e.g., {'.mp4', '.mov'})
         """
         self.callback = callback
         self.supported_formats = {fmt.lower() for fmt in supported_formats}
-        self.processing_files = set()
-        self.processed_files = set()
+        self.tracker = FileStabilityTracker(callback)
         
     def is_video_file(self, path: Path) -> bool:
         """Check if file is a supported video format"""
@@ -47,74 +46,28 @@ class VideoFileHandler(FileSystemEventHandler):
         dest_path = Path(event.dest_path)
         self._handle_new_file(dest_path)
     
+    def on_modified(self, event):
+        """Writes to a file we're already waiting on push its stability check back"""
+        if not event.is_directory:
+            self.tracker.note(Path(event.src_path), only_if_tracked=True)
+    
+    def on_closed(self, event):
+        """Close-after-write (inotify) means the writer is done"""
+        if not event.is_directory:
+            self.tracker.note(Path(event.src_path), closed=True, only_if_tracked=True)
+    
     def _handle_new_file(self, file_path: Path):
-        """Process a new file"""
+        """Start tracking a new file; the tracker calls back once it's stable"""
         if not self.is_video_file(file_path):
             return
         
-        # Avoid processing same file multiple times
-        file_key = str(file_path.absolute())
-        if file_key in self.processing_files or file_key in self.processed_files:
-            return
-        
-        self.processing_files.add(file_key)
-        logger.info(f"New video file detected: {file_path.name}")
-        
-        try:
-            # Wait for file to be fully written
-            if self._wait_for_file_stable(file_path):
-                self.callback(file_path)
-                self.processed_files.add(file_key)
-            else:
-                logger.warning(f"File not stable after waiting: {file_path}")
-        except Exception as e:
-            logger.error(f"Error processing {file_path}: {e}")
-        finally:
-            self.processing_files.discard(file_key)
+        if not self.tracker.is_tracking(file_path):
+            logger.info(f"New video file detected: {file_path.name}")
+        self.tracker.note(file_path)
     
-    def _wait_for_file_stable(self, file_path: Path, timeout: int = 30) -> bool:
-        """
-        Wait for file to be fully written
-        Checks if file size stops changing
-        
-        Args:
-            file_path: Path to file
-            timeout: Max seconds to wait
-            
-        Returns:
-            True if file is stable
-        """
-        if not file_path.exists():
-            return False
-        
-        last_size = -1
-        stable_count = 0
-        checks = 0
-        max_checks = timeout * 2  # Check every 0.5 seconds
-        
-        while checks < max_checks:
-            try:
-                current_size = file_path.stat().st_size
-                
-                if current_size == last_size:
-                    stable_count += 1
-                    # Consider stable after 3 consecutive same-size checks
-                    if stable_count >= 3:
-                        logger.debug(f"File stable: {file_path.name} ({current_size} bytes)")
-                        return True
-                else:
-                    stable_count = 0
-                    last_size = current_size
-                
-                time.sleep(0.5)
-                checks += 1
-                
-            except OSError:
-                # File might be temporarily inaccessible
-                time.sleep(0.5)
-                checks += 1
-        
-        return False
+    def stop(self):
+        """Stop stability tracking"""
+        self.tracker.stop()
 
 
 class VideoFileWatcher:
@@ -181,6 +134,7 @@ class VideoFileWatcher:
             self.observer.stop()
             self.observer.join()
             self.observer = None
+            self.event_handler.stop()
             logger.info("File watcher stopped")
     
     def is_running(self) -> bool:
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Measure the per-request overhead of the instrumentation subsystem.
+
+Drives a FastAPI app directly over ASGI (no HTTP client in the loop) with
+an endpoint that runs a few SQL statements, then measures in isolation the
+two costs instrumentation adds: the middleware around one request and the
+cursor hooks around one statement. Overhead is their sum relative to the
+bare request time. A whole-request A/B is only printed against Postgres:
+aiosqlite runs each connection on a thread, and GIL hand-offs with it swing
+request times by more than the effect being measured.
+
+    python scripts/benchmark_instrumentation.py --requests 2000 --queries 3
+
+Uses in-memory SQLite by default; set BENCH_DATABASE_URL to measure against
+Postgres, where the fixed overhead is a smaller share of each request.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from middleware.request_metrics import RequestMetricsMiddleware
+from services.instrumentation import _after_cursor_execute, _before_cursor_execute, instrument_engine
+
+
+def build_app(db_url: str, queries: int, instrumented: bool):
+    engine = create_async_engine(db_url)
+    if instrumented:
+        instrument_engine(engine)
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        async with engine.connect() as conn:
+            for _ in range(queries):
+                await conn.execute(text("SELECT :id"), {"id": item_id})
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(RequestMetricsMiddleware)
+    return app, engine
+
+
+async def call(app, path: str) -> None:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def timed_round(app, requests: int) -> float:
+    started = time.perf_counter()
+    for i in range(requests):
+        await call(app, f"/items/{i}")
+    return (time.perf_counter() - started) / requests
+
+
+async def noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def middleware_cost(iterations: int) -> float:
+    """Seconds the middleware adds around one request"""
+    wrapped = RequestMetricsMiddleware(noop_app)
+    route = SimpleNamespace(path="/items/{item_id}")
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    timings = {}
+    for label, app in (("bare", noop_app), ("wrapped", wrapped)) * 2:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await app({"type": "http", "method": "GET", "path": "/items/1", "headers": [], "route": route}, receive, send)
+        timings[label] = (time.perf_counter() - started) / iterations
+    return timings["wrapped"] - timings["bare"]
+
+
+def statement_cost(iterations: int) -> float:
+    """Seconds the cursor hooks add around one SQL statement"""
+    context = SimpleNamespace()
+    statement = "SELECT id FROM items WHERE id = ?"
+    started = time.perf_counter()
+    for _ in range(iterations):
+        _before_cursor_execute(None, None, statement, None, context, False)
+        _after_cursor_execute(None, None, statement, None, context, False)
+    return (time.perf_counter() - started) / iterations
+
+
+async def main(requests: int, queries: int, rounds: int):
+    db_url = os.getenv("BENCH_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+    db_url = db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    bare_app, bare_engine = build_app(db_url, queries, instrumented=False)
+    inst_app, inst_engine = build_app(db_url, queries, instrumented=True)
+
+    print("=" * 60)
+    print(f"📊 Instrumentation overhead: {requests} requests x {rounds} rounds, {queries} SQL/request")
+    print("=" * 60)
+
+    # Warm pools, imports and route compilation
+    await timed_round(bare_app, 200)
+    await timed_round(inst_app, 200)
+
+    bare, inst = [], []
+    for _ in range(rounds):
+        bare.append(await timed_round(bare_app, requests))
+        inst.append(await timed_round(inst_app, requests))
+    bare_us = statistics.median(bare) * 1e6
+    inst_us = statistics.median(inst) * 1e6
+
+    per_request_us = await middleware_cost(requests * 20) * 1e6
+    per_statement_us = statement_cost(requests * 20) * 1e6
+    added_us = per_request_us + queries * per_statement_us
+
+    print(f"   {'bare request':<28} {bare_us:10.1f} µs")
+    print(f"   {'middleware per request':<28} {per_request_us:10.1f} µs")
+    print(f"   {'hooks per SQL statement':<28} {per_statement_us:10.1f} µs")
+    print(f"   overhead: {added_us:.1f} µs per request ({added_us / bare_us * 100:.2f}%)")
+    if "asyncpg" in db_url:
+        print(f"   A/B whole requests: {inst_us:.1f} vs {bare_us:.1f} µs ({(inst_us / bare_us - 1) * 100:+.2f}%)")
+
+    await bare_engine.dispose()
+    await inst_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.queries, args.rounds))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Compare the old serial iPhone import with the staged pipeline.
+
+The "serial" run reproduces the previous script's shape: read 1 MB of every
+file up front, then process files one at a time and rewrite a JSON state
+file (holding every file) after each batch of 5. Ingest and analysis are
+replaced by a fixed per-file latency so the numbers isolate the pipeline
+and state overhead from the database and AI calls.
+
+    python scripts/benchmark_iphone_ingest.py --files 2000 --size-kb 2048 --latency-ms 2
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.ingest_iphone_media import (
+    IngestionPipeline,
+    IngestionStore,
+    MediaIngester,
+    MediaStatus,
+    scan_directory,
+)
+
+
+class TimedIngester(MediaIngester):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    async def ingest_file(self, media_file):
+        await asyncio.sleep(self.latency)
+        media_file.status = MediaStatus.INGESTED
+        return True
+
+    async def analyze_file(self, media_file):
+        await asyncio.sleep(self.latency)
+        media_file.status = MediaStatus.ANALYZED
+        media_file.analysis_result = {"pre_social_score": 80}
+        return True
+
+
+def make_library(directory: Path, count: int, size: int):
+    block = bytes(range(256)) * (size // 256)
+    for i in range(count):
+        (directory / f"IMG_{i:05d}.MOV").write_bytes(i.to_bytes(4, 'big') + block)
+
+
+async def serial(directory: Path, state_file: Path, latency: float) -> float:
+    """Previous script: hash everything, then one file at a time, JSON rewrite every 5 files"""
+    started = time.perf_counter()
+    files = {}
+    for path in sorted(directory.iterdir()):
+        with open(path, 'rb') as f:
+            digest = hashlib.md5(f.read(1024 * 1024)).hexdigest()
+        files[digest] = {'path': str(path), 'status': 'pending'}
+    for i, entry in enumerate(files.values(), 1):
+        await asyncio.sleep(latency)
+        await asyncio.sleep(latency)
+        entry['status'] = 'analyzed'
+        if i % 5 == 0:
+            state_file.write_text(json.dumps({'files': files}, indent=2))
+    return time.perf_counter() - started
+
+
+async def pipelined(directory: Path, db: Path, latency: float) -> float:
+    started = time.perf_counter()
+    store = IngestionStore(db)
+    pipeline = IngestionPipeline(store, TimedIngester(latency))
+    await pipeline.run(scan_directory(directory))
+    store.close()
+    return time.perf_counter() - started
+
+
+async def main(files: int, size_kb: int, latency_ms: float):
+    latency = latency_ms / 1000
+
+    print("=" * 60)
+    print(f"📊 iPhone import: {files} files x {size_kb} KB, {latency_ms:.1f} ms per ingest/analyze call")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        library = tmp / "IphoneImport"
+        library.mkdir()
+        make_library(library, files, size_kb * 1024)
+
+        serial_s = await serial(library, tmp / "state.json", latency)
+        pipeline_s = await pipelined(library, tmp / "state.sqlite3", latency)
+        resume_s = await pipelined(library, tmp / "state.sqlite3", latency)
+
+    print(f"   {'serial + JSON state':<24} {serial_s:8.2f} s")
+    print(f"   {'staged pipeline':<24} {pipeline_s:8.2f} s  ({serial_s / pipeline_s:.1f}x)")
+    print(f"   {'resume, nothing changed':<24} {resume_s:8.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size-kb", type=int, default=2048)
+    parser.add_argument("--latency-ms", type=float, default=2)
+    args = parser.parse_args()
+    asyncio.run(main(args.files, args.size_kb, args.latency_ms))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Time get_optimal_times against history size.
+
+The "per-slot" column reproduces the previous implementation: every one of
+the 168 slots re-filters the platform's full history and re-averages it.
+The "surface" column is the current service, which reads a precomputed
+7x24 score matrix.
+
+    python scripts/benchmark_optimal_timing.py --sizes 100 1000 10000 100000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.optimal_timing import DayOfWeek, OptimalTimingService
+
+START = datetime(2026, 10, 14, 10, 30)
+
+
+def per_slot_times(service, history, platform, start, num_slots=5, min_gap_hours=4):
+    """Previous algorithm: O(slots x history) per request"""
+    slots = []
+    for day_offset in range(7):
+        check_date = start + timedelta(days=day_offset)
+        day = DayOfWeek(check_date.weekday())
+        for hour in range(24):
+            slot_time = check_date.replace(hour=hour, minute=0, second=0, microsecond=0)
+            if slot_time <= start:
+                continue
+            score = service.DEFAULT_PATTERNS[platform].get(hour, 50)
+            if day in (DayOfWeek.SATURDAY, DayOfWeek.SUNDAY):
+                score *= service.WEEKEND_MODIFIERS[platform]
+            matching = [e for (h, d, e) in history if h == hour and d == day]
+            if matching:
+                score = statistics.mean(matching) * 0.7 + score * 0.3
+            slots.append((slot_time, min(100, max(0, score))))
+    slots.sort(key=lambda x: x[1], reverse=True)
+    selected = []
+    for slot_time, _ in slots:
+        if all(abs((slot_time - s).total_seconds()) / 3600 >= min_gap_hours for s in selected):
+            selected.append(slot_time)
+            if len(selected) >= num_slots:
+                break
+    return selected
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main(sizes, repeat: int):
+    print("=" * 60)
+    print(f"📊 get_optimal_times latency by history size ({repeat} requests each)")
+    print("=" * 60)
+    print(f"   {'posts':>8} {'per-slot ms':>14} {'surface ms':>12} {'speedup':>9}")
+
+    rng = random.Random(42)
+    for size in sizes:
+        service = OptimalTimingService()
+        history = []
+        for _ in range(size):
+            posted_at = START - timedelta(hours=rng.randrange(1, 24 * 365))
+            views, likes = rng.randrange(100, 10000), rng.randrange(0, 500)
+            service.add_historical_data("instagram", posted_at, views, likes)
+            history.append((posted_at.hour, posted_at.weekday(), service._calculate_engagement(views, likes)))
+
+        legacy_ms = timed(lambda: per_slot_times(service, history, "instagram", START), max(1, repeat // 10))
+        surface_ms = timed(lambda: service.get_optimal_times("instagram", START), repeat)
+        print(f"   {size:>8} {legacy_ms:>14.2f} {surface_ms:>12.3f} {legacy_ms / surface_ms:>8.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark full-history vs incremental content rollups.
+
+Builds a throwaway `rollup_bench` schema with synthetic content_metrics
+history (10M snapshots by default), then times:
+  1. the legacy DISTINCT ON rollup over the whole history
+  2. an incremental RollupEngine run after a small batch of new snapshots
+
+Run against a scratch database only:
+    BENCH_DATABASE_URL=postgresql://... python scripts/benchmark_rollups.py --snapshots 10000000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from services.analytics.rollup_engine import RollupEngine
+
+MIGRATION = (
+    Path(__file__).parent.parent.parent
+    / "supabase" / "migrations" / "20261018000100_incremental_content_rollups.sql"
+)
+
+SCHEMA_SQL = """
+CREATE TABLE content_items (id UUID PRIMARY KEY);
+CREATE TABLE content_variants (
+    id UUID PRIMARY KEY,
+    content_id UUID REFERENCES content_items(id) ON DELETE CASCADE
+);
+CREATE TABLE content_metrics (
+    id BIGSERIAL PRIMARY KEY,
+    variant_id UUID NOT NULL REFERENCES content_variants(id) ON DELETE CASCADE,
+    snapshot_at TIMESTAMPTZ NOT NULL,
+    traffic_type TEXT NOT NULL DEFAULT 'organic',
+    views BIGINT, impressions BIGINT, reach BIGINT, likes BIGINT, comments BIGINT,
+    shares BIGINT, saves BIGINT, clicks BIGINT, watch_time_seconds BIGINT,
+    sentiment_score NUMERIC
+);
+CREATE TABLE content_rollups (
+    content_id UUID PRIMARY KEY REFERENCES content_items(id) ON DELETE CASCADE,
+    total_views_organic BIGINT, total_views_paid BIGINT,
+    total_impressions_organic BIGINT, total_impressions_paid BIGINT,
+    total_likes_organic BIGINT, total_likes_paid BIGINT,
+    total_comments_organic BIGINT, total_comments_paid BIGINT,
+    total_shares_organic BIGINT, total_shares_paid BIGINT,
+    total_saves_organic BIGINT, total_saves_paid BIGINT,
+    total_clicks_organic BIGINT, total_clicks_paid BIGINT,
+    avg_watch_time_seconds_organic NUMERIC, avg_watch_time_seconds_paid NUMERIC,
+    global_sentiment NUMERIC, best_platform TEXT,
+    last_updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+LEGACY_ROLLUP_SQL = """
+WITH latest_metrics AS (
+    SELECT DISTINCT ON (variant_id)
+        variant_id, views, likes, comments, shares, saves, clicks, watch_time_seconds, traffic_type
+    FROM content_metrics
+    ORDER BY variant_id, snapshot_at DESC
+)
+SELECT cv.content_id, lm.traffic_type, SUM(lm.views), SUM(lm.likes)
+FROM latest_metrics lm
+JOIN content_variants cv ON lm.variant_id = cv.id
+GROUP BY cv.content_id, lm.traffic_type
+"""
+
+
+async def timed(label, coro):
+    start = time.perf_counter()
+    result = await coro
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<40} {elapsed:8.2f}s")
+    return result
+
+
+async def main(snapshots: int, variants: int, new_snapshots: int):
+    db_url = os.getenv("BENCH_DATABASE_URL")
+    if not db_url:
+        print("Set BENCH_DATABASE_URL to a scratch Postgres database")
+        sys.exit(1)
+    db_url = db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    engine = create_async_engine(db_url, connect_args={"server_settings": {"search_path": "rollup_bench"}})
+    per_variant = max(1, snapshots // variants)
+
+    print("=" * 60)
+    print(f"📊 Rollup benchmark: {variants:,} variants x {per_variant} snapshots")
+    print("=" * 60)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA IF EXISTS rollup_bench CASCADE"))
+        await conn.execute(text("CREATE SCHEMA rollup_bench"))
+        for statement in SCHEMA_SQL.split(";"):
+            if statement.strip():
+                await conn.execute(text(statement))
+
+        await timed("seed content + variants", conn.execute(text(f"""
+            INSERT INTO content_items SELECT md5(i::text)::uuid FROM generate_series(1, {variants // 2}) i;
+        """)))
+        await conn.execute(text(f"""
+            INSERT INTO content_variants
+            SELECT md5('v' || i::text)::uuid, md5(((i + 1) / 2)::text)::uuid
+            FROM generate_series(1, {variants}) i
+        """))
+        await timed("seed metrics history", conn.execute(text(f"""
+            INSERT INTO content_metrics (variant_id, snapshot_at, views, likes, comments, shares, saves, clicks, watch_time_seconds)
+            SELECT md5('v' || v::text)::uuid, NOW() - (s || ' hours')::interval,
+                   (1000 - s) * 10, 100 - s, 10, 5, 3, 2, (1000 - s) * 70
+            FROM generate_series(1, {variants}) v, generate_series(1, {per_variant}) s
+        """)))
+
+    async with engine.begin() as conn:
+        await timed("apply migration (index + backfill)", conn.exec_driver_sql(MIGRATION.read_text()))
+
+    async with AsyncSession(engine) as session:
+        await timed("legacy full-history rollup", session.execute(text(LEGACY_ROLLUP_SQL)))
+        await timed("initial incremental run (all dirty)", RollupEngine().run_rollups(session))
+
+        await session.execute(text(f"""
+            INSERT INTO content_metrics (variant_id, snapshot_at, views, likes, watch_time_seconds)
+            SELECT md5('v' || v::text)::uuid, NOW(), 20000, 200, 1500000
+            FROM generate_series(1, {new_snapshots}) v
+        """))
+        await session.commit()
+
+        stats = await timed(
+            f"incremental run ({new_snapshots:,} new snapshots)",
+            RollupEngine().run_rollups(session)
+        )
+        print(f"   -> {stats}")
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA rollup_bench CASCADE"))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshots", type=int, default=10_000_000)
+    parser.add_argument("--variants", type=int, default=200_000)
+    parser.add_argument("--new-snapshots", type=int, default=2_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.snapshots, args.variants, args.new_snapshots))
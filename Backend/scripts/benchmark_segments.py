@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark delete-and-reinsert vs diff-based dynamic segment refresh.
+
+Builds a throwaway `segment_bench` schema with synthetic person_insights
+(1M people by default) and 50 dynamic segments, then times:
+  1. the legacy per-segment refresh (DELETE all members, re-INSERT all)
+  2. SegmentEngine.refresh_dynamic_segments on the same data
+after an initial fill and again after a small share of people change state.
+Write volume (rows inserted + deleted) and dead tuples come from
+pg_stat_user_tables for segment_members.
+
+Run against a scratch database only:
+    BENCH_DATABASE_URL=postgresql://... python scripts/benchmark_segments.py --people 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from services.intelligence.segment_engine import SegmentCompiler, SegmentEngine
+
+MIGRATION = (
+    Path(__file__).parent.parent.parent
+    / "supabase" / "migrations" / "20261018000300_segment_membership_events.sql"
+)
+
+SCHEMA_SQL = """
+CREATE TABLE people (id UUID PRIMARY KEY);
+CREATE TABLE person_insights (
+    person_id UUID PRIMARY KEY REFERENCES people(id) ON DELETE CASCADE,
+    interests JSONB, tone_preferences JSONB, channel_preferences JSONB,
+    activity_state TEXT, last_active_at TIMESTAMPTZ, warmth_score NUMERIC,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE TABLE segments (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    name TEXT NOT NULL, definition JSONB, is_dynamic BOOLEAN NOT NULL DEFAULT false
+);
+CREATE TABLE segment_members (
+    segment_id UUID NOT NULL REFERENCES segments(id) ON DELETE CASCADE,
+    person_id UUID NOT NULL REFERENCES people(id) ON DELETE CASCADE,
+    added_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (segment_id, person_id)
+);
+CREATE INDEX idx_segment_members_person ON segment_members (person_id)
+"""
+
+STATES = ["active", "warming", "cool", "dormant"]
+TOPICS = ["AI automation", "video editing", "3D printing", "copywriting", "productivity"]
+
+
+def segment_definitions(count: int):
+    """A mix of shorthand and DSL definitions with varied selectivity"""
+    for i in range(count):
+        if i % 3 == 0:
+            yield {"min_warmth": (i * 7) % 90, "activity_state": STATES[i % 4]}
+        elif i % 3 == 1:
+            yield {"operator": "AND", "conditions": [
+                {"field": "interests", "operator": "contains", "value": TOPICS[i % len(TOPICS)]},
+                {"field": "warmth_score", "operator": "gte", "value": (i * 3) % 60},
+            ]}
+        else:
+            yield {"operator": "OR", "conditions": [
+                {"field": "activity_state", "operator": "in", "value": STATES[: 1 + i % 3]},
+                {"field": "channel_preferences", "key": "email", "operator": "gte", "value": 0.9},
+            ]}
+
+
+async def legacy_refresh(session: AsyncSession):
+    """The previous strategy: per segment, delete every member and re-insert the result"""
+    segments = await SegmentEngine()._fetch_dynamic_segments(session)
+    for segment in segments:
+        predicate, params = SegmentCompiler("b").compile(segment["definition"])
+        await session.execute(text("DELETE FROM segment_members WHERE segment_id = :sid"), {"sid": segment["id"]})
+        await session.execute(
+            text(f"""
+                INSERT INTO segment_members (segment_id, person_id)
+                SELECT CAST(:sid AS uuid), pi.person_id FROM person_insights pi WHERE {predicate}
+            """),
+            {**params, "sid": str(segment["id"])}
+        )
+        await session.commit()
+
+
+async def member_writes(session: AsyncSession):
+    row = (await session.execute(text("""
+        SELECT n_tup_ins, n_tup_del, n_dead_tup
+        FROM pg_stat_user_tables WHERE relname = 'segment_members' AND schemaname = 'segment_bench'
+    """))).one()
+    return {"inserted": row.n_tup_ins, "deleted": row.n_tup_del, "dead": row.n_dead_tup}
+
+
+async def timed(label, session, fn):
+    before = await member_writes(session)
+    start = time.perf_counter()
+    await fn(session)
+    elapsed = time.perf_counter() - start
+    # Stats are flushed asynchronously by the backend
+    await asyncio.sleep(1)
+    await session.execute(text("SELECT pg_stat_clear_snapshot()"))
+    after = await member_writes(session)
+    written = (after["inserted"] - before["inserted"]) + (after["deleted"] - before["deleted"])
+    print(f"   {label:<44} {elapsed:8.2f}s  {written:>12,} rows written  {after['dead']:>12,} dead")
+
+
+async def main(people: int, segments: int, churn: float):
+    db_url = os.getenv("BENCH_DATABASE_URL")
+    if not db_url:
+        print("Set BENCH_DATABASE_URL to a scratch Postgres database")
+        sys.exit(1)
+    db_url = db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    engine = create_async_engine(db_url, connect_args={"server_settings": {"search_path": "segment_bench"}})
+
+    print("=" * 60)
+    print(f"📊 Segment refresh benchmark: {people:,} people x {segments} segments")
+    print("=" * 60)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA IF EXISTS segment_bench CASCADE"))
+        await conn.execute(text("CREATE SCHEMA segment_bench"))
+        for statement in SCHEMA_SQL.split(";"):
+            if statement.strip():
+                await conn.execute(text(statement))
+        await conn.exec_driver_sql(MIGRATION.read_text())
+
+        await conn.execute(text(f"INSERT INTO people SELECT md5(i::text)::uuid FROM generate_series(1, {people}) i"))
+        await conn.execute(text(f"""
+            INSERT INTO person_insights (person_id, interests, channel_preferences, activity_state, last_active_at, warmth_score)
+            SELECT md5(i::text)::uuid,
+                   jsonb_build_array((ARRAY{TOPICS!r})[1 + i % {len(TOPICS)}]),
+                   jsonb_build_object('email', (i % 100) / 100.0),
+                   (ARRAY{STATES!r})[1 + i % 4],
+                   NOW() - ((i % 120) || ' days')::interval,
+                   i % 100
+            FROM generate_series(1, {people}) i
+        """))
+        for definition in segment_definitions(segments):
+            await conn.execute(
+                text("INSERT INTO segments (name, definition, is_dynamic) VALUES ('bench', CAST(:d AS jsonb), true)"),
+                {"d": json.dumps(definition)}
+            )
+
+    async def churn_people(session):
+        await session.execute(text(f"""
+            UPDATE person_insights
+            SET warmth_score = (warmth_score + 37)::int % 100,
+                activity_state = CASE activity_state WHEN 'active' THEN 'cool' ELSE 'active' END
+            WHERE abs(hashtext(person_id::text)) % 10000 < {int(churn * 10000)}
+        """))
+        await session.commit()
+
+    async with AsyncSession(engine) as session:
+        print("   Initial fill")
+        await timed("legacy delete + reinsert", session, legacy_refresh)
+        await session.execute(text("TRUNCATE segment_members"))
+        await session.commit()
+        await timed("diff-based single pass", session, SegmentEngine().refresh_dynamic_segments)
+
+        print(f"   Steady state ({churn:.1%} of people changed)")
+        await churn_people(session)
+        await timed("legacy delete + reinsert", session, legacy_refresh)
+        await churn_people(session)
+        await timed("diff-based single pass", session, SegmentEngine().refresh_dynamic_segments)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA segment_bench CASCADE"))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--people", type=int, default=1_000_000)
+    parser.add_argument("--segments", type=int, default=50)
+    parser.add_argument("--churn", type=float, default=0.01, help="Share of people whose insights change between refreshes")
+    args = parser.parse_args()
+    asyncio.run(main(args.people, args.segments, args.churn))
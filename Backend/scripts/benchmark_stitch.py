@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Compare long-video assembly: full re-encode + audio pass vs the stitch planner.
+
+Generates synthetic H.264/AAC clips with ffmpeg (one deliberately at a
+different resolution, so the planner has an outlier to normalize), then
+times LongVideoOrchestrator's legacy path (_stitch_reencode + _add_audio)
+against _stitch_clips, which stream-copies and only re-encodes outliers and
+crossfade boundaries.
+
+    python scripts/benchmark_stitch.py --clips 10 --seconds 60
+
+Needs ffmpeg and ffprobe on PATH.
+"""
+import argparse
+import asyncio
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.clip_cache import ClipCache
+from services.long_video_orchestrator import LongVideoOrchestrator, SceneSpec
+
+
+def make_clip(path: Path, seconds: int, size: str, hue: int) -> None:
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error',
+        '-f', 'lavfi', '-i', f"testsrc2=size={size}:rate=30,hue=h={hue}",
+        '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000',
+        '-t', str(seconds), '-c:v', 'libx264', '-preset', 'veryfast', '-g', '60',
+        '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-ac', '2', str(path),
+    ], check=True)
+
+
+def make_audio(path: Path, seconds: int) -> None:
+    subprocess.run([
+        'ffmpeg', '-y', '-v', 'error', '-f', 'lavfi', '-i', 'sine=frequency=220:sample_rate=48000',
+        '-t', str(seconds), '-c:a', 'aac', str(path),
+    ], check=True)
+
+
+async def run(orchestrator: LongVideoOrchestrator, clips, audio, transition: str, legacy: bool) -> float:
+    job = orchestrator.create_from_scenes(
+        [SceneSpec(i + 1, "bench", transition=transition) for i in range(len(clips))]
+    )
+    job.clip_paths = [str(c) for c in clips]
+    job.spec.audio_track = str(audio)
+    started = time.perf_counter()
+    if legacy:
+        await orchestrator._add_audio(job, await orchestrator._stitch_reencode(job))
+    else:
+        await orchestrator._stitch_clips(job)
+    return time.perf_counter() - started
+
+
+async def main(clips: int, seconds: int):
+    if not shutil.which('ffmpeg') or not shutil.which('ffprobe'):
+        sys.exit("ffmpeg/ffprobe not found on PATH")
+
+    print("=" * 60)
+    print(f"📊 Stitch benchmark: {clips} clips x {seconds}s (1080p30, one 720p outlier)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        paths = []
+        for i in range(clips):
+            path = tmp / f"clip_{i}.mp4"
+            make_clip(path, seconds, '1280x720' if i == clips // 2 else '1920x1080', i * 30)
+            paths.append(path)
+        audio = tmp / "music.m4a"
+        make_audio(audio, clips * seconds)
+
+        orchestrator = LongVideoOrchestrator(output_dir=str(tmp / "out"), clip_cache=ClipCache(tmp / "cache"))
+        legacy = await run(orchestrator, paths, audio, "cut", legacy=True)
+        cuts = await run(orchestrator, paths, audio, "cut", legacy=False)
+        fades = await run(orchestrator, paths, audio, "crossfade", legacy=False)
+
+    print(f"   {'re-encode + audio pass':<28} {legacy:8.2f} s")
+    print(f"   {'planner, hard cuts':<28} {cuts:8.2f} s  ({legacy / cuts:.1f}x)")
+    print(f"   {'planner, crossfades':<28} {fades:8.2f} s  ({legacy / fades:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=10)
+    parser.add_argument("--seconds", type=int, default=60)
+    args = parser.parse_args()
+    asyncio.run(main(args.clips, args.seconds))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark requests/sec on a trivial workspace-scoped endpoint.
+
+Serves `GET /ping` (which only resolves the workspace) in-process and
+hammers it with concurrent requests in two configurations:
+  1. legacy: `SELECT 1` on every session + an uncached workspace lookup
+  2. cached: the current get_db + get_current_workspace_id
+Uses a throwaway `workspace_bench` schema with one workspace.
+
+Run against a scratch database only:
+    BENCH_DATABASE_URL=postgresql://... python scripts/benchmark_workspace_resolution.py --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import Depends, FastAPI, Header, HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from database import connection
+from middleware.workspace_cache import workspace_cache
+from middleware.workspace_context import get_current_workspace_id
+
+
+async def legacy_get_db():
+    async with connection.async_session_maker() as session:
+        await session.execute(text("SELECT 1"))
+        yield session
+        await session.commit()
+
+
+async def legacy_workspace_id(
+    x_workspace_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(legacy_get_db)
+) -> uuid.UUID:
+    workspace_id = uuid.UUID(x_workspace_id)
+    result = await db.execute(text("SELECT 1 FROM workspaces WHERE id = :id"), {"id": workspace_id})
+    if not result.fetchall():
+        raise HTTPException(status_code=404, detail="Workspace not found")
+    return workspace_id
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/legacy/ping")
+    async def legacy_ping(workspace_id: uuid.UUID = Depends(legacy_workspace_id)):
+        return {"workspace_id": str(workspace_id)}
+
+    @app.get("/ping")
+    async def ping(workspace_id: uuid.UUID = Depends(get_current_workspace_id)):
+        return {"workspace_id": str(workspace_id)}
+
+    return app
+
+
+async def hammer(client: httpx.AsyncClient, path: str, workspace_id: uuid.UUID, seconds: float, concurrency: int) -> float:
+    headers = {"X-Workspace-Id": str(workspace_id)}
+    deadline = time.perf_counter() + seconds
+    done = 0
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+            done += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / (time.perf_counter() - start)
+
+
+async def main(seconds: float, concurrency: int):
+    db_url = os.getenv("BENCH_DATABASE_URL")
+    if not db_url:
+        print("Set BENCH_DATABASE_URL to a scratch Postgres database")
+        sys.exit(1)
+    db_url = db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    engine = create_async_engine(
+        db_url,
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20,
+        connect_args={"server_settings": {"search_path": "workspace_bench"}},
+    )
+    connection.async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    workspace_id = uuid.uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA IF EXISTS workspace_bench CASCADE"))
+        await conn.execute(text("CREATE SCHEMA workspace_bench"))
+        await conn.execute(text("CREATE TABLE workspaces (id UUID PRIMARY KEY, created_at TIMESTAMPTZ DEFAULT NOW())"))
+        await conn.execute(text("INSERT INTO workspaces (id) VALUES (:id)"), {"id": workspace_id})
+
+    print("=" * 60)
+    print(f"📊 Workspace resolution: {concurrency} concurrent clients, {seconds:.0f}s per run")
+    print("=" * 60)
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm the pool so both runs start from open connections
+        await hammer(client, "/legacy/ping", workspace_id, 1, concurrency)
+        legacy = await hammer(client, "/legacy/ping", workspace_id, seconds, concurrency)
+        print(f"   {'legacy (SELECT 1 + lookup per request)':<44} {legacy:10.0f} req/s")
+
+        workspace_cache.invalidate()
+        cached = await hammer(client, "/ping", workspace_id, seconds, concurrency)
+        print(f"   {'cached resolution + pool pre-ping':<44} {cached:10.0f} req/s")
+        print(f"   speedup: {cached / legacy:.2f}x")
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA workspace_bench CASCADE"))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.seconds, args.concurrency))
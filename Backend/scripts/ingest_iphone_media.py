@@ -3,6 +3,13 @@
 iPhone Media Ingestion Script with Smart Resume
 Systematically ingests and analyzes all media from IphoneImport folder
 with progress tracking and resume capabilities.
+
+The import runs as a staged pipeline - discover, fingerprint, ingest,
+analyze - with a bounded worker pool per stage, connected by bounded
+queues. Per-file state lives in a SQLite database, one row per file,
+written as each file moves between stages. A resume only fingerprints and
+processes files that are new, changed, or unfinished; unchanged finished
+files are recognized from their size and mtime alone.
 """
 import os
 import sys
@@ -10,10 +17,11 @@ import json
 import hashlib
 import asyncio
 import logging
+import sqlite3
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, List, Any
-from dataclasses import dataclass, asdict
+from typing import Optional, Dict, List, Awaitable, Callable, Set, Tuple
+from dataclasses import dataclass, asdict, fields
 from enum import Enum
 
 # Add parent directory to path for imports
@@ -22,25 +30,20 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from dotenv import load_dotenv
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('ingestion.log')
-    ]
-)
 logger = logging.getLogger(__name__)
 
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
 IPHONE_IMPORT_PATH = Path(os.path.expanduser("~/Documents/IphoneImport"))
-STATE_FILE = Path(__file__).parent / "ingestion_state.json"
+STATE_DB = Path(__file__).parent / "ingestion_state.sqlite3"
 SUPPORTED_VIDEO_EXTENSIONS = {'.mov', '.mp4', '.m4v', '.avi', '.mkv'}
 SUPPORTED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic', '.webp', '.gif'}
-BATCH_SIZE = 5  # Process this many files before saving state
+HASH_WORKERS = 8      # Fingerprinting is disk-bound; runs in threads
+INGEST_WORKERS = 4    # Concurrent DB inserts + ffprobe calls
+ANALYZE_WORKERS = 4   # Concurrent AI analyses
+SAMPLE_BLOCK = 64 * 1024  # Bytes read at each fingerprint sample point
+PROGRESS_EVERY = 100  # Log progress every N finished files
 MAX_RETRIES = 3
 
 
@@ -54,14 +57,17 @@ class MediaStatus(str, Enum):
     SKIPPED = "skipped"
 
 
+TERMINAL_STATUSES = {MediaStatus.ANALYZED, MediaStatus.FAILED, MediaStatus.SKIPPED}
+
+
 @dataclass
 class MediaFile:
     path: str
     filename: str
     file_type: str  # 'video' or 'image'
     size_bytes: int
-    modified_at: str
-    file_hash: str
+    mtime_ns: int
+    fingerprint: Optional[str] = None
     status: str = MediaStatus.PENDING
     error_message: Optional[str] = None
     retry_count: int = 0
@@ -69,115 +75,199 @@ class MediaFile:
     analyzed_at: Optional[str] = None
     media_id: Optional[str] = None
     analysis_result: Optional[Dict] = None
+    duplicate_of: Optional[str] = None
 
 
-@dataclass
-class IngestionState:
-    started_at: str
-    last_updated: str
-    total_files: int
-    processed_count: int
-    success_count: int
-    failed_count: int
-    skipped_count: int
-    current_batch: int
-    files: Dict[str, Dict]  # file_hash -> MediaFile as dict
-    
-    @classmethod
-    def create_new(cls) -> 'IngestionState':
-        now = datetime.now().isoformat()
-        return cls(
-            started_at=now,
-            last_updated=now,
-            total_files=0,
-            processed_count=0,
-            success_count=0,
-            failed_count=0,
-            skipped_count=0,
-            current_batch=0,
-            files={}
+MEDIA_COLUMNS = [f.name for f in fields(MediaFile)]
+
+
+class IngestionStore:
+    """
+    Per-file ingestion state in SQLite.
+
+    Every save is its own small transaction (WAL, synchronous=NORMAL), so
+    progress is durable file by file and an interrupted run loses at most
+    the files that were mid-stage.
+    """
+
+    def __init__(self, path: Path = STATE_DB):
+        self.path = path
+        self.conn = sqlite3.connect(str(path), isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS media_files (
+                path TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                fingerprint TEXT,
+                status TEXT NOT NULL,
+                error_message TEXT,
+                retry_count INTEGER NOT NULL DEFAULT 0,
+                ingested_at TEXT,
+                analyzed_at TEXT,
+                media_id TEXT,
+                analysis_result TEXT,
+                duplicate_of TEXT,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS media_files_fingerprint ON media_files (fingerprint);
+            CREATE TABLE IF NOT EXISTS ingestion_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    def _from_row(self, row) -> MediaFile:
+        data = dict(zip(MEDIA_COLUMNS, row))
+        if data['analysis_result']:
+            data['analysis_result'] = json.loads(data['analysis_result'])
+        return MediaFile(**data)
+
+    def snapshot(self) -> Dict[str, Tuple[int, int, str]]:
+        """path -> (size_bytes, mtime_ns, status) for every known file, in one query"""
+        rows = self.conn.execute("SELECT path, size_bytes, mtime_ns, status FROM media_files")
+        return {path: (size, mtime_ns, status) for path, size, mtime_ns, status in rows}
+
+    def load(self, path: str) -> Optional[MediaFile]:
+        row = self.conn.execute(
+            f"SELECT {', '.join(MEDIA_COLUMNS)} FROM media_files WHERE path = ?", (path,)
+        ).fetchone()
+        return self._from_row(row) if row else None
+
+    def save(self, media_file: MediaFile):
+        data = asdict(media_file)
+        data['status'] = MediaStatus(data['status']).value
+        if data['analysis_result'] is not None:
+            data['analysis_result'] = json.dumps(data['analysis_result'], default=str)
+        columns = MEDIA_COLUMNS + ['updated_at']
+        values = [data[c] for c in MEDIA_COLUMNS] + [datetime.now().isoformat()]
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO media_files ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})",
+            values,
         )
-    
-    def save(self, path: Path = STATE_FILE):
-        """Save state to JSON file."""
-        self.last_updated = datetime.now().isoformat()
-        with open(path, 'w') as f:
-            json.dump(asdict(self), f, indent=2, default=str)
-        logger.debug(f"State saved: {self.processed_count}/{self.total_files} processed")
-    
-    @classmethod
-    def load(cls, path: Path = STATE_FILE) -> Optional['IngestionState']:
-        """Load state from JSON file."""
-        if not path.exists():
-            return None
-        try:
-            with open(path, 'r') as f:
-                data = json.load(f)
-            return cls(**data)
-        except Exception as e:
-            logger.error(f"Failed to load state: {e}")
-            return None
 
+    def find_by_fingerprint(self, fingerprint: str, exclude_path: str) -> Optional[MediaFile]:
+        """Another file with identical content that is (being) imported itself, if any"""
+        row = self.conn.execute(
+            f"SELECT {', '.join(MEDIA_COLUMNS)} FROM media_files "
+            f"WHERE fingerprint = ? AND path != ? AND status NOT IN (?, ?) LIMIT 1",
+            (fingerprint, exclude_path, MediaStatus.FAILED.value, MediaStatus.SKIPPED.value),
+        ).fetchone()
+        return self._from_row(row) if row else None
+
+    def orphaned_duplicates(self) -> List[MediaFile]:
+        """Skipped copies whose original failed for good or is no longer tracked"""
+        rows = self.conn.execute(
+            f"SELECT {', '.join('d.' + c for c in MEDIA_COLUMNS)} FROM media_files d "
+            f"LEFT JOIN media_files o ON o.path = d.duplicate_of "
+            f"WHERE d.status = ? AND d.duplicate_of IS NOT NULL AND (o.path IS NULL OR o.status = ?)",
+            (MediaStatus.SKIPPED.value, MediaStatus.FAILED.value),
+        )
+        return [self._from_row(row) for row in rows]
+
+    def link_duplicates(self):
+        """Give skipped copies the media id of an original that finished after them"""
+        self.conn.execute(
+            "UPDATE media_files SET media_id = "
+            "(SELECT o.media_id FROM media_files o WHERE o.path = media_files.duplicate_of) "
+            "WHERE status = ? AND media_id IS NULL AND duplicate_of IS NOT NULL",
+            (MediaStatus.SKIPPED.value,),
+        )
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM media_files GROUP BY status")
+        return dict(rows.fetchall())
+
+    def failures(self) -> List[Tuple[str, Optional[str]]]:
+        return self.conn.execute(
+            "SELECT filename, error_message FROM media_files WHERE status = ? ORDER BY filename",
+            (MediaStatus.FAILED.value,),
+        ).fetchall()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM ingestion_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO ingestion_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def reset(self):
+        self.conn.execute("DELETE FROM media_files")
+        self.conn.execute("DELETE FROM ingestion_meta")
 
-def compute_file_hash(file_path: Path, chunk_size: int = 8192) -> str:
-    """Compute MD5 hash of file for deduplication."""
-    hasher = hashlib.md5()
+    def close(self):
+        self.conn.close()
+
+
+def quick_fingerprint(file_path: str, size: int) -> str:
+    """
+    Content fingerprint from the file size plus sampled blocks (start,
+    middle, end). Small files are hashed in full. Identical copies under
+    different names or mtimes get the same fingerprint; change detection
+    uses size + mtime separately, so mtime is deliberately left out here.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(str(size).encode())
     with open(file_path, 'rb') as f:
-        # Only hash first 1MB for speed on large files
-        data = f.read(1024 * 1024)
-        hasher.update(data)
+        if size <= 3 * SAMPLE_BLOCK:
+            hasher.update(f.read())
+        else:
+            for offset in (0, size // 2 - SAMPLE_BLOCK // 2, size - SAMPLE_BLOCK):
+                f.seek(offset)
+                hasher.update(f.read(SAMPLE_BLOCK))
     return hasher.hexdigest()
 
 
 def scan_directory(directory: Path) -> List[MediaFile]:
-    """Scan directory for media files."""
+    """Scan directory for media files (stat only, no reads)."""
     media_files = []
-    
+
     if not directory.exists():
         logger.error(f"Directory does not exist: {directory}")
         return media_files
-    
+
     logger.info(f"Scanning {directory}...")
-    
-    for file_path in directory.iterdir():
-        if file_path.is_file():
-            ext = file_path.suffix.lower()
-            
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+
+            ext = os.path.splitext(entry.name)[1].lower()
             if ext in SUPPORTED_VIDEO_EXTENSIONS:
                 file_type = 'video'
             elif ext in SUPPORTED_IMAGE_EXTENSIONS:
                 file_type = 'image'
             else:
                 continue
-            
+
             try:
-                stat = file_path.stat()
-                file_hash = compute_file_hash(file_path)
-                
-                media_file = MediaFile(
-                    path=str(file_path),
-                    filename=file_path.name,
+                stat = entry.stat()
+                media_files.append(MediaFile(
+                    path=entry.path,
+                    filename=entry.name,
                     file_type=file_type,
                     size_bytes=stat.st_size,
-                    modified_at=datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                    file_hash=file_hash
-                )
-                media_files.append(media_file)
-                
-            except Exception as e:
-                logger.warning(f"Error scanning {file_path}: {e}")
-    
+                    mtime_ns=stat.st_mtime_ns,
+                ))
+            except OSError as e:
+                logger.warning(f"Error scanning {entry.path}: {e}")
+
+    media_files.sort(key=lambda mf: mf.filename)
     logger.info(f"Found {len(media_files)} media files")
     return media_files
 
 
 class MediaIngester:
-    """Handles media ingestion and analysis with resume capability."""
-    
-    def __init__(self, state: IngestionState):
-        self.state = state
-        self.db_session = None
-    
+    """Ingests and analyzes single media files."""
+
+    def __init__(self):
+        self.async_session_maker = None
+
     async def initialize_db(self):
         """Initialize database connection."""
         try:
@@ -189,7 +279,13 @@ class MediaIngester:
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
             return False
-    
+
+    def _record_failure(self, media_file: MediaFile, error: Exception):
+        media_file.error_message = str(error)
+        media_file.retry_count += 1
+        if media_file.retry_count >= MAX_RETRIES:
+            media_file.status = MediaStatus.FAILED
+
     async def ingest_file(self, media_file: MediaFile) -> bool:
         """Ingest a single media file into the database."""
         # Skip non-video files for now (just mark as analyzed)
@@ -197,31 +293,34 @@ class MediaIngester:
             media_file.status = MediaStatus.INGESTED
             media_file.ingested_at = datetime.now().isoformat()
             return True
-        
+
+        if self.async_session_maker is None:
+            return await self.mock_ingest_file(media_file)
+
         try:
             from database.models import Video
             from sqlalchemy import select
             import uuid
-            
+
             # Default user_id for system imports
             DEFAULT_USER_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
-            
+
             async with self.async_session_maker() as session:
                 # Check if already exists by source_uri (file path)
                 result = await session.execute(
                     select(Video).where(Video.source_uri == media_file.path)
                 )
                 existing = result.scalar_one_or_none()
-                
+
                 if existing:
                     logger.info(f"Skipping duplicate: {media_file.filename}")
                     media_file.status = MediaStatus.SKIPPED
                     media_file.media_id = str(existing.id)
                     return True
-                
+
                 # Get video metadata
                 duration, resolution, aspect_ratio = await self.get_video_metadata(media_file.path)
-                
+
                 # Create new video record
                 video = Video(
                     id=uuid.uuid4(),
@@ -234,51 +333,47 @@ class MediaIngester:
                     resolution=resolution,
                     aspect_ratio=aspect_ratio,
                 )
-                
+
                 session.add(video)
                 await session.commit()
-                
+
                 media_file.media_id = str(video.id)
                 media_file.status = MediaStatus.INGESTED
                 media_file.ingested_at = datetime.now().isoformat()
-                
+
                 logger.info(f"Ingested: {media_file.filename} -> {media_file.media_id}")
                 return True
-                
+
         except ImportError as e:
             # Database models not available, use mock ingestion
             logger.warning(f"Database not available, using mock ingestion: {e}")
             return await self.mock_ingest_file(media_file)
         except Exception as e:
             logger.error(f"Error ingesting {media_file.filename}: {e}")
-            media_file.error_message = str(e)
-            media_file.retry_count += 1
-            if media_file.retry_count >= MAX_RETRIES:
-                media_file.status = MediaStatus.FAILED
+            self._record_failure(media_file, e)
             return False
-    
+
     async def get_video_metadata(self, file_path: str) -> tuple:
         """Extract video metadata using ffprobe."""
         import subprocess
-        import json as json_module
-        
+
         try:
             cmd = [
                 'ffprobe', '-v', 'quiet', '-print_format', 'json',
                 '-show_format', '-show_streams', file_path
             ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
+            result = await asyncio.to_thread(subprocess.run, cmd, capture_output=True, text=True, timeout=30)
+
             if result.returncode != 0:
                 return None, None, None
-            
-            data = json_module.loads(result.stdout)
-            
+
+            data = json.loads(result.stdout)
+
             # Get duration
             duration = None
             if 'format' in data and 'duration' in data['format']:
                 duration = int(float(data['format']['duration']))
-            
+
             # Get video stream info
             resolution = None
             aspect_ratio = None
@@ -293,27 +388,27 @@ class MediaIngester:
                         g = gcd(width, height)
                         aspect_ratio = f"{width//g}:{height//g}"
                     break
-            
+
             return duration, resolution, aspect_ratio
-            
+
         except Exception as e:
             logger.warning(f"Failed to get metadata for {file_path}: {e}")
             return None, None, None
-    
+
     async def mock_ingest_file(self, media_file: MediaFile) -> bool:
         """Mock ingestion for testing without database."""
         import uuid
-        
+
         # Simulate processing time
         await asyncio.sleep(0.1)
-        
+
         media_file.media_id = str(uuid.uuid4())
         media_file.status = MediaStatus.INGESTED
         media_file.ingested_at = datetime.now().isoformat()
-        
+
         logger.info(f"[MOCK] Ingested: {media_file.filename}")
         return True
-    
+
     async def analyze_file(self, media_file: MediaFile) -> bool:
         """Run AI analysis on a media file."""
         if media_file.file_type != 'video':
@@ -322,37 +417,34 @@ class MediaIngester:
             media_file.analyzed_at = datetime.now().isoformat()
             media_file.analysis_result = {"type": "image", "analyzed": True}
             return True
-        
+
         try:
             # Try to use real AI analysis
             from services.ai_analysis import analyze_video
-            
+
             result = await analyze_video(media_file.path)
             media_file.analysis_result = result
             media_file.status = MediaStatus.ANALYZED
             media_file.analyzed_at = datetime.now().isoformat()
-            
+
             logger.info(f"Analyzed: {media_file.filename} - Score: {result.get('pre_social_score', 'N/A')}")
             return True
-            
+
         except ImportError:
             # AI service not available, use mock
             return await self.mock_analyze_file(media_file)
         except Exception as e:
             logger.error(f"Error analyzing {media_file.filename}: {e}")
-            media_file.error_message = str(e)
-            media_file.retry_count += 1
-            if media_file.retry_count >= MAX_RETRIES:
-                media_file.status = MediaStatus.FAILED
+            self._record_failure(media_file, e)
             return False
-    
+
     async def mock_analyze_file(self, media_file: MediaFile) -> bool:
         """Mock analysis for testing."""
         import random
-        
+
         # Simulate processing time
         await asyncio.sleep(0.2)
-        
+
         media_file.status = MediaStatus.ANALYZED
         media_file.analyzed_at = datetime.now().isoformat()
         media_file.analysis_result = {
@@ -363,180 +455,283 @@ class MediaIngester:
             "analyzed": True,
             "mock": True
         }
-        
+
         logger.info(f"[MOCK] Analyzed: {media_file.filename} - Score: {media_file.analysis_result['pre_social_score']}")
         return True
-    
-    async def process_batch(self, files: List[MediaFile]) -> int:
-        """Process a batch of files."""
-        success_count = 0
-        
-        for media_file in files:
-            file_state = self.state.files.get(media_file.file_hash, asdict(media_file))
-            current_status = file_state.get('status', MediaStatus.PENDING)
-            
-            # Restore state
-            media_file.status = current_status
-            media_file.retry_count = file_state.get('retry_count', 0)
-            media_file.media_id = file_state.get('media_id')
-            
-            # Skip if already completed or failed
-            if current_status in [MediaStatus.ANALYZED, MediaStatus.FAILED, MediaStatus.SKIPPED]:
-                logger.debug(f"Skipping {media_file.filename} (status: {current_status})")
-                continue
-            
-            # Ingest if needed
-            if current_status in [MediaStatus.PENDING, MediaStatus.INGESTING]:
-                media_file.status = MediaStatus.INGESTING
-                self.state.files[media_file.file_hash] = asdict(media_file)
-                
-                if await self.ingest_file(media_file):
-                    if media_file.status == MediaStatus.SKIPPED:
-                        self.state.skipped_count += 1
-                else:
-                    self.state.files[media_file.file_hash] = asdict(media_file)
+
+
+_DONE = object()  # End-of-stream marker passed between stages
+
+
+class IngestionPipeline:
+    """
+    discover -> fingerprint -> ingest -> analyze, each stage a bounded pool
+    of workers reading from a bounded queue. A file drops out of the
+    pipeline as soon as it reaches a terminal status (or fails a stage).
+    """
+
+    def __init__(
+        self,
+        store: IngestionStore,
+        ingester: MediaIngester,
+        hash_workers: int = HASH_WORKERS,
+        ingest_workers: int = INGEST_WORKERS,
+        analyze_workers: int = ANALYZE_WORKERS,
+    ):
+        self.store = store
+        self.ingester = ingester
+        self.hash_workers = hash_workers
+        self.ingest_workers = ingest_workers
+        self.analyze_workers = analyze_workers
+        self.unchanged_count = 0
+        self.queued_count = 0
+        self.finished_count = 0
+
+    def plan(self, scanned: List[MediaFile]) -> List[MediaFile]:
+        """
+        Files that need work: new or changed files start fresh, unfinished
+        ones resume from their stored row, finished unchanged ones are
+        skipped without being read. Copies skipped as duplicates of an
+        original that has since failed are imported in its place.
+        """
+        known = self.store.snapshot()
+        orphans = self._orphaned_duplicates({m.path for m in scanned})
+        pending = []
+        for media_file in scanned:
+            previous = known.get(media_file.path)
+            if previous and previous[:2] == (media_file.size_bytes, media_file.mtime_ns):
+                if media_file.path in orphans:
+                    pending.append(orphans[media_file.path])
                     continue
-            
-            # Analyze if ingested
-            if media_file.status in [MediaStatus.INGESTED, MediaStatus.ANALYZING]:
-                media_file.status = MediaStatus.ANALYZING
-                self.state.files[media_file.file_hash] = asdict(media_file)
-                
-                if await self.analyze_file(media_file):
-                    success_count += 1
-                    self.state.success_count += 1
-            
-            # Update state
-            self.state.files[media_file.file_hash] = asdict(media_file)
-            self.state.processed_count += 1
-            
-            if media_file.status == MediaStatus.FAILED:
-                self.state.failed_count += 1
-        
-        return success_count
-    
-    async def run(self, media_files: List[MediaFile], batch_size: int = 5, resume: bool = True):
-        """Run the full ingestion pipeline."""
-        logger.info(f"Starting ingestion of {len(media_files)} files (resume={resume}, batch_size={batch_size})")
-        
-        # Initialize database
-        db_available = await self.initialize_db()
-        if not db_available:
-            logger.warning("Database not available, running in mock mode")
-        
-        # Add new files to state
-        for mf in media_files:
-            if mf.file_hash not in self.state.files:
-                self.state.files[mf.file_hash] = asdict(mf)
-        
-        self.state.total_files = len(media_files)
-        
-        # Process in batches
-        total_batches = (len(media_files) + batch_size - 1) // batch_size
-        
-        for batch_num in range(self.state.current_batch, total_batches):
-            start_idx = batch_num * batch_size
-            end_idx = min(start_idx + batch_size, len(media_files))
-            batch = media_files[start_idx:end_idx]
-            
-            logger.info(f"Processing batch {batch_num + 1}/{total_batches} ({len(batch)} files)")
-            
-            self.state.current_batch = batch_num
-            success = await self.process_batch(batch)
-            
-            # Save state after each batch
-            self.state.save()
-            
-            # Progress report
-            progress = (self.state.processed_count / self.state.total_files) * 100
-            logger.info(
-                f"Progress: {progress:.1f}% | "
-                f"Success: {self.state.success_count} | "
-                f"Failed: {self.state.failed_count} | "
-                f"Skipped: {self.state.skipped_count}"
+                if previous[2] in TERMINAL_STATUSES:
+                    self.unchanged_count += 1
+                    continue
+                pending.append(self.store.load(media_file.path))
+            else:
+                pending.append(media_file)
+        return pending
+
+    def _orphaned_duplicates(self, paths: Set[str]) -> Dict[str, MediaFile]:
+        """Orphaned copies among `paths`, reset so they are fingerprinted and imported afresh"""
+        orphans = {}
+        for media_file in self.store.orphaned_duplicates():
+            if media_file.path in paths:
+                logger.info(f"Importing {media_file.filename}: its original {Path(media_file.duplicate_of).name} failed")
+                media_file.status = MediaStatus.PENDING
+                media_file.fingerprint = None
+                media_file.duplicate_of = None
+                media_file.media_id = None
+                self.store.save(media_file)
+                orphans[media_file.path] = media_file
+        return orphans
+
+    async def _run_stage(
+        self,
+        name: str,
+        inbox: asyncio.Queue,
+        outbox: Optional[asyncio.Queue],
+        workers: int,
+        handle: Callable[[MediaFile], Awaitable[bool]],
+    ):
+        """Run `workers` consumers of `inbox`; files whose handler returns True move on to `outbox`"""
+        async def worker():
+            while True:
+                media_file = await inbox.get()
+                if media_file is _DONE:
+                    await inbox.put(_DONE)  # let sibling workers see it too
+                    return
+                try:
+                    passed = await handle(media_file)
+                except Exception as e:
+                    logger.error(f"{name} failed for {media_file.filename}: {e}")
+                    self.ingester._record_failure(media_file, e)
+                    passed = False
+                if not passed:
+                    self.store.save(media_file)
+                    self._finished(media_file)
+                elif outbox is not None:
+                    await outbox.put(media_file)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    def _finished(self, media_file: MediaFile):
+        self.finished_count += 1
+        if self.finished_count % PROGRESS_EVERY == 0 or self.finished_count == self.queued_count:
+            logger.info(f"Progress: {self.finished_count}/{self.queued_count} files this run")
+
+    async def _fingerprint(self, media_file: MediaFile) -> bool:
+        if media_file.fingerprint is None:
+            media_file.fingerprint = await asyncio.to_thread(
+                quick_fingerprint, media_file.path, media_file.size_bytes
             )
-        
-        # Final report
-        self.print_summary()
-    
+            # Check and save with no await in between, so concurrent copies can't both miss
+            original = self.store.find_by_fingerprint(media_file.fingerprint, media_file.path)
+            if original:
+                logger.info(f"Skipping duplicate: {media_file.filename} (same content as {original.filename})")
+                media_file.status = MediaStatus.SKIPPED
+                media_file.duplicate_of = original.path
+                media_file.media_id = original.media_id
+                return False
+            self.store.save(media_file)
+        return True
+
+    async def _ingest(self, media_file: MediaFile) -> bool:
+        if media_file.status in (MediaStatus.PENDING, MediaStatus.INGESTING):
+            media_file.status = MediaStatus.INGESTING
+            self.store.save(media_file)
+            if not await self.ingester.ingest_file(media_file):
+                return False
+            self.store.save(media_file)
+        return media_file.status in (MediaStatus.INGESTED, MediaStatus.ANALYZING)
+
+    async def _analyze(self, media_file: MediaFile) -> bool:
+        media_file.status = MediaStatus.ANALYZING
+        self.store.save(media_file)
+        await self.ingester.analyze_file(media_file)
+        return False  # Last stage: always record the outcome
+
+    async def run(self, scanned: List[MediaFile]):
+        """Run the full ingestion pipeline."""
+        if not self.store.get_meta('started_at'):
+            self.store.set_meta('started_at', datetime.now().isoformat())
+
+        pending = self.plan(scanned)
+        self.queued_count = len(pending)
+        logger.info(
+            f"Starting ingestion: {len(pending)} files to process, "
+            f"{self.unchanged_count} unchanged and already done"
+        )
+        await self._process(pending)
+
+        # Originals that failed during this run leave their skipped copies
+        # behind; each pass settles at least one file, so this ends
+        paths = {m.path for m in scanned}
+        while orphans := self._orphaned_duplicates(paths):
+            self.queued_count += len(orphans)
+            await self._process(list(orphans.values()))
+
+        self.store.link_duplicates()
+        self.store.set_meta('last_updated', datetime.now().isoformat())
+
+    async def _process(self, pending: List[MediaFile]):
+        hash_queue: asyncio.Queue = asyncio.Queue(maxsize=self.hash_workers * 4)
+        ingest_queue: asyncio.Queue = asyncio.Queue(maxsize=self.ingest_workers * 4)
+        analyze_queue: asyncio.Queue = asyncio.Queue(maxsize=self.analyze_workers * 4)
+
+        async def discover():
+            for media_file in pending:
+                await hash_queue.put(media_file)
+            await hash_queue.put(_DONE)
+
+        await asyncio.gather(
+            discover(),
+            self._run_stage("fingerprint", hash_queue, ingest_queue, self.hash_workers, self._fingerprint),
+            self._run_stage("ingest", ingest_queue, analyze_queue, self.ingest_workers, self._ingest),
+            self._run_stage("analyze", analyze_queue, None, self.analyze_workers, self._analyze),
+        )
+
     def print_summary(self):
         """Print ingestion summary."""
+        counts = self.store.counts()
         print("\n" + "=" * 60)
         print("INGESTION COMPLETE")
         print("=" * 60)
-        print(f"Total Files:     {self.state.total_files}")
-        print(f"Processed:       {self.state.processed_count}")
-        print(f"Successful:      {self.state.success_count}")
-        print(f"Failed:          {self.state.failed_count}")
-        print(f"Skipped (dupes): {self.state.skipped_count}")
-        print(f"Started:         {self.state.started_at}")
-        print(f"Completed:       {self.state.last_updated}")
+        print(f"Total Files:     {sum(counts.values())}")
+        print(f"This Run:        {self.queued_count} processed, {self.unchanged_count} unchanged")
+        print(f"Analyzed:        {counts.get(MediaStatus.ANALYZED.value, 0)}")
+        print(f"Failed:          {counts.get(MediaStatus.FAILED.value, 0)}")
+        print(f"Skipped (dupes): {counts.get(MediaStatus.SKIPPED.value, 0)}")
+        print(f"Started:         {self.store.get_meta('started_at')}")
+        print(f"Completed:       {self.store.get_meta('last_updated')}")
         print("=" * 60)
-        
+
         # List failed files
-        if self.state.failed_count > 0:
+        failures = self.store.failures()
+        if failures:
             print("\nFailed files:")
-            for file_hash, file_data in self.state.files.items():
-                if file_data.get('status') == MediaStatus.FAILED:
-                    print(f"  - {file_data['filename']}: {file_data.get('error_message', 'Unknown error')}")
+            for filename, error in failures:
+                print(f"  - {filename}: {error or 'Unknown error'}")
+
+
+def configure_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler('ingestion.log')
+        ]
+    )
 
 
 async def main():
     """Main entry point."""
     import argparse
-    
+
     parser = argparse.ArgumentParser(description="Ingest iPhone media with resume capability")
     parser.add_argument("--path", type=str, default=str(IPHONE_IMPORT_PATH),
                        help="Path to media directory")
+    parser.add_argument("--state-db", type=str, default=str(STATE_DB),
+                       help="SQLite file holding per-file ingestion state")
     parser.add_argument("--reset", action="store_true",
                        help="Reset state and start fresh")
     parser.add_argument("--status", action="store_true",
                        help="Show current ingestion status")
-    parser.add_argument("--batch-size", type=int, default=5,
-                       help="Number of files to process per batch")
-    
+    parser.add_argument("--hash-workers", type=int, default=HASH_WORKERS,
+                       help="Concurrent fingerprint workers")
+    parser.add_argument("--ingest-workers", type=int, default=INGEST_WORKERS,
+                       help="Concurrent ingest workers")
+    parser.add_argument("--analyze-workers", type=int, default=ANALYZE_WORKERS,
+                       help="Concurrent analysis workers")
+
     args = parser.parse_args()
-    
-    batch_size = args.batch_size
-    
-    # Status only
-    if args.status:
-        state = IngestionState.load()
-        if state:
-            print(f"\nIngestion Status:")
-            print(f"  Started: {state.started_at}")
-            print(f"  Last Updated: {state.last_updated}")
-            print(f"  Progress: {state.processed_count}/{state.total_files}")
-            print(f"  Success: {state.success_count}")
-            print(f"  Failed: {state.failed_count}")
-            print(f"  Skipped: {state.skipped_count}")
-            print(f"  Current Batch: {state.current_batch}")
-        else:
-            print("No ingestion in progress")
-        return
-    
-    # Load or create state
-    if args.reset or not STATE_FILE.exists():
-        logger.info("Starting fresh ingestion")
-        state = IngestionState.create_new()
-    else:
-        state = IngestionState.load()
-        if state:
-            logger.info(f"Resuming from batch {state.current_batch}, {state.processed_count}/{state.total_files} processed")
-        else:
-            state = IngestionState.create_new()
-    
-    # Scan directory
-    media_path = Path(args.path)
-    media_files = scan_directory(media_path)
-    
-    if not media_files:
-        logger.error("No media files found")
-        return
-    
-    # Run ingestion
-    ingester = MediaIngester(state)
-    await ingester.run(media_files, batch_size=batch_size)
+    configure_logging()
+
+    store = IngestionStore(Path(args.state_db))
+    try:
+        # Status only
+        if args.status:
+            counts = store.counts()
+            if counts:
+                print(f"\nIngestion Status:")
+                print(f"  Started: {store.get_meta('started_at')}")
+                print(f"  Last Updated: {store.get_meta('last_updated')}")
+                print(f"  Files: {sum(counts.values())}")
+                for status in MediaStatus:
+                    print(f"  {status.value.title()}: {counts.get(status.value, 0)}")
+            else:
+                print("No ingestion in progress")
+            return
+
+        if args.reset:
+            logger.info("Starting fresh ingestion")
+            store.reset()
+
+        # Scan directory
+        media_files = await asyncio.to_thread(scan_directory, Path(args.path))
+
+        if not media_files:
+            logger.error("No media files found")
+            return
+
+        ingester = MediaIngester()
+        if not await ingester.initialize_db():
+            logger.warning("Database not available, running in mock mode")
+
+        # Run ingestion
+        pipeline = IngestionPipeline(
+            store,
+            ingester,
+            hash_workers=args.hash_workers,
+            ingest_workers=args.ingest_workers,
+            analyze_workers=args.analyze_workers,
+        )
+        await pipeline.run(media_files)
+        pipeline.print_summary()
+    finally:
+        store.close()
 
 
 if __name__ == "__main__":
@@ -2,48 +2,33 @@ import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-class RollupEngine:
-    """
-    Aggregates metrics from content_metrics (per variant) 
-    into content_rollups (per canonical content item).
-    """
-    
-    async def run_rollups(self, db_session: AsyncSession):
-        """
-        Recompute rollups for all content items that have had new metrics recently.
-        For simplicity, we'll recompute for all content items.
-        """
-        print("Starting analytics rollup...")
-        
-        # SQL to aggregate metrics
-        # We take the LATEST snapshot for each variant, then sum them up per content_id
-        
-        query = """
-        WITH latest_metrics AS (
-            SELECT DISTINCT ON (variant_id) 
-                variant_id, 
-                views, likes, comments, shares, saves, clicks, watch_time_seconds, traffic_type
-            FROM content_metrics
-            ORDER BY variant_id, snapshot_at DESC
-        ),
-        variant_sums AS (
-            SELECT 
-                cv.content_id,
-                lm.traffic_type,
-                COALESCE(SUM(lm.views), 0) as views,
-                COALESCE(SUM(lm.likes), 0) as likes,
-                COALESCE(SUM(lm.comments), 0) as comments,
-                COALESCE(SUM(lm.shares), 0) as shares,
-                COALESCE(SUM(lm.saves), 0) as saves,
-                COALESCE(SUM(lm.clicks), 0) as clicks,
-                COALESCE(SUM(lm.watch_time_seconds), 0) as watch_time
-            FROM latest_metrics lm
-            JOIN content_variants cv ON lm.variant_id = cv.id
-            GROUP BY cv.content_id, lm.traffic_type
-        )
+
+# Per-traffic-type aggregation of the latest snapshot of every variant of the
+# given content items. Watch time is stored per snapshot as a total, so the
+# average is total watch time over total views.
+_ROLLUP_UPSERT = """
+    variant_sums AS (
+        SELECT
+            cv.content_id,
+            lm.traffic_type,
+            COALESCE(SUM(lm.views), 0) as views,
+            COALESCE(SUM(lm.impressions), 0) as impressions,
+            COALESCE(SUM(lm.likes), 0) as likes,
+            COALESCE(SUM(lm.comments), 0) as comments,
+            COALESCE(SUM(lm.shares), 0) as shares,
+            COALESCE(SUM(lm.saves), 0) as saves,
+            COALESCE(SUM(lm.clicks), 0) as clicks,
+            COALESCE(SUM(lm.watch_time_seconds), 0) as watch_time
+        FROM content_metrics_latest lm
+        JOIN content_variants cv ON lm.variant_id = cv.id
+        WHERE cv.content_id IN (SELECT content_id FROM target_content)
+        GROUP BY cv.content_id, lm.traffic_type
+    ),
+    upserted AS (
         INSERT INTO content_rollups (
             content_id,
             total_views_organic, total_views_paid,
+            total_impressions_organic, total_impressions_paid,
             total_likes_organic, total_likes_paid,
             total_comments_organic, total_comments_paid,
             total_shares_organic, total_shares_paid,
@@ -54,29 +39,32 @@ class RollupEngine:
         )
         SELECT
             content_id,
-            MAX(CASE WHEN traffic_type = 'organic' THEN views ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'paid' THEN views ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'organic' THEN likes ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'paid' THEN likes ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'organic' THEN comments ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'paid' THEN comments ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'organic' THEN shares ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'paid' THEN shares ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'organic' THEN saves ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'paid' THEN saves ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'organic' THEN clicks ELSE 0 END),
-            MAX(CASE WHEN traffic_type = 'paid' THEN clicks ELSE 0 END),
-            -- Watch time is sum here, but schema says avg? 
-            -- Let's assume schema meant total or we compute avg per view.
-            -- For now, storing total watch time in the 'avg' column is wrong.
-            -- Let's just store 0 for avg since we don't have view counts per variant easily here without more complex SQL
-            0, 0,
+            SUM(CASE WHEN traffic_type = 'organic' THEN views ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'paid' THEN views ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'organic' THEN impressions ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'paid' THEN impressions ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'organic' THEN likes ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'paid' THEN likes ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'organic' THEN comments ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'paid' THEN comments ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'organic' THEN shares ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'paid' THEN shares ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'organic' THEN saves ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'paid' THEN saves ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'organic' THEN clicks ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'paid' THEN clicks ELSE 0 END),
+            SUM(CASE WHEN traffic_type = 'organic' THEN watch_time ELSE 0 END)
+                / NULLIF(SUM(CASE WHEN traffic_type = 'organic' THEN views ELSE 0 END), 0),
+            SUM(CASE WHEN traffic_type = 'paid' THEN watch_time ELSE 0 END)
+                / NULLIF(SUM(CASE WHEN traffic_type = 'paid' THEN views ELSE 0 END), 0),
             NOW()
         FROM variant_sums
         GROUP BY content_id
         ON CONFLICT (content_id) DO UPDATE SET
             total_views_organic = EXCLUDED.total_views_organic,
             total_views_paid = EXCLUDED.total_views_paid,
+            total_impressions_organic = EXCLUDED.total_impressions_organic,
+            total_impressions_paid = EXCLUDED.total_impressions_paid,
             total_likes_organic = EXCLUDED.total_likes_organic,
             total_likes_paid = EXCLUDED.total_likes_paid,
             total_comments_organic = EXCLUDED.total_comments_organic,
@@ -87,9 +75,111 @@ class RollupEngine:
             total_saves_paid = EXCLUDED.total_saves_paid,
             total_clicks_organic = EXCLUDED.total_clicks_organic,
             total_clicks_paid = EXCLUDED.total_clicks_paid,
-            last_updated_at = NOW();
+            avg_watch_time_seconds_organic = EXCLUDED.avg_watch_time_seconds_organic,
+            avg_watch_time_seconds_paid = EXCLUDED.avg_watch_time_seconds_paid,
+            last_updated_at = NOW()
+        RETURNING content_id
+    )
+"""
+
+# Variants whose latest snapshot has not been folded into a rollup yet. The
+# snapshot_at captured here becomes the variant's new high-water mark, so a
+# snapshot that lands mid-run leaves the variant dirty for the next run.
+INCREMENTAL_ROLLUP_SQL = """
+    WITH dirty AS (
+        SELECT l.variant_id, l.snapshot_at
+        FROM content_metrics_latest l
+        WHERE l.rolled_up_snapshot_at IS DISTINCT FROM l.snapshot_at
+        ORDER BY l.snapshot_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ),
+    target_content AS (
+        SELECT DISTINCT cv.content_id
+        FROM dirty d
+        JOIN content_variants cv ON cv.id = d.variant_id
+    ),
+""" + _ROLLUP_UPSERT + """,
+    marked AS (
+        UPDATE content_metrics_latest l
+        SET rolled_up_snapshot_at = d.snapshot_at
+        FROM dirty d
+        WHERE l.variant_id = d.variant_id
+        RETURNING l.variant_id
+    )
+    SELECT
+        (SELECT COUNT(*) FROM marked) AS variants,
+        (SELECT COUNT(*) FROM upserted) AS content_items
+"""
+
+FULL_ROLLUP_SQL = """
+    WITH target_content AS (
+        SELECT id AS content_id FROM content_items
+    ),
+""" + _ROLLUP_UPSERT + """,
+    marked AS (
+        UPDATE content_metrics_latest
+        SET rolled_up_snapshot_at = snapshot_at
+        WHERE rolled_up_snapshot_at IS DISTINCT FROM snapshot_at
+        RETURNING variant_id
+    )
+    SELECT
+        (SELECT COUNT(*) FROM marked) AS variants,
+        (SELECT COUNT(*) FROM upserted) AS content_items
+"""
+
+
+class RollupEngine:
+    """
+    Aggregates metrics from content_metrics (per variant)
+    into content_rollups (per canonical content item).
+
+    Reads from content_metrics_latest, which a trigger on content_metrics keeps
+    at one row per variant, so cost scales with new snapshots rather than with
+    the full metrics history.
+    """
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+
+    async def run_rollups(self, db_session: AsyncSession, full: bool = False) -> dict:
+        """
+        Recompute rollups for content items with new metrics since the last run.
+
+        Args:
+            db_session: Database session
+            full: Recompute every content item (e.g. after a backfill)
+
+        Returns:
+            Dict with counts of variants and content items processed
         """
-        
-        await db_session.execute(text(query))
-        await db_session.commit()
-        print("Rollup complete.")
+        print(f"Starting analytics rollup ({'full' if full else 'incremental'})...")
+
+        if full:
+            result = await db_session.execute(text(FULL_ROLLUP_SQL))
+            variants, content_items = result.one()
+            await db_session.commit()
+            print(f"Rollup complete: {content_items} content items.")
+            return {"variants": variants, "content_items": content_items, "batches": 1}
+
+        totals = {"variants": 0, "content_items": 0, "batches": 0}
+        while True:
+            result = await db_session.execute(
+                text(INCREMENTAL_ROLLUP_SQL), {"batch_size": self.batch_size}
+            )
+            variants, content_items = result.one()
+            await db_session.commit()
+
+            if not variants:
+                break
+            totals["variants"] += variants
+            totals["content_items"] += content_items
+            totals["batches"] += 1
+            if variants < self.batch_size:
+                break
+
+        print(
+            f"Rollup complete: {totals['content_items']} content items "
+            f"from {totals['variants']} updated variants."
+        )
+        return totals
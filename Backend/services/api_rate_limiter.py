@@ -16,6 +16,62 @@ Base = declarative_base()
 logger = logging.getLogger(__name__)
 
 
+# Monthly call budgets per API, shared by every caller that logs to api_call_logs
+API_BUDGETS = {
+    "tiktok_scraper": {
+        "monthly_limit": 250,
+        "safety_margin": 0.9  # Use only 90% of limit (225 calls)
+    },
+    "instagram_looter": {
+        "monthly_limit": 10000,
+        "safety_margin": 0.9
+    },
+    "youtube_v31": {
+        "monthly_limit": 10000,
+        "safety_margin": 0.9
+    },
+}
+DEFAULT_BUDGET = {"monthly_limit": 1000, "safety_margin": 0.9}
+
+
+def monthly_limit(api_name: str) -> int:
+    """Usable calls per month for an API after the safety margin"""
+    config = API_BUDGETS.get(api_name, DEFAULT_BUDGET)
+    return int(config["monthly_limit"] * config["safety_margin"])
+
+
+def paced_allowance(
+    api_name: str,
+    used: int,
+    now: Optional[datetime] = None,
+    burst_fraction: float = 0.02
+) -> int:
+    """
+    Calls that may be spent right now without outrunning the monthly budget
+
+    The budget is released evenly across the month, plus a small burst, so a
+    backlog early in the month cannot drain calls needed later on.
+
+    Args:
+        api_name: API name as logged in api_call_logs
+        used: Calls already spent (or reserved) this month
+        now: Current time
+        burst_fraction: Share of the monthly limit usable ahead of pace
+
+    Returns:
+        Number of calls allowed now (never negative)
+    """
+    now = now or datetime.now()
+    limit = monthly_limit(api_name)
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    elapsed = (now - month_start) / (next_month - month_start)
+
+    burst = max(1, int(limit * burst_fraction))
+    released = min(limit, int(limit * elapsed) + burst)
+    return max(0, released - used)
+
+
 class APICallLog(Base):
     """Track API calls for rate limiting and budget management"""
     __tablename__ = "api_call_logs"
@@ -55,12 +111,7 @@ class APIRateLimiter:
         self.cache: Dict[str, Any] = {}
         
         # Budget configurations
-        self.budgets = {
-            "tiktok_scraper": {
-                "monthly_limit": 250,
-                "safety_margin": 0.9  # Use only 90% of limit (225 calls)
-            }
-        }
+        self.budgets = API_BUDGETS
     
     def can_make_call(self, endpoint: str) -> tuple[bool, str]:
         """
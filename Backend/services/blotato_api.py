@@ -21,6 +21,8 @@ from enum import Enum
 from datetime import datetime
 import logging
 
+from services.job_waiter import DONE, FAILED, TIMEOUT, JobPoll, get_job_waiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -712,28 +714,28 @@ class BlotatoAPI:
         Args:
             video_id: The video ID to wait for
             timeout_seconds: Maximum time to wait
-            poll_interval: Seconds between status checks
+            poll_interval: Base seconds between status checks (backs off from here)
         
         Returns:
             dict with final video status including mediaUrl
         """
-        import asyncio
-        
-        start_time = datetime.now()
-        while True:
+        async def poll() -> JobPoll:
             status = await self.get_video_status(video_id)
-            
-            if status.get("item", {}).get("mediaUrl"):
-                return status
-            
-            if status.get("item", {}).get("status") == "Failed":
-                raise Exception(f"Video creation failed: {video_id}")
-            
-            elapsed = (datetime.now() - start_time).total_seconds()
-            if elapsed > timeout_seconds:
-                raise Exception(f"Timeout waiting for video: {video_id}")
-            
-            await asyncio.sleep(poll_interval)
+            item = status.get("item", {})
+            if item.get("mediaUrl"):
+                return JobPoll(DONE, result=status)
+            if item.get("status") == "Failed":
+                return JobPoll(FAILED, error=f"Video creation failed: {video_id}")
+            return JobPoll()
+        
+        outcome = await get_job_waiter().wait(
+            "blotato", video_id, poll, timeout=timeout_seconds, interval=poll_interval
+        )
+        if outcome.state == TIMEOUT:
+            raise Exception(f"Timeout waiting for video: {video_id}")
+        if outcome.state == FAILED:
+            raise Exception(outcome.error)
+        return outcome.result
     
     # =========================================================================
     # UTILITY METHODS
@@ -8,7 +8,7 @@ from sqlalchemy import select, and_, or_, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
-from database.models import ScheduledPost, VideoClip, ContentVariant, PlatformPost
+from database.models import ScheduledPost, VideoClip, ContentVariant, ContentItem, PlatformPost
 from services.exceptions import ServiceError
 
 
@@ -18,6 +18,80 @@ class CalendarService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
+    @staticmethod
+    def _calendar_query():
+        """
+        Column projection for calendar reads
+        
+        Joins variant, content item and clip in a single statement and selects
+        only the columns the calendar renders, so rows come back as plain
+        mappings without hydrating ORM objects.
+        """
+        return (
+            select(
+                ScheduledPost.id,
+                ScheduledPost.platform,
+                ScheduledPost.scheduled_time,
+                ScheduledPost.status,
+                ScheduledPost.is_ai_recommended,
+                ScheduledPost.recommendation_score,
+                ScheduledPost.recommendation_reasoning,
+                ScheduledPost.published_at,
+                ScheduledPost.error_message,
+                ScheduledPost.created_at,
+                ContentVariant.id.label('variant_id'),
+                ContentVariant.platform.label('variant_platform'),
+                ContentItem.title.label('content_title'),
+                ContentItem.description.label('content_caption'),
+                VideoClip.id.label('clip_id'),
+                VideoClip.title.label('clip_title'),
+                VideoClip.start_time.label('clip_start_time'),
+                VideoClip.end_time.label('clip_end_time'),
+                VideoClip.rendered_url.label('clip_rendered_url'),
+            )
+            .select_from(ScheduledPost)
+            .outerjoin(ContentVariant, ContentVariant.id == ScheduledPost.content_variant_id)
+            .outerjoin(ContentItem, ContentItem.id == ContentVariant.content_id)
+            .outerjoin(VideoClip, VideoClip.id == ScheduledPost.clip_id)
+        )
+    
+    @staticmethod
+    def _format_calendar_row(row) -> Dict[str, Any]:
+        """Convert a projected calendar row into the API response shape"""
+        post_dict = {
+            'id': str(row['id']),
+            'platform': row['platform'],
+            'scheduled_time': row['scheduled_time'].isoformat(),
+            'status': row['status'],
+            'is_ai_recommended': row['is_ai_recommended'],
+            'recommendation_score': row['recommendation_score'],
+            'recommendation_reasoning': row['recommendation_reasoning'],
+            'published_at': row['published_at'].isoformat() if row['published_at'] else None,
+            'error_message': row['error_message'],
+            'created_at': row['created_at'].isoformat() if row['created_at'] else None
+        }
+        
+        if row['variant_id']:
+            post_dict['content'] = {
+                'variant_id': str(row['variant_id']),
+                'platform': row['variant_platform'],
+                'title': row['content_title'],
+                'caption': row['content_caption']
+            }
+        
+        if row['clip_id']:
+            duration = None
+            if row['clip_start_time'] is not None and row['clip_end_time'] is not None:
+                duration = row['clip_end_time'] - row['clip_start_time']
+            post_dict['clip'] = {
+                'clip_id': str(row['clip_id']),
+                'title': row['clip_title'],
+                'duration_seconds': duration,
+                'file_path': row['clip_rendered_url']
+            }
+        
+        return post_dict
+    
     async def get_calendar_posts(
         self,
         user_id: UUID,
@@ -29,6 +103,9 @@ class CalendarService:
         """
         Get scheduled posts for calendar view
         
+        Runs as a single joined query regardless of how many posts are in
+        range; see ``_calendar_query``.
+        
         Args:
             user_id: User ID to filter by
             start_date: Optional start date filter
@@ -41,7 +118,7 @@ class CalendarService:
         """
         try:
             # Build base query
-            query = select(ScheduledPost).where(ScheduledPost.status != 'cancelled')
+            query = self._calendar_query().where(ScheduledPost.status != 'cancelled')
             
             # Apply date filters
             if start_date:
@@ -61,54 +138,7 @@ class CalendarService:
             query = query.order_by(ScheduledPost.scheduled_time.asc())
             
             result = await self.db.execute(query)
-            scheduled_posts = result.scalars().all()
-            
-            # Format response with content details
-            posts_data = []
-            for post in scheduled_posts:
-                post_dict = {
-                    'id': str(post.id),
-                    'platform': post.platform,
-                    'scheduled_time': post.scheduled_time.isoformat(),
-                    'status': post.status,
-                    'is_ai_recommended': post.is_ai_recommended,
-                    'recommendation_score': post.recommendation_score,
-                    'recommendation_reasoning': post.recommendation_reasoning,
-                    'published_at': post.published_at.isoformat() if post.published_at else None,
-                    'error_message': post.error_message,
-                    'created_at': post.created_at.isoformat()
-                }
-                
-                # Include content variant data if available
-                if post.content_variant_id:
-                    variant_result = await self.db.execute(
-                        select(ContentVariant).where(ContentVariant.id == post.content_variant_id)
-                    )
-                    variant = variant_result.scalar_one_or_none()
-                    if variant:
-                        post_dict['content'] = {
-                            'variant_id': str(variant.id),
-                            'caption': variant.caption,
-                            'title': variant.title,
-                            'hashtags': variant.hashtags,
-                            'thumbnail_url': variant.thumbnail_url
-                        }
-                
-                # Include clip data if available
-                if post.clip_id:
-                    clip_result = await self.db.execute(
-                        select(VideoClip).where(VideoClip.id == post.clip_id)
-                    )
-                    clip = clip_result.scalar_one_or_none()
-                    if clip:
-                        post_dict['clip'] = {
-                            'clip_id': str(clip.id),
-                            'title': clip.title,
-                            'duration_seconds': clip.duration_seconds,
-                            'file_path': clip.file_path
-                        }
-                
-                posts_data.append(post_dict)
+            posts_data = [self._format_calendar_row(row) for row in result.mappings().all()]
             
             logger.info(f"Retrieved {len(posts_data)} calendar posts")
             return posts_data
@@ -117,6 +147,59 @@ class CalendarService:
             logger.error(f"Failed to get calendar posts: {e}")
             raise ServiceError(f"Failed to get calendar posts: {str(e)}")
     
+    async def get_calendar_view(
+        self,
+        user_id: UUID,
+        view: str = 'month',
+        anchor: Optional[datetime] = None,
+        platforms: Optional[List[str]] = None,
+        status: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get a month or week of posts grouped by day
+        
+        Args:
+            user_id: User ID to filter by
+            view: 'month' or 'week' (weeks start on Monday)
+            anchor: Any datetime inside the requested period (defaults to now)
+            platforms: Optional list of platforms to filter by
+            status: Optional status filter
+        
+        Returns:
+            Dict with the period bounds and posts keyed by ISO date
+        """
+        if view not in ('month', 'week'):
+            raise ServiceError(f"Unsupported calendar view: {view}")
+        
+        anchor = anchor or datetime.now()
+        day_start = anchor.replace(hour=0, minute=0, second=0, microsecond=0)
+        if view == 'week':
+            start_date = day_start - timedelta(days=day_start.weekday())
+            end_date = start_date + timedelta(days=7)
+        else:
+            start_date = day_start.replace(day=1)
+            end_date = (start_date + timedelta(days=32)).replace(day=1)
+        
+        posts = await self.get_calendar_posts(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date - timedelta(microseconds=1),
+            platforms=platforms,
+            status=status
+        )
+        
+        days: Dict[str, List[Dict[str, Any]]] = {}
+        for post in posts:
+            days.setdefault(post['scheduled_time'][:10], []).append(post)
+        
+        return {
+            'view': view,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'total_posts': len(posts),
+            'days': days
+        }
+    
     async def schedule_post(
         self,
         clip_id: Optional[UUID] = None,
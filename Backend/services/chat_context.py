@@ -0,0 +1,536 @@
+"""
+AI Chat Context Snapshots
+Precomputes per-workspace library, analytics, schedule and coaching summaries
+for the chat prompt, so a chat message only has to read a few short strings.
+
+Snapshots live in ai_context_snapshots, one row per (workspace, section), as
+compact text already trimmed to the section's token budget. Statement-level
+triggers on the source tables mark a section stale for the workspaces whose
+rows changed in a column that section reads; the refresh beat recomputes
+stale sections (debounced) and anything older than MAX_AGE.
+"""
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import text
+
+
+SECTIONS = ('media', 'analytics', 'schedule', 'coaching')
+
+# Prompt tokens each section may use; the full context stays under ~1.3k
+SECTION_TOKEN_BUDGETS = {
+    'media': 250,
+    'analytics': 400,
+    'schedule': 300,
+    'coaching': 300,
+}
+CHARS_PER_TOKEN = 4  # Conservative for English text and numbers
+
+MAX_AGE = timedelta(hours=1)                # Scheduled refresh
+STALE_DEBOUNCE = timedelta(seconds=60)      # Min gap between event refreshes
+CACHE_TTL_SECONDS = 30                      # In-process snapshot cache
+CONTEXT_BUILD_BUDGET_MS = 20.0
+
+
+# ============================================================================
+# SOURCE QUERIES
+# ============================================================================
+
+MEDIA_SUMMARY_SQL = """
+SELECT
+    COUNT(*) AS total,
+    COUNT(*) FILTER (WHERE processing_status = 'completed') AS processed,
+    COUNT(*) FILTER (WHERE processing_status IN ('pending', 'processing')) AS pending,
+    COUNT(*) FILTER (WHERE processing_status = 'failed') AS failed,
+    COALESCE(SUM(duration_seconds), 0) AS total_seconds,
+    MAX(date_uploaded) AS last_upload
+FROM original_videos
+WHERE workspace_id = :workspace_id
+"""
+
+MEDIA_TOPICS_SQL = """
+SELECT topic, COUNT(*) AS videos
+FROM original_videos, unnest(topics) AS topic
+WHERE workspace_id = :workspace_id
+GROUP BY topic
+ORDER BY videos DESC
+LIMIT 10
+"""
+
+MEDIA_RECENT_SQL = """
+SELECT file_name, processing_status, date_uploaded
+FROM original_videos
+WHERE workspace_id = :workspace_id
+ORDER BY date_uploaded DESC NULLS LAST
+LIMIT 5
+"""
+
+ANALYTICS_TOTALS_SQL = """
+SELECT
+    COUNT(*) AS content_count,
+    COALESCE(SUM(r.total_views), 0) AS views,
+    COALESCE(SUM(r.total_likes), 0) AS likes,
+    COALESCE(SUM(r.total_comments), 0) AS comments,
+    COALESCE(SUM(r.total_shares), 0) AS shares,
+    COALESCE(SUM(r.total_saves), 0) AS saves
+FROM content_items ci
+JOIN content_rollups r ON r.content_id = ci.id
+WHERE ci.workspace_id = :workspace_id
+"""
+
+ANALYTICS_PLATFORMS_SQL = """
+SELECT
+    cv.platform,
+    COUNT(*) AS posts,
+    COALESCE(SUM(l.views), 0) AS views,
+    COALESCE(SUM(l.likes + l.comments + l.shares + l.saves), 0) AS engagement
+FROM content_metrics_latest l
+JOIN content_variants cv ON cv.id = l.variant_id
+JOIN content_items ci ON ci.id = cv.content_id
+WHERE ci.workspace_id = :workspace_id
+GROUP BY cv.platform
+ORDER BY views DESC
+"""
+
+ANALYTICS_TOP_SQL = """
+SELECT
+    ci.title,
+    r.total_views AS views,
+    r.total_likes + r.total_comments + r.total_shares + r.total_saves AS engagement,
+    r.best_platform
+FROM content_items ci
+JOIN content_rollups r ON r.content_id = ci.id
+WHERE ci.workspace_id = :workspace_id
+ORDER BY r.total_views DESC NULLS LAST
+LIMIT 10
+"""
+
+SCHEDULE_SUMMARY_SQL = """
+SELECT
+    COUNT(*) FILTER (WHERE sp.status = 'scheduled' AND sp.scheduled_time >= :now) AS upcoming,
+    MIN(sp.scheduled_time) FILTER (WHERE sp.status = 'scheduled' AND sp.scheduled_time >= :now) AS next_post,
+    COUNT(*) FILTER (WHERE sp.status = 'published' AND sp.published_at >= :week_ago) AS published_7d,
+    COUNT(*) FILTER (WHERE sp.status IN ('failed', 'max_retries_reached') AND sp.updated_at >= :week_ago) AS failed_7d
+FROM scheduled_posts sp
+JOIN content_variants cv ON cv.id = sp.content_variant_id
+JOIN content_items ci ON ci.id = cv.content_id
+WHERE ci.workspace_id = :workspace_id
+"""
+
+SCHEDULE_UPCOMING_SQL = """
+SELECT sp.platform, sp.scheduled_time, ci.title
+FROM scheduled_posts sp
+JOIN content_variants cv ON cv.id = sp.content_variant_id
+JOIN content_items ci ON ci.id = cv.content_id
+WHERE ci.workspace_id = :workspace_id
+  AND sp.status = 'scheduled'
+  AND sp.scheduled_time >= :now
+ORDER BY sp.scheduled_time ASC
+LIMIT 10
+"""
+
+COACHING_GOALS_SQL = """
+SELECT goal_name, goal_type, end_date
+FROM posting_goals
+WHERE status = 'active'
+  AND user_id IN (SELECT user_id FROM workspace_members WHERE workspace_id = :workspace_id)
+ORDER BY priority DESC, created_at DESC
+LIMIT 10
+"""
+
+# content_recommendations is not workspace-scoped yet, so every workspace
+# sees the same pending list
+COACHING_RECOMMENDATIONS_SQL = """
+SELECT title, recommendation_type, expected_improvement
+FROM content_recommendations
+WHERE status = 'pending' AND (expires_at IS NULL OR expires_at > :now)
+ORDER BY priority DESC, created_at DESC
+LIMIT 10
+"""
+
+# ============================================================================
+# SNAPSHOT QUERIES
+# ============================================================================
+
+LOAD_SNAPSHOTS_SQL = """
+SELECT section, content, token_count, item_count, computed_at
+FROM ai_context_snapshots
+WHERE workspace_id = :workspace_id
+"""
+
+UPSERT_SNAPSHOT_SQL = """
+INSERT INTO ai_context_snapshots
+    (workspace_id, section, content, token_count, item_count, stale, computed_at, build_ms)
+VALUES (:workspace_id, :section, :content, :token_count, :item_count, FALSE, :computed_at, :build_ms)
+ON CONFLICT (workspace_id, section) DO UPDATE SET
+    content = EXCLUDED.content,
+    token_count = EXCLUDED.token_count,
+    item_count = EXCLUDED.item_count,
+    computed_at = EXCLUDED.computed_at,
+    build_ms = EXCLUDED.build_ms,
+    -- Keep the flag if a write landed after this refresh started reading
+    stale = ai_context_snapshots.stale AND ai_context_snapshots.stale_at >= EXCLUDED.computed_at
+"""
+
+DUE_SNAPSHOTS_SQL = """
+SELECT w.id AS workspace_id, s.section
+FROM workspaces w
+CROSS JOIN unnest(CAST(:sections AS text[])) AS s(section)
+LEFT JOIN ai_context_snapshots c ON c.workspace_id = w.id AND c.section = s.section
+WHERE c.workspace_id IS NULL
+   OR (c.stale AND c.computed_at < :debounce_before)
+   OR c.computed_at < :expired_before
+ORDER BY c.computed_at ASC NULLS FIRST
+LIMIT :limit
+"""
+
+
+# ============================================================================
+# TOKEN BUDGETS
+# ============================================================================
+
+def estimate_tokens(content: str) -> int:
+    """Rough prompt token count for a string"""
+    return math.ceil(len(content) / CHARS_PER_TOKEN)
+
+
+def fit_to_budget(lines: Sequence[str], budget: int) -> Tuple[str, int]:
+    """
+    Join lines in priority order, dropping the tail once over budget
+
+    Args:
+        lines: Lines, most important first
+        budget: Token budget for the section
+
+    Returns:
+        (content, estimated tokens)
+    """
+    kept: List[str] = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1  # newline
+        if used + cost > budget:
+            if not kept:
+                # A single oversized line is cut rather than dropped
+                kept.append(line[:budget * CHARS_PER_TOKEN - 3] + '...')
+                used = budget
+            break
+        kept.append(line)
+        used += cost
+    return '\n'.join(kept), used
+
+
+def _fmt_time(value: Optional[datetime]) -> str:
+    return value.strftime('%Y-%m-%d %H:%M') if value else 'none'
+
+
+def _rate(part: float, whole: float) -> str:
+    return f"{part / whole * 100:.1f}%" if whole else 'n/a'
+
+
+# ============================================================================
+# SECTION BUILDERS
+# ============================================================================
+
+@dataclass
+class SectionSnapshot:
+    """One rendered context section"""
+    section: str
+    content: str
+    token_count: int
+    item_count: int
+    computed_at: datetime
+
+
+async def _media_lines(db, workspace_id: UUID, now: datetime) -> Tuple[List[str], int]:
+    params = {'workspace_id': workspace_id}
+    summary = (await db.execute(text(MEDIA_SUMMARY_SQL), params)).first()
+    topics = (await db.execute(text(MEDIA_TOPICS_SQL), params)).fetchall()
+    recent = (await db.execute(text(MEDIA_RECENT_SQL), params)).fetchall()
+
+    total = summary.total if summary else 0
+    lines = [
+        f"videos: {total} ({summary.processed} analyzed, {summary.pending} pending, {summary.failed} failed)"
+        if total else "videos: 0",
+    ]
+    if total:
+        lines.append(f"footage: {summary.total_seconds / 3600:.1f}h, last upload {_fmt_time(summary.last_upload)}")
+    if topics:
+        lines.append("top topics: " + ', '.join(f"{t.topic} ({t.videos})" for t in topics))
+    lines.extend(
+        f"recent: {r.file_name} [{r.processing_status}] {_fmt_time(r.date_uploaded)}"
+        for r in recent
+    )
+    return lines, total
+
+
+async def _analytics_lines(db, workspace_id: UUID, now: datetime) -> Tuple[List[str], int]:
+    params = {'workspace_id': workspace_id}
+    totals = (await db.execute(text(ANALYTICS_TOTALS_SQL), params)).first()
+    platforms = (await db.execute(text(ANALYTICS_PLATFORMS_SQL), params)).fetchall()
+    top = (await db.execute(text(ANALYTICS_TOP_SQL), params)).fetchall()
+
+    count = totals.content_count if totals else 0
+    if not count:
+        return ["no published content with metrics yet"], 0
+
+    engagement = totals.likes + totals.comments + totals.shares + totals.saves
+    lines = [
+        f"content: {count} pieces, {totals.views:,} views, {engagement:,} engagements "
+        f"(rate {_rate(engagement, totals.views)})",
+        f"likes {totals.likes:,}, comments {totals.comments:,}, shares {totals.shares:,}, saves {totals.saves:,}",
+    ]
+    if platforms:
+        lines.append("by platform: " + '; '.join(
+            f"{p.platform} {p.views:,} views, {_rate(p.engagement, p.views)} eng, {p.posts} posts"
+            for p in platforms
+        ))
+    lines.extend(
+        f"top: \"{t.title or 'untitled'}\" {t.views or 0:,} views, {_rate(t.engagement or 0, t.views or 0)} eng"
+        + (f", best on {t.best_platform}" if t.best_platform else '')
+        for t in top
+    )
+    return lines, count
+
+
+async def _schedule_lines(db, workspace_id: UUID, now: datetime) -> Tuple[List[str], int]:
+    params = {'workspace_id': workspace_id, 'now': now, 'week_ago': now - timedelta(days=7)}
+    summary = (await db.execute(text(SCHEDULE_SUMMARY_SQL), params)).first()
+    upcoming = (await db.execute(text(SCHEDULE_UPCOMING_SQL), params)).fetchall()
+
+    scheduled = summary.upcoming if summary else 0
+    lines = [
+        f"scheduled: {scheduled} upcoming, next {_fmt_time(summary.next_post if summary else None)}",
+        f"last 7 days: {summary.published_7d if summary else 0} published, {summary.failed_7d if summary else 0} failed",
+    ]
+    lines.extend(
+        f"upcoming: {_fmt_time(p.scheduled_time)} {p.platform} \"{p.title or 'untitled'}\""
+        for p in upcoming
+    )
+    return lines, scheduled
+
+
+async def _coaching_lines(db, workspace_id: UUID, now: datetime) -> Tuple[List[str], int]:
+    goals = (await db.execute(text(COACHING_GOALS_SQL), {'workspace_id': workspace_id})).fetchall()
+    recs = (await db.execute(text(COACHING_RECOMMENDATIONS_SQL), {'now': now})).fetchall()
+
+    lines = [f"active goals: {len(goals)}, pending recommendations: {len(recs)}"]
+    # Interleave so a tight budget still keeps some of each
+    for i in range(max(len(goals), len(recs))):
+        if i < len(goals):
+            g = goals[i]
+            due = f", due {g.end_date:%Y-%m-%d}" if g.end_date else ''
+            lines.append(f"goal: {g.goal_name} ({g.goal_type}{due})")
+        if i < len(recs):
+            r = recs[i]
+            gain = f", expected {r.expected_improvement}" if r.expected_improvement else ''
+            lines.append(f"recommendation: {r.title} ({r.recommendation_type}{gain})")
+    return lines, len(recs)
+
+
+SECTION_BUILDERS = {
+    'media': _media_lines,
+    'analytics': _analytics_lines,
+    'schedule': _schedule_lines,
+    'coaching': _coaching_lines,
+}
+
+
+async def build_section(db, workspace_id: UUID, section: str, now: Optional[datetime] = None) -> SectionSnapshot:
+    """Query a section's sources and render it within its token budget"""
+    now = now or datetime.now(timezone.utc)
+    lines, item_count = await SECTION_BUILDERS[section](db, workspace_id, now)
+    content, tokens = fit_to_budget(lines, SECTION_TOKEN_BUDGETS[section])
+    return SectionSnapshot(section, content, tokens, item_count, now)
+
+
+# ============================================================================
+# SNAPSHOT SERVICE
+# ============================================================================
+
+class ContextSnapshotCache:
+    """Per-process cache of loaded workspace snapshots"""
+
+    def __init__(self, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[UUID, Tuple[float, Dict[str, SectionSnapshot]]] = {}
+
+    def get(self, workspace_id: UUID) -> Optional[Dict[str, SectionSnapshot]]:
+        entry = self._entries.get(workspace_id)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            return entry[1]
+        return None
+
+    def put(self, workspace_id: UUID, snapshots: Dict[str, SectionSnapshot]) -> None:
+        self._entries[workspace_id] = (time.monotonic(), snapshots)
+
+    def invalidate(self, workspace_id: Optional[UUID] = None) -> None:
+        if workspace_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(workspace_id, None)
+
+
+_snapshot_cache = ContextSnapshotCache()
+
+
+def get_snapshot_cache() -> ContextSnapshotCache:
+    """Get the process-wide snapshot cache"""
+    return _snapshot_cache
+
+
+@dataclass
+class ChatContext:
+    """Assembled chat context and how long it took"""
+    prompt: str
+    sections: Dict[str, SectionSnapshot]
+    token_count: int
+    build_ms: float
+
+
+class ContextSnapshotService:
+    """Refreshes and serves per-workspace chat context snapshots"""
+
+    def __init__(self, db, cache: Optional[ContextSnapshotCache] = None):
+        self.db = db
+        self.cache = cache or get_snapshot_cache()
+
+    async def refresh_workspace(
+        self,
+        workspace_id: UUID,
+        sections: Sequence[str] = SECTIONS,
+        commit: bool = True
+    ) -> Dict[str, SectionSnapshot]:
+        """
+        Recompute and store sections for one workspace
+
+        Args:
+            workspace_id: Workspace to refresh
+            sections: Sections to rebuild (default: all)
+            commit: Commit after writing
+
+        Returns:
+            The rebuilt sections
+        """
+        rebuilt = {}
+        rows = []
+        for section in sections:
+            started = time.perf_counter()
+            snapshot = await build_section(self.db, workspace_id, section)
+            rebuilt[section] = snapshot
+            rows.append({
+                'workspace_id': workspace_id,
+                'section': section,
+                'content': snapshot.content,
+                'token_count': snapshot.token_count,
+                'item_count': snapshot.item_count,
+                'computed_at': snapshot.computed_at,
+                'build_ms': (time.perf_counter() - started) * 1000,
+            })
+
+        await self.db.execute(text(UPSERT_SNAPSHOT_SQL), rows)
+        if commit:
+            await self.db.commit()
+        self.cache.invalidate(workspace_id)
+        return rebuilt
+
+    async def refresh_due(self, limit: int = 200) -> Dict[str, int]:
+        """
+        Rebuild missing, stale (debounced) and expired sections
+
+        Returns:
+            Stats with workspaces and sections refreshed
+        """
+        now = datetime.now(timezone.utc)
+        result = await self.db.execute(text(DUE_SNAPSHOTS_SQL), {
+            'sections': list(SECTIONS),
+            'debounce_before': now - STALE_DEBOUNCE,
+            'expired_before': now - MAX_AGE,
+            'limit': limit,
+        })
+
+        due: Dict[UUID, List[str]] = {}
+        for row in result:
+            due.setdefault(row.workspace_id, []).append(row.section)
+
+        refreshed = 0
+        for workspace_id, sections in due.items():
+            try:
+                await self.refresh_workspace(workspace_id, sections)
+                refreshed += len(sections)
+            except Exception as e:
+                await self.db.rollback()
+                logger.error(f"Error refreshing chat context for workspace {workspace_id}: {e}")
+
+        return {'workspaces': len(due), 'sections': refreshed}
+
+    async def get_sections(self, workspace_id: UUID) -> Dict[str, SectionSnapshot]:
+        """
+        Stored sections for a workspace, from the process cache when fresh
+
+        Sections never computed for this workspace are built inline once.
+        """
+        cached = self.cache.get(workspace_id)
+        if cached is not None:
+            return cached
+
+        result = await self.db.execute(text(LOAD_SNAPSHOTS_SQL), {'workspace_id': workspace_id})
+        snapshots = {
+            row.section: SectionSnapshot(row.section, row.content, row.token_count, row.item_count, row.computed_at)
+            for row in result
+        }
+        missing = [s for s in SECTIONS if s not in snapshots]
+        if missing:
+            snapshots.update(await self.refresh_workspace(workspace_id, missing))
+
+        self.cache.put(workspace_id, snapshots)
+        return snapshots
+
+    async def build_context(self, workspace_id: UUID, context: str = 'all') -> ChatContext:
+        """
+        Assemble the chat system prompt from stored snapshots
+
+        Args:
+            workspace_id: Workspace the chat belongs to
+            context: 'all' or a single section name
+
+        Returns:
+            ChatContext with the prompt and its build time
+        """
+        started = time.perf_counter()
+        snapshots = await self.get_sections(workspace_id)
+        wanted = SECTIONS if context == 'all' else tuple(s for s in SECTIONS if s == context)
+
+        parts = []
+        for section in SECTIONS:
+            snapshot = snapshots.get(section)
+            if section in wanted and snapshot:
+                parts.append(f"{section.upper()} (as of {_fmt_time(snapshot.computed_at)}):\n{snapshot.content}")
+            else:
+                parts.append(f"{section.upper()}:\nNot available in current context")
+
+        prompt = (
+            "You are an AI assistant for MediaPoster, a social media management platform.\n"
+            "You have access to the following user data:\n\n"
+            + '\n\n'.join(parts)
+            + "\n\nUse this data to provide helpful, specific, and actionable responses.\n"
+            "Always cite which data sources you're using in your response.\n"
+            "Be conversational but professional.\n"
+            "If asked about something outside the available data, acknowledge the limitation."
+        )
+        used = {s: snapshots[s] for s in wanted if s in snapshots}
+        build_ms = (time.perf_counter() - started) * 1000
+        if build_ms > CONTEXT_BUILD_BUDGET_MS:
+            logger.warning(f"Chat context for workspace {workspace_id} took {build_ms:.1f}ms")
+
+        return ChatContext(
+            prompt=prompt,
+            sections=used,
+            token_count=sum(s.token_count for s in used.values()),
+            build_ms=build_ms,
+        )
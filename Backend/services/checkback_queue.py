@@ -0,0 +1,680 @@
+"""
+Adaptive Check-back Queue
+Schedules metric check-backs for social_media_posts from each post's recent
+engagement velocity and age, instead of fixed 1h/6h/24h/... offsets.
+
+The queue lives in the database: social_media_posts.next_check_at is the
+priority key, and due posts are claimed per provider with FOR UPDATE SKIP
+LOCKED under a per-provider advisory lock, so any number of worker processes
+can drain it without double-checking a post or overspending the provider's
+API budget (see services.api_rate_limiter.paced_allowance).
+"""
+import asyncio
+import json
+import logging
+import math
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from services.api_rate_limiter import monthly_limit, paced_allowance
+
+logger = logging.getLogger(__name__)
+
+
+# Interval shaping: a post is checked roughly every quarter of its age,
+# sooner while its views are growing fast and later once they stall
+MIN_INTERVAL_HOURS = 0.25
+MAX_INTERVAL_HOURS = 72.0
+AGE_FRACTION = 0.25
+TRACKING_WINDOW_HOURS = 720  # 30 days, the end of the old fixed schedule
+TARGET_GROWTH_RATE = 0.02    # views growing 2% per hour is "normal"
+MIN_VELOCITY_FACTOR = 0.25
+MAX_VELOCITY_FACTOR = 4.0
+
+# Failed checks back off exponentially; after MAX_CHECK_FAILURES in a row the
+# post is marked dead (deleted, private) and leaves the queue
+RETRY_BASE_MINUTES = 30
+MAX_RETRY_DELAY_HOURS = 24
+MAX_CHECK_FAILURES = 6
+
+
+@dataclass
+class CheckbackProvider:
+    """Metrics provider for one platform"""
+    api_name: str          # Budget key in api_call_logs / API_BUDGETS
+    batch_size: int = 1    # Posts covered by one API request
+    concurrency: int = 4   # Requests in flight per worker
+
+
+PROVIDERS: Dict[str, CheckbackProvider] = {
+    'tiktok': CheckbackProvider('tiktok_scraper', concurrency=2),
+    'instagram': CheckbackProvider('instagram_looter'),
+    'youtube': CheckbackProvider('youtube_v31', batch_size=50),
+}
+
+
+@dataclass
+class CheckDecision:
+    """Why a post's next check-back was scheduled when it was"""
+    checked_at: datetime
+    next_check_at: Optional[datetime]
+    age_hours: float
+    views: int
+    velocity: float          # Views gained per hour since the previous check
+    growth_rate: float       # velocity / views
+    base_interval_hours: float
+    velocity_factor: float
+    interval_hours: Optional[float]
+    reason: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['checked_at'] = self.checked_at.isoformat()
+        data['next_check_at'] = self.next_check_at.isoformat() if self.next_check_at else None
+        return data
+
+
+def plan_next_check(
+    posted_at: Optional[datetime],
+    checked_at: datetime,
+    views: int,
+    prev_views: Optional[int] = None,
+    prev_checked_at: Optional[datetime] = None
+) -> CheckDecision:
+    """
+    Compute a post's next check-back from its age and view velocity
+
+    Args:
+        posted_at: When the post went live (falls back to checked_at)
+        checked_at: Time of the check just made
+        views: View count at this check
+        prev_views: View count at the previous check, if any
+        prev_checked_at: Time of the previous check, if any
+
+    Returns:
+        CheckDecision; next_check_at is None once the tracking window ends
+    """
+    posted_at = posted_at or checked_at
+    age_hours = max((checked_at - posted_at).total_seconds() / 3600, 0.0)
+
+    # Velocity since the last check, or the lifetime average on the first one
+    if prev_views is not None and prev_checked_at and checked_at > prev_checked_at:
+        span_hours = (checked_at - prev_checked_at).total_seconds() / 3600
+        velocity = max(views - prev_views, 0) / span_hours
+    else:
+        velocity = views / max(age_hours, 1.0)
+    growth_rate = velocity / max(views, 1)
+
+    base = min(max(age_hours * AGE_FRACTION, MIN_INTERVAL_HOURS), MAX_INTERVAL_HOURS)
+    if growth_rate > 0:
+        factor = min(max(TARGET_GROWTH_RATE / growth_rate, MIN_VELOCITY_FACTOR), MAX_VELOCITY_FACTOR)
+    else:
+        factor = MAX_VELOCITY_FACTOR
+
+    decision = CheckDecision(
+        checked_at=checked_at,
+        next_check_at=None,
+        age_hours=round(age_hours, 2),
+        views=views,
+        velocity=round(velocity, 2),
+        growth_rate=round(growth_rate, 4),
+        base_interval_hours=round(base, 2),
+        velocity_factor=round(factor, 2),
+        interval_hours=None,
+        reason='',
+    )
+
+    if age_hours >= TRACKING_WINDOW_HOURS:
+        decision.reason = f"tracking window of {TRACKING_WINDOW_HOURS}h ended"
+        return decision
+
+    interval = min(max(base * factor, MIN_INTERVAL_HOURS), MAX_INTERVAL_HOURS)
+    # Always take a final reading at the end of the window
+    interval = min(interval, max(TRACKING_WINDOW_HOURS - age_hours, MIN_INTERVAL_HOURS))
+
+    decision.interval_hours = round(interval, 2)
+    decision.next_check_at = checked_at + timedelta(hours=interval)
+    if factor < 1:
+        decision.reason = f"views growing {growth_rate:.1%}/h, checking {1 / factor:.1f}x sooner than age alone"
+    elif factor > 1:
+        decision.reason = f"views growing {growth_rate:.1%}/h, checking {factor:.1f}x later than age alone"
+    else:
+        decision.reason = "steady growth, interval follows age"
+    return decision
+
+
+def plan_retry(
+    posted_at: Optional[datetime],
+    now: datetime,
+    failures: int
+) -> Dict[str, Any]:
+    """
+    Schedule the retry of a failed check-back
+
+    Args:
+        posted_at: When the post went live
+        now: Time of the failed check
+        failures: Consecutive failures including this one
+
+    Returns:
+        Decision dict; next_check_at is None once the post is dead or its
+        tracking window has ended
+    """
+    decision: Dict[str, Any] = {'checked_at': now.isoformat(), 'next_check_at': None, 'failures': failures}
+    if failures >= MAX_CHECK_FAILURES:
+        decision['reason'] = f"dead after {failures} failed checks in a row"
+        return decision
+    if posted_at and now - posted_at >= timedelta(hours=TRACKING_WINDOW_HOURS):
+        decision['reason'] = f"fetch failed after the {TRACKING_WINDOW_HOURS}h tracking window ended"
+        return decision
+
+    delay = min(RETRY_BASE_MINUTES * 2 ** (failures - 1), MAX_RETRY_DELAY_HOURS * 60)
+    decision['next_check_at'] = (now + timedelta(minutes=delay)).isoformat()
+    decision['reason'] = f"fetch failed ({failures}/{MAX_CHECK_FAILURES}), retrying in {delay}m"
+    return decision
+
+
+# ============================================================================
+# SQL
+# ============================================================================
+
+# Posts ingested by any path (scrapers, tracker, publishing) join the queue
+# with their first check an hour after posting
+ENQUEUE_NEW_POSTS_SQL = """
+UPDATE social_media_posts
+SET next_check_at = GREATEST(COALESCE(posted_at, :now) + INTERVAL '1 hour', :now),
+    tracking_started_at = COALESCE(tracking_started_at, :now),
+    tracking_complete = FALSE
+WHERE next_check_at IS NULL
+  AND last_checked_at IS NULL
+  AND COALESCE(tracking_complete, FALSE) = FALSE
+  AND platform = ANY(:platforms)
+  AND posted_at >= :window_start
+"""
+
+# Serializes budget reads and claims per provider across worker processes
+PROVIDER_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext(:lock_key))"
+
+PROVIDER_USAGE_SQL = """
+SELECT
+    (SELECT COUNT(*) FROM api_call_logs
+     WHERE api_name = :api_name AND timestamp >= :month_start
+       AND cache_hit = FALSE) AS used,
+    (SELECT COUNT(*) FROM social_media_posts
+     WHERE platform = :platform AND check_claimed_until > :now) AS in_flight
+"""
+
+CLAIM_DUE_CHECKS_SQL = """
+UPDATE social_media_posts p
+SET check_claimed_until = :lease_until
+WHERE p.id IN (
+    SELECT id FROM social_media_posts
+    WHERE platform = :platform
+      AND tracking_complete = FALSE
+      AND next_check_at <= :now
+      AND (check_claimed_until IS NULL OR check_claimed_until < :now)
+    ORDER BY next_check_at ASC
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING p.id, p.platform, p.external_post_id, p.posted_at, p.next_check_at,
+          p.last_checked_at, p.last_check_views, p.check_failures, p.check_claimed_until
+"""
+
+INSERT_SNAPSHOT_SQL = """
+INSERT INTO social_media_post_analytics
+    (post_id, snapshot_date, snapshot_hour, likes_count, comments_count,
+     views_count, shares_count, saves_count)
+VALUES (:post_id, :snapshot_date, :snapshot_hour, :likes, :comments, :views, :shares, :saves)
+ON CONFLICT (post_id, snapshot_date, snapshot_hour) DO UPDATE SET
+    likes_count = EXCLUDED.likes_count,
+    comments_count = EXCLUDED.comments_count,
+    views_count = EXCLUDED.views_count,
+    shares_count = EXCLUDED.shares_count,
+    saves_count = EXCLUDED.saves_count
+"""
+
+# Completion only lands while the worker still holds the lease it claimed
+# with; once the lease expired and another worker re-claimed the post, the
+# stale worker's results are dropped
+RESCHEDULE_SQL = """
+UPDATE social_media_posts p
+SET next_check_at = u.next_check_at,
+    tracking_complete = u.next_check_at IS NULL,
+    checks_completed = COALESCE(p.checks_completed, 0) + 1,
+    last_checked_at = u.checked_at,
+    last_check_views = u.views,
+    check_velocity = u.velocity,
+    check_decision = CAST(u.decision AS jsonb),
+    check_failures = 0,
+    check_claimed_until = NULL
+FROM unnest(
+    CAST(:post_ids AS integer[]),
+    CAST(:leases AS timestamp[]),
+    CAST(:next_checks AS timestamp[]),
+    CAST(:checked_ats AS timestamp[]),
+    CAST(:views AS bigint[]),
+    CAST(:velocities AS double precision[]),
+    CAST(:decisions AS text[])
+) AS u(post_id, lease_until, next_check_at, checked_at, views, velocity, decision)
+WHERE p.id = u.post_id AND p.check_claimed_until = u.lease_until
+RETURNING p.id
+"""
+
+RETRY_SQL = """
+UPDATE social_media_posts p
+SET next_check_at = u.next_check_at,
+    tracking_complete = u.next_check_at IS NULL,
+    check_failures = u.failures,
+    check_claimed_until = NULL,
+    check_decision = CAST(u.decision AS jsonb)
+FROM unnest(
+    CAST(:post_ids AS integer[]),
+    CAST(:leases AS timestamp[]),
+    CAST(:next_checks AS timestamp[]),
+    CAST(:failures AS integer[]),
+    CAST(:decisions AS text[])
+) AS u(post_id, lease_until, next_check_at, failures, decision)
+WHERE p.id = u.post_id AND p.check_claimed_until = u.lease_until
+"""
+
+# Every request is logged, failed or not: failures spend provider quota too
+LOG_CALL_SQL = """
+INSERT INTO api_call_logs (api_name, endpoint, timestamp, cost, success, cache_hit, response_time_ms)
+VALUES (:api_name, 'checkback', :timestamp, 1.0, :success, FALSE, :response_time_ms)
+"""
+
+EXPLAIN_SQL = """
+SELECT id, platform, external_post_id, posted_at, next_check_at, tracking_complete,
+       checks_completed, last_checked_at, last_check_views, check_velocity,
+       check_decision, check_claimed_until, check_failures
+FROM social_media_posts
+WHERE id = :post_id
+"""
+
+UPCOMING_SQL = """
+SELECT id, platform, external_post_id, next_check_at, check_velocity, check_decision
+FROM social_media_posts
+WHERE tracking_complete = FALSE AND next_check_at IS NOT NULL
+  AND (CAST(:platform AS varchar) IS NULL OR platform = :platform)
+ORDER BY next_check_at ASC
+LIMIT :limit
+"""
+
+
+# ============================================================================
+# FETCHING
+# ============================================================================
+
+FetchFn = Callable[[str, List[Dict[str, Any]]], Awaitable[Dict[int, Dict[str, int]]]]
+
+
+async def fetch_post_metrics(platform: str, posts: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
+    """
+    Fetch current metrics for claimed posts of one platform
+
+    Args:
+        platform: Platform name
+        posts: Claimed rows (id, external_post_id, ...)
+
+    Returns:
+        Map of post id to metrics; posts that could not be fetched are absent,
+        posts that really have no engagement yet map to zeros
+    """
+    from services.realtime_metrics import RealTimeMetricsService
+
+    service = RealTimeMetricsService()
+    provider = PROVIDERS[platform]
+    semaphore = asyncio.Semaphore(provider.concurrency)
+    by_external = {post['external_post_id']: post['id'] for post in posts}
+
+    async def fetch_batch(batch: List[Dict[str, Any]]) -> List[Any]:
+        async with semaphore:
+            if platform == 'youtube':
+                return await service.get_youtube_videos([p['external_post_id'] for p in batch])
+            if platform == 'tiktok':
+                return [await service.get_tiktok_post(batch[0]['external_post_id'], use_cache=False)]
+            return [await service.get_instagram_post(batch[0]['external_post_id'], use_cache=False)]
+
+    try:
+        size = provider.batch_size
+        batches = [posts[i:i + size] for i in range(0, len(posts), size)]
+        fetched = await asyncio.gather(*(fetch_batch(b) for b in batches))
+    finally:
+        await service.close()
+
+    results = {}
+    for metrics in (m for batch in fetched for m in batch):
+        if not metrics.fetched:
+            continue
+        post_id = by_external.get(metrics.post_id)
+        if post_id is not None:
+            results[post_id] = {
+                'views': metrics.views,
+                'likes': metrics.likes,
+                'comments': metrics.comments,
+                'shares': metrics.shares,
+                'saves': metrics.saves,
+            }
+    return results
+
+
+# ============================================================================
+# QUEUE
+# ============================================================================
+
+class CheckbackQueue:
+    """
+    Database-backed priority queue of post check-backs
+
+    Each run enqueues newly ingested posts, then for every provider claims as
+    many due posts as its paced budget allows, fetches them in batches, stores
+    snapshots and schedules each post's next check from its velocity.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        fetch_fn: Optional[FetchFn] = None,
+        providers: Optional[Dict[str, CheckbackProvider]] = None,
+        max_claim: int = 500,
+        lease_minutes: int = 15
+    ):
+        """
+        Initialize queue
+
+        Args:
+            session_factory: async_sessionmaker (or compatible) for DB sessions
+            fetch_fn: Override for fetching metrics (tests/benchmarks)
+            providers: Platform -> provider config (default: PROVIDERS)
+            max_claim: Posts claimed per provider per run
+            lease_minutes: How long a claim holds before another worker may retry it
+        """
+        self.session_factory = session_factory
+        self.fetch_fn = fetch_fn or fetch_post_metrics
+        self.providers = providers or PROVIDERS
+        self.max_claim = max_claim
+        self.lease = timedelta(minutes=lease_minutes)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """
+        Run one scheduling pass over every provider
+
+        Returns:
+            Stats with enqueued count and per-provider claimed/checked/failed
+        """
+        enqueued = await self.enqueue_new_posts()
+        platforms = list(self.providers)
+        outcomes = await asyncio.gather(
+            *(self.run_provider(platform) for platform in platforms),
+            return_exceptions=True
+        )
+
+        stats: Dict[str, Any] = {'enqueued': enqueued, 'checked': 0, 'providers': {}}
+        for platform, outcome in zip(platforms, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Check-back run failed for {platform}: {outcome}")
+                outcome = {'error': str(outcome)}
+            stats['providers'][platform] = outcome
+            stats['checked'] += outcome.get('checked', 0)
+        return stats
+
+    async def enqueue_new_posts(self, now: Optional[datetime] = None) -> int:
+        """Give recently posted, never-checked posts their first check-back"""
+        now = now or datetime.now()
+        async with self.session_factory() as db:
+            result = await db.execute(text(ENQUEUE_NEW_POSTS_SQL), {
+                'now': now,
+                'platforms': list(self.providers),
+                'window_start': now - timedelta(hours=TRACKING_WINDOW_HOURS),
+            })
+            await db.commit()
+            return result.rowcount or 0
+
+    async def run_provider(self, platform: str) -> Dict[str, Any]:
+        """Claim, fetch and reschedule one provider's due posts"""
+        claimed, budget = await self.claim(platform)
+        if not claimed:
+            return {'claimed': 0, 'checked': 0, 'failed': 0, 'budget': budget}
+
+        started = time.perf_counter()
+        try:
+            results = await self.fetch_fn(platform, claimed)
+        except Exception as e:
+            logger.error(f"Fetching {len(claimed)} {platform} check-backs failed: {e}")
+            results = {}
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        stored = await self.complete(platform, claimed, results, elapsed_ms)
+        return {
+            'claimed': len(claimed),
+            'checked': stored,
+            'failed': len(claimed) - len(results),
+            'budget': budget,
+        }
+
+    async def claim(self, platform: str, now: Optional[datetime] = None) -> tuple:
+        """
+        Claim due posts for one provider within its budget
+
+        Returns:
+            (claimed rows, budget snapshot)
+        """
+        now = now or datetime.now()
+        provider = self.providers[platform]
+        async with self.session_factory() as db:
+            await db.execute(text(PROVIDER_LOCK_SQL), {'lock_key': f"checkback:{provider.api_name}"})
+            budget = await provider_budget(db, platform, now, self.providers)
+
+            limit = min(self.max_claim, budget['available_calls'] * provider.batch_size)
+            if limit <= 0:
+                await db.commit()
+                return [], budget
+
+            result = await db.execute(text(CLAIM_DUE_CHECKS_SQL), {
+                'platform': platform,
+                'now': now,
+                'lease_until': now + self.lease,
+                'limit': limit,
+            })
+            claimed = [dict(row._mapping) for row in result]
+            await db.commit()
+
+        logger.info(f"Claimed {len(claimed)} {platform} check-backs ({budget['available_calls']} calls available)")
+        return claimed, budget
+
+    async def complete(
+        self,
+        platform: str,
+        claimed: List[Dict[str, Any]],
+        results: Dict[int, Dict[str, int]],
+        elapsed_ms: float = 0.0,
+        now: Optional[datetime] = None
+    ) -> int:
+        """
+        Store snapshots, reschedule checked posts and back off failed ones
+
+        Writes only apply to posts whose claim (check_claimed_until) is still
+        the one this worker took; posts re-claimed after the lease expired
+        are left to their new holder.
+
+        Returns:
+            Number of checked posts whose results were stored
+        """
+        now = now or datetime.now()
+        provider = self.providers[platform]
+        checked = [post for post in claimed if post['id'] in results]
+        failed = [post for post in claimed if post['id'] not in results]
+
+        decisions = [
+            plan_next_check(
+                post['posted_at'], now, results[post['id']]['views'],
+                post.get('last_check_views'), post.get('last_checked_at')
+            )
+            for post in checked
+        ]
+
+        retries = [
+            plan_retry(post['posted_at'], now, (post.get('check_failures') or 0) + 1)
+            for post in failed
+        ]
+
+        requests = max(1, math.ceil(len(claimed) / provider.batch_size))
+        stored = []
+        async with self.session_factory() as db:
+            if checked:
+                result = await db.execute(text(RESCHEDULE_SQL), {
+                    'post_ids': [post['id'] for post in checked],
+                    'leases': [post['check_claimed_until'] for post in checked],
+                    'next_checks': [d.next_check_at for d in decisions],
+                    'checked_ats': [now] * len(checked),
+                    'views': [d.views for d in decisions],
+                    'velocities': [d.velocity for d in decisions],
+                    'decisions': [json.dumps(d.to_dict()) for d in decisions],
+                })
+                stored = [row[0] for row in result]
+                if len(stored) < len(checked):
+                    logger.warning(
+                        f"Dropped {len(checked) - len(stored)} {platform} check-backs whose lease expired"
+                    )
+            if stored:
+                await db.execute(text(INSERT_SNAPSHOT_SQL), [
+                    {
+                        'post_id': post_id,
+                        'snapshot_date': now.date(),
+                        'snapshot_hour': now.hour,
+                        **{k: results[post_id].get(k, 0) for k in ('likes', 'comments', 'views', 'shares', 'saves')},
+                    }
+                    for post_id in stored
+                ])
+            if failed:
+                await db.execute(text(RETRY_SQL), {
+                    'post_ids': [post['id'] for post in failed],
+                    'leases': [post['check_claimed_until'] for post in failed],
+                    'next_checks': [
+                        datetime.fromisoformat(r['next_check_at']) if r['next_check_at'] else None for r in retries
+                    ],
+                    'failures': [r['failures'] for r in retries],
+                    'decisions': [json.dumps(r) for r in retries],
+                })
+            await db.execute(text(LOG_CALL_SQL), [
+                {
+                    'api_name': provider.api_name,
+                    'timestamp': now,
+                    'success': bool(checked),
+                    'response_time_ms': elapsed_ms / requests,
+                }
+                for _ in range(requests)
+            ])
+            await db.commit()
+        return len(stored)
+
+
+async def provider_budget(
+    db,
+    platform: str,
+    now: Optional[datetime] = None,
+    providers: Optional[Dict[str, CheckbackProvider]] = None
+) -> Dict[str, Any]:
+    """
+    Calls available to a provider now, net of claims still in flight
+
+    Args:
+        db: Async session
+        platform: Platform name
+        now: Current time
+        providers: Platform -> provider config (default: PROVIDERS)
+
+    Returns:
+        Budget snapshot with used, in-flight and available calls
+    """
+    now = now or datetime.now()
+    provider = (providers or PROVIDERS)[platform]
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    row = (await db.execute(text(PROVIDER_USAGE_SQL), {
+        'api_name': provider.api_name,
+        'platform': platform,
+        'month_start': month_start,
+        'now': now,
+    })).first()
+    used, in_flight = (row.used or 0, row.in_flight or 0) if row else (0, 0)
+    reserved = math.ceil(in_flight / provider.batch_size)
+
+    return {
+        'api_name': provider.api_name,
+        'monthly_limit': monthly_limit(provider.api_name),
+        'used': used,
+        'in_flight_posts': in_flight,
+        'available_calls': paced_allowance(provider.api_name, used + reserved, now),
+    }
+
+
+async def upcoming_checkbacks(db, platform: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """Next check-backs in queue order, with the reason for each"""
+    result = await db.execute(text(UPCOMING_SQL), {'platform': platform, 'limit': limit})
+    upcoming = []
+    for row in result:
+        decision = json.loads(row.check_decision) if isinstance(row.check_decision, str) else row.check_decision
+        upcoming.append({
+            'post_id': row.id,
+            'platform': row.platform,
+            'external_post_id': row.external_post_id,
+            'next_check_at': row.next_check_at.isoformat(),
+            'velocity': row.check_velocity,
+            'reason': (decision or {}).get('reason', 'first check an hour after posting'),
+        })
+    return upcoming
+
+
+async def explain_checkback(db, post_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Describe a post's check-back state and the decision behind its next check
+
+    Returns:
+        Explanation dict, or None if the post does not exist
+    """
+    row = (await db.execute(text(EXPLAIN_SQL), {'post_id': post_id})).first()
+    if not row:
+        return None
+
+    now = datetime.now()
+    decision = row.check_decision
+    if isinstance(decision, str):
+        decision = json.loads(decision)
+
+    if row.tracking_complete and (row.check_failures or 0) >= MAX_CHECK_FAILURES:
+        status = 'dead'
+    elif row.tracking_complete:
+        status = 'complete'
+    elif row.check_claimed_until and row.check_claimed_until > now:
+        status = 'checking'
+    elif row.next_check_at is None:
+        status = 'not_tracked'
+    elif row.next_check_at <= now:
+        status = 'due'
+    else:
+        status = 'scheduled'
+
+    explanation = {
+        'post_id': row.id,
+        'platform': row.platform,
+        'external_post_id': row.external_post_id,
+        'status': status,
+        'next_check_at': row.next_check_at.isoformat() if row.next_check_at else None,
+        'last_checked_at': row.last_checked_at.isoformat() if row.last_checked_at else None,
+        'checks_completed': row.checks_completed or 0,
+        'consecutive_failures': row.check_failures or 0,
+        'views_at_last_check': row.last_check_views,
+        'velocity': row.check_velocity,
+        'decision': decision,
+        'budget': None,
+    }
+    if row.platform in PROVIDERS:
+        explanation['budget'] = await provider_budget(db, row.platform, now)
+        if status == 'due' and explanation['budget']['available_calls'] == 0:
+            explanation['status'] = 'waiting_for_budget'
+    return explanation
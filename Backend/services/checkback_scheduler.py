@@ -4,7 +4,7 @@ Handles automated checkback metrics collection and comment analysis
 """
 import logging
 from datetime import datetime, timedelta
-from typing import List, Callable, Dict, Any
+from typing import List, Callable, Dict, Any, Optional
 from dataclasses import dataclass
 import uuid
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -29,7 +29,11 @@ class CheckbackScheduler:
     Schedules and manages automated checkback jobs
     
     Uses APScheduler for background job management
-    In production, consider using Celery for distributed task processing
+    
+    These are the fixed-hour (1/6/24/72/168h) PlatformPost checkbacks that
+    north-star and pattern metrics compare across posts. Tracking of
+    social_media_posts runs through the shared, velocity-driven queue in
+    services.checkback_queue instead.
     """
     
     def __init__(self):
@@ -0,0 +1,209 @@
+"""
+Clip Cache
+Durable per-scene state for long video jobs.
+
+Each scene is keyed by a hash of what determines its output (prompt,
+provider, duration, input image, resolution). Finished clips are kept on
+disk under that key, so a retried job - or any later job with an identical
+scene - reuses them instead of paying the provider again. While a scene is
+generating, the provider's job id is recorded, so a retry after a crash
+re-awaits that job rather than starting a new one.
+
+The cache is bounded: after each store, clips unused for MAX_AGE_DAYS and
+then the least recently used ones beyond MAX_BYTES are deleted, file and
+row together. Clips used within RETAIN_SECONDS are never evicted, so a job
+still stitching its scenes keeps them even if that overshoots the budget.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from loguru import logger
+
+CLIP_CACHE_DIR = Path(os.getenv("CLIP_CACHE_DIR", "data/clip_cache"))
+MAX_BYTES = int(os.getenv("CLIP_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))
+MAX_AGE_DAYS = float(os.getenv("CLIP_CACHE_MAX_AGE_DAYS", "30"))
+RETAIN_SECONDS = 6 * 3600          # Longer than any single long-video job
+
+GENERATING = "generating"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+def _image_fingerprint(input_image: Optional[str]) -> Optional[str]:
+    """Local images are identified by content, URLs by value"""
+    if input_image and os.path.isfile(input_image):
+        digest = hashlib.sha256()
+        with open(input_image, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return f"sha256:{digest.hexdigest()}"
+    return input_image
+
+
+def scene_key(scene, width: int, height: int) -> str:
+    """Hash of everything that determines a scene's clip"""
+    spec = {
+        'prompt': scene.prompt,
+        'provider': scene.provider,
+        'duration': scene.duration_seconds,
+        'input_image': _image_fingerprint(scene.input_image),
+        'size': [width, height],
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:40]
+
+
+class ClipCache:
+    """Clip files plus a SQLite table of per-scene state"""
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+        max_age_days: Optional[float] = None,
+    ):
+        self.root = Path(root or CLIP_CACHE_DIR)
+        self.max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+        self.max_age_days = MAX_AGE_DAYS if max_age_days is None else max_age_days
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Opened on first use, so constructing a cache touches no disk"""
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.root / "scenes.sqlite3"), isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS scene_clips (
+                    scene_key TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    provider TEXT,
+                    provider_job_id TEXT,
+                    clip_path TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at REAL NOT NULL,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    last_used_at REAL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_scene_clips_lru ON scene_clips (last_used_at) WHERE state = 'completed'"
+            )
+        return self._conn
+
+    def _row(self, key: str):
+        return self.conn.execute(
+            "SELECT state, provider, provider_job_id, clip_path, attempts, error FROM scene_clips WHERE scene_key = ?",
+            (key,),
+        ).fetchone()
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the finished clip for this scene, if cached"""
+        row = self._row(key)
+        if row and row[0] == COMPLETED and row[3] and os.path.exists(row[3]):
+            self.conn.execute("UPDATE scene_clips SET last_used_at = ? WHERE scene_key = ?", (time.time(), key))
+            return row[3]
+        return None
+
+    def in_flight(self, key: str) -> Optional[Tuple[str, str]]:
+        """(provider, provider_job_id) of a generation that was started but not finished"""
+        row = self._row(key)
+        if row and row[0] == GENERATING and row[2]:
+            return row[1], row[2]
+        return None
+
+    def state(self, key: str) -> Optional[dict]:
+        row = self._row(key)
+        if row is None:
+            return None
+        return dict(zip(('state', 'provider', 'provider_job_id', 'clip_path', 'attempts', 'error'), row))
+
+    def mark_generating(self, key: str, provider: str, provider_job_id: str) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO scene_clips (scene_key, state, provider, provider_job_id, attempts, updated_at)
+            VALUES (?, ?, ?, ?, 1, ?)
+            ON CONFLICT (scene_key) DO UPDATE SET
+                state = excluded.state, provider = excluded.provider,
+                provider_job_id = excluded.provider_job_id, error = NULL,
+                attempts = scene_clips.attempts + 1, updated_at = excluded.updated_at
+            """,
+            (key, GENERATING, provider, provider_job_id, time.time()),
+        )
+
+    def mark_failed(self, key: str, provider: str, error: str) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO scene_clips (scene_key, state, provider, error, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (scene_key) DO UPDATE SET
+                state = excluded.state, provider = excluded.provider, provider_job_id = NULL,
+                error = excluded.error, updated_at = excluded.updated_at
+            """,
+            (key, FAILED, provider, error[:1000], time.time()),
+        )
+
+    def store(self, key: str, provider: str, clip_path: str) -> str:
+        """Move a finished clip into the cache; returns its cached path"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        cached = self.root / f"{key}{Path(clip_path).suffix or '.mp4'}"
+        shutil.move(clip_path, cached)
+        now = time.time()
+        self.conn.execute(
+            """
+            INSERT INTO scene_clips (scene_key, state, provider, clip_path, updated_at, size_bytes, last_used_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (scene_key) DO UPDATE SET
+                state = excluded.state, provider = excluded.provider, provider_job_id = NULL,
+                clip_path = excluded.clip_path, error = NULL, updated_at = excluded.updated_at,
+                size_bytes = excluded.size_bytes, last_used_at = excluded.last_used_at
+            """,
+            (key, COMPLETED, provider, str(cached), now, cached.stat().st_size, now),
+        )
+        logger.info(f"Cached clip {cached.name} from {provider}")
+        self.evict(now)
+        return str(cached)
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """
+        Delete expired clips, then least recently used ones over max_bytes
+
+        Returns:
+            Number of clips evicted
+        """
+        now = now or time.time()
+        rows = self.conn.execute(
+            """
+            SELECT scene_key, clip_path, size_bytes, COALESCE(last_used_at, updated_at)
+            FROM scene_clips WHERE state = ?
+            ORDER BY COALESCE(last_used_at, updated_at) ASC
+            """,
+            (COMPLETED,),
+        ).fetchall()
+        total = sum(row[2] for row in rows)
+        expire_before = now - self.max_age_days * 86400
+        evicted = 0
+        for key, clip_path, size, last_used in rows:
+            if last_used >= now - RETAIN_SECONDS:
+                break
+            if last_used >= expire_before and total <= self.max_bytes:
+                break
+            if clip_path:
+                Path(clip_path).unlink(missing_ok=True)
+            self.conn.execute("DELETE FROM scene_clips WHERE scene_key = ? AND state = ?", (key, COMPLETED))
+            total -= size
+            evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} cached clips ({total / 1024 ** 2:.0f} MB kept)")
+        return evicted
+
+    def owns(self, path: str) -> bool:
+        """Whether a path is a cached clip (callers must not delete those)"""
+        return Path(path).resolve().parent == self.root.resolve()
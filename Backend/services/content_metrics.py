@@ -6,18 +6,22 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from uuid import UUID
 from loguru import logger
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import ContentVariant, ContentMetric, ContentRollup
-from connectors import registry
+from services.metrics_poller import MetricsPoller
+
+# Rows per multi-row INSERT when storing polled snapshots
+METRICS_INSERT_CHUNK = 1000
 
 
 class ContentMetricsService:
     """Service for aggregating content metrics across platforms"""
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, poller: Optional[MetricsPoller] = None):
         self.db = db
+        self.poller = poller or MetricsPoller()
     
     async def poll_metrics_for_variant(
         self,
@@ -36,52 +40,16 @@ class ContentMetricsService:
             logger.debug(f"Variant {variant.id} not yet published, skipping")
             return None
         
-        # Get adapter for this platform
-        adapters = registry.get_adapters_for_platform(variant.platform)
-        if not adapters:
-            logger.warning(f"No enabled adapter for platform: {variant.platform}")
+        rows = await self.poller.fetch([variant])
+        if not rows:
             return None
         
-        adapter = adapters[0]
+        metric = ContentMetric(**rows[0])
+        self.db.add(metric)
+        await self.db.commit()
         
-        try:
-            # Fetch metrics from platform
-            snapshot = await adapter.fetch_metrics(
-                platform=variant.platform,
-                platform_post_id=variant.platform_post_id
-            )
-            
-            if not snapshot:
-                logger.debug(f"No metrics returned for variant {variant.id}")
-                return None
-            
-            # Create metric record
-            metric = ContentMetric(
-                variant_id=variant.id,
-                snapshot_at=snapshot.snapshot_at or datetime.utcnow(),
-                views=snapshot.views,
-                impressions=snapshot.impressions,
-                reach=snapshot.reach,
-                likes=snapshot.likes,
-                comments=snapshot.comments,
-                shares=snapshot.shares,
-                saves=snapshot.saves,
-                clicks=snapshot.clicks,
-                watch_time_seconds=snapshot.watch_time_seconds,
-                sentiment_score=None,  # Computed separately
-                traffic_type='paid' if variant.is_paid else 'organic',
-                raw_metadata=snapshot.raw_payload
-            )
-            
-            self.db.add(metric)
-            await self.db.commit()
-            
-            logger.info(f"Polled metrics for variant {variant.id}: {metric.views} views, {metric.likes} likes")
-            return metric
-            
-        except Exception as e:
-            logger.error(f"Error polling metrics for variant {variant.id}: {e}")
-            return None
+        logger.info(f"Polled metrics for variant {variant.id}: {metric.views} views, {metric.likes} likes")
+        return metric
     
     async def poll_metrics_for_content(
         self,
@@ -107,48 +75,54 @@ class ContentMetricsService:
         
         logger.info(f"Polling metrics for {len(variants)} variants of content {content_id}")
         
+        rows = await self.poller.fetch(variants)
         metrics = []
-        for variant in variants:
-            metric = await self.poll_metrics_for_variant(variant)
-            if metric:
-                metrics.append(metric)
+        if rows:
+            result = await self.db.scalars(insert(ContentMetric).returning(ContentMetric), rows)
+            metrics = result.all()
+            await self.db.commit()
         
         # Trigger rollup recomputation
         await self.recompute_rollup(content_id)
         
         return metrics
     
-    async def recompute_rollup(self, content_id: UUID) -> ContentRollup:
+    async def _insert_metrics(self, rows: List[Dict[str, Any]]):
+        """Bulk insert snapshot rows in multi-row INSERT chunks"""
+        for start in range(0, len(rows), METRICS_INSERT_CHUNK):
+            await self.db.execute(insert(ContentMetric), rows[start:start + METRICS_INSERT_CHUNK])
+    
+    async def recompute_rollup(self, content_id: UUID, commit: bool = True) -> ContentRollup:
         """
         Recompute aggregated rollup for a content item
         
         Args:
             content_id: Content UUID
+            commit: Commit the rollup (batch callers commit once at the end)
             
         Returns:
             Updated ContentRollup
         """
-        # Get latest metrics for each variant
-        result = await self.db.execute(
-            select(ContentMetric.variant_id, func.max(ContentMetric.snapshot_at))
+        # Latest snapshot time per variant
+        latest = (
+            select(ContentMetric.variant_id, func.max(ContentMetric.snapshot_at).label('snapshot_at'))
             .join(ContentVariant, ContentMetric.variant_id == ContentVariant.id)
             .where(ContentVariant.content_id == content_id)
             .group_by(ContentMetric.variant_id)
+            .subquery()
         )
-        latest_by_variant = {row[0]: row[1] for row in result.fetchall()}
-        
-        # Get those latest metrics
-        latest_metrics = []
-        for variant_id, snapshot_at in latest_by_variant.items():
-            result = await self.db.execute(
-                select(ContentMetric).where(
-                    ContentMetric.variant_id == variant_id,
-                    ContentMetric.snapshot_at == snapshot_at
-                )
-            )
-            metric = result.scalar_one_or_none()
-            if metric:
-                latest_metrics.append(metric)
+        
+        # Those snapshots with their variant's platform
+        result = await self.db.execute(
+            select(ContentMetric, ContentVariant.platform)
+            .join(latest, and_(
+                ContentMetric.variant_id == latest.c.variant_id,
+                ContentMetric.snapshot_at == latest.c.snapshot_at
+            ))
+            .join(ContentVariant, ContentMetric.variant_id == ContentVariant.id)
+        )
+        latest_rows = result.all()
+        latest_metrics = [row[0] for row in latest_rows]
         
         if not latest_metrics:
             logger.debug(f"No metrics to aggregate for content {content_id}")
@@ -169,12 +143,8 @@ class ContentMetricsService:
         
         # Find best performing platform
         platform_views = {}
-        for metric in latest_metrics:
-            result = await self.db.execute(
-                select(ContentVariant).where(ContentVariant.id == metric.variant_id)
-            )
-            variant = result.scalar_one()
-            platform_views[variant.platform] = platform_views.get(variant.platform, 0) + (metric.views or 0)
+        for metric, platform in latest_rows:
+            platform_views[platform] = platform_views.get(platform, 0) + (metric.views or 0)
         
         best_platform = max(platform_views.items(), key=lambda x: x[1])[0] if platform_views else None
         
@@ -199,7 +169,8 @@ class ContentMetricsService:
         rollup.best_platform = best_platform
         rollup.last_updated_at = datetime.utcnow()
         
-        await self.db.commit()
+        if commit:
+            await self.db.commit()
         
         logger.success(f"Recomputed rollup for content {content_id}: {total_views} total views across {len(latest_metrics)} platforms")
         return rollup
@@ -208,6 +179,9 @@ class ContentMetricsService:
         """
         Poll metrics for all content published in the last N hours
         
+        All published variants of the recent content are polled concurrently,
+        their snapshots bulk inserted, and each touched rollup recomputed once.
+        
         Args:
             hours: Look back window
             
@@ -216,30 +190,46 @@ class ContentMetricsService:
         """
         since = datetime.utcnow() - timedelta(hours=hours)
         
-        # Get recent variants
-        result = await self.db.execute(
+        # Every published variant of content with a recent variant
+        recent_content = (
             select(ContentVariant.content_id)
             .where(ContentVariant.published_at >= since)
             .distinct()
         )
-        content_ids = [row[0] for row in result.fetchall()]
+        result = await self.db.execute(
+            select(ContentVariant).where(
+                ContentVariant.content_id.in_(recent_content),
+                ContentVariant.published_at.isnot(None)
+            )
+        )
+        variants = result.scalars().all()
+        content_ids = {variant.content_id for variant in variants}
         
-        logger.info(f"Polling metrics for {len(content_ids)} recent content items")
+        logger.info(f"Polling metrics for {len(variants)} variants of {len(content_ids)} recent content items")
         
-        metrics_collected = 0
-        rollups_updated = 0
+        rows = await self.poller.fetch(variants)
+        if rows:
+            await self._insert_metrics(rows)
+            await self.db.commit()
+        
+        content_by_variant = {variant.id: variant.content_id for variant in variants}
+        updated_content = {content_by_variant[row['variant_id']] for row in rows}
         
-        for content_id in content_ids:
+        rollups_updated = 0
+        for content_id in updated_content:
             try:
-                metrics = await self.poll_metrics_for_content(content_id)
-                metrics_collected += len(metrics)
-                if metrics:
-                    rollups_updated += 1
+                async with self.db.begin_nested():
+                    if await self.recompute_rollup(content_id, commit=False):
+                        rollups_updated += 1
             except Exception as e:
-                logger.error(f"Error polling content {content_id}: {e}")
+                logger.error(f"Error recomputing rollup for content {content_id}: {e}")
+        await self.db.commit()
         
         return {
             'content_items': len(content_ids),
-            'metrics_collected': metrics_collected,
-            'rollups_updated': rollups_updated
+            'variants_polled': len(variants),
+            'metrics_collected': len(rows),
+            'rollups_updated': rollups_updated,
+            'adapter_requests': self.poller.stats['requests'],
+            'adapter_errors': self.poller.stats['errors']
         }
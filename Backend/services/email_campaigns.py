@@ -0,0 +1,460 @@
+"""
+Email Campaign Fan-out
+Sends one templated email to every member of a segment.
+
+- Members are streamed in person_id order, in keyset windows read through a
+  server-side cursor, so neither the segment nor an open transaction grows
+  with the campaign.
+- Subject and body templates are compiled once per campaign.
+- Sends go through a pool of reused SMTP connections, with a per-domain
+  concurrency cap and spacing so one provider isn't flooded.
+- outbound_messages rows are written in bulk, as 'queued', before a batch
+  is sent, then updated in bulk with the outcome. The campaign row holds the
+  checkpoint (last person_id) and counters.
+
+Resume is at-most-once: a person with any row in the campaign is never
+sent to again. Rows still 'queued' when a run is resumed were interrupted
+mid-send, so their outcome is unknown. They are marked 'interrupted' rather
+than retried.
+"""
+import asyncio
+import json
+import smtplib
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from jinja2 import Template
+from loguru import logger
+from sqlalchemy import text
+
+from services.email_service import build_message
+
+FIRST_PERSON_ID = "00000000-0000-0000-0000-000000000000"
+CAMPAIGN_LEASE_SECONDS = 300
+
+INSERT_CAMPAIGN_SQL = """
+INSERT INTO email_campaigns (id, segment_id, subject, body_template, goal_type, variant, personalization, status)
+VALUES (:id, :segment_id, :subject, :body_template, :goal_type, :variant, :personalization, 'pending')
+"""
+
+CLAIM_CAMPAIGN_SQL = """
+UPDATE email_campaigns
+SET status = 'running', claimed_until = :lease_until, updated_at = CURRENT_TIMESTAMP
+WHERE id = :id
+  AND status <> 'completed'
+  AND (claimed_until IS NULL OR claimed_until < :now)
+RETURNING segment_id, subject, body_template, goal_type, variant, personalization, cursor_person_id
+"""
+
+CAMPAIGN_STATS_SQL = """
+SELECT status, sent, failed, skipped FROM email_campaigns WHERE id = :id
+"""
+
+# Rows left 'queued' by a run that stopped mid-batch
+MARK_INTERRUPTED_SQL = """
+UPDATE outbound_messages
+SET delivery_status = 'interrupted'
+WHERE campaign_id = :campaign_id AND delivery_status = 'queued'
+"""
+
+# One keyset window of members who have no message in this campaign yet
+MEMBERS_WINDOW_SQL = """
+SELECT p.id, p.full_name, p.primary_email, p.company, p.role
+FROM segment_members sm
+JOIN people p ON p.id = sm.person_id
+WHERE sm.segment_id = :segment_id
+  AND sm.person_id > :after
+  AND NOT EXISTS (
+      SELECT 1 FROM outbound_messages om
+      WHERE om.campaign_id = :campaign_id AND om.person_id = sm.person_id
+  )
+ORDER BY sm.person_id
+LIMIT :window
+"""
+
+INSERT_MESSAGES_SQL = """
+INSERT INTO outbound_messages
+    (id, person_id, segment_id, campaign_id, channel, goal_type, variant, subject, body, sent_at, delivery_status)
+VALUES
+    (:id, :person_id, :segment_id, :campaign_id, 'email', :goal_type, :variant, :subject, :body,
+     CURRENT_TIMESTAMP, :delivery_status)
+"""
+
+UPDATE_DELIVERY_SQL = """
+UPDATE outbound_messages SET delivery_status = :delivery_status WHERE id = :id
+"""
+
+CHECKPOINT_SQL = """
+UPDATE email_campaigns
+SET cursor_person_id = :cursor,
+    sent = sent + :sent,
+    failed = failed + :failed,
+    skipped = skipped + :skipped,
+    claimed_until = :lease_until,
+    updated_at = CURRENT_TIMESTAMP
+WHERE id = :id
+"""
+
+FINISH_CAMPAIGN_SQL = """
+UPDATE email_campaigns
+SET status = :status, claimed_until = NULL, updated_at = CURRENT_TIMESTAMP,
+    completed_at = CASE WHEN :status = 'completed' THEN CURRENT_TIMESTAMP ELSE completed_at END
+WHERE id = :id
+"""
+
+# Rejections that leave the SMTP session usable (smtplib resets it)
+RECIPIENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+@dataclass
+class CampaignRecipient:
+    """The person fields available to campaign templates as `person`"""
+    id: str
+    full_name: Optional[str]
+    primary_email: Optional[str]
+    company: Optional[str] = None
+    role: Optional[str] = None
+
+    @property
+    def domain(self) -> str:
+        return (self.primary_email or "").rpartition("@")[2].lower()
+
+
+class SMTPConnectionPool:
+    """
+    Up to `size` SMTP connections, each logged in once and reused for many
+    messages. smtplib blocks, so every call runs in a worker thread.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        size: int = 4,
+        timeout: float = 30,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[smtplib.SMTP] = []
+        self._closed = False
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    async def send(self, message):
+        async with self._slots:
+            server = self._idle.pop() if self._idle else None
+            await asyncio.to_thread(self._send_blocking, server, message)
+
+    def _send_blocking(self, server: Optional[smtplib.SMTP], message):
+        """
+        Runs in a worker thread and owns `server` until it is back in the
+        pool, so a cancelled send() never closes a socket that is still in use.
+        """
+        try:
+            if server is None:
+                server = self._connect()
+            try:
+                server.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # Idle connection timed out on the server side: reconnect once
+                server.close()
+                server = self._connect()
+                server.send_message(message)
+        except RECIPIENT_ERRORS:
+            self._release(server)
+            raise
+        except BaseException:
+            if server is not None:
+                server.close()
+            raise
+        self._release(server)
+
+    def _release(self, server: smtplib.SMTP):
+        if self._closed:
+            server.close()
+        else:
+            self._idle.append(server)
+
+    async def close(self):
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for server in idle:
+            try:
+                await asyncio.to_thread(server.quit)
+            except Exception:
+                server.close()
+
+
+class DomainThrottle:
+    """Caps concurrent sends per recipient domain and spaces them `min_interval` apart"""
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self.clock = clock
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_slot: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, domain: str):
+        semaphore = self._semaphores.setdefault(domain, asyncio.Semaphore(self.max_concurrent))
+        async with semaphore:
+            if self.min_interval:
+                now = self.clock()
+                start = max(now, self._next_slot.get(domain, 0.0))
+                self._next_slot[domain] = start + self.min_interval
+                if start > now:
+                    await asyncio.sleep(start - now)
+            yield
+
+
+class CampaignEngine:
+    """Creates and runs segment campaigns; see module docstring"""
+
+    def __init__(
+        self,
+        sender: Optional[SMTPConnectionPool],
+        from_header: str,
+        session_factory: Optional[Callable] = None,
+        throttle: Optional[DomainThrottle] = None,
+        batch_size: int = 200,
+        window_size: int = 5000,
+        lease_seconds: float = CAMPAIGN_LEASE_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.sender = sender
+        self.from_header = from_header
+        self._session_factory = session_factory
+        self.throttle = throttle or DomainThrottle()
+        self.batch_size = batch_size
+        self.window_size = max(window_size, batch_size)
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+
+    def _session(self):
+        factory = self._session_factory
+        if factory is None:
+            from database import connection
+            factory = connection.async_session_maker
+        if factory is None:
+            raise RuntimeError("Database not initialized")
+        return factory()
+
+    async def _execute(self, sql: str, params) -> list:
+        async with self._session() as session:
+            result = await session.execute(text(sql), params)
+            rows = result.fetchall() if result.returns_rows else []
+            await session.commit()
+            return rows
+
+    async def create(
+        self,
+        segment_id: UUID,
+        subject: str,
+        body_template: str,
+        goal_type: Optional[str] = None,
+        variant: str = "A",
+        personalization: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Record a new campaign; returns its id"""
+        # Fail on template syntax errors before anything is stored
+        Template(subject), Template(body_template)
+        campaign_id = str(uuid4())
+        await self._execute(INSERT_CAMPAIGN_SQL, {
+            'id': campaign_id,
+            'segment_id': str(segment_id),
+            'subject': subject,
+            'body_template': body_template,
+            'goal_type': goal_type,
+            'variant': variant,
+            'personalization': json.dumps(personalization or {}, default=str),
+        })
+        return campaign_id
+
+    async def run(self, campaign_id) -> Dict[str, Any]:
+        """Send (or resume sending) a campaign; returns its cumulative stats"""
+        campaign_id = str(campaign_id)
+        now = self.clock()
+        rows = await self._execute(CLAIM_CAMPAIGN_SQL, {
+            'id': campaign_id, 'now': now, 'lease_until': now + self.lease_seconds,
+        })
+        if not rows:
+            stats = await self.stats(campaign_id)
+            if stats.get('status') == 'completed':
+                return stats
+            raise RuntimeError(f"Campaign {campaign_id} not found or already running")
+        segment_id, subject, body_template, goal_type, variant, personalization, cursor = rows[0]
+        if isinstance(personalization, str):
+            personalization = json.loads(personalization)
+
+        async with self._session() as session:
+            interrupted = (await session.execute(text(MARK_INTERRUPTED_SQL), {'campaign_id': campaign_id})).rowcount
+            if interrupted:
+                await session.execute(text(CHECKPOINT_SQL), {
+                    'id': campaign_id, 'cursor': cursor, 'sent': 0, 'failed': interrupted, 'skipped': 0,
+                    'lease_until': self.clock() + self.lease_seconds,
+                })
+            await session.commit()
+        if interrupted:
+            logger.warning(f"Campaign {campaign_id}: {interrupted} messages interrupted mid-send, not retried")
+
+        campaign = {
+            'id': campaign_id,
+            'segment_id': str(segment_id),
+            'goal_type': goal_type,
+            'variant': variant,
+            'subject': Template(subject),
+            'body': Template(body_template),
+            'personalization': personalization or {},
+        }
+        logger.info(f"Sending campaign {campaign_id} to segment {segment_id}"
+                    + (f" (resuming after {cursor})" if cursor else ""))
+
+        status = 'failed'
+        try:
+            async for batch in self._members(campaign_id, str(segment_id), str(cursor or FIRST_PERSON_ID)):
+                await self._send_batch(campaign, batch)
+            status = 'completed'
+        finally:
+            await self._execute(FINISH_CAMPAIGN_SQL, {'id': campaign_id, 'status': status})
+
+        stats = await self.stats(campaign_id)
+        logger.info(f"Campaign {campaign_id} done: {stats['sent']} sent, {stats['failed']} failed, "
+                    f"{stats['skipped']} skipped")
+        return stats
+
+    async def stats(self, campaign_id) -> Dict[str, Any]:
+        rows = await self._execute(CAMPAIGN_STATS_SQL, {'id': str(campaign_id)})
+        if not rows:
+            return {}
+        status, sent, failed, skipped = rows[0]
+        return {
+            'campaign_id': str(campaign_id),
+            'status': status,
+            'sent': sent,
+            'failed': failed,
+            'skipped': skipped,
+            'total': sent + failed + skipped,
+        }
+
+    async def _members(self, campaign_id: str, segment_id: str, after: str) -> AsyncIterator[List[CampaignRecipient]]:
+        """
+        Stream members in batches. Each window is one server-side cursor, so
+        a read transaction stays open for at most `window_size` members.
+        """
+        while True:
+            count = 0
+            async with self._session() as reader:
+                result = await reader.stream(
+                    text(MEMBERS_WINDOW_SQL).execution_options(yield_per=self.batch_size),
+                    {'segment_id': segment_id, 'campaign_id': campaign_id, 'after': after, 'window': self.window_size},
+                )
+                async for rows in result.partitions():
+                    batch = [CampaignRecipient(str(r[0]), r[1], r[2], r[3], r[4]) for r in rows]
+                    count += len(batch)
+                    after = batch[-1].id
+                    yield batch
+            if count < self.window_size:
+                return
+
+    async def _send_batch(self, campaign: Dict[str, Any], batch: List[CampaignRecipient]):
+        messages = []
+        for person in batch:
+            entry = {
+                'id': str(uuid4()),
+                'person': person,
+                'row': {
+                    'person_id': person.id,
+                    'segment_id': campaign['segment_id'],
+                    'campaign_id': campaign['id'],
+                    'goal_type': campaign['goal_type'],
+                    'variant': campaign['variant'],
+                    'subject': None,
+                    'body': None,
+                },
+            }
+            if not person.primary_email:
+                entry['status'] = 'failed'
+                logger.error(f"Person {person.id} has no email address")
+            else:
+                try:
+                    context = {
+                        'person': person,
+                        'full_name': person.full_name or 'there',
+                        **campaign['personalization'],
+                    }
+                    entry['row']['subject'] = campaign['subject'].render(**context)
+                    entry['row']['body'] = campaign['body'].render(**context)
+                    entry['status'] = 'queued' if self.sender else 'skipped'
+                except Exception as e:
+                    entry['status'] = 'failed'
+                    logger.error(f"Failed to render campaign email for person {person.id}: {e}")
+            messages.append(entry)
+
+        # Commit the rows before sending: from here on these people are never sent to again
+        await self._execute(INSERT_MESSAGES_SQL, [
+            {'id': m['id'], 'delivery_status': m['status'], **m['row']} for m in messages
+        ])
+
+        queued = [m for m in messages if m['status'] == 'queued']
+        if queued:
+            results = await asyncio.gather(*(self._deliver(m) for m in queued))
+            for message, status in zip(queued, results):
+                message['status'] = status
+
+        counts = {'sent': 0, 'failed': 0, 'skipped': 0}
+        for m in messages:
+            counts[m['status']] += 1
+        async with self._session() as session:
+            if queued:
+                await session.execute(text(UPDATE_DELIVERY_SQL), [
+                    {'id': m['id'], 'delivery_status': m['status']} for m in queued
+                ])
+            await session.execute(text(CHECKPOINT_SQL), {
+                'id': campaign['id'],
+                'cursor': batch[-1].id,
+                'lease_until': self.clock() + self.lease_seconds,
+                **counts,
+            })
+            await session.commit()
+
+    async def _deliver(self, message: Dict[str, Any]) -> str:
+        person: CampaignRecipient = message['person']
+        mime = build_message(
+            from_header=self.from_header,
+            to_email=person.primary_email,
+            to_name=person.full_name,
+            subject=message['row']['subject'],
+            body_html=message['row']['body'],
+            body_text=None,
+            tracking_id=message['id'],
+        )
+        try:
+            async with self.throttle.slot(person.domain):
+                await self.sender.send(mime)
+            return 'sent'
+        except Exception as e:
+            logger.error(f"Failed to send to {person.primary_email}: {e}")
+            return 'failed'
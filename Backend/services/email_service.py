@@ -10,7 +10,6 @@ import os
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from jinja2 import Template
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,6 +17,34 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import Person, Segment, OutboundMessage, PersonEvent
 
 
+def build_message(
+    from_header: str,
+    to_email: str,
+    to_name: Optional[str],
+    subject: str,
+    body_html: str,
+    body_text: Optional[str],
+    tracking_id: str
+) -> MIMEMultipart:
+    """Build a MIME email with an open-tracking pixel for `tracking_id`"""
+    msg = MIMEMultipart('alternative')
+    msg['From'] = from_header
+    msg['To'] = f"{to_name} <{to_email}>" if to_name else to_email
+    msg['Subject'] = subject
+    
+    # Add tracking pixel
+    tracking_pixel = f'<img src="https://track.example.com/open/{tracking_id}" width="1" height="1" />'
+    body_html_tracked = body_html + tracking_pixel
+    
+    # Plain text part
+    if body_text:
+        msg.attach(MIMEText(body_text, 'plain'))
+    
+    # HTML part
+    msg.attach(MIMEText(body_html_tracked, 'html'))
+    return msg
+
+
 class EmailServiceProvider:
     """Email Service Provider for sending personalized emails"""
     
@@ -29,6 +56,7 @@ class EmailServiceProvider:
         self.smtp_password = os.getenv("SMTP_PASSWORD")
         self.from_email = os.getenv("FROM_EMAIL", self.smtp_user)
         self.from_name = os.getenv("FROM_NAME", "MediaPoster")
+        self.smtp_starttls = os.getenv("SMTP_STARTTLS", "true").lower() != "false"
         self.enabled = bool(self.smtp_user and self.smtp_password)
     
     async def send_email(
@@ -111,11 +139,17 @@ class EmailServiceProvider:
         body_template: str,
         goal_type: str,
         variant: str = "A",
-        personalization_data: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, int]:
+        personalization_data: Optional[Dict[str, Any]] = None,
+        campaign_id: Optional[UUID] = None
+    ) -> Dict[str, Any]:
         """
         Send email to all people in a segment
         
+        Runs as a resumable campaign (services/email_campaigns.py): members
+        are streamed, templates compiled once, and sends go through a pooled
+        SMTP sender. Pass the `campaign_id` of an interrupted run to resume
+        it; people who already have a message in it are not sent again.
+        
         Args:
             segment_id: Segment UUID
             subject: Email subject (supports {{variables}})
@@ -123,56 +157,39 @@ class EmailServiceProvider:
             goal_type: Campaign goal
             variant: A/B variant
             personalization_data: Data for template rendering
+            campaign_id: Campaign to resume instead of starting a new one
             
         Returns:
-            Stats dict with sent/failed counts
+            Stats dict with sent/failed/skipped counts and the campaign_id
         """
-        # Get segment members
-        from database.models import SegmentMember
+        from services.email_campaigns import CampaignEngine, SMTPConnectionPool
         
-        result = await self.db.execute(
-            select(Person)
-            .join(SegmentMember, SegmentMember.person_id == Person.id)
-            .where(SegmentMember.segment_id == segment_id)
-        )
-        people = result.scalars().all()
-        
-        logger.info(f"Sending email to {len(people)} people in segment {segment_id}")
+        if not self.enabled:
+            logger.warning("ESP not configured, emails will be recorded but not sent")
         
-        sent = 0
-        failed = 0
+        sender = SMTPConnectionPool(
+            host=self.smtp_host,
+            port=self.smtp_port,
+            user=self.smtp_user,
+            password=self.smtp_password,
+            starttls=self.smtp_starttls
+        ) if self.enabled else None
+        engine = CampaignEngine(sender=sender, from_header=f"{self.from_name} <{self.from_email}>")
         
-        for person in people:
-            try:
-                # Render personalized template
-                context = {
-                    'person': person,
-                    'full_name': person.full_name or 'there',
-                    **(personalization_data or {})
-                }
-                
-                rendered_subject = Template(subject).render(**context)
-                rendered_body = Template(body_template).render(**context)
-                
-                await self.send_email(
-                    person_id=person.id,
-                    subject=rendered_subject,
-                    body_html=rendered_body,
+        try:
+            if campaign_id is None:
+                campaign_id = await engine.create(
                     segment_id=segment_id,
+                    subject=subject,
+                    body_template=body_template,
                     goal_type=goal_type,
-                    variant=variant
+                    variant=variant,
+                    personalization=personalization_data
                 )
-                sent += 1
-                
-            except Exception as e:
-                logger.error(f"Failed to send to person {person.id}: {e}")
-                failed += 1
-        
-        return {
-            "sent": sent,
-            "failed": failed,
-            "total": len(people)
-        }
+            return await engine.run(campaign_id)
+        finally:
+            if sender:
+                await sender.close()
     
     def _send_smtp(
         self,
@@ -184,25 +201,20 @@ class EmailServiceProvider:
         tracking_id: str
     ):
         """Send email via SMTP"""
-        msg = MIMEMultipart('alternative')
-        msg['From'] = f"{self.from_name} <{self.from_email}>"
-        msg['To'] = f"{to_name} <{to_email}>" if to_name else to_email
-        msg['Subject'] = subject
-        
-        # Add tracking pixel
-        tracking_pixel = f'<img src="https://track.example.com/open/{tracking_id}" width="1" height="1" />'
-        body_html_tracked = body_html + tracking_pixel
-        
-        # Plain text part
-        if body_text:
-            msg.attach(MIMEText(body_text, 'plain'))
-        
-        # HTML part
-        msg.attach(MIMEText(body_html_tracked, 'html'))
+        msg = build_message(
+            from_header=f"{self.from_name} <{self.from_email}>",
+            to_email=to_email,
+            to_name=to_name,
+            subject=subject,
+            body_html=body_html,
+            body_text=body_text,
+            tracking_id=tracking_id
+        )
         
         # Send
         with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-            server.starttls()
+            if self.smtp_starttls:
+                server.starttls()
             if self.smtp_user and self.smtp_password:
                 server.login(self.smtp_user, self.smtp_password)
             server.send_message(msg)
@@ -3,16 +3,22 @@ Follower tracking service for engagement analytics
 Provides functions to track followers and their interactions across platforms
 """
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
 from datetime import datetime
 from typing import Optional, Dict, Any
+import asyncio
 import os
 import json
 from dotenv import load_dotenv
 
+from services.intelligence.person_recompute import ENGAGEMENT_CHUNK_SIZE, recompute_engagement_scores
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 engine = create_engine(DATABASE_URL)
+_async_engine = None
 
 
 def get_or_create_follower(
@@ -233,154 +239,37 @@ def analyze_sentiment(text: str) -> tuple[float, str]:
     return score, label
 
 
-def update_engagement_scores(follower_id: Optional[str] = None):
+def _get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        url = DATABASE_URL
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql+asyncpg://", 1)
+        elif url.startswith("postgresql://") and "+asyncpg" not in url:
+            url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        # No pool: every asyncio.run() below has its own event loop
+        _async_engine = create_async_engine(url, poolclass=NullPool)
+    return _async_engine
+
+
+def update_engagement_scores(
+    follower_id: Optional[str] = None,
+    incremental: bool = False,
+    chunk_size: int = ENGAGEMENT_CHUNK_SIZE
+) -> int:
     """
     Calculate/update engagement scores for followers
-    If follower_id is provided, updates just that follower
-    Otherwise updates all followers
+    Sync entry point for the backfill scripts; async callers should await
+    recompute_engagement_scores with their own session instead.
+    Returns number of followers recomputed
     """
-    conn = engine.connect()
-    
-    try:
-        if follower_id:
-            # Update single follower
-            conn.execute(text("""
-                INSERT INTO follower_engagement_scores (
-                    follower_id,
-                    total_interactions,
-                    comment_count,
-                    like_count,
-                    share_count,
-                    save_count,
-                    profile_visit_count,
-                    link_click_count,
-                    engagement_score,
-                    engagement_tier,
-                    avg_sentiment,
-                    first_interaction,
-                    last_interaction,
-                    last_calculated_at
-                )
-                SELECT
-                    :follower_id,
-                    COUNT(*) as total_interactions,
-                    COUNT(*) FILTER (WHERE interaction_type = 'comment') as comment_count,
-                    COUNT(*) FILTER (WHERE interaction_type = 'like') as like_count,
-                    COUNT(*) FILTER (WHERE interaction_type = 'share') as share_count,
-                    COUNT(*) FILTER (WHERE interaction_type = 'save') as save_count,
-                    COUNT(*) FILTER (WHERE interaction_type = 'profile_visit') as profile_visit_count,
-                    COUNT(*) FILTER (WHERE interaction_type = 'link_click') as link_click_count,
-                    calculate_engagement_score(
-                        COUNT(*) FILTER (WHERE interaction_type = 'comment')::INT,
-                        COUNT(*) FILTER (WHERE interaction_type = 'like')::INT,
-                        COUNT(*) FILTER (WHERE interaction_type = 'share')::INT,
-                        COUNT(*) FILTER (WHERE interaction_type = 'save')::INT,
-                        COUNT(*) FILTER (WHERE interaction_type = 'profile_visit')::INT,
-                        COUNT(*) FILTER (WHERE interaction_type = 'link_click')::INT
-                    ) as engagement_score,
-                    determine_engagement_tier(
-                        calculate_engagement_score(
-                            COUNT(*) FILTER (WHERE interaction_type = 'comment')::INT,
-                            COUNT(*) FILTER (WHERE interaction_type = 'like')::INT,
-                            COUNT(*) FILTER (WHERE interaction_type = 'share')::INT,
-                            COUNT(*) FILTER (WHERE interaction_type = 'save')::INT,
-                            COUNT(*) FILTER (WHERE interaction_type = 'profile_visit')::INT,
-                            COUNT(*) FILTER (WHERE interaction_type = 'link_click')::INT
-                        )
-                    ) as engagement_tier,
-                    AVG(sentiment_score) as avg_sentiment,
-                    MIN(occurred_at) as first_interaction,
-                    MAX(occurred_at) as last_interaction,
-                    NOW() as last_calculated_at
-                FROM follower_interactions
-                WHERE follower_id = :follower_id
-                ON CONFLICT (follower_id) DO UPDATE SET
-                    total_interactions = EXCLUDED.total_interactions,
-                    comment_count = EXCLUDED.comment_count,
-                    like_count = EXCLUDED.like_count,
-                    share_count = EXCLUDED.share_count,
-                    save_count = EXCLUDED.save_count,
-                    profile_visit_count = EXCLUDED.profile_visit_count,
-                    link_click_count = EXCLUDED.link_click_count,
-                    engagement_score = EXCLUDED.engagement_score,
-                    engagement_tier = EXCLUDED.engagement_tier,
-                    avg_sentiment = EXCLUDED.avg_sentiment,
-                    first_interaction = EXCLUDED.first_interaction,
-                    last_interaction = EXCLUDED.last_interaction,
-                    last_calculated_at = EXCLUDED.last_calculated_at
-            """), {"follower_id": follower_id})
-        else:
-            # Update all followers with interactions
-            conn.execute(text("""
-                INSERT INTO follower_engagement_scores (
-                    follower_id,
-                    total_interactions,
-                    comment_count,
-                    like_count,
-                    share_count,
-                    save_count,
-                    profile_visit_count,
-                    link_click_count,
-                    engagement_score,
-                    engagement_tier,
-                    avg_sentiment,
-                    first_interaction,
-                    last_interaction,
-                    last_calculated_at
-                )
-                SELECT
-                    follower_id,
-                    COUNT(*) as total_interactions,
-                    COUNT(*) FILTER (WHERE interaction_type = 'comment') as comment_count,
-                    COUNT(*) FILTER (WHERE interaction_type = 'like') as like_count,
-                    COUNT(*) FILTER (WHERE interaction_type = 'share') as share_count,
-                    COUNT(*) FILTER (WHERE interaction_type = 'save') as save_count,
-                    COUNT(*) FILTER (WHERE interaction_type = 'profile_visit') as profile_visit_count,
-                    COUNT(*) FILTER (WHERE interaction_type = 'link_click') as link_click_count,
-                    calculate_engagement_score(
-                        COUNT(*) FILTER (WHERE interaction_type = 'comment')::INT,
-                        COUNT(*) FILTER (WHERE interaction_type = 'like')::INT,
-                        COUNT(*) FILTER (WHERE interaction_type = 'share')::INT,
-                        COUNT(*) FILTER (WHERE interaction_type = 'save')::INT,
-                        COUNT(*) FILTER (WHERE interaction_type = 'profile_visit')::INT,
-                        COUNT(*) FILTER (WHERE interaction_type = 'link_click')::INT
-                    ) as engagement_score,
-                    determine_engagement_tier(
-                        calculate_engagement_score(
-                            COUNT(*) FILTER (WHERE interaction_type = 'comment')::INT,
-                            COUNT(*) FILTER (WHERE interaction_type = 'like')::INT,
-                            COUNT(*) FILTER (WHERE interaction_type = 'share')::INT,
-                            COUNT(*) FILTER (WHERE interaction_type = 'save')::INT,
-                            COUNT(*) FILTER (WHERE interaction_type = 'profile_visit')::INT,
-                            COUNT(*) FILTER (WHERE interaction_type = 'link_click')::INT
-                        )
-                    ) as engagement_tier,
-                    AVG(sentiment_score) as avg_sentiment,
-                    MIN(occurred_at) as first_interaction,
-                    MAX(occurred_at) as last_interaction,
-                    NOW() as last_calculated_at
-                FROM follower_interactions
-                GROUP BY follower_id
-                ON CONFLICT (follower_id) DO UPDATE SET
-                    total_interactions = EXCLUDED.total_interactions,
-                    comment_count = EXCLUDED.comment_count,
-                    like_count = EXCLUDED.like_count,
-                    share_count = EXCLUDED.share_count,
-                    save_count = EXCLUDED.save_count,
-                    profile_visit_count = EXCLUDED.profile_visit_count,
-                    link_click_count = EXCLUDED.link_click_count,
-                    engagement_score = EXCLUDED.engagement_score,
-                    engagement_tier = EXCLUDED.engagement_tier,
-                    avg_sentiment = EXCLUDED.avg_sentiment,
-                    first_interaction = EXCLUDED.first_interaction,
-                    last_interaction = EXCLUDED.last_interaction,
-                    last_calculated_at = EXCLUDED.last_calculated_at
-            """))
-        
-        conn.commit()
-        
-    finally:
-        conn.close()
+    async def run() -> int:
+        async with AsyncSession(_get_async_engine()) as session:
+            return await recompute_engagement_scores(
+                session, follower_id=follower_id, incremental=incremental, chunk_size=chunk_size
+            )
+
+    return asyncio.run(run())
 
 
 # Convenience function for processing comments
@@ -0,0 +1,506 @@
+"""
+Instrumentation
+Process-wide latency/cost metrics in Prometheus text format, plus per-request
+accounting of where the time went.
+
+What is recorded:
+    - HTTP requests (route template, method, status) - see middleware/request_metrics.py
+    - SQL statements per request and their duration (SQLAlchemy cursor events)
+    - Subprocess wall time (ffmpeg/ffprobe/...) via an instrumented Popen
+    - External calls: OpenAI latency/tokens/cost, RapidAPI latency
+
+Metrics live in this process only; each API worker / Celery child exposes its
+own series and Prometheus aggregates across them.
+"""
+import bisect
+import functools
+import inspect
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+LONG_TASK_BUCKETS = (0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+
+SQL_QUERY_WARNING_THRESHOLD = 50     # Per request; usually an N+1
+TRACKED_TOOLS = {"ffmpeg", "ffprobe", "whisper", "yt-dlp", "exiftool"}
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+RAPIDAPI_HOST_SUFFIX = ".rapidapi.com"
+RAPIDAPI_COST_PER_CALL_USD = float(os.getenv("RAPIDAPI_COST_PER_CALL_USD", "0"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# USD per 1K (prompt, completion) tokens; matched by longest model prefix
+LLM_PRICES_PER_1K = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4-vision-preview": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+
+# ============================================================================
+# METRICS REGISTRY
+# ============================================================================
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in sorted(items):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_fmt(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram with labels (buckets stored non-cumulative)"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for label_values, series in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _fmt(float(bound))
+                labels = _labels(self.labels, label_values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {_fmt(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric of the process and renders the exposition text"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"))
+HTTP_REQUEST_SQL_QUERIES = REGISTRY.histogram(
+    "http_request_sql_queries", "SQL statements executed per HTTP request",
+    ("route",), QUERY_COUNT_BUCKETS)
+HTTP_REQUEST_SQL_SECONDS = REGISTRY.histogram(
+    "http_request_sql_seconds", "Time spent in SQL per HTTP request",
+    ("route",))
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "db_query_duration_seconds", "SQL statement latency",
+    ("operation",), SQL_BUCKETS)
+SUBPROCESS_SECONDS = REGISTRY.histogram(
+    "subprocess_duration_seconds", "Subprocess wall time",
+    ("tool", "status"), LONG_TASK_BUCKETS)
+EXTERNAL_CALL_SECONDS = REGISTRY.histogram(
+    "external_call_duration_seconds", "Latency of LLM and third-party API calls",
+    ("provider", "operation", "status"), LONG_TASK_BUCKETS)
+EXTERNAL_CALL_COST = REGISTRY.counter(
+    "external_call_cost_usd_total", "Estimated spend on LLM and third-party API calls",
+    ("provider", "operation"))
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "LLM tokens consumed",
+    ("model", "kind"))
+
+
+# ============================================================================
+# PER-REQUEST ACCOUNTING
+# ============================================================================
+
+@dataclass
+class RequestStats:
+    """Time spent outside the handler's own code during one request"""
+    sql_count: int = 0
+    sql_seconds: float = 0.0
+    subprocess_seconds: float = 0.0
+    external_seconds: float = 0.0
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def start_request_stats():
+    """Begin accounting for the current request; returns a token for end_request_stats"""
+    stats = RequestStats()
+    return stats, _current_request.set(stats)
+
+
+def end_request_stats(token) -> None:
+    _current_request.reset(token)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current_request.get()
+
+
+def record_request(method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+    HTTP_REQUEST_SECONDS.observe(seconds, method, route, str(status))
+    HTTP_REQUEST_SQL_QUERIES.observe(stats.sql_count, route)
+    if stats.sql_count:
+        HTTP_REQUEST_SQL_SECONDS.observe(stats.sql_seconds, route)
+    if stats.sql_count >= SQL_QUERY_WARNING_THRESHOLD:
+        logger.warning(
+            f"{method} {route} ran {stats.sql_count} SQL statements "
+            f"({stats.sql_seconds * 1000:.0f}ms) - possible N+1"
+        )
+
+
+# ============================================================================
+# SQL
+# ============================================================================
+
+_operation_cache: Dict[str, str] = {}
+
+
+def _sql_operation(statement: str) -> str:
+    # Statement strings come from SQLAlchemy's compiled cache, so the same
+    # objects repeat; look them up instead of re-parsing every execution
+    operation = _operation_cache.get(statement)
+    if operation is None:
+        head = statement[:64].lstrip()[:6].upper()
+        operation = "WITH" if head.startswith("WITH") else (head if head in SQL_OPERATIONS else "OTHER")
+        if len(_operation_cache) >= 4096:
+            _operation_cache.clear()
+        _operation_cache[statement] = operation
+    return operation
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._instrumentation_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_instrumentation_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    DB_QUERY_SECONDS.observe(elapsed, _sql_operation(statement))
+    stats = _current_request.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += elapsed
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement run through an (async or sync) SQLAlchemy engine"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ============================================================================
+# SUBPROCESSES
+# ============================================================================
+
+def _tool_name(args) -> str:
+    if isinstance(args, (str, bytes, os.PathLike)):
+        first = os.fsdecode(args).split(None, 1)[0] if args else ""
+    else:
+        first = os.fsdecode(args[0]) if args else ""
+    name = os.path.basename(first)
+    return name if name in TRACKED_TOOLS else "other"
+
+
+def record_subprocess(tool: str, seconds: float, returncode: Optional[int]) -> None:
+    """Record a finished subprocess (call directly for asyncio subprocesses, which bypass Popen.wait)"""
+    SUBPROCESS_SECONDS.observe(seconds, tool, "ok" if returncode == 0 else "error")
+    stats = _current_request.get()
+    if stats is not None:
+        stats.subprocess_seconds += seconds
+
+
+class _TimedPopen(subprocess.Popen):
+    """Popen that records its wall time the first time it is waited on"""
+
+    def __init__(self, args, *popen_args, **popen_kwargs):
+        self._instrumentation_tool = _tool_name(args)
+        self._instrumentation_started = time.perf_counter()
+        self._instrumentation_recorded = False
+        super().__init__(args, *popen_args, **popen_kwargs)
+
+    def wait(self, timeout=None):
+        returncode = super().wait(timeout)
+        if not self._instrumentation_recorded:
+            self._instrumentation_recorded = True
+            record_subprocess(
+                self._instrumentation_tool,
+                time.perf_counter() - self._instrumentation_started,
+                returncode,
+            )
+        return returncode
+
+
+# ============================================================================
+# EXTERNAL CALLS (LLM / RAPIDAPI)
+# ============================================================================
+
+@dataclass
+class ExternalCall:
+    """Filled in by the caller inside track_external_call"""
+    cost_usd: float = 0.0
+    failed: bool = False
+
+
+def record_external_call(provider: str, operation: str, seconds: float, ok: bool = True, cost_usd: float = 0.0) -> None:
+    EXTERNAL_CALL_SECONDS.observe(seconds, provider, operation, "ok" if ok else "error")
+    if cost_usd:
+        EXTERNAL_CALL_COST.inc(cost_usd, provider, operation)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.external_seconds += seconds
+
+
+@contextmanager
+def track_external_call(provider: str, operation: str) -> Iterator[ExternalCall]:
+    """Time a third-party call; set `cost_usd`/`failed` on the yielded object"""
+    call = ExternalCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.failed = True
+        raise
+    finally:
+        record_external_call(provider, operation, time.perf_counter() - started, not call.failed, call.cost_usd)
+
+
+def llm_cost_usd(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of one completion (0 for unknown models)"""
+    if not model:
+        return 0.0
+    matches = [name for name in LLM_PRICES_PER_1K if model.startswith(name)]
+    if not matches:
+        return 0.0
+    prompt_price, completion_price = LLM_PRICES_PER_1K[max(matches, key=len)]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+def _record_llm_usage(call: ExternalCall, model: Optional[str], response) -> None:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    model = getattr(response, "model", None) or model or "unknown"
+    LLM_TOKENS.inc(prompt_tokens, model, "prompt")
+    LLM_TOKENS.inc(completion_tokens, model, "completion")
+    call.cost_usd = llm_cost_usd(model, prompt_tokens, completion_tokens)
+
+
+def _wrap_openai(cls, operation: str) -> None:
+    original = cls.create
+    if getattr(original, "_instrumented", False):
+        return
+
+    if inspect.iscoroutinefunction(original):
+        @functools.wraps(original)
+        async def create(self, *args, **kwargs):
+            with track_external_call("openai", operation) as call:
+                response = await original(self, *args, **kwargs)
+                _record_llm_usage(call, kwargs.get("model"), response)
+                return response
+    else:
+        @functools.wraps(original)
+        def create(self, *args, **kwargs):
+            with track_external_call("openai", operation) as call:
+                response = original(self, *args, **kwargs)
+                _record_llm_usage(call, kwargs.get("model"), response)
+                return response
+
+    create._instrumented = True
+    cls.create = create
+
+
+def _instrument_openai() -> None:
+    try:
+        from openai.resources.chat.completions import AsyncCompletions, Completions
+        from openai.resources.audio.transcriptions import AsyncTranscriptions, Transcriptions
+    except ImportError:
+        return
+    _wrap_openai(Completions, "chat")
+    _wrap_openai(AsyncCompletions, "chat")
+    _wrap_openai(Transcriptions, "transcription")
+    _wrap_openai(AsyncTranscriptions, "transcription")
+
+
+def _rapidapi_operation(host: Optional[str]) -> Optional[str]:
+    if host and host.endswith(RAPIDAPI_HOST_SUFFIX):
+        return host[:-len(RAPIDAPI_HOST_SUFFIX)]
+    return None
+
+
+def _instrument_http_clients() -> None:
+    """Time RapidAPI requests made through httpx or requests"""
+    import httpx
+
+    async_send = httpx.AsyncClient.send
+    if not getattr(async_send, "_instrumented", False):
+        @functools.wraps(async_send)
+        async def send(self, request, *args, **kwargs):
+            operation = _rapidapi_operation(request.url.host)
+            if operation is None:
+                return await async_send(self, request, *args, **kwargs)
+            with track_external_call("rapidapi", operation) as call:
+                response = await async_send(self, request, *args, **kwargs)
+                call.failed = response.status_code >= 400
+                call.cost_usd = RAPIDAPI_COST_PER_CALL_USD
+                return response
+
+        send._instrumented = True
+        httpx.AsyncClient.send = send
+
+    sync_send = httpx.Client.send
+    if not getattr(sync_send, "_instrumented", False):
+        @functools.wraps(sync_send)
+        def client_send(self, request, *args, **kwargs):
+            operation = _rapidapi_operation(request.url.host)
+            if operation is None:
+                return sync_send(self, request, *args, **kwargs)
+            with track_external_call("rapidapi", operation) as call:
+                response = sync_send(self, request, *args, **kwargs)
+                call.failed = response.status_code >= 400
+                call.cost_usd = RAPIDAPI_COST_PER_CALL_USD
+                return response
+
+        client_send._instrumented = True
+        httpx.Client.send = client_send
+
+    try:
+        import requests
+    except ImportError:
+        return
+    session_send = requests.Session.send
+    if not getattr(session_send, "_instrumented", False):
+        from urllib.parse import urlsplit
+
+        @functools.wraps(session_send)
+        def requests_send(self, request, **kwargs):
+            operation = _rapidapi_operation(urlsplit(request.url).hostname)
+            if operation is None:
+                return session_send(self, request, **kwargs)
+            with track_external_call("rapidapi", operation) as call:
+                response = session_send(self, request, **kwargs)
+                call.failed = response.status_code >= 400
+                call.cost_usd = RAPIDAPI_COST_PER_CALL_USD
+                return response
+
+        requests_send._instrumented = True
+        requests.Session.send = requests_send
+
+
+def start_metrics_server(port: int) -> None:
+    """Serve /metrics from a daemon thread (for processes without the API, e.g. Celery children)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Metrics served on :{port}/metrics")
+
+
+_installed = False
+
+
+def install_instrumentation() -> None:
+    """Install the subprocess, OpenAI and HTTP hooks (idempotent)"""
+    global _installed
+    if _installed:
+        return
+    subprocess.Popen = _TimedPopen
+    _instrument_openai()
+    _instrument_http_clients()
+    _installed = True
+    logger.info("Instrumentation hooks installed")
@@ -1,9 +1,11 @@
 import asyncio
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Sequence
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
+from services.intelligence.person_recompute import PersonRecomputeEngine
+
 class PersonInsightsService:
     """
     Computes and updates insights for people based on their event history.
@@ -33,6 +35,27 @@ class PersonInsightsService:
             channel_prefs
         )
 
+    async def update_insights_for_people(
+        self,
+        db_session: AsyncSession,
+        person_ids: Optional[Sequence[str]] = None,
+        workspace_id: Optional[str] = None,
+        incremental: bool = False
+    ) -> Dict[str, int]:
+        """
+        Recompute insights for many people in chunks (same scoring as
+        update_insights_for_person, computed set-wise).
+
+        With no person_ids, everyone with events is recomputed, or with
+        incremental=True only people with new events since the last run.
+        """
+        engine = PersonRecomputeEngine(db_session, scorer='insights')
+        return await engine.run(
+            workspace_id=workspace_id,
+            incremental=incremental,
+            person_ids=person_ids
+        )
+
     async def _fetch_person_events(self, db_session: AsyncSession, person_id: str) -> List[Dict]:
         result = await db_session.execute(
             text("""
@@ -0,0 +1,638 @@
+"""
+Batch recompute of person_insights.
+
+Events for a chunk of people are loaded in one query, ordered by person, and
+scored with NumPy group reductions instead of one query and one Python pass
+per person. Results for the chunk are written with a single upsert.
+
+Two scorers share the pipeline:
+- "lens": the PersonLensComputer model (0-1 warmth, interests, tone)
+- "insights": the PersonInsightsService model (0-100 decayed warmth)
+
+Incremental runs only touch people with events newer than the last run's
+high-water mark (person_events.id), less a trailing re-scan window for ids
+that committed late, plus people whose activity state has crossed a day
+threshold since their insights were written. Warmth recency
+still drifts for everyone else, so a periodic full run is expected.
+
+Follower engagement scores use the same chunked, watermarked pattern on
+follower_interactions (recompute_engagement_scores).
+"""
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+LENS_WINDOW_DAYS = 90
+INSIGHTS_EVENTS_PER_PERSON = 100
+DEFAULT_CHUNK_SIZE = 5000
+
+# Ids are handed out at insert but only become visible at commit, so a
+# transaction that commits after a run can land ids below that run's high
+# water. Incremental runs re-scan this many ids below the stored watermark;
+# recomputing a person twice is harmless.
+WATERMARK_RESCAN_IDS = 10000
+
+LENS_DEPTH_WEIGHTS = {
+    'commented': 1.0,
+    'shared': 0.8,
+    'saved': 0.6,
+    'liked': 0.3,
+    'viewed': 0.1
+}
+INSIGHTS_EVENT_WEIGHTS = {
+    'comment': 5.0,
+    'dm_reply': 5.0,
+    'click': 3.0,
+    'save': 3.0,
+}
+INTEREST_STOPWORDS = {'the', 'a', 'an', 'this', 'that', 'is', 'it', 'to', 'and', 'or', 'of', 'in', 'on'}
+ENTHUSIASTIC_RE = re.compile('|'.join(re.escape(m) for m in ['lol', '!', '😊', '❤️', 'love']))
+TECHNICAL_RE = re.compile('|'.join(re.escape(m) for m in ['api', 'code', 'function', 'system']))
+
+# A person's activity state can change without new events once 7/30/90 days
+# pass; both scorers' boundaries (< and <=) are covered.
+STATE_BOUNDARY_DAYS = [7, 8, 30, 31, 90, 91]
+
+
+# ============================================================================
+# Vectorized scoring
+# ============================================================================
+
+class EventColumns:
+    """Column arrays for a batch of events, grouped by person"""
+
+    def __init__(self, rows: Sequence[Dict[str, Any]], now: datetime):
+        person_ids = np.array([str(r['person_id']) for r in rows], dtype=object)
+        # Stable sort keeps each person's events in their original (newest first) order
+        order = np.argsort(person_ids, kind='stable')
+        rows = [rows[i] for i in order]
+        person_ids = person_ids[order]
+
+        is_start = np.ones(len(rows), dtype=bool)
+        is_start[1:] = person_ids[1:] != person_ids[:-1]
+
+        self.rows = rows
+        self.starts = np.flatnonzero(is_start)
+        self.group = np.cumsum(is_start) - 1
+        self.people = person_ids[self.starts]
+        self.counts = np.bincount(self.group, minlength=len(self.people))
+
+        now_ts = now.timestamp()
+        self.occurred = np.array([_as_utc(r['occurred_at']).timestamp() for r in rows], dtype=np.float64)
+        self.days_ago = np.floor((now_ts - self.occurred) / 86400)
+        self.last_occurred = np.maximum.reduceat(self.occurred, self.starts)
+        self.last_days_ago = np.floor((now_ts - self.last_occurred) / 86400)
+
+    def column(self, name: str) -> np.ndarray:
+        return np.array([r[name] for r in self.rows], dtype=object)
+
+    def last_active_at(self) -> List[str]:
+        return [datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() for ts in self.last_occurred]
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _map_weights(values: np.ndarray, weights: Dict[str, float], default: float) -> np.ndarray:
+    labels, inverse = np.unique(values.astype(str), return_inverse=True)
+    return np.array([weights.get(label, default) for label in labels])[inverse]
+
+
+def _group_shares(
+    events: EventColumns,
+    values: np.ndarray,
+    decimals: Optional[int] = None
+) -> List[Dict[str, float]]:
+    """Per-person share of each distinct value, most frequent first"""
+    labels, codes = np.unique(values.astype(str), return_inverse=True)
+    keys, pair_counts = np.unique(events.group * len(labels) + codes, return_counts=True)
+    groups = keys // len(labels)
+    label_codes = keys % len(labels)
+    shares = pair_counts / events.counts[groups]
+    if decimals is not None:
+        shares = np.round(shares, decimals)
+
+    result: List[Dict[str, float]] = [{} for _ in events.people]
+    for i in np.lexsort((-pair_counts, groups)):
+        result[groups[i]][labels[label_codes[i]]] = float(shares[i])
+    return result
+
+
+def _top_interests(events: EventColumns, limit: int = 10) -> List[List[str]]:
+    """Most frequent excerpt words per person (ties broken by first appearance)"""
+    vocabulary: Dict[str, int] = {}
+    token_groups, token_codes = [], []
+    for group, excerpt in zip(events.group, events.column('content_excerpt')):
+        if not excerpt:
+            continue
+        for word in excerpt.lower().split():
+            if len(word) > 3 and word not in INTEREST_STOPWORDS:
+                token_groups.append(group)
+                token_codes.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    result: List[List[str]] = [[] for _ in events.people]
+    if not token_codes:
+        return result
+
+    words = np.array(list(vocabulary), dtype=object)
+    keys = np.array(token_groups) * len(words) + np.array(token_codes)
+    unique_keys, first_index, counts = np.unique(keys, return_index=True, return_counts=True)
+    groups = unique_keys // len(words)
+
+    for i in np.lexsort((first_index, -counts, groups)):
+        interests = result[groups[i]]
+        if len(interests) < limit:
+            interests.append(words[unique_keys[i] % len(words)])
+    return result
+
+
+def _tone_preferences(events: EventColumns) -> List[Dict[str, float]]:
+    excerpts = [(e or '').lower() for e in events.column('content_excerpt')]
+    has_text = np.array([bool(e) for e in excerpts])
+    enthusiastic = np.array([bool(ENTHUSIASTIC_RE.search(e)) for e in excerpts]) & has_text
+    technical = np.array([bool(TECHNICAL_RE.search(e)) for e in excerpts]) & has_text
+    formal = np.array([len(e) > 100 and '.' in e for e in excerpts]) & has_text
+    casual = has_text & ~formal
+
+    n = len(events.people)
+    tallies = {
+        'casual': np.bincount(events.group, weights=casual, minlength=n),
+        'formal': np.bincount(events.group, weights=formal, minlength=n),
+        'enthusiastic': np.bincount(events.group, weights=enthusiastic, minlength=n),
+        'technical': np.bincount(events.group, weights=technical, minlength=n),
+    }
+    totals = sum(tallies.values())
+    totals[totals == 0] = 1
+    return [
+        {tone: float(values[i] / totals[i]) for tone, values in tallies.items()}
+        for i in range(n)
+    ]
+
+
+def compute_lens_batch(rows: Sequence[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    PersonLensComputer scoring for many people at once
+
+    Args:
+        rows: Events within the lens window with person_id, channel, event_type,
+            occurred_at and content_excerpt
+        now: Reference time (defaults to current UTC time)
+
+    Returns:
+        One person_insights row per person
+    """
+    if not rows:
+        return []
+    events = EventColumns(rows, now or datetime.now(timezone.utc))
+
+    recency = np.maximum(0, 1 - events.last_days_ago / LENS_WINDOW_DAYS)
+    frequency = np.minimum(1.0, events.counts / 12 / 5)  # Events per week over 12 weeks, capped at 5
+    depth_weights = _map_weights(events.column('event_type'), LENS_DEPTH_WEIGHTS, 0.1)
+    depth = np.bincount(events.group, weights=depth_weights) / events.counts
+    warmth = np.round(recency * 0.4 + frequency * 0.3 + depth * 0.3, 3)
+
+    days = events.last_days_ago
+    states = np.select([days <= 7, days <= 30, days <= 90], ['active', 'warming', 'cool'], 'dormant')
+
+    interests = _top_interests(events)
+    tones = _tone_preferences(events)
+    channels = _group_shares(events, events.column('channel'))
+    last_active = events.last_active_at()
+
+    return [
+        {
+            'person_id': person_id,
+            'interests': interests[i],
+            'tone_preferences': tones[i],
+            'channel_preferences': channels[i],
+            'activity_state': str(states[i]),
+            'warmth_score': float(warmth[i]),
+            'last_active_at': last_active[i],
+        }
+        for i, person_id in enumerate(events.people)
+    ]
+
+
+def compute_insights_batch(rows: Sequence[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    PersonInsightsService scoring for many people at once
+
+    Args:
+        rows: Up to the latest 100 events per person with person_id, channel,
+            event_type and occurred_at
+        now: Reference time (defaults to current UTC time)
+
+    Returns:
+        One person_insights row per person
+    """
+    if not rows:
+        return []
+    events = EventColumns(rows, now or datetime.now(timezone.utc))
+
+    decay = np.maximum(0.1, 1.0 - events.days_ago / 30.0)
+    weights = _map_weights(events.column('event_type'), INSIGHTS_EVENT_WEIGHTS, 1.0)
+    contributions = np.where(events.days_ago > 90, 0.0, weights * decay)
+    warmth = np.minimum(100.0, np.bincount(events.group, weights=contributions))
+
+    days = events.last_days_ago
+    states = np.select([days < 7, days < 30, days < 90], ['active', 'warming', 'cool'], 'dormant')
+
+    channels = _group_shares(events, events.column('channel'), decimals=2)
+    last_active = events.last_active_at()
+
+    return [
+        {
+            'person_id': person_id,
+            'channel_preferences': channels[i],
+            'activity_state': str(states[i]),
+            'warmth_score': float(warmth[i]),
+            'last_active_at': last_active[i],
+        }
+        for i, person_id in enumerate(events.people)
+    ]
+
+
+# ============================================================================
+# SQL
+# ============================================================================
+
+LENS_EVENTS_SQL = """
+    SELECT person_id, channel, event_type, occurred_at, content_excerpt
+    FROM person_events
+    WHERE person_id = ANY(CAST(:ids AS uuid[]))
+      AND occurred_at >= :since
+    ORDER BY person_id, occurred_at DESC
+"""
+
+INSIGHTS_EVENTS_SQL = """
+    SELECT person_id, channel, event_type, occurred_at
+    FROM (
+        SELECT person_id, channel, event_type, occurred_at,
+               ROW_NUMBER() OVER (PARTITION BY person_id ORDER BY occurred_at DESC) AS rn
+        FROM person_events
+        WHERE person_id = ANY(CAST(:ids AS uuid[]))
+    ) ranked
+    WHERE rn <= :per_person
+    ORDER BY person_id, occurred_at DESC
+"""
+
+LENS_UPSERT_SQL = """
+    INSERT INTO person_insights (
+        person_id, interests, tone_preferences, channel_preferences,
+        activity_state, warmth_score, last_active_at, updated_at
+    )
+    SELECT r.person_id, r.interests, r.tone_preferences, r.channel_preferences,
+           r.activity_state, r.warmth_score, r.last_active_at, NOW()
+    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(
+        person_id uuid, interests jsonb, tone_preferences jsonb, channel_preferences jsonb,
+        activity_state text, warmth_score numeric, last_active_at timestamptz
+    )
+    ON CONFLICT (person_id) DO UPDATE SET
+        interests = EXCLUDED.interests,
+        tone_preferences = EXCLUDED.tone_preferences,
+        channel_preferences = EXCLUDED.channel_preferences,
+        activity_state = EXCLUDED.activity_state,
+        warmth_score = EXCLUDED.warmth_score,
+        last_active_at = EXCLUDED.last_active_at,
+        updated_at = NOW()
+"""
+
+INSIGHTS_UPSERT_SQL = """
+    INSERT INTO person_insights (
+        person_id, channel_preferences, activity_state, warmth_score, last_active_at, updated_at
+    )
+    SELECT r.person_id, r.channel_preferences, r.activity_state, r.warmth_score, r.last_active_at, NOW()
+    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(
+        person_id uuid, channel_preferences jsonb, activity_state text,
+        warmth_score numeric, last_active_at timestamptz
+    )
+    ON CONFLICT (person_id) DO UPDATE SET
+        channel_preferences = EXCLUDED.channel_preferences,
+        activity_state = EXCLUDED.activity_state,
+        warmth_score = EXCLUDED.warmth_score,
+        last_active_at = EXCLUDED.last_active_at,
+        updated_at = NOW()
+"""
+
+# People selected without any events to score (for the lens, none left in
+# the window) have decayed to nothing; writing that keeps the state-boundary
+# query from selecting them again on every incremental run
+MARK_DORMANT_SQL = """
+    UPDATE person_insights
+    SET activity_state = 'dormant', warmth_score = 0, updated_at = NOW()
+    WHERE person_id = ANY(CAST(:ids AS uuid[]))
+"""
+
+ENGAGEMENT_CHUNK_SIZE = DEFAULT_CHUNK_SIZE
+ENGAGEMENT_WATERMARK = 'follower_engagement'
+ENGAGEMENT_RESCAN_IDS = WATERMARK_RESCAN_IDS
+
+# Set-based score upsert; {where} selects which followers are recomputed
+ENGAGEMENT_UPSERT_SQL = """
+    INSERT INTO follower_engagement_scores (
+        follower_id,
+        total_interactions,
+        comment_count,
+        like_count,
+        share_count,
+        save_count,
+        profile_visit_count,
+        link_click_count,
+        engagement_score,
+        engagement_tier,
+        avg_sentiment,
+        first_interaction,
+        last_interaction,
+        last_calculated_at
+    )
+    SELECT
+        follower_id,
+        COUNT(*) as total_interactions,
+        COUNT(*) FILTER (WHERE interaction_type = 'comment') as comment_count,
+        COUNT(*) FILTER (WHERE interaction_type = 'like') as like_count,
+        COUNT(*) FILTER (WHERE interaction_type = 'share') as share_count,
+        COUNT(*) FILTER (WHERE interaction_type = 'save') as save_count,
+        COUNT(*) FILTER (WHERE interaction_type = 'profile_visit') as profile_visit_count,
+        COUNT(*) FILTER (WHERE interaction_type = 'link_click') as link_click_count,
+        calculate_engagement_score(
+            COUNT(*) FILTER (WHERE interaction_type = 'comment')::INT,
+            COUNT(*) FILTER (WHERE interaction_type = 'like')::INT,
+            COUNT(*) FILTER (WHERE interaction_type = 'share')::INT,
+            COUNT(*) FILTER (WHERE interaction_type = 'save')::INT,
+            COUNT(*) FILTER (WHERE interaction_type = 'profile_visit')::INT,
+            COUNT(*) FILTER (WHERE interaction_type = 'link_click')::INT
+        ) as engagement_score,
+        determine_engagement_tier(
+            calculate_engagement_score(
+                COUNT(*) FILTER (WHERE interaction_type = 'comment')::INT,
+                COUNT(*) FILTER (WHERE interaction_type = 'like')::INT,
+                COUNT(*) FILTER (WHERE interaction_type = 'share')::INT,
+                COUNT(*) FILTER (WHERE interaction_type = 'save')::INT,
+                COUNT(*) FILTER (WHERE interaction_type = 'profile_visit')::INT,
+                COUNT(*) FILTER (WHERE interaction_type = 'link_click')::INT
+            )
+        ) as engagement_tier,
+        AVG(sentiment_score) as avg_sentiment,
+        MIN(occurred_at) as first_interaction,
+        MAX(occurred_at) as last_interaction,
+        NOW() as last_calculated_at
+    FROM follower_interactions
+    WHERE {where}
+    GROUP BY follower_id
+    ON CONFLICT (follower_id) DO UPDATE SET
+        total_interactions = EXCLUDED.total_interactions,
+        comment_count = EXCLUDED.comment_count,
+        like_count = EXCLUDED.like_count,
+        share_count = EXCLUDED.share_count,
+        save_count = EXCLUDED.save_count,
+        profile_visit_count = EXCLUDED.profile_visit_count,
+        link_click_count = EXCLUDED.link_click_count,
+        engagement_score = EXCLUDED.engagement_score,
+        engagement_tier = EXCLUDED.engagement_tier,
+        avg_sentiment = EXCLUDED.avg_sentiment,
+        first_interaction = EXCLUDED.first_interaction,
+        last_interaction = EXCLUDED.last_interaction,
+        last_calculated_at = EXCLUDED.last_calculated_at
+"""
+
+SCORERS = {
+    'lens': (LENS_EVENTS_SQL, compute_lens_batch, LENS_UPSERT_SQL),
+    'insights': (INSIGHTS_EVENTS_SQL, compute_insights_batch, INSIGHTS_UPSERT_SQL),
+}
+
+
+async def get_watermark(db_session: AsyncSession, name: str) -> int:
+    result = await db_session.execute(
+        text("SELECT last_id FROM recompute_watermarks WHERE name = :name"),
+        {"name": name}
+    )
+    return result.scalar() or 0
+
+
+async def set_watermark(db_session: AsyncSession, name: str, last_id: int):
+    await db_session.execute(
+        text("""
+            INSERT INTO recompute_watermarks (name, last_id, updated_at)
+            VALUES (:name, :last_id, NOW())
+            ON CONFLICT (name) DO UPDATE SET last_id = EXCLUDED.last_id, updated_at = NOW()
+        """),
+        {"name": name, "last_id": last_id}
+    )
+
+
+def chunked(items: Sequence, size: int) -> List[Sequence]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# ============================================================================
+# Engine
+# ============================================================================
+
+class PersonRecomputeEngine:
+    """
+    Recomputes person_insights in chunks of people
+    """
+
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        scorer: str = 'lens',
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        rescan_ids: int = WATERMARK_RESCAN_IDS
+    ):
+        if scorer not in SCORERS:
+            raise ValueError(f"Unknown scorer: {scorer}")
+        self.db = db_session
+        self.scorer = scorer
+        self.chunk_size = chunk_size
+        self.rescan_ids = rescan_ids
+        self.events_sql, self.compute, self.upsert_sql = SCORERS[scorer]
+
+    @property
+    def watermark_name(self) -> str:
+        return f"person_{self.scorer}"
+
+    async def run(
+        self,
+        workspace_id: Optional[str] = None,
+        incremental: bool = False,
+        person_ids: Optional[Sequence[str]] = None
+    ) -> Dict[str, int]:
+        """
+        Recompute insights
+
+        Args:
+            workspace_id: Limit to one workspace
+            incremental: Only people with new events (or a state change) since the last run
+            person_ids: Explicit people to recompute (skips the watermark)
+
+        Returns:
+            Dict with people and events processed and chunks written
+        """
+        now = datetime.now(timezone.utc)
+        high_water = None
+
+        if person_ids is None:
+            result = await self.db.execute(text("SELECT COALESCE(MAX(id), 0) FROM person_events"))
+            high_water = result.scalar() or 0
+            person_ids = await self._select_people(workspace_id, incremental, high_water, now)
+
+        stats = {"people": 0, "events": 0, "chunks": 0}
+        logger.info(
+            f"Recomputing {self.scorer} insights for {len(person_ids)} people "
+            f"({'incremental' if incremental else 'full'})"
+        )
+
+        for chunk in chunked([str(pid) for pid in person_ids], self.chunk_size):
+            rows = await self._load_events(chunk, now)
+            results = self.compute(rows, now)
+            if results:
+                await self.db.execute(
+                    text(self.upsert_sql),
+                    {"rows": json.dumps(results)}
+                )
+            scored = {str(r['person_id']) for r in results}
+            unscored = [pid for pid in chunk if pid not in scored]
+            if unscored:
+                await self.db.execute(text(MARK_DORMANT_SQL), {"ids": unscored})
+            await self.db.commit()
+
+            stats["people"] += len(results)
+            stats["events"] += len(rows)
+            stats["chunks"] += 1
+
+        if high_water is not None and workspace_id is None:
+            await set_watermark(self.db, self.watermark_name, high_water)
+            await self.db.commit()
+
+        logger.success(
+            f"Recomputed {stats['people']} people from {stats['events']} events in {stats['chunks']} chunks"
+        )
+        return stats
+
+    async def _select_people(
+        self,
+        workspace_id: Optional[str],
+        incremental: bool,
+        high_water: int,
+        now: datetime
+    ) -> List[str]:
+        workspace_filter = (
+            "AND e.person_id IN (SELECT id FROM people WHERE workspace_id = :workspace_id)"
+            if workspace_id else ""
+        )
+        params: Dict[str, Any] = {"high_water": high_water}
+        if workspace_id:
+            params["workspace_id"] = str(workspace_id)
+
+        if not incremental:
+            window = "AND e.occurred_at >= :since" if self.scorer == 'lens' else ""
+            if window:
+                params["since"] = now - timedelta(days=LENS_WINDOW_DAYS)
+            query = f"""
+                SELECT DISTINCT e.person_id
+                FROM person_events e
+                WHERE e.id <= :high_water {window} {workspace_filter}
+            """
+        else:
+            watermark = await get_watermark(self.db, self.watermark_name)
+            params["last_id"] = max(0, watermark - self.rescan_ids)
+            params["boundaries"] = STATE_BOUNDARY_DAYS
+            query = f"""
+                SELECT DISTINCT e.person_id
+                FROM person_events e
+                WHERE e.id > :last_id AND e.id <= :high_water {workspace_filter}
+                UNION
+                SELECT pi.person_id
+                FROM person_insights pi
+                JOIN people p ON p.id = pi.person_id
+                WHERE pi.last_active_at IS NOT NULL
+                  AND (CAST(:workspace_id AS uuid) IS NULL OR p.workspace_id = CAST(:workspace_id AS uuid))
+                  AND EXISTS (
+                      SELECT 1 FROM unnest(CAST(:boundaries AS int[])) AS b(days)
+                      WHERE pi.last_active_at + make_interval(days => b.days)
+                            BETWEEN pi.updated_at AND NOW()
+                  )
+            """
+            params.setdefault("workspace_id", None)
+
+        result = await self.db.execute(text(query), params)
+        return [row[0] for row in result.fetchall()]
+
+    async def _load_events(self, person_ids: Sequence[str], now: datetime) -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {"ids": list(person_ids)}
+        if self.scorer == 'lens':
+            params["since"] = now - timedelta(days=LENS_WINDOW_DAYS)
+        else:
+            params["per_person"] = INSIGHTS_EVENTS_PER_PERSON
+
+        result = await self.db.execute(text(self.events_sql), params)
+        return [dict(row._mapping) for row in result]
+
+
+# ============================================================================
+# Follower engagement scores
+# ============================================================================
+
+async def recompute_engagement_scores(
+    db_session: AsyncSession,
+    follower_id: Optional[str] = None,
+    incremental: bool = False,
+    chunk_size: int = ENGAGEMENT_CHUNK_SIZE,
+    rescan_ids: int = ENGAGEMENT_RESCAN_IDS
+) -> int:
+    """
+    Recompute follower_engagement_scores
+
+    Args:
+        db_session: Database session
+        follower_id: Recompute just this follower
+        incremental: Only followers with interactions since the last run
+        chunk_size: Followers per upsert (one commit each)
+        rescan_ids: Interaction ids re-scanned below the stored watermark
+
+    Returns:
+        Number of followers recomputed
+    """
+    if follower_id:
+        await db_session.execute(
+            text(ENGAGEMENT_UPSERT_SQL.format(where="follower_id = :follower_id")),
+            {"follower_id": follower_id}
+        )
+        await db_session.commit()
+        return 1
+
+    # Interactions past this id are picked up by the next incremental run
+    result = await db_session.execute(text("SELECT COALESCE(MAX(id), 0) FROM follower_interactions"))
+    high_water = result.scalar() or 0
+    last_id = 0
+    if incremental:
+        last_id = max(0, await get_watermark(db_session, ENGAGEMENT_WATERMARK) - rescan_ids)
+
+    result = await db_session.execute(
+        text("""
+            SELECT DISTINCT follower_id FROM follower_interactions
+            WHERE id > :last_id AND id <= :high_water
+        """),
+        {"last_id": last_id, "high_water": high_water}
+    )
+    follower_ids = [str(fid) for fid in result.scalars().all()]
+
+    chunk_sql = text(ENGAGEMENT_UPSERT_SQL.format(where="follower_id = ANY(CAST(:ids AS uuid[]))"))
+    for chunk in chunked(follower_ids, chunk_size):
+        await db_session.execute(chunk_sql, {"ids": list(chunk)})
+        await db_session.commit()
+
+    await set_watermark(db_session, ENGAGEMENT_WATERMARK, high_water)
+    await db_session.commit()
+
+    logger.success(f"Recomputed engagement scores for {len(follower_ids)} followers")
+    return len(follower_ids)
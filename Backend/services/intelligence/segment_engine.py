@@ -1,22 +1,241 @@
-import asyncio
-from typing import List, Dict
+import json
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
+# Segment definition fields, mapped to person_insights columns and their kind
+FIELDS = {
+    'warmth_score': ('pi.warmth_score', 'number'),
+    'activity_state': ('pi.activity_state', 'text'),
+    'last_active_at': ('pi.last_active_at', 'timestamp'),
+    'interests': ('pi.interests', 'jsonb_array'),
+    'tone_preferences': ('pi.tone_preferences', 'jsonb_object_key'),
+    'channel_preferences': ('pi.channel_preferences', 'jsonb_object'),
+}
+
+COMPARISONS = {'eq': '=', 'neq': '<>', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+# Evaluated memberships live in a transaction-scoped temp table so the diff
+# against segment_members can be done set-wise in SQL
+CREATE_EVAL_TABLE_SQL = """
+CREATE TEMP TABLE segment_eval (
+    segment_id UUID NOT NULL,
+    person_id UUID NOT NULL
+) ON COMMIT DROP
+"""
+
+EVALUATE_SQL = """
+INSERT INTO segment_eval (segment_id, person_id)
+SELECT m.segment_id, pi.person_id
+FROM person_insights pi
+CROSS JOIN LATERAL unnest(ARRAY[
+    {cases}
+]) AS m(segment_id)
+WHERE m.segment_id IS NOT NULL
+"""
+
+ADD_MEMBERS_SQL = """
+WITH added AS (
+    INSERT INTO segment_members (segment_id, person_id)
+    SELECT e.segment_id, e.person_id
+    FROM segment_eval e
+    WHERE NOT EXISTS (
+        SELECT 1 FROM segment_members m
+        WHERE m.segment_id = e.segment_id AND m.person_id = e.person_id
+    )
+    ON CONFLICT DO NOTHING
+    RETURNING segment_id, person_id
+),
+logged AS (
+    INSERT INTO segment_membership_events (segment_id, person_id, change)
+    SELECT segment_id, person_id, 'added' FROM added
+    RETURNING segment_id
+)
+SELECT segment_id, COUNT(*) AS changed FROM logged GROUP BY segment_id
+"""
+
+REMOVE_MEMBERS_SQL = """
+WITH removed AS (
+    DELETE FROM segment_members m
+    WHERE m.segment_id = ANY(CAST(:segment_ids AS uuid[]))
+      AND NOT EXISTS (
+          SELECT 1 FROM segment_eval e
+          WHERE e.segment_id = m.segment_id AND e.person_id = m.person_id
+      )
+    RETURNING m.segment_id, m.person_id
+),
+logged AS (
+    INSERT INTO segment_membership_events (segment_id, person_id, change)
+    SELECT segment_id, person_id, 'removed' FROM removed
+    RETURNING segment_id
+)
+SELECT segment_id, COUNT(*) AS changed FROM logged GROUP BY segment_id
+"""
+
+MEMBER_COUNTS_SQL = "SELECT segment_id, COUNT(*) AS members FROM segment_eval GROUP BY segment_id"
+
+
+class SegmentCompiler:
+    """
+    Compiles a segment `definition` into a SQL predicate over person_insights (alias `pi`).
+
+    Accepts the shorthand form ({"min_warmth": 50, "activity_state": "active"})
+    and the SegmentDefinition DSL ({"operator": "AND", "conditions": [...]}),
+    where conditions may nest further groups. Values are always bound as
+    parameters, prefixed so several segments can share one statement.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.params: Dict[str, Any] = {}
+
+    def compile(self, definition: Optional[Dict]) -> Tuple[str, Dict[str, Any]]:
+        definition = definition or {}
+        if isinstance(definition, str):
+            definition = json.loads(definition)
+
+        clauses = []
+        if 'min_warmth' in definition:
+            clauses.append(self._condition({'field': 'warmth_score', 'operator': 'gte', 'value': definition['min_warmth']}))
+        if 'max_warmth' in definition:
+            clauses.append(self._condition({'field': 'warmth_score', 'operator': 'lte', 'value': definition['max_warmth']}))
+        if 'activity_state' in definition:
+            state = definition['activity_state']
+            operator = 'in' if isinstance(state, list) else 'eq'
+            clauses.append(self._condition({'field': 'activity_state', 'operator': operator, 'value': state}))
+        if 'conditions' in definition:
+            clauses.append(self._group(definition))
+
+        predicate = " AND ".join(clauses) if clauses else "TRUE"
+        return predicate, self.params
+
+    def _bind(self, value: Any) -> str:
+        name = f"{self.prefix}_{len(self.params)}"
+        self.params[name] = value
+        return f":{name}"
+
+    def _positive_share(self, column: str, key: Any) -> str:
+        # ->> yields NULL for legacy array values instead of raising
+        return f"COALESCE(CAST({column} ->> {self._bind(key)} AS numeric), 0) > 0"
+
+    def _group(self, group: Dict) -> str:
+        joiner = str(group.get('operator', 'AND')).upper()
+        if joiner not in ('AND', 'OR'):
+            raise ValueError(f"Unsupported group operator: {joiner}")
+
+        parts = [
+            self._group(c) if 'conditions' in c else self._condition(c)
+            for c in group.get('conditions', [])
+        ]
+        if not parts:
+            return "TRUE"
+        return "(" + f" {joiner} ".join(parts) + ")"
+
+    def _condition(self, condition: Dict) -> str:
+        field = condition.get('field')
+        operator = condition.get('operator', 'eq')
+        value = condition.get('value')
+        if field not in FIELDS:
+            raise ValueError(f"Unsupported segment field: {field}")
+        column, kind = FIELDS[field]
+
+        if kind in ('number', 'text'):
+            if operator in COMPARISONS:
+                return f"{column} {COMPARISONS[operator]} {self._bind(value)}"
+            if operator == 'in':
+                return f"{column} = ANY({self._bind(list(value))})"
+
+        elif kind == 'timestamp':
+            if operator == 'within_days':
+                return f"{column} >= NOW() - make_interval(days => {self._bind(int(value))})"
+            if operator == 'older_than_days':
+                return f"{column} < NOW() - make_interval(days => {self._bind(int(value))})"
+
+        elif kind == 'jsonb_array':
+            if operator == 'contains':
+                return f"{column} @> CAST({self._bind(json.dumps([value]))} AS jsonb)"
+            if operator == 'contains_any':
+                return f"{column} ?| {self._bind(list(value))}"
+
+        elif kind == 'jsonb_object':
+            # {"field": "channel_preferences", "key": "email", "operator": "gte", "value": 0.5}
+            if operator == 'contains':
+                return f"({column} ->> {self._bind(value)}) IS NOT NULL"
+            if operator in COMPARISONS and condition.get('key'):
+                key = self._bind(condition['key'])
+                return f"CAST({column} ->> {key} AS numeric) {COMPARISONS[operator]} {self._bind(value)}"
+
+        elif kind == 'jsonb_object_key':
+            # Stored as {key: share} with every key present, so a key only
+            # "contains" when its share is positive
+            if operator == 'contains':
+                return self._positive_share(column, value)
+            if operator == 'contains_any':
+                shares = [self._positive_share(column, v) for v in value]
+                return "(" + " OR ".join(shares) + ")" if shares else "FALSE"
+            if operator in COMPARISONS and condition.get('key'):
+                key = self._bind(condition['key'])
+                return f"CAST({column} ->> {key} AS numeric) {COMPARISONS[operator]} {self._bind(value)}"
+
+        raise ValueError(f"Unsupported operator '{operator}' for field '{field}'")
+
+
 class SegmentEngine:
     """
     Manages user segments (dynamic and static).
+
+    Dynamic segments are evaluated together in one scan of person_insights and
+    only the membership diff is written: new members are inserted, departed
+    ones deleted, and each change is logged to segment_membership_events for
+    downstream triggers.
     """
-    
-    async def refresh_dynamic_segments(self, db_session: AsyncSession):
+
+    async def refresh_dynamic_segments(self, db_session: AsyncSession) -> Dict[str, Dict[str, int]]:
         """
         Re-evaluate membership for all dynamic segments.
+
+        Returns:
+            {segment_id: {"members": n, "added": n, "removed": n}}
         """
-        # 1. Fetch all dynamic segments
         segments = await self._fetch_dynamic_segments(db_session)
-        
+
+        predicates, params, segment_ids = [], {}, []
         for segment in segments:
-            await self._update_segment_membership(db_session, segment)
+            segment_id = str(segment['id'])
+            try:
+                predicate, segment_params = SegmentCompiler(f"s{len(segment_ids)}").compile(segment['definition'])
+            except (ValueError, TypeError) as e:
+                # Leave the segment's current members untouched
+                print(f"Skipping segment {segment_id}: {e}")
+                continue
+
+            sid = f"sid{len(segment_ids)}"
+            predicates.append(f"CASE WHEN {predicate} THEN CAST(:{sid} AS uuid) END")
+            params.update(segment_params)
+            params[sid] = segment_id
+            segment_ids.append(segment_id)
+
+        if not segment_ids:
+            return {}
+
+        await db_session.execute(text(CREATE_EVAL_TABLE_SQL))
+        await db_session.execute(text(EVALUATE_SQL.format(cases=",\n    ".join(predicates))), params)
+        await db_session.execute(text("ANALYZE segment_eval"))
+
+        summary = {sid: {"members": 0, "added": 0, "removed": 0} for sid in segment_ids}
+        for row in await db_session.execute(text(MEMBER_COUNTS_SQL)):
+            summary[str(row.segment_id)]["members"] = row.members
+        for row in await db_session.execute(text(ADD_MEMBERS_SQL)):
+            summary[str(row.segment_id)]["added"] = row.changed
+        for row in await db_session.execute(text(REMOVE_MEMBERS_SQL), {"segment_ids": segment_ids}):
+            summary[str(row.segment_id)]["removed"] = row.changed
+
+        await db_session.commit()
+
+        added = sum(s["added"] for s in summary.values())
+        removed = sum(s["removed"] for s in summary.values())
+        print(f"Refreshed {len(segment_ids)} dynamic segments: +{added} / -{removed} members")
+        return summary
 
     async def _fetch_dynamic_segments(self, db_session: AsyncSession) -> List[Dict]:
         result = await db_session.execute(
@@ -24,45 +243,21 @@ class SegmentEngine:
         )
         return [dict(row._mapping) for row in result]
 
-    async def _update_segment_membership(self, db_session: AsyncSession, segment: Dict):
-        segment_id = segment['id']
-        definition = segment['definition'] # e.g. {"min_warmth": 50, "activity_state": "active"}
-        
-        # Construct query based on definition (simplified DSL)
-        # In a real app, this would be a robust query builder
-        
-        query_parts = ["SELECT id FROM people p JOIN person_insights pi ON p.id = pi.person_id WHERE 1=1"]
-        params = {}
-        
-        if 'min_warmth' in definition:
-            query_parts.append("AND pi.warmth_score >= :min_warmth")
-            params['min_warmth'] = definition['min_warmth']
-            
-        if 'activity_state' in definition:
-            query_parts.append("AND pi.activity_state = :state")
-            params['state'] = definition['activity_state']
-            
-        query = " ".join(query_parts)
-        
-        # Execute query to find matching people
-        result = await db_session.execute(text(query), params)
-        matching_person_ids = [row.id for row in result]
-        
-        # Update segment_members table
-        # Full refresh strategy: Delete all and re-insert (or diff)
-        # For simplicity: Delete all for this segment and re-insert
-        
-        await db_session.execute(
-            text("DELETE FROM segment_members WHERE segment_id = :sid"),
-            {"sid": segment_id}
+    async def fetch_membership_changes(
+        self,
+        db_session: AsyncSession,
+        after_id: int = 0,
+        limit: int = 1000
+    ) -> List[Dict]:
+        """Membership change events recorded after `after_id`, oldest first."""
+        result = await db_session.execute(
+            text("""
+                SELECT id, segment_id, person_id, change, occurred_at
+                FROM segment_membership_events
+                WHERE id > :after_id
+                ORDER BY id
+                LIMIT :limit
+            """),
+            {"after_id": after_id, "limit": limit}
         )
-        
-        if matching_person_ids:
-            values = [{"sid": segment_id, "pid": pid} for pid in matching_person_ids]
-            await db_session.execute(
-                text("INSERT INTO segment_members (segment_id, person_id) VALUES (:sid, :pid)"),
-                values
-            )
-            
-        await db_session.commit()
-        print(f"Updated segment {segment_id}: {len(matching_person_ids)} members")
+        return [dict(row._mapping) for row in result]
@@ -0,0 +1,476 @@
+"""
+Remote Job Waiter
+Waits on remote jobs (Instagram containers, Sora / Blotato renders, ...)
+without a sleep loop per caller.
+
+Every pending job lives in one heap ordered by its next poll time; a single
+dispatcher task per event loop polls whatever is due, under a per-provider
+concurrency budget, and resolves the futures callers are awaiting. Polls back
+off exponentially with jitter, several callers waiting on the same job share
+its polls, and deadlines are enforced by the dispatcher.
+
+Webhooks shortcut the schedule: publish_job_event() (called from a webhook
+endpoint) makes every API worker poll that job immediately. The webhook body
+is never trusted as the result; it only triggers the poll.
+
+Deadlines, attempt counts and outcomes are kept in a small SQLite file, so a
+job awaited again after a restart or task retry keeps its original deadline
+and backoff instead of starting over.
+"""
+import asyncio
+import heapq
+import json
+import os
+import random
+import sqlite3
+import time
+import weakref
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import redis.asyncio as aioredis
+from loguru import logger
+
+from config import settings
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+TIMEOUT = "timeout"
+TERMINAL_STATES = {DONE, FAILED, TIMEOUT}
+
+JITTER = 0.2                   # +/- fraction applied to every poll interval
+STATE_RETENTION_SECONDS = 86400
+STATE_DB_PATH = Path(os.getenv("JOB_WAITER_DB", "data/job_waiter.sqlite3"))
+EVENT_CHANNEL = "job-waiter:events"
+RECONNECT_DELAY_SECONDS = 5
+
+
+@dataclass
+class JobPoll:
+    """One observation of a remote job"""
+    state: str = PENDING
+    result: Any = None
+    error: Optional[str] = None
+
+
+@dataclass
+class PollBudget:
+    """How hard a provider may be polled"""
+    initial_delay: float = 5.0     # First poll after the job is registered
+    base_interval: float = 5.0
+    max_interval: float = 60.0
+    factor: float = 1.5
+    max_concurrent: int = 4        # Polls in flight per provider, per process
+    max_errors: int = 5            # Consecutive poll exceptions before giving up
+    timeout: float = 600.0
+
+
+PROVIDER_BUDGETS: Dict[str, PollBudget] = {
+    'instagram': PollBudget(initial_delay=5, base_interval=5, max_interval=30, timeout=300),
+    'blotato': PollBudget(initial_delay=5, base_interval=5, max_interval=30, timeout=300),
+    'sora': PollBudget(initial_delay=10, base_interval=10, max_interval=60, timeout=600),
+}
+DEFAULT_BUDGET = PollBudget()
+
+PollFn = Callable[[], Awaitable[JobPoll]]
+
+
+# ============================================================================
+# STATE STORE
+# ============================================================================
+
+class JobStateStore:
+    """SQLite table of awaited jobs; writes are batched once per dispatcher tick"""
+
+    def __init__(self, path: Optional[Path] = None):
+        path = str(path or STATE_DB_PATH)
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS remote_jobs (
+                provider TEXT NOT NULL,
+                job_id TEXT NOT NULL,
+                state TEXT NOT NULL,
+                deadline REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (provider, job_id)
+            )
+        """)
+
+    def load(self, provider: str, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT state, deadline, attempts, error FROM remote_jobs WHERE provider = ? AND job_id = ?",
+            (provider, job_id),
+        ).fetchone()
+        if row is None:
+            return None
+        return {'state': row[0], 'deadline': row[1], 'attempts': row[2], 'error': row[3]}
+
+    def save_many(self, rows: List[Tuple]) -> None:
+        """rows: (provider, job_id, state, deadline, attempts, error, updated_at)"""
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                """
+                INSERT INTO remote_jobs (provider, job_id, state, deadline, attempts, error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (provider, job_id) DO UPDATE SET
+                    state = excluded.state, deadline = excluded.deadline,
+                    attempts = excluded.attempts, error = excluded.error,
+                    updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+
+    def pending(self) -> List[Tuple[str, str, float]]:
+        """Jobs that were still being awaited when the process stopped"""
+        return self.conn.execute(
+            "SELECT provider, job_id, deadline FROM remote_jobs WHERE state = ?", (PENDING,)
+        ).fetchall()
+
+    def prune(self, older_than: float) -> None:
+        self.conn.execute(
+            "DELETE FROM remote_jobs WHERE updated_at < ? AND (state != ? OR deadline < ?)",
+            (older_than, PENDING, older_than),
+        )
+
+
+# ============================================================================
+# WAITER
+# ============================================================================
+
+@dataclass
+class _PendingJob:
+    provider: str
+    job_id: str
+    poll: PollFn
+    budget: PollBudget
+    interval: float
+    deadline: float
+    attempts: int = 0
+    errors: int = 0
+    next_poll_at: float = 0.0
+    polling: bool = False
+    repoll: bool = False           # Event arrived while a poll was in flight
+    futures: List[asyncio.Future] = field(default_factory=list)
+
+
+class RemoteJobWaiter:
+    """Multiplexes polling for any number of remote jobs on one event loop"""
+
+    def __init__(
+        self,
+        store: Optional[JobStateStore] = None,
+        budgets: Optional[Dict[str, PollBudget]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store or JobStateStore()
+        self.budgets = budgets if budgets is not None else PROVIDER_BUDGETS
+        self.clock = clock
+        self._jobs: Dict[Tuple[str, str], _PendingJob] = {}
+        self._heap: List[Tuple[float, int, Tuple[str, str]]] = []
+        self._seq = 0
+        self._dirty: Dict[Tuple[str, str], Tuple] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._poll_tasks: set = set()
+        self.store.prune(self.clock() - STATE_RETENTION_SECONDS)
+
+    # ---- public API ------------------------------------------------------
+
+    async def wait(
+        self,
+        provider: str,
+        job_id: str,
+        poll: PollFn,
+        timeout: Optional[float] = None,
+        interval: Optional[float] = None,
+    ) -> JobPoll:
+        """
+        Wait until a remote job finishes, fails or runs out of time
+
+        Args:
+            provider: Budget key (see PROVIDER_BUDGETS)
+            job_id: Provider's job / container / video id
+            poll: async () -> JobPoll checking the job once
+            timeout: Seconds until the job is given up on (budget default)
+            interval: Base poll interval override (budget default)
+
+        Returns:
+            The terminal JobPoll; state is DONE, FAILED or TIMEOUT
+        """
+        key = (provider, job_id)
+        job = self._jobs.get(key)
+        if job is None:
+            job = self._register(provider, job_id, poll, timeout, interval)
+
+        future = asyncio.get_running_loop().create_future()
+        job.futures.append(future)
+        try:
+            return await future
+        finally:
+            if future in job.futures:
+                job.futures.remove(future)
+            if not job.futures and self._jobs.get(key) is job:
+                # Last caller gave up (cancelled); stop polling but keep the
+                # stored deadline so a retry resumes where this left off
+                del self._jobs[key]
+
+    def notify(self, provider: str, job_id: str) -> bool:
+        """Poll a job now (webhook / push notification). Returns whether it was pending here."""
+        job = self._jobs.get((provider, job_id))
+        if job is None:
+            return False
+        if job.polling:
+            job.repoll = True
+        else:
+            self._schedule(job, self.clock())
+        return True
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._jobs)
+
+    async def close(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        self._flush()
+
+    # ---- scheduling ------------------------------------------------------
+
+    def _register(self, provider, job_id, poll, timeout, interval) -> _PendingJob:
+        budget = self.budgets.get(provider, DEFAULT_BUDGET)
+        now = self.clock()
+        job = _PendingJob(
+            provider=provider,
+            job_id=job_id,
+            poll=poll,
+            budget=budget,
+            interval=interval or budget.base_interval,
+            deadline=now + (timeout or budget.timeout),
+        )
+        stored = self.store.load(provider, job_id)
+        if stored and stored['state'] == PENDING:
+            # Awaited before a restart/retry: keep its deadline and backoff
+            job.deadline = stored['deadline']
+            job.attempts = stored['attempts']
+            first_poll = now
+            logger.info(f"Resuming wait on {provider} job {job_id} (attempt {job.attempts})")
+        elif stored:
+            # Finished earlier; one poll fetches the result again
+            first_poll = now
+        else:
+            first_poll = now + min(budget.initial_delay, job.interval)
+
+        self._jobs[(provider, job_id)] = job
+        self._mark_dirty(job, PENDING)
+        self._schedule(job, first_poll)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._run())
+        return job
+
+    def _schedule(self, job: _PendingJob, at: float) -> None:
+        job.next_poll_at = min(at, job.deadline)
+        self._seq += 1
+        heapq.heappush(self._heap, (job.next_poll_at, self._seq, (job.provider, job.job_id)))
+        self._wakeup.set()
+
+    def _next_interval(self, job: _PendingJob) -> float:
+        delay = min(job.interval * job.budget.factor ** job.attempts, job.budget.max_interval)
+        return delay * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def _slot(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._slots:
+            budget = self.budgets.get(provider, DEFAULT_BUDGET)
+            self._slots[provider] = asyncio.Semaphore(budget.max_concurrent)
+        return self._slots[provider]
+
+    async def _run(self) -> None:
+        while self._jobs:
+            now = self.clock()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, key = heapq.heappop(self._heap)
+                job = self._jobs.get(key)
+                if job is None or job.polling or job.next_poll_at != due:
+                    continue   # Superseded heap entry
+                if now >= job.deadline:
+                    self._finish(job, JobPoll(TIMEOUT, error=f"No result after {job.attempts} polls"))
+                    continue
+                job.polling = True
+                task = asyncio.create_task(self._poll(job))
+                self._poll_tasks.add(task)
+                task.add_done_callback(self._poll_tasks.discard)
+
+            self._flush()
+            self._wakeup.clear()
+            delay = self._heap[0][0] - self.clock() if self._heap else None
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        self._heap.clear()
+        self._flush()
+
+    async def _poll(self, job: _PendingJob) -> None:
+        try:
+            async with self._slot(job.provider):
+                result = await job.poll()
+            job.errors = 0
+        except Exception as e:
+            job.errors += 1
+            logger.warning(f"Polling {job.provider} job {job.job_id} failed ({job.errors}/{job.budget.max_errors}): {e}")
+            result = JobPoll(FAILED, error=str(e)) if job.errors >= job.budget.max_errors else JobPoll(PENDING)
+        finally:
+            job.polling = False
+
+        if self._jobs.get((job.provider, job.job_id)) is not job:
+            return   # Every caller went away while we were polling
+        if result.state in TERMINAL_STATES:
+            self._finish(job, result)
+            self._wakeup.set()
+            return
+        job.attempts += 1
+        self._mark_dirty(job, PENDING)
+        self._schedule(job, self.clock() if job.repoll else self.clock() + self._next_interval(job))
+        job.repoll = False
+
+    def _finish(self, job: _PendingJob, result: JobPoll) -> None:
+        self._jobs.pop((job.provider, job.job_id), None)
+        self._mark_dirty(job, result.state, result.error)
+        if result.state != DONE:
+            logger.warning(f"{job.provider} job {job.job_id} {result.state}: {result.error}")
+        for future in job.futures:
+            if not future.done():
+                future.set_result(result)
+
+    def _mark_dirty(self, job: _PendingJob, state: str, error: Optional[str] = None) -> None:
+        self._dirty[(job.provider, job.job_id)] = (
+            job.provider, job.job_id, state, job.deadline, job.attempts, error, self.clock(),
+        )
+
+    def _flush(self) -> None:
+        if not self._dirty:
+            return
+        rows, self._dirty = list(self._dirty.values()), {}
+        try:
+            self.store.save_many(rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Job waiter state not saved: {e}")
+
+
+_waiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, RemoteJobWaiter]" = weakref.WeakKeyDictionary()
+
+
+def get_job_waiter() -> RemoteJobWaiter:
+    """The waiter for the running event loop"""
+    loop = asyncio.get_running_loop()
+    if loop not in _waiters:
+        _waiters[loop] = RemoteJobWaiter()
+    return _waiters[loop]
+
+
+async def video_job_poll(model, job_id: str) -> JobPoll:
+    """Poll a modules.ai VideoModelInterface job (sync client, run off the loop)"""
+    job = await asyncio.to_thread(model.get_status, job_id)
+    status = getattr(job.status, 'value', job.status)
+    if status == 'completed':
+        return JobPoll(DONE, result=job)
+    if status == 'failed':
+        return JobPoll(FAILED, result=job, error=job.error_message)
+    return JobPoll(PENDING, result=job)
+
+
+# ============================================================================
+# WEBHOOK EVENTS
+# ============================================================================
+
+_redis: Optional[aioredis.Redis] = None
+_listener_task: Optional[asyncio.Task] = None
+
+
+def _get_redis() -> aioredis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(settings.redis_url, decode_responses=True)
+    return _redis
+
+
+def handle_job_event(data: str) -> None:
+    """Apply an event received from the channel to every waiter in this process"""
+    try:
+        event = json.loads(data)
+        provider, job_id = event['provider'], str(event['job_id'])
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring malformed job event {data!r}: {e}")
+        return
+    for waiter in list(_waiters.values()):
+        waiter.notify(provider, job_id)
+
+
+async def publish_job_event(provider: str, job_id: str) -> None:
+    """
+    Tell every worker that a remote job changed (call from webhook handlers)
+
+    Applied locally first; if Redis is down other workers simply find out on
+    their next scheduled poll.
+    """
+    message = json.dumps({'provider': provider, 'job_id': job_id})
+    handle_job_event(message)
+    try:
+        await _get_redis().publish(EVENT_CHANNEL, message)
+    except Exception as e:
+        logger.warning(f"Job event not broadcast: {e}")
+
+
+async def _listen() -> None:
+    while True:
+        try:
+            pubsub = _get_redis().pubsub()
+            await pubsub.subscribe(EVENT_CHANNEL)
+            logger.info(f"Listening for remote job events on {EVENT_CHANNEL}")
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    handle_job_event(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Job event listener disconnected: {e}")
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+
+def start_job_event_listener() -> None:
+    """Subscribe this worker to remote job events (call on startup)"""
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_listen())
+
+
+async def stop_job_event_listener() -> None:
+    """Cancel the subscription, close the Redis client and flush waiter state"""
+    global _listener_task, _redis
+    if _listener_task:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+    for waiter in list(_waiters.values()):
+        await waiter.close()
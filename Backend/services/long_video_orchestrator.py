@@ -6,14 +6,32 @@ from typing import Optional, List, Dict, Any
 from dataclasses import dataclass, field
 from enum import Enum
 import asyncio
+import shutil
 import subprocess
 import tempfile
 import os
+import time
 import uuid
 from loguru import logger
 
 from modules.ai.video_model_factory import VideoModelFactory, create_video_model
 from modules.ai.video_model_interface import VideoGenerationRequest, VideoGenerationJob, VideoStatus
+from services.clip_cache import ClipCache, scene_key
+from services.instrumentation import record_subprocess
+from services.job_waiter import get_job_waiter, video_job_poll
+from services.stitch_planner import StitchUnsupported, stitch_clips
+
+CLIP_WIDTH, CLIP_HEIGHT = 1920, 1080
+
+# Providers tried, in order, when a scene's own provider fails
+FALLBACK_PROVIDERS: Dict[str, List[str]] = {
+    "sora": ["kling", "runway"],
+    "kling": ["hailuo", "runway"],
+    "runway": ["kling", "luma"],
+    "luma": ["kling", "runway"],
+    "pika": ["kling", "runway"],
+    "hailuo": ["kling", "runway"],
+}
 
 
 class LongVideoStatus(Enum):
@@ -60,6 +78,8 @@ class LongVideoJob:
     clip_paths: List[str] = field(default_factory=list)
     output_path: Optional[str] = None
     error_message: Optional[str] = None
+    scene_clips: Dict[int, str] = field(default_factory=dict)  # scene_number -> clip path
+    failed_scenes: Dict[int, str] = field(default_factory=dict)  # scene_number -> error
 
 
 class LongVideoOrchestrator:
@@ -75,12 +95,17 @@ class LongVideoOrchestrator:
         self,
         output_dir: str = "/tmp/long_videos",
         max_parallel_jobs: int = 3,
-        preferred_provider: str = "kling"
+        preferred_provider: str = "kling",
+        clip_cache: Optional[ClipCache] = None,
+        fallback_providers: Optional[Dict[str, List[str]]] = None
     ):
         self.output_dir = output_dir
         self.max_parallel_jobs = max_parallel_jobs
         self.preferred_provider = preferred_provider
         self.jobs: Dict[str, LongVideoJob] = {}
+        self.clip_cache = clip_cache or ClipCache()
+        self.fallback_providers = FALLBACK_PROVIDERS if fallback_providers is None else fallback_providers
+        self._scene_tasks: Dict[str, asyncio.Task] = {}
         
         os.makedirs(output_dir, exist_ok=True)
     
@@ -136,6 +161,9 @@ class LongVideoOrchestrator:
     async def generate(self, job_id: str) -> LongVideoJob:
         """
         Generate the complete long video
+
+        Safe to call again on a failed job: finished clips come from the
+        clip cache, so only the scenes that failed are regenerated.
         """
         job = self.jobs.get(job_id)
         if not job:
@@ -146,15 +174,10 @@ class LongVideoOrchestrator:
             job.status = LongVideoStatus.GENERATING_CLIPS
             await self._generate_all_clips(job)
             
-            # Step 2: Stitch clips together
+            # Step 2: Stitch clips together (and mux audio if provided)
             job.status = LongVideoStatus.STITCHING
             output_path = await self._stitch_clips(job)
             
-            # Step 3: Add audio if provided
-            if job.spec.audio_track or job.spec.background_music:
-                job.status = LongVideoStatus.ADDING_AUDIO
-                output_path = await self._add_audio(job, output_path)
-            
             job.output_path = output_path
             job.status = LongVideoStatus.COMPLETED
             job.progress = 100
@@ -176,60 +199,164 @@ class LongVideoOrchestrator:
         return job
     
     async def _generate_all_clips(self, job: LongVideoJob):
-        """Generate all video clips, potentially in parallel"""
-        total_scenes = len(job.spec.scenes)
+        """
+        Generate all video clips, potentially in parallel.
+
+        Every scene runs to completion even if others fail; successful clips
+        are kept (and cached) and the job only fails once all scenes have
+        settled, naming the scenes that need a retry.
+        """
+        scenes = job.spec.scenes
+        total_scenes = len(scenes)
+        job.failed_scenes = {}
         
         # Use semaphore to limit parallel generations
         semaphore = asyncio.Semaphore(self.max_parallel_jobs)
         
         async def generate_scene(scene: SceneSpec):
             async with semaphore:
-                return await self._generate_single_clip(scene)
+                clip_path = await self._generate_single_clip(scene)
+            job.scene_clips[scene.scene_number] = clip_path
+            job.progress = int(len(job.scene_clips) / total_scenes * 50)  # 0-50% for clip generation
+            return clip_path
         
         # Generate all clips
-        tasks = [generate_scene(scene) for scene in job.spec.scenes]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await asyncio.gather(*(generate_scene(scene) for scene in scenes), return_exceptions=True)
         
-        for i, result in enumerate(results):
+        for scene, result in zip(scenes, results):
             if isinstance(result, Exception):
-                logger.error(f"Scene {i} failed: {result}")
+                logger.error(f"Scene {scene.scene_number} failed: {result}")
+                job.failed_scenes[scene.scene_number] = str(result)
+            elif isinstance(result, BaseException):
                 raise result
-            
-            job.clip_paths.append(result)
-            job.progress = int((i + 1) / total_scenes * 50)  # 0-50% for clip generation
+        
+        if job.failed_scenes:
+            failed = ", ".join(str(n) for n in sorted(job.failed_scenes))
+            raise Exception(
+                f"{len(job.failed_scenes)}/{total_scenes} scenes failed (scenes {failed}); "
+                f"completed clips are cached and a retry regenerates only the failed scenes"
+            )
+        
+        job.clip_paths = [job.scene_clips[scene.scene_number] for scene in scenes]
     
     async def _generate_single_clip(self, scene: SceneSpec) -> str:
-        """Generate a single video clip"""
-        model = create_video_model(scene.provider)
-        
-        request = VideoGenerationRequest(
-            prompt=scene.prompt,
-            model=scene.provider,
-            duration_seconds=scene.duration_seconds,
-            width=1920,
-            height=1080,
-            input_image=scene.input_image
-        )
-        
-        # Start generation
-        clip_job = model.create_video(request)
+        """Return a cached clip for the scene, or generate (and cache) one"""
+        key = scene_key(scene, CLIP_WIDTH, CLIP_HEIGHT)
+        
+        cached = self.clip_cache.get(key)
+        if cached:
+            logger.info(f"Scene {scene.scene_number}: reusing cached clip")
+            return cached
+        
+        # Identical scenes in concurrent jobs share one generation
+        task = self._scene_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._produce_clip(scene, key))
+            self._scene_tasks[key] = task
+            task.add_done_callback(lambda _: self._scene_tasks.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def _produce_clip(self, scene: SceneSpec, key: str) -> str:
+        """Try the scene's provider, then its fallbacks, until one produces a clip"""
+        providers = [scene.provider] + [
+            p for p in self.fallback_providers.get(scene.provider, []) if p != scene.provider
+        ]
         
-        # Poll for completion
-        while clip_job.status not in [VideoStatus.COMPLETED, VideoStatus.FAILED]:
-            await asyncio.sleep(5)
-            clip_job = model.get_status(clip_job.job_id)
+        # A generation started by an earlier (crashed) attempt is awaited, not paid for again
+        resume = self.clip_cache.in_flight(key)
+        if resume and resume[0] in providers:
+            providers.remove(resume[0])
+            providers.insert(0, resume[0])
+        
+        errors = []
+        for provider in providers:
+            resume_job_id = resume[1] if resume and resume[0] == provider else None
+            try:
+                clip_path = await self._generate_with_provider(scene, provider, key, resume_job_id)
+            except Exception as e:
+                logger.warning(f"Scene {scene.scene_number} failed on {provider}: {e}")
+                self.clip_cache.mark_failed(key, provider, str(e))
+                errors.append(f"{provider}: {e}")
+                continue
+            return self.clip_cache.store(key, provider, clip_path)
+        
+        raise Exception(f"Clip generation failed ({'; '.join(errors)})")
+    
+    async def _generate_with_provider(
+        self,
+        scene: SceneSpec,
+        provider: str,
+        key: str,
+        resume_job_id: Optional[str] = None
+    ) -> str:
+        """Generate a single video clip on one provider"""
+        model = create_video_model(provider)
+        
+        if resume_job_id:
+            logger.info(f"Scene {scene.scene_number}: resuming {provider} job {resume_job_id}")
+            job_id = resume_job_id
+        else:
+            request = VideoGenerationRequest(
+                prompt=scene.prompt,
+                model=provider,
+                duration_seconds=scene.duration_seconds,
+                width=CLIP_WIDTH,
+                height=CLIP_HEIGHT,
+                input_image=scene.input_image
+            )
+            
+            # Start generation
+            clip_job = await asyncio.to_thread(model.create_video, request)
+            if clip_job.status == VideoStatus.FAILED:
+                raise Exception(f"Clip generation failed: {clip_job.error_message}")
+            job_id = clip_job.job_id
+            self.clip_cache.mark_generating(key, provider, job_id)
+        
+        # Wait for completion
+        outcome = await get_job_waiter().wait(provider, job_id, lambda: video_job_poll(model, job_id))
+        if outcome.result is None:
+            # Timed out, or the status endpoint kept erroring
+            raise Exception(f"Clip generation {outcome.state}: {outcome.error}")
+        clip_job = outcome.result
         
         if clip_job.status == VideoStatus.FAILED:
             raise Exception(f"Clip generation failed: {clip_job.error_message}")
         
         # Download clip
         output_path = os.path.join(self.output_dir, f"clip_{scene.scene_number}_{uuid.uuid4().hex[:8]}.mp4")
-        model.download_video(clip_job.job_id, output_path)
+        await asyncio.to_thread(model.download_video, job_id, output_path)
         
         return output_path
     
     async def _stitch_clips(self, job: LongVideoJob) -> str:
-        """Stitch all clips together using FFmpeg"""
+        """
+        Stitch clips by stream copy, re-encoding only outlier clips and the
+        transition segments (services/stitch_planner.py); audio is muxed in
+        the same pass. Falls back to a full re-encode if the clips can't be
+        planned.
+        """
+        output_path = os.path.join(self.output_dir, f"{job.job_id}_final.mp4")
+        audio_input = job.spec.audio_track or job.spec.background_music
+        transitions = [scene.transition for scene in job.spec.scenes[1:]]
+        workdir = os.path.join(self.output_dir, f"{job.job_id}_stitch")
+        
+        try:
+            await stitch_clips(job.clip_paths, transitions, output_path, workdir, audio_path=audio_input)
+            job.progress = 95 if audio_input else 80
+            return output_path
+        except StitchUnsupported as e:
+            logger.warning(f"Stream-copy stitch not possible, re-encoding: {e}")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        
+        output_path = await self._stitch_reencode(job)
+        if audio_input:
+            job.status = LongVideoStatus.ADDING_AUDIO
+            output_path = await self._add_audio(job, output_path)
+        return output_path
+    
+    async def _stitch_reencode(self, job: LongVideoJob) -> str:
+        """Stitch all clips together by re-encoding the whole video"""
         output_path = os.path.join(self.output_dir, f"{job.job_id}_final.mp4")
         
         # Create concat file
@@ -238,7 +365,7 @@ class LongVideoOrchestrator:
             for clip_path in job.clip_paths:
                 f.write(f"file '{clip_path}'\n")
         
-        # FFmpeg command for concatenation with crossfade
+        # FFmpeg command for concatenation
         cmd = [
             'ffmpeg', '-y',
             '-f', 'concat',
@@ -251,12 +378,14 @@ class LongVideoOrchestrator:
             output_path
         ]
         
+        started = time.perf_counter()
         process = await asyncio.create_subprocess_exec(
             *cmd,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
         stdout, stderr = await process.communicate()
+        record_subprocess('ffmpeg', time.perf_counter() - started, process.returncode)
         
         if process.returncode != 0:
             raise Exception(f"FFmpeg stitching failed: {stderr.decode()}")
@@ -286,12 +415,14 @@ class LongVideoOrchestrator:
             output_path
         ]
         
+        started = time.perf_counter()
         process = await asyncio.create_subprocess_exec(
             *cmd,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
         stdout, stderr = await process.communicate()
+        record_subprocess('ffmpeg', time.perf_counter() - started, process.returncode)
         
         if process.returncode != 0:
             logger.warning(f"Audio overlay failed, using video without audio: {stderr.decode()}")
@@ -338,8 +469,9 @@ class LongVideoOrchestrator:
         if not job:
             return
         
+        # Cached clips are shared across jobs and retries; only job-local files go
         for clip_path in job.clip_paths:
-            if os.path.exists(clip_path):
+            if os.path.exists(clip_path) and not self.clip_cache.owns(clip_path):
                 os.remove(clip_path)
         
         del self.jobs[job_id]
@@ -0,0 +1,25 @@
+"""
+Media probing helpers shared by the transcription and thumbnail pipelines
+"""
+import subprocess
+from pathlib import Path
+from typing import Optional, Union
+
+
+def probe_duration(path: Union[str, Path]) -> Optional[float]:
+    """Return media duration in seconds using ffprobe"""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1",
+                str(path)
+            ],
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+        return float(result.stdout.strip()) if result.returncode == 0 else None
+    except (subprocess.TimeoutExpired, ValueError, FileNotFoundError):
+        return None
@@ -0,0 +1,155 @@
+"""
+Metrics Polling Engine
+Fans metric fetches out across platform adapters with per-platform
+concurrency limits, batching posts for adapters that support it
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from connectors import registry as default_registry
+from connectors.base import ContentVariant as AdapterVariant, PlatformMetricSnapshot, SourceAdapter
+from database.models import ContentVariant
+
+
+# In-flight metric requests per platform, shared across adapters. Platforms
+# not listed fall back to the adapter's metrics_concurrency.
+PLATFORM_CONCURRENCY = {
+    'instagram': 4,
+    'facebook': 4,
+    'threads': 2,
+    'tiktok': 2,
+    'youtube': 4,
+    'linkedin': 2,
+    'twitter': 2,
+}
+
+
+class MetricsPoller:
+    """
+    Fetches the latest metrics for many variants at once
+
+    Variants are grouped by adapter and platform and split into batches of
+    the adapter's metrics_batch_size; batches run concurrently, bounded by a
+    semaphore per platform. Results are returned as content_metrics row dicts
+    ready for a bulk insert.
+    """
+
+    def __init__(
+        self,
+        adapter_registry=None,
+        platform_concurrency: Optional[Dict[str, int]] = None
+    ):
+        self.registry = adapter_registry or default_registry
+        self.platform_concurrency = {**PLATFORM_CONCURRENCY, **(platform_concurrency or {})}
+        self.stats = {'requests': 0, 'errors': 0, 'missing': 0}
+
+    async def fetch(self, variants: Sequence[ContentVariant]) -> List[Dict[str, Any]]:
+        """
+        Poll every published variant
+
+        Args:
+            variants: ContentVariant rows; unpublished ones are skipped
+
+        Returns:
+            One content_metrics row dict per variant that returned metrics
+        """
+        batches: Dict[Tuple[str, str], List[ContentVariant]] = defaultdict(list)
+        adapters: Dict[str, SourceAdapter] = {}
+        adapter_for_platform: Dict[str, Optional[SourceAdapter]] = {}
+
+        for variant in variants:
+            if not variant.platform_post_id:
+                continue
+            if variant.platform not in adapter_for_platform:
+                platform_adapters = self.registry.get_adapters_for_platform(variant.platform)
+                adapter_for_platform[variant.platform] = platform_adapters[0] if platform_adapters else None
+                if not platform_adapters:
+                    logger.warning(f"No enabled adapter for platform: {variant.platform}")
+            adapter = adapter_for_platform[variant.platform]
+            if adapter is None:
+                continue
+            adapters[adapter.id] = adapter
+            batches[(adapter.id, variant.platform)].append(variant)
+
+        semaphores = {
+            platform: asyncio.Semaphore(
+                self.platform_concurrency.get(platform, adapters[adapter_id].metrics_concurrency)
+            )
+            for adapter_id, platform in batches
+        }
+
+        tasks = []
+        for (adapter_id, platform), group in batches.items():
+            adapter = adapters[adapter_id]
+            size = max(1, adapter.metrics_batch_size)
+            for start in range(0, len(group), size):
+                tasks.append(self._fetch_batch(adapter, group[start:start + size], semaphores[platform]))
+
+        rows = []
+        for batch_rows in await asyncio.gather(*tasks):
+            rows.extend(batch_rows)
+        return rows
+
+    async def _fetch_batch(
+        self,
+        adapter: SourceAdapter,
+        variants: List[ContentVariant],
+        semaphore: asyncio.Semaphore
+    ) -> List[Dict[str, Any]]:
+        request = [
+            AdapterVariant(
+                content_id=str(v.content_id),
+                platform=v.platform,
+                platform_post_id=v.platform_post_id
+            )
+            for v in variants
+        ]
+
+        async with semaphore:
+            self.stats['requests'] += 1
+            try:
+                if len(request) == 1:
+                    snapshots = await adapter.fetch_metrics_for_variant(request[0])
+                else:
+                    snapshots = await adapter.fetch_metrics_for_variants(request)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error polling {len(variants)} {variants[0].platform} variants via {adapter.id}: {e}")
+                return []
+
+        by_post_id = {(s.platform, s.platform_post_id): s for s in snapshots}
+        rows = []
+        for variant in variants:
+            snapshot = by_post_id.get((variant.platform, variant.platform_post_id))
+            if snapshot is None and len(variants) == 1 and snapshots:
+                # Single-post fetches may not echo the post id back
+                snapshot = snapshots[0]
+            if snapshot is None:
+                self.stats['missing'] += 1
+                logger.debug(f"No metrics returned for variant {variant.id}")
+                continue
+            rows.append(self._metric_row(variant, snapshot))
+        return rows
+
+    @staticmethod
+    def _metric_row(variant: ContentVariant, snapshot: PlatformMetricSnapshot) -> Dict[str, Any]:
+        return {
+            'variant_id': variant.id,
+            'snapshot_at': snapshot.snapshot_at or datetime.utcnow(),
+            'views': snapshot.views,
+            'impressions': snapshot.impressions,
+            'reach': snapshot.reach,
+            'likes': snapshot.likes,
+            'comments': snapshot.comments,
+            'shares': snapshot.shares,
+            'saves': snapshot.saves,
+            'clicks': snapshot.clicks,
+            'watch_time_seconds': snapshot.watch_time_seconds,
+            'sentiment_score': None,  # Computed separately
+            'traffic_type': 'paid' if variant.is_paid else 'organic',
+            'raw_metadata': snapshot.raw_payload,
+        }
@@ -1,18 +1,30 @@
 """
 OAuth Integration Manager
 Phase 4: Handles OAuth flows for all social media platforms
+
+Tokens and pending states live in the encrypted token vault
+(services/token_vault.py), so connected accounts survive restarts and are
+shared by every worker; a background refresher renews tokens before they
+expire.
 """
 import os
+import asyncio
 import hashlib
 import secrets
 import time
-from datetime import datetime, timedelta
-from typing import Dict, Optional, List, Any
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, List, Any, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 from urllib.parse import urlencode
 import json
 import httpx
+from loguru import logger
+
+from services.token_vault import TokenRefresher, TokenVault, token_vault_configured
+
+# get_valid_token refreshes tokens with less than this left
+MIN_TOKEN_VALIDITY_SECONDS = 300
 
 
 class OAuthProvider(str, Enum):
@@ -61,6 +73,38 @@ class OAuthToken:
     def expires_in_seconds(self) -> int:
         delta = self.expires_at - datetime.utcnow()
         return max(0, int(delta.total_seconds()))
+    
+    @property
+    def expires_at_epoch(self) -> float:
+        return self.expires_at.replace(tzinfo=timezone.utc).timestamp()
+    
+    def to_payload(self) -> Dict[str, Any]:
+        """Serialized form stored (encrypted) in the token vault"""
+        return {
+            'provider': self.provider.value,
+            'access_token': self.access_token,
+            'refresh_token': self.refresh_token,
+            'token_type': self.token_type,
+            'expires_at': self.expires_at_epoch,
+            'scopes': self.scopes,
+            'user_id': self.user_id,
+            'username': self.username,
+            'raw_response': self.raw_response,
+        }
+    
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> 'OAuthToken':
+        return cls(
+            provider=OAuthProvider(payload['provider']),
+            access_token=payload['access_token'],
+            refresh_token=payload.get('refresh_token'),
+            token_type=payload.get('token_type', 'Bearer'),
+            expires_at=datetime.fromtimestamp(payload['expires_at'], timezone.utc).replace(tzinfo=None),
+            scopes=payload.get('scopes', []),
+            user_id=payload.get('user_id'),
+            username=payload.get('username'),
+            raw_response=payload.get('raw_response', {}),
+        )
 
 
 @dataclass
@@ -72,6 +116,26 @@ class OAuthState:
     redirect_after: str
     created_at: datetime
     code_verifier: Optional[str] = None  # For PKCE
+    
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            'provider': self.provider.value,
+            'user_id': self.user_id,
+            'redirect_after': self.redirect_after,
+            'created_at': self.created_at.isoformat(),
+            'code_verifier': self.code_verifier,
+        }
+    
+    @classmethod
+    def from_payload(cls, state_key: str, payload: Dict[str, Any]) -> 'OAuthState':
+        return cls(
+            state_key=state_key,
+            provider=OAuthProvider(payload['provider']),
+            user_id=payload['user_id'],
+            redirect_after=payload['redirect_after'],
+            created_at=datetime.fromisoformat(payload['created_at']),
+            code_verifier=payload.get('code_verifier'),
+        )
 
 
 class OAuthManager:
@@ -131,10 +195,9 @@ class OAuthManager:
         },
     }
     
-    def __init__(self):
+    def __init__(self, vault: Optional[TokenVault] = None):
         self.configs: Dict[OAuthProvider, OAuthConfig] = {}
-        self.tokens: Dict[str, OAuthToken] = {}  # user_id:provider -> token
-        self.pending_states: Dict[str, OAuthState] = {}
+        self.vault = vault or TokenVault()
         self._http_client: Optional[httpx.AsyncClient] = None
     
     async def get_client(self) -> httpx.AsyncClient:
@@ -183,7 +246,7 @@ class OAuthManager:
         digest = hashlib.sha256(verifier.encode()).digest()
         return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
     
-    def get_authorization_url(
+    async def get_authorization_url(
         self,
         provider: OAuthProvider,
         user_id: str,
@@ -214,8 +277,8 @@ class OAuthManager:
         if platform_config.get('uses_pkce'):
             code_verifier = self._generate_code_verifier()
         
-        # Store state
-        self.pending_states[state_key] = OAuthState(
+        # Store state (expires after the vault's state TTL)
+        oauth_state = OAuthState(
             state_key=state_key,
             provider=provider,
             user_id=user_id,
@@ -223,6 +286,7 @@ class OAuthManager:
             created_at=datetime.utcnow(),
             code_verifier=code_verifier
         )
+        await self.vault.save_state(state_key, oauth_state.to_payload())
         
         # Build authorization URL
         params = {
@@ -264,15 +328,12 @@ class OAuthManager:
         Returns:
             OAuthToken with access and refresh tokens
         """
-        # Validate state
-        if state not in self.pending_states:
+        # Validate state (single use; expired states are never returned)
+        state_payload = await self.vault.consume_state(state)
+        if state_payload is None:
             raise ValueError("Invalid or expired state parameter")
         
-        oauth_state = self.pending_states.pop(state)
-        
-        # Check state is not too old (10 minute expiry)
-        if datetime.utcnow() - oauth_state.created_at > timedelta(minutes=10):
-            raise ValueError("State parameter expired")
+        oauth_state = OAuthState.from_payload(state, state_payload)
         
         if oauth_state.provider != provider:
             raise ValueError("Provider mismatch")
@@ -326,28 +387,24 @@ class OAuthManager:
         )
         
         # Store token
-        token_key = f"{oauth_state.user_id}:{provider.value}"
-        self.tokens[token_key] = token
+        await self.vault.save_token(oauth_state.user_id, provider.value, token.to_payload(), token.expires_at_epoch)
         
         return token
     
-    async def refresh_token(
+    async def _request_refresh(
         self,
-        user_id: str,
-        provider: OAuthProvider
-    ) -> OAuthToken:
-        """Refresh an expired access token"""
-        token_key = f"{user_id}:{provider.value}"
-        
-        if token_key not in self.tokens:
-            raise ValueError("No token found for user/provider")
-        
-        current_token = self.tokens[token_key]
+        provider: OAuthProvider,
+        payload: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], float]:
+        """Call the provider's refresh endpoint; returns the new vault payload and expiry"""
+        current_token = OAuthToken.from_payload(payload)
         
         if not current_token.refresh_token:
             raise ValueError("No refresh token available")
         
-        config = self.configs[provider]
+        config = self.configs.get(provider)
+        if config is None:
+            raise ValueError(f"Provider {provider} not configured")
         
         if not config.refresh_url:
             raise ValueError("Refresh not supported for this provider")
@@ -382,8 +439,22 @@ class OAuthManager:
             raw_response=token_response
         )
         
-        self.tokens[token_key] = new_token
-        return new_token
+        return new_token.to_payload(), new_token.expires_at_epoch
+    
+    def _refresh_fn(self, provider: OAuthProvider):
+        return lambda payload: self._request_refresh(provider, payload)
+    
+    async def refresh_token(
+        self,
+        user_id: str,
+        provider: OAuthProvider
+    ) -> OAuthToken:
+        """
+        Refresh an access token. Only one worker refreshes a given token at
+        a time; others wait for and return its result.
+        """
+        payload = await self.vault.refresh(user_id, provider.value, self._refresh_fn(provider))
+        return OAuthToken.from_payload(payload)
     
     async def get_valid_token(
         self,
@@ -391,17 +462,21 @@ class OAuthManager:
         provider: OAuthProvider
     ) -> OAuthToken:
         """Get a valid (non-expired) token, refreshing if necessary"""
-        token_key = f"{user_id}:{provider.value}"
+        stored = await self.vault.get_token(user_id, provider.value)
         
-        if token_key not in self.tokens:
+        if stored is None:
             raise ValueError("No token found for user/provider")
         
-        token = self.tokens[token_key]
+        token = OAuthToken.from_payload(stored.payload)
         
-        # Refresh if expired or expiring soon (within 5 minutes)
-        if token.expires_in_seconds < 300:
+        # Refresh if expired or expiring soon (the background refresher normally gets there first)
+        if token.expires_in_seconds < MIN_TOKEN_VALIDITY_SECONDS:
             if token.refresh_token:
-                token = await self.refresh_token(user_id, provider)
+                payload = await self.vault.refresh(
+                    user_id, provider.value, self._refresh_fn(provider),
+                    min_valid_seconds=MIN_TOKEN_VALIDITY_SECONDS,
+                )
+                token = OAuthToken.from_payload(payload)
             else:
                 raise ValueError("Token expired and cannot be refreshed")
         
@@ -413,12 +488,12 @@ class OAuthManager:
         provider: OAuthProvider
     ) -> bool:
         """Revoke tokens for a user/provider"""
-        token_key = f"{user_id}:{provider.value}"
+        stored = await self.vault.get_token(user_id, provider.value)
         
-        if token_key not in self.tokens:
+        if stored is None:
             return True  # Already revoked
         
-        token = self.tokens[token_key]
+        token = OAuthToken.from_payload(stored.payload)
         config = self.configs.get(provider)
         
         if config and config.revoke_url:
@@ -431,25 +506,56 @@ class OAuthManager:
             except Exception:
                 pass  # Best effort revocation
         
-        del self.tokens[token_key]
+        await self.vault.delete_token(user_id, provider.value)
         return True
     
-    def get_connected_accounts(self, user_id: str) -> List[Dict[str, Any]]:
+    async def get_connected_accounts(self, user_id: str) -> List[Dict[str, Any]]:
         """Get list of connected OAuth accounts for a user"""
         accounts = []
         
-        for key, token in self.tokens.items():
-            if key.startswith(f"{user_id}:"):
-                accounts.append({
-                    'provider': token.provider.value,
-                    'username': token.username,
-                    'connected': True,
-                    'expires_at': token.expires_at.isoformat(),
-                    'scopes': token.scopes,
-                })
+        for _, payload in await self.vault.list_tokens(user_id):
+            token = OAuthToken.from_payload(payload)
+            accounts.append({
+                'provider': token.provider.value,
+                'username': token.username,
+                'connected': True,
+                'expires_at': token.expires_at.isoformat(),
+                'scopes': token.scopes,
+            })
         
         return accounts
+    
+    def create_refresher(self, **kwargs) -> TokenRefresher:
+        """Background refresher renewing this manager's tokens ahead of expiry"""
+        return TokenRefresher(
+            self.vault,
+            lambda user_id, provider: self._refresh_fn(OAuthProvider(provider)),
+            **kwargs
+        )
 
 
 # Singleton instance
 oauth_manager = OAuthManager()
+
+_refresher_task: Optional[asyncio.Task] = None
+
+
+def start_token_refresher() -> None:
+    """Renew stored tokens in the background (call on startup)"""
+    global _refresher_task
+    if not token_vault_configured():
+        logger.info("TOKEN_VAULT_KEY not set; OAuth token refresher not started")
+        return
+    if _refresher_task is None or _refresher_task.done():
+        _refresher_task = asyncio.create_task(oauth_manager.create_refresher().run())
+
+
+async def stop_token_refresher() -> None:
+    global _refresher_task
+    if _refresher_task:
+        _refresher_task.cancel()
+        try:
+            await _refresher_task
+        except asyncio.CancelledError:
+            pass
+        _refresher_task = None
@@ -6,7 +6,8 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
-import statistics
+import math
+import numpy as np
 
 class DayOfWeek(int, Enum):
     MONDAY = 0
@@ -39,10 +40,85 @@ class OptimalTimeRecommendation:
     reason: str
 
 
+class EngagementSurface:
+    """
+    Recency-weighted engagement per (day of week, hour), as 7x24 arrays
+    updated in O(1) per post.
+
+    Uses forward decay: a post at time t is weighted 2^((t - landmark) / half_life),
+    so older posts count less and nothing already stored has to be
+    re-weighted when a new post arrives. Each slot's mean is
+    score_sum / weight_sum. half_life_days=None weights every post equally.
+    """
+
+    # Re-base the landmark before weights get large enough to lose precision
+    MAX_EXPONENT = 64
+
+    def __init__(self, half_life_days: Optional[float] = 30.0):
+        self.half_life = half_life_days * 86400 if half_life_days else None
+        self.landmark: Optional[float] = None
+        self.score_sum = np.zeros((7, 24))
+        self.weight_sum = np.zeros((7, 24))
+        self.counts = np.zeros((7, 24), dtype=np.int64)
+        self.samples = 0
+        self.version = 0
+        self._scores: Optional[np.ndarray] = None
+        self._scores_version = -1
+
+    def _weight(self, timestamp: float) -> float:
+        if self.half_life is None:
+            return 1.0
+        if self.landmark is None:
+            self.landmark = timestamp
+        exponent = (timestamp - self.landmark) / self.half_life
+        if exponent > self.MAX_EXPONENT:
+            # Shift the landmark forward; the means are unchanged by the rescale
+            scale = 2.0 ** -exponent
+            self.score_sum *= scale
+            self.weight_sum *= scale
+            self.landmark = timestamp
+            exponent = 0.0
+        return 2.0 ** exponent
+
+    def add(self, posted_at: datetime, engagement: float):
+        day, hour = posted_at.weekday(), posted_at.hour
+        weight = self._weight(posted_at.timestamp())
+        self.score_sum[day, hour] += engagement * weight
+        self.weight_sum[day, hour] += weight
+        self.counts[day, hour] += 1
+        self.samples += 1
+        self.version += 1
+
+    def means(self) -> np.ndarray:
+        """Weighted mean engagement per slot (NaN where there's no data)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.counts > 0, self.score_sum / self.weight_sum, np.nan)
+
+    def effective_samples(self, at: datetime) -> float:
+        """Posts remaining after decay to `at` (the sample count without decay)"""
+        if self.half_life is None or self.landmark is None:
+            return float(self.samples)
+        age = (at.timestamp() - self.landmark) / self.half_life
+        return float(self.weight_sum.sum() * 2.0 ** -age)
+
+    def scores(self, defaults: np.ndarray) -> np.ndarray:
+        """Final 0-100 score per slot: 70% history, 30% default where there's history"""
+        if self._scores_version != self.version:
+            means = self.means()
+            blended = np.where(np.isnan(means), defaults, means * 0.7 + defaults * 0.3)
+            self._scores = np.clip(blended, 0, 100)
+            self._scores_version = self.version
+        return self._scores
+
+
 class OptimalTimingService:
     """
     Analyzes historical engagement data to suggest optimal posting times.
     Uses platform-specific patterns and user's historical performance.
+
+    History lives in EngagementSurfaces keyed by (platform, account_id); the
+    platform-wide surface (account_id None) receives every post. Requests
+    read a cached 7x24 score matrix, so their cost doesn't grow with history.
     """
     
     # Default engagement patterns by platform (hour -> relative score)
@@ -114,9 +190,11 @@ class OptimalTimingService:
         'threads': 1.1,     # Better on weekends
     }
 
-    def __init__(self):
-        self.historical_data: Dict[str, List[TimeSlot]] = {}
+    def __init__(self, half_life_days: Optional[float] = 30.0):
+        self.half_life_days = half_life_days
+        self.surfaces: Dict[Tuple[str, Optional[str]], EngagementSurface] = {}
         self.user_timezone: str = 'America/New_York'
+        self._defaults: Dict[str, np.ndarray] = {}
     
     def set_timezone(self, timezone: str):
         """Set user's timezone for recommendations"""
@@ -129,24 +207,20 @@ class OptimalTimingService:
         views: int,
         likes: int,
         comments: int = 0,
-        shares: int = 0
+        shares: int = 0,
+        account_id: Optional[str] = None
     ):
         """Add historical post performance data"""
-        if platform not in self.historical_data:
-            self.historical_data[platform] = []
-        
-        # Calculate engagement score
+        platform_lower = platform.lower()
         engagement = self._calculate_engagement(views, likes, comments, shares)
         
-        slot = TimeSlot(
-            hour=posted_at.hour,
-            day_of_week=DayOfWeek(posted_at.weekday()),
-            engagement_score=engagement,
-            avg_views=views,
-            avg_likes=likes,
-            sample_size=1
-        )
-        self.historical_data[platform].append(slot)
+        keys = [(platform_lower, None)]
+        if account_id is not None:
+            keys.append((platform_lower, account_id))
+        for key in keys:
+            if key not in self.surfaces:
+                self.surfaces[key] = EngagementSurface(self.half_life_days)
+            self.surfaces[key].add(posted_at, engagement)
     
     def _calculate_engagement(
         self,
@@ -169,40 +243,44 @@ class OptimalTimingService:
         # Normalize to 0-100 scale (assuming 10% is excellent)
         return min(100, engagement_rate * 10)
     
-    def get_platform_score(self, platform: str, hour: int, day: DayOfWeek) -> float:
-        """Get engagement score for a specific time slot"""
+    def _default_scores(self, platform_lower: str) -> np.ndarray:
+        """7x24 default pattern with the weekend modifier applied (not yet clipped)"""
+        if platform_lower not in self._defaults:
+            pattern = self.DEFAULT_PATTERNS.get(platform_lower, {})
+            hours = np.array([pattern.get(hour, 50) for hour in range(24)], dtype=float)
+            scores = np.tile(hours, (7, 1))
+            scores[[DayOfWeek.SATURDAY, DayOfWeek.SUNDAY]] *= self.WEEKEND_MODIFIERS.get(platform_lower, 1.0)
+            self._defaults[platform_lower] = scores
+        return self._defaults[platform_lower]
+    
+    def _surface(self, platform_lower: str, account_id: Optional[str]) -> Optional[EngagementSurface]:
+        """The account's surface, falling back to the platform-wide one"""
+        return self.surfaces.get((platform_lower, account_id)) or self.surfaces.get((platform_lower, None))
+    
+    def score_matrix(self, platform: str, account_id: Optional[str] = None) -> np.ndarray:
+        """Engagement score (0-100) for every (day of week, hour) slot"""
         platform_lower = platform.lower()
-        
-        # Get base score from default patterns
-        if platform_lower in self.DEFAULT_PATTERNS:
-            base_score = self.DEFAULT_PATTERNS[platform_lower].get(hour, 50)
-        else:
-            base_score = 50
-        
-        # Apply weekend modifier
-        is_weekend = day in (DayOfWeek.SATURDAY, DayOfWeek.SUNDAY)
-        if is_weekend and platform_lower in self.WEEKEND_MODIFIERS:
-            base_score *= self.WEEKEND_MODIFIERS[platform_lower]
-        
-        # Blend with historical data if available
-        if platform_lower in self.historical_data:
-            historical_slots = [
-                s for s in self.historical_data[platform_lower]
-                if s.hour == hour and s.day_of_week == day
-            ]
-            if historical_slots:
-                historical_avg = statistics.mean(s.engagement_score for s in historical_slots)
-                # Weight: 70% historical, 30% default
-                base_score = (historical_avg * 0.7) + (base_score * 0.3)
-        
-        return min(100, max(0, base_score))
+        defaults = self._default_scores(platform_lower)
+        surface = self._surface(platform_lower, account_id)
+        return surface.scores(defaults) if surface else np.clip(defaults, 0, 100)
+    
+    def get_platform_score(
+        self,
+        platform: str,
+        hour: int,
+        day: DayOfWeek,
+        account_id: Optional[str] = None
+    ) -> float:
+        """Get engagement score for a specific time slot"""
+        return float(self.score_matrix(platform, account_id)[day, hour])
     
     def get_optimal_times(
         self,
         platform: str,
         start_date: Optional[datetime] = None,
         num_slots: int = 5,
-        min_gap_hours: int = 4
+        min_gap_hours: int = 4,
+        account_id: Optional[str] = None
     ) -> List[OptimalTimeRecommendation]:
         """
         Get optimal posting times for the next week.
@@ -212,67 +290,51 @@ class OptimalTimingService:
             start_date: Starting date (default: now)
             num_slots: Number of time slots to return
             min_gap_hours: Minimum hours between recommendations
+            account_id: Use this account's history where it has any
         
         Returns:
             List of optimal time recommendations sorted by score
         """
         start = start_date or datetime.utcnow()
-        recommendations = []
-        
-        # Score all time slots for the next 7 days
-        all_slots: List[Tuple[datetime, float]] = []
+        first_day = start.replace(hour=0, minute=0, second=0, microsecond=0)
         
-        for day_offset in range(7):
-            check_date = start + timedelta(days=day_offset)
-            day_of_week = DayOfWeek(check_date.weekday())
-            
-            for hour in range(24):
-                slot_time = check_date.replace(hour=hour, minute=0, second=0, microsecond=0)
-                
-                # Skip past times
-                if slot_time <= start:
-                    continue
-                
-                score = self.get_platform_score(platform, hour, day_of_week)
-                all_slots.append((slot_time, score))
+        # The next 7 calendar days as 168 hourly slots, in time order
+        matrix = self.score_matrix(platform, account_id)
+        scores = np.roll(matrix, -first_day.weekday(), axis=0).ravel()
         
-        # Sort by score descending
-        all_slots.sort(key=lambda x: x[1], reverse=True)
+        # Skip past times
+        elapsed = int((start - first_day) // timedelta(hours=1)) + 1
+        scores[:elapsed] = -np.inf
         
-        # Select top slots with minimum gap
-        selected_times: List[datetime] = []
+        # Confidence based on how much (recent) history backs the scores
+        surface = self._surface(platform.lower(), account_id)
+        sample_size = surface.effective_samples(start) if surface else 0
         
-        for slot_time, score in all_slots:
-            # Check gap from all selected times
-            too_close = False
-            for selected in selected_times:
-                gap = abs((slot_time - selected).total_seconds() / 3600)
-                if gap < min_gap_hours:
-                    too_close = True
-                    break
+        # Best remaining slot, then block its neighbours within the gap;
+        # argmax takes the earliest slot on ties
+        reach = max(0, math.ceil(min_gap_hours) - 1)
+        recommendations = []
+        while len(recommendations) < num_slots:
+            index = int(np.argmax(scores))
+            score = float(scores[index])
+            if score == -np.inf:
+                break
+            scores[max(0, index - reach):index + reach + 1] = -np.inf
+            
+            slot_time = first_day + timedelta(hours=index)
+            confidence = score / 100
+            if sample_size > 20:
+                confidence = min(0.95, confidence * 1.2)
+            elif sample_size > 5:
+                confidence = min(0.85, confidence * 1.1)
             
-            if not too_close:
-                selected_times.append(slot_time)
-                
-                # Determine confidence based on score and data availability
-                confidence = score / 100
-                if platform.lower() in self.historical_data:
-                    sample_size = len(self.historical_data[platform.lower()])
-                    if sample_size > 20:
-                        confidence = min(0.95, confidence * 1.2)
-                    elif sample_size > 5:
-                        confidence = min(0.85, confidence * 1.1)
-                
-                recommendations.append(OptimalTimeRecommendation(
-                    datetime=slot_time,
-                    platform=platform,
-                    confidence=confidence,
-                    expected_engagement=score,
-                    reason=self._generate_reason(slot_time, platform, score)
-                ))
-                
-                if len(recommendations) >= num_slots:
-                    break
+            recommendations.append(OptimalTimeRecommendation(
+                datetime=slot_time,
+                platform=platform,
+                confidence=confidence,
+                expected_engagement=score,
+                reason=self._generate_reason(slot_time, platform, score)
+            ))
         
         return recommendations
     
@@ -310,13 +372,18 @@ class OptimalTimingService:
         
         return f"Recommended for {day_name}: " + ", ".join(reasons[:2])
     
-    def get_best_time_today(self, platform: str) -> Optional[OptimalTimeRecommendation]:
+    def get_best_time_today(
+        self,
+        platform: str,
+        account_id: Optional[str] = None
+    ) -> Optional[OptimalTimeRecommendation]:
         """Get single best remaining time slot for today"""
         recommendations = self.get_optimal_times(
             platform=platform,
             start_date=datetime.utcnow(),
             num_slots=1,
-            min_gap_hours=0
+            min_gap_hours=0,
+            account_id=account_id
         )
         
         if recommendations:
@@ -332,7 +399,8 @@ class OptimalTimingService:
         self,
         platform: str,
         posts_per_day: int = 2,
-        preferred_hours: Optional[List[int]] = None
+        preferred_hours: Optional[List[int]] = None,
+        account_id: Optional[str] = None
     ) -> List[OptimalTimeRecommendation]:
         """
         Generate an optimal weekly posting schedule.
@@ -341,6 +409,7 @@ class OptimalTimingService:
             platform: Target platform
             posts_per_day: Number of posts per day
             preferred_hours: Optional list of preferred hours to consider
+            account_id: Use this account's history where it has any
         
         Returns:
             List of recommendations for the week
@@ -358,7 +427,8 @@ class OptimalTimingService:
                 platform=platform,
                 start_date=day_start,
                 num_slots=posts_per_day * 2,  # Get more to filter
-                min_gap_hours=4
+                min_gap_hours=4,
+                account_id=account_id
             )
             
             # Filter to this day and apply preferred hours
@@ -11,6 +11,7 @@ from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Person, PersonEvent, PersonInsight
+from services.intelligence.person_recompute import PersonRecomputeEngine
 
 
 class PersonLensComputer:
@@ -198,31 +199,27 @@ class PersonLensComputer:
         
         return round(warmth, 3)
     
-    async def recompute_all_active_people(self) -> int:
+    async def recompute_all_active_people(
+        self,
+        workspace_id: Optional[UUID] = None,
+        incremental: bool = False
+    ) -> int:
         """
         Recompute lens for all recently active people
         
+        Runs the batch engine: events are loaded and scored per chunk of
+        people rather than per person, and written with one upsert per chunk.
+        
+        Args:
+            workspace_id: Limit to one workspace
+            incremental: Only people with new events since the last run
+            
         Returns:
             Number of people updated
         """
-        # Get people with events in last 90 days
-        since = datetime.utcnow() - timedelta(days=90)
-        result = await self.db.execute(
-            select(PersonEvent.person_id)
-            .where(PersonEvent.occurred_at >= since)
-            .distinct()
+        engine = PersonRecomputeEngine(self.db, scorer='lens')
+        stats = await engine.run(
+            workspace_id=str(workspace_id) if workspace_id else None,
+            incremental=incremental
         )
-        person_ids = [row[0] for row in list(result.fetchall())]  # Convert to list immediately
-        
-        logger.info(f"Recomputing lens for {len(person_ids)} active people")
-        
-        updated = 0
-        for person_id in person_ids:
-            try:
-                await self.compute_lens_for_person(person_id)
-                updated += 1
-            except Exception as e:
-                logger.error(f"Failed to compute lens for {person_id}: {e}")
-        
-        logger.success(f"Updated {updated}/{len(person_ids)} person lenses")
-        return updated
+        return stats["people"]
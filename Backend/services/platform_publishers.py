@@ -16,6 +16,16 @@ import logging
 import json
 import hashlib
 
+from services.job_waiter import DONE, FAILED, JobPoll, get_job_waiter
+from services.resumable_upload import (
+    ContentRangeProtocol,
+    GoogleResumableProtocol,
+    ResumableUploader,
+    UploadError,
+    UploadResult,
+    upload_key,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -103,6 +113,18 @@ class BasePlatformPublisher(ABC):
             self._client = httpx.AsyncClient(timeout=120.0)
         return self._client
     
+    async def _resumable_upload(self, request: PublishRequest, protocol, start_session, headers=None) -> UploadResult:
+        """Stream request.media_path in chunks, resuming a stored session for the same file"""
+        client = await self._get_client()
+        return await ResumableUploader(client).upload(
+            key=upload_key(self.platform.value, request.account_id, request.media_path),
+            platform=self.platform.value,
+            file_path=request.media_path,
+            protocol=protocol,
+            start_session=start_session,
+            headers=headers,
+        )
+    
     async def close(self):
         """Close HTTP client"""
         if self._client:
@@ -130,53 +152,34 @@ class TikTokPublisher(BasePlatformPublisher):
             
             client = await self._get_client()
             
-            # Step 1: Initialize upload
-            init_response = await client.post(
-                f"{self.API_BASE}/post/publish/inbox/video/init/",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "source_info": {
-                        "source": "FILE_UPLOAD",
-                        "video_size": os.path.getsize(request.media_path),
-                    },
-                },
-            )
+            protocol = ContentRangeProtocol()
             
-            if init_response.status_code != 200:
-                return PublishResult(
-                    success=False,
-                    status=PublishStatus.FAILED,
-                    platform=self.platform,
-                    error_message=f"Init failed: {init_response.text}",
+            # Step 1: Initialize upload (skipped when resuming a stored session)
+            async def start_session(total_bytes: int, chunk_size: int):
+                init_response = await client.post(
+                    f"{self.API_BASE}/post/publish/inbox/video/init/",
+                    headers={
+                        "Authorization": f"Bearer {access_token}",
+                        "Content-Type": "application/json",
+                    },
+                    json={
+                        "source_info": {
+                            "source": "FILE_UPLOAD",
+                            "video_size": total_bytes,
+                            "chunk_size": chunk_size,
+                            "total_chunk_count": protocol.chunk_count(total_bytes, chunk_size),
+                        },
+                    },
                 )
+                if init_response.status_code != 200:
+                    raise UploadError(f"Init failed: {init_response.text}")
+                
+                init_data = init_response.json().get("data", {})
+                return init_data.get("upload_url"), {"publish_id": init_data.get("publish_id")}
             
-            init_data = init_response.json()
-            upload_url = init_data.get("data", {}).get("upload_url")
-            publish_id = init_data.get("data", {}).get("publish_id")
-            
-            # Step 2: Upload video
-            with open(request.media_path, "rb") as f:
-                video_data = f.read()
-            
-            upload_response = await client.put(
-                upload_url,
-                headers={
-                    "Content-Type": "video/mp4",
-                    "Content-Range": f"bytes 0-{len(video_data)-1}/{len(video_data)}",
-                },
-                content=video_data,
-            )
-            
-            if upload_response.status_code not in [200, 201]:
-                return PublishResult(
-                    success=False,
-                    status=PublishStatus.FAILED,
-                    platform=self.platform,
-                    error_message=f"Upload failed: {upload_response.text}",
-                )
+            # Step 2: Upload video in chunks
+            upload = await self._resumable_upload(request, protocol, start_session)
+            publish_id = upload.extra.get("publish_id")
             
             # Step 3: Publish
             caption = f"{request.description}\n\n{' '.join(request.hashtags)}"
@@ -280,58 +283,38 @@ class YouTubePublisher(BasePlatformPublisher):
                 if "#Shorts" not in video_metadata["snippet"]["title"]:
                     video_metadata["snippet"]["title"] += " #Shorts"
             
-            # Upload video
-            with open(request.media_path, "rb") as f:
-                video_data = f.read()
-            
-            # Resumable upload
-            init_response = await client.post(
-                f"{self.UPLOAD_URL}?uploadType=resumable&part=snippet,status",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Content-Type": "application/json",
-                    "X-Upload-Content-Length": str(len(video_data)),
-                    "X-Upload-Content-Type": "video/*",
-                },
-                json=video_metadata,
-            )
-            
-            if init_response.status_code != 200:
-                return PublishResult(
-                    success=False,
-                    status=PublishStatus.FAILED,
-                    platform=self.platform,
-                    error_message=f"Upload init failed: {init_response.text}",
+            # Resumable upload (init skipped when resuming a stored session)
+            async def start_session(total_bytes: int, chunk_size: int):
+                init_response = await client.post(
+                    f"{self.UPLOAD_URL}?uploadType=resumable&part=snippet,status",
+                    headers={
+                        "Authorization": f"Bearer {access_token}",
+                        "Content-Type": "application/json",
+                        "X-Upload-Content-Length": str(total_bytes),
+                        "X-Upload-Content-Type": "video/*",
+                    },
+                    json=video_metadata,
                 )
+                if init_response.status_code != 200:
+                    raise UploadError(f"Upload init failed: {init_response.text}")
+                return init_response.headers.get("Location"), {}
             
-            upload_url = init_response.headers.get("Location")
-            
-            # Upload video content
-            upload_response = await client.put(
-                upload_url,
-                headers={"Content-Type": "video/*"},
-                content=video_data,
+            upload = await self._resumable_upload(
+                request,
+                GoogleResumableProtocol(),
+                start_session,
+                headers={"Authorization": f"Bearer {access_token}", "Content-Type": "video/*"},
             )
-            
-            if upload_response.status_code in [200, 201]:
-                video_data = upload_response.json()
-                video_id = video_data.get("id")
-                
-                return PublishResult(
-                    success=True,
-                    status=PublishStatus.PUBLISHED,
-                    platform=self.platform,
-                    post_id=video_id,
-                    post_url=f"https://youtube.com/watch?v={video_id}",
-                    published_at=datetime.now().isoformat(),
-                    metadata={"video_id": video_id, "is_short": is_short},
-                )
+            video_id = upload.response.json().get("id")
             
             return PublishResult(
-                success=False,
-                status=PublishStatus.FAILED,
+                success=True,
+                status=PublishStatus.PUBLISHED,
                 platform=self.platform,
-                error_message=f"Upload failed: {upload_response.text}",
+                post_id=video_id,
+                post_url=f"https://youtube.com/watch?v={video_id}",
+                published_at=datetime.now().isoformat(),
+                metadata={"video_id": video_id, "is_short": is_short},
             )
             
         except Exception as e:
@@ -457,8 +440,8 @@ class InstagramPublisher(BasePlatformPublisher):
         
         container_id = create_response.json().get("id")
         
-        # Step 2: Wait for container to be ready (polling)
-        for _ in range(30):  # Max 5 minutes
+        # Step 2: Wait for container to be ready
+        async def poll_container() -> JobPoll:
             status_response = await client.get(
                 f"{self.API_BASE}/{container_id}",
                 params={
@@ -468,15 +451,19 @@ class InstagramPublisher(BasePlatformPublisher):
             )
             status_code = status_response.json().get("status_code")
             if status_code == "FINISHED":
-                break
-            elif status_code == "ERROR":
-                return PublishResult(
-                    success=False,
-                    status=PublishStatus.FAILED,
-                    platform=self.platform,
-                    error_message="Video processing failed",
-                )
-            await asyncio.sleep(10)
+                return JobPoll(DONE)
+            if status_code == "ERROR":
+                return JobPoll(FAILED, error="Video processing failed")
+            return JobPoll()
+        
+        outcome = await get_job_waiter().wait("instagram", container_id, poll_container)
+        if outcome.state != DONE:
+            return PublishResult(
+                success=False,
+                status=PublishStatus.FAILED,
+                platform=self.platform,
+                error_message=outcome.error if outcome.state == FAILED else "Video processing timed out",
+            )
         
         # Step 3: Publish container
         publish_response = await client.post(
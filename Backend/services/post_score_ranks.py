@@ -0,0 +1,140 @@
+"""
+Post Score Percentile Ranks
+Sorted score distributions per (account, platform, media_type), loaded from
+the post_score_latest table and ranked with binary search
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Distributions are refreshed from the database at most this often per group;
+# scores written by this process are applied immediately
+DEFAULT_TTL_SECONDS = 60.0
+
+GroupKey = Tuple[int, str, str]
+
+
+class ScoreDistribution:
+    """
+    Latest scores of one group of posts, kept sorted
+
+    rank() is O(log n); update() is O(n) for the list shift but avoids any
+    database round trip.
+    """
+
+    def __init__(self, scores: Optional[Dict[int, float]] = None):
+        self.by_post: Dict[int, float] = dict(scores or {})
+        self.sorted_scores = sorted(self.by_post.values())
+
+    def __len__(self) -> int:
+        return len(self.sorted_scores)
+
+    def update(self, post_id: int, score: float):
+        old = self.by_post.get(post_id)
+        if old is not None:
+            del self.sorted_scores[bisect_left(self.sorted_scores, old)]
+        self.by_post[post_id] = score
+        insort(self.sorted_scores, score)
+
+    def rank(self, score: float, post_id: Optional[int] = None) -> Tuple[int, int, int]:
+        """
+        Place `score` in the distribution, replacing the post's stored score
+
+        Returns:
+            (total_posts, posts_below, posts_equal), counting the post itself
+        """
+        total = len(self.sorted_scores)
+        below = bisect_left(self.sorted_scores, score)
+        equal = bisect_right(self.sorted_scores, score) - below
+
+        old = self.by_post.get(post_id) if post_id is not None else None
+        if old is not None:
+            total -= 1
+            if old < score:
+                below -= 1
+            elif old == score:
+                equal -= 1
+
+        return total + 1, below, equal + 1
+
+
+class PercentileRankCache:
+    """Process-wide ScoreDistribution per (account_id, platform, media_type)"""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._groups: Dict[GroupKey, Tuple[float, ScoreDistribution]] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, key: GroupKey) -> Optional[ScoreDistribution]:
+        with self._lock:
+            entry = self._groups.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+                return entry[1]
+        return None
+
+    async def get(self, db: AsyncSession, account_id: int, platform: str, media_type: str) -> ScoreDistribution:
+        key = (account_id, platform, media_type)
+        distribution = self._fresh(key)
+        if distribution is None:
+            result = await db.execute(
+                text("""
+                    SELECT post_id, score
+                    FROM post_score_latest
+                    WHERE account_id = :account_id
+                    AND platform = :platform
+                    AND media_type = :media_type
+                """),
+                {"account_id": account_id, "platform": platform, "media_type": media_type}
+            )
+            distribution = ScoreDistribution({row.post_id: float(row.score) for row in result})
+            self.put(key, distribution)
+        return distribution
+
+    async def get_account(self, db: AsyncSession, account_id: int) -> Dict[Tuple[str, str], ScoreDistribution]:
+        """All groups of one account in a single query, keyed by (platform, media_type)"""
+        result = await db.execute(
+            text("SELECT post_id, platform, media_type, score FROM post_score_latest WHERE account_id = :account_id"),
+            {"account_id": account_id}
+        )
+        grouped: Dict[Tuple[str, str], Dict[int, float]] = {}
+        for row in result:
+            grouped.setdefault((row.platform, row.media_type), {})[row.post_id] = float(row.score)
+
+        distributions = {group: ScoreDistribution(scores) for group, scores in grouped.items()}
+        for (platform, media_type), distribution in distributions.items():
+            self.put((account_id, platform, media_type), distribution)
+        return distributions
+
+    def put(self, key: GroupKey, distribution: ScoreDistribution):
+        with self._lock:
+            self._groups[key] = (time.monotonic(), distribution)
+
+    def record(self, key: GroupKey, scores: Iterable[Tuple[int, float]]):
+        """Apply scores this process just stored to a cached group, if loaded"""
+        with self._lock:
+            entry = self._groups.get(key)
+        if entry:
+            for post_id, score in scores:
+                entry[1].update(post_id, score)
+
+    def clear(self):
+        with self._lock:
+            self._groups.clear()
+
+
+_rank_cache: Optional[PercentileRankCache] = None
+
+
+def get_rank_cache() -> PercentileRankCache:
+    global _rank_cache
+    if _rank_cache is None:
+        _rank_cache = PercentileRankCache()
+    return _rank_cache
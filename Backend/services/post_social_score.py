@@ -4,13 +4,49 @@ Calculates normalized performance scores for published content
 Phase 3: Pre/Post Social Score + Coaching
 """
 import logging
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from services.post_score_ranks import ScoreDistribution, get_rank_cache
+
 logger = logging.getLogger(__name__)
 
+ACCOUNT_POSTS_SQL = """
+    SELECT
+        smp.id,
+        smp.platform,
+        smp.media_type,
+        smp.posted_at,
+        sa.followers_count
+    FROM social_media_posts smp
+    JOIN social_media_accounts sa ON smp.account_id = sa.id
+    WHERE smp.account_id = :account_id
+"""
+
+LATEST_ANALYTICS_SQL = """
+    SELECT DISTINCT ON (post_id)
+        id,
+        post_id,
+        views_count,
+        likes_count,
+        comments_count,
+        shares_count,
+        saves_count
+    FROM social_media_post_analytics
+    WHERE post_id = ANY(CAST(:post_ids AS integer[]))
+    ORDER BY post_id, snapshot_date DESC, snapshot_hour DESC NULLS LAST
+"""
+
+# Writes scores onto the latest snapshots; a trigger mirrors them into post_score_latest
+STORE_SCORES_SQL = """
+    UPDATE social_media_post_analytics a
+    SET viral_score = v.score
+    FROM unnest(CAST(:snapshot_ids AS integer[]), CAST(:scores AS numeric[])) AS v(id, score)
+    WHERE a.id = v.id
+"""
+
 
 class PostSocialScoreCalculator:
     """
@@ -65,7 +101,8 @@ class PostSocialScoreCalculator:
         media_type: str,
         follower_count: int,
         posted_at: datetime,
-        current_metrics: Dict[str, Any]
+        current_metrics: Dict[str, Any],
+        account_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Calculate normalized post-social score for a published post
@@ -78,6 +115,7 @@ class PostSocialScoreCalculator:
             follower_count: Account follower count at time of posting
             posted_at: When the post was published
             current_metrics: Current metrics dict with views, likes, comments, shares, etc.
+            account_id: Owning account (looked up from the post if omitted)
             
         Returns:
             Dict with:
@@ -87,78 +125,95 @@ class PostSocialScoreCalculator:
             - normalization_factors: Breakdown of normalization
         """
         try:
-            # Get current metrics
-            views = current_metrics.get('views', 0) or 0
-            likes = current_metrics.get('likes', 0) or 0
-            likes = likes or 0
-            comments = current_metrics.get('comments', 0) or 0
-            comments = comments or 0
-            shares = current_metrics.get('shares', 0) or 0
-            shares = shares or 0
-            saves = current_metrics.get('saves', 0) or 0
-            saves = saves or 0
-            
-            # Calculate raw engagement
-            total_engagement = likes + comments + shares + saves
-            raw_engagement_rate = (total_engagement / views * 100) if views > 0 else 0
-            
-            # 1. Follower Count Normalization
-            follower_normalized_score = self._normalize_by_followers(
-                views, likes, comments, shares, saves,
-                follower_count, platform, media_type
-            )
+            score_data = self.score_metrics(platform, media_type, follower_count, posted_at, current_metrics)
             
-            # 2. Platform Behavior Normalization
-            platform_normalized_score = self._normalize_by_platform(
-                raw_engagement_rate, platform, media_type
+            # Percentile rank ("Top X% of your Reels")
+            score_data['percentile_rank'] = await self._calculate_percentile_rank(
+                db, post_id, platform, media_type, score_data['post_social_score'], account_id
             )
             
-            # 3. Time-Since-Posting Normalization
-            time_normalized_score = self._normalize_by_time(
-                total_engagement, posted_at
-            )
-            
-            # 4. Calculate weighted final score
-            final_score = (
-                follower_normalized_score * 0.40 +  # 40% weight
-                platform_normalized_score * 0.35 +  # 35% weight
-                time_normalized_score * 0.25        # 25% weight
-            )
-            
-            # Clamp to 0-100
-            final_score = max(0, min(100, final_score))
-            
-            # 5. Calculate percentile rank ("Top X% of your Reels")
-            percentile_rank = await self._calculate_percentile_rank(
-                db, post_id, platform, media_type, final_score
-            )
-            
-            return {
-                'post_social_score': round(final_score, 1),
-                'raw_score': round(follower_normalized_score, 1),
-                'percentile_rank': percentile_rank,
-                'normalization_factors': {
-                    'follower_normalized': round(follower_normalized_score, 1),
-                    'platform_normalized': round(platform_normalized_score, 1),
-                    'time_normalized': round(time_normalized_score, 1),
-                    'follower_count': follower_count,
-                    'time_since_posting_hours': self._hours_since_posting(posted_at)
-                },
-                'metrics': {
-                    'views': views,
-                    'likes': likes,
-                    'comments': comments,
-                    'shares': shares,
-                    'saves': saves,
-                    'total_engagement': total_engagement,
-                    'engagement_rate': round(raw_engagement_rate, 2)
-                }
-            }
+            return score_data
             
         except Exception as e:
             logger.error(f"Error calculating post-social score for post {post_id}: {e}")
             raise
     
+    def score_metrics(
+        self,
+        platform: str,
+        media_type: str,
+        follower_count: int,
+        posted_at: datetime,
+        current_metrics: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Normalized score for one post's metrics, without the percentile rank
+        
+        Pure computation, so batch scoring can run it for every post of an
+        account before ranking them together.
+        """
+        # Get current metrics
+        views = current_metrics.get('views', 0) or 0
+        likes = current_metrics.get('likes', 0) or 0
+        likes = likes or 0
+        comments = current_metrics.get('comments', 0) or 0
+        comments = comments or 0
+        shares = current_metrics.get('shares', 0) or 0
+        shares = shares or 0
+        saves = current_metrics.get('saves', 0) or 0
+        saves = saves or 0
+        
+        # Calculate raw engagement
+        total_engagement = likes + comments + shares + saves
+        raw_engagement_rate = (total_engagement / views * 100) if views > 0 else 0
+        
+        # 1. Follower Count Normalization
+        follower_normalized_score = self._normalize_by_followers(
+            views, likes, comments, shares, saves,
+            follower_count, platform, media_type
+        )
+        
+        # 2. Platform Behavior Normalization
+        platform_normalized_score = self._normalize_by_platform(
+            raw_engagement_rate, platform, media_type
+        )
+        
+        # 3. Time-Since-Posting Normalization
+        time_normalized_score = self._normalize_by_time(
+            total_engagement, posted_at
+        )
+        
+        # 4. Calculate weighted final score
+        final_score = (
+            follower_normalized_score * 0.40 +  # 40% weight
+            platform_normalized_score * 0.35 +  # 35% weight
+            time_normalized_score * 0.25        # 25% weight
+        )
+        
+        # Clamp to 0-100
+        final_score = max(0, min(100, final_score))
+        
+        return {
+            'post_social_score': round(final_score, 1),
+            'raw_score': round(follower_normalized_score, 1),
+            'normalization_factors': {
+                'follower_normalized': round(follower_normalized_score, 1),
+                'platform_normalized': round(platform_normalized_score, 1),
+                'time_normalized': round(time_normalized_score, 1),
+                'follower_count': follower_count,
+                'time_since_posting_hours': self._hours_since_posting(posted_at)
+            },
+            'metrics': {
+                'views': views,
+                'likes': likes,
+                'comments': comments,
+                'shares': shares,
+                'saves': saves,
+                'total_engagement': total_engagement,
+                'engagement_rate': round(raw_engagement_rate, 2)
+            }
+        }
+    
     def _normalize_by_followers(
         self,
         views: int,
@@ -269,84 +324,29 @@ class PostSocialScoreCalculator:
         post_id: int,
         platform: str,
         media_type: str,
-        score: float
+        score: float,
+        account_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Calculate percentile rank: "Top X% of your Reels"
         
-        Compares this post's score to all other posts from the same account
+        Compares this post's score to the latest scores of the account's other
+        posts of the same platform/media type (post_score_latest), using a
+        cached sorted distribution
         """
         try:
-            # Get all posts from same account/platform/media_type
-            query = text("""
-                WITH post_scores AS (
-                    SELECT 
-                        smp.id,
-                        smp.account_id,
-                        COALESCE(
-                            (SELECT post_social_score 
-                             FROM post_metrics 
-                             WHERE post_id = smp.id 
-                             ORDER BY snapshot_at DESC 
-                             LIMIT 1),
-                            0
-                        ) as score
-                    FROM social_media_posts smp
-                    WHERE smp.platform = :platform
-                    AND smp.media_type = :media_type
-                    AND smp.account_id = (
-                        SELECT account_id 
-                        FROM social_media_posts 
-                        WHERE id = :post_id
-                    )
+            if account_id is None:
+                result = await db.execute(
+                    text("SELECT account_id FROM social_media_posts WHERE id = :post_id"),
+                    {'post_id': post_id}
                 )
-                SELECT 
-                    COUNT(*) as total_posts,
-                    COUNT(*) FILTER (WHERE score < :current_score) as posts_below,
-                    COUNT(*) FILTER (WHERE score = :current_score) as posts_equal
-                FROM post_scores
-            """)
-            
-            result = await db.execute(query, {
-                'platform': platform,
-                'media_type': media_type,
-                'post_id': post_id,
-                'current_score': score
-            })
+                account_id = result.scalar()
+                if account_id is None:
+                    return self._rank_payload(0, 0, 0, media_type)
             
-            row = result.first()
-            if not row or row.total_posts == 0:
-                return {
-                    'percentile': 100,
-                    'rank': 1,
-                    'total_posts': 0,
-                    'description': 'No comparison data'
-                }
-            
-            total_posts = row.total_posts
-            posts_below = row.posts_below
-            posts_equal = row.posts_equal
-            
-            # Calculate percentile: (posts below + 0.5 * posts equal) / total
-            percentile = ((posts_below + (posts_equal * 0.5)) / total_posts) * 100
-            rank = total_posts - posts_below  # Higher score = lower rank number
-            
-            # Generate description
-            if percentile >= 90:
-                description = f"Top 10% of your {media_type}s"
-            elif percentile >= 75:
-                description = f"Top 25% of your {media_type}s"
-            elif percentile >= 50:
-                description = f"Top 50% of your {media_type}s"
-            else:
-                description = f"Bottom 50% of your {media_type}s"
-            
-            return {
-                'percentile': round(100 - percentile, 1),  # Invert: higher percentile = better
-                'rank': rank,
-                'total_posts': total_posts,
-                'description': description
-            }
+            distribution = await get_rank_cache().get(db, account_id, platform, media_type)
+            total_posts, posts_below, posts_equal = distribution.rank(score, post_id)
+            return self._rank_payload(total_posts, posts_below, posts_equal, media_type)
             
         except Exception as e:
             logger.error(f"Error calculating percentile rank: {e}")
@@ -356,4 +356,125 @@ class PostSocialScoreCalculator:
                 'total_posts': 0,
                 'description': 'Unable to calculate'
             }
-
+    
+    def _rank_payload(
+        self,
+        total_posts: int,
+        posts_below: int,
+        posts_equal: int,
+        media_type: str
+    ) -> Dict[str, Any]:
+        """Format a (total, below, equal) placement as the percentile_rank dict"""
+        if total_posts <= 1:
+            return {
+                'percentile': 100,
+                'rank': 1,
+                'total_posts': total_posts,
+                'description': 'No comparison data'
+            }
+        
+        # Calculate percentile: (posts below + 0.5 * posts equal) / total
+        percentile = ((posts_below + (posts_equal * 0.5)) / total_posts) * 100
+        rank = total_posts - posts_below  # Higher score = lower rank number
+        
+        # Generate description
+        if percentile >= 90:
+            description = f"Top 10% of your {media_type}s"
+        elif percentile >= 75:
+            description = f"Top 25% of your {media_type}s"
+        elif percentile >= 50:
+            description = f"Top 50% of your {media_type}s"
+        else:
+            description = f"Bottom 50% of your {media_type}s"
+        
+        return {
+            'percentile': round(100 - percentile, 1),  # Invert: higher percentile = better
+            'rank': rank,
+            'total_posts': total_posts,
+            'description': description
+        }
+    
+    async def score_account_posts(
+        self,
+        db: AsyncSession,
+        account_id: int,
+        platform: Optional[str] = None,
+        store: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Score every post of an account in one pass
+        
+        Loads posts, their latest analytics snapshots and the account's stored
+        score distributions with one query each, scores all posts, then ranks
+        each against the account's other posts with the new scores applied.
+        
+        Args:
+            db: Database session
+            account_id: Account to score
+            platform: Optional platform filter
+            store: Write scores to the latest analytics snapshots
+            
+        Returns:
+            One dict per post with metrics: post_id, platform, media_type plus
+            the calculate_post_social_score fields
+        """
+        posts_query = ACCOUNT_POSTS_SQL + (" AND smp.platform = :platform" if platform else "")
+        params = {"account_id": account_id, "platform": platform} if platform else {"account_id": account_id}
+        posts = (await db.execute(text(posts_query), params)).fetchall()
+        if not posts:
+            return []
+        
+        result = await db.execute(text(LATEST_ANALYTICS_SQL), {"post_ids": [post.id for post in posts]})
+        latest = {row.post_id: row for row in result}
+        
+        scored = []
+        for post in posts:
+            row = latest.get(post.id)
+            if row is None:
+                continue
+            media_type = post.media_type or 'video'
+            score_data = self.score_metrics(
+                post.platform, media_type, post.followers_count or 0, post.posted_at,
+                {
+                    'views': row.views_count or 0,
+                    'likes': row.likes_count or 0,
+                    'comments': row.comments_count or 0,
+                    'shares': row.shares_count or 0,
+                    'saves': row.saves_count or 0
+                }
+            )
+            scored.append({
+                'post_id': post.id,
+                'platform': post.platform,
+                'media_type': media_type,
+                'snapshot_id': row.id,
+                **score_data
+            })
+        
+        # Rank against stored scores with this batch's scores swapped in
+        distributions = await get_rank_cache().get_account(db, account_id)
+        by_group: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for item in scored:
+            by_group.setdefault((item['platform'], item['media_type']), []).append(item)
+        
+        for group, items in by_group.items():
+            distribution = ScoreDistribution(distributions[group].by_post if group in distributions else None)
+            for item in items:
+                distribution.update(item['post_id'], item['post_social_score'])
+            for item in items:
+                item['percentile_rank'] = self._rank_payload(
+                    *distribution.rank(item['post_social_score'], item['post_id']), item['media_type']
+                )
+            if store:
+                get_rank_cache().put((account_id, *group), distribution)
+        
+        if store and scored:
+            await db.execute(text(STORE_SCORES_SQL), {
+                'snapshot_ids': [item['snapshot_id'] for item in scored],
+                'scores': [item['post_social_score'] for item in scored]
+            })
+            await db.commit()
+        
+        for item in scored:
+            del item['snapshot_id']
+        return scored
@@ -0,0 +1,221 @@
+"""
+Publish Dispatcher - Concurrency-safe fan-out of due scheduled posts
+
+Due posts are claimed atomically (see PublisherService.claim_due_posts), grouped
+by platform account into batches, and each batch is published concurrently
+under global, per-platform and per-account limits. Every post gets its own DB
+session because an AsyncSession cannot be shared between concurrent tasks.
+
+Each claim carries a claim_token. The publish path only calls the platform if
+it is the first to start that claim, and heartbeats it while the upload runs,
+so a redelivered batch is a no-op and a live upload is never released as stale.
+"""
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+
+from loguru import logger
+
+from services.platform_adapters.base import PublishResult
+from services.publisher_service import CLAIM_HEARTBEAT_SECONDS, PublisherService
+
+
+# Conservative defaults; platforms with stricter upload APIs get lower caps
+DEFAULT_PLATFORM_LIMITS: Dict[str, int] = {
+    "youtube": 4,
+    "instagram": 6,
+    "facebook": 6,
+    "tiktok": 4,
+    "linkedin": 4,
+    "twitter": 8,
+    "threads": 6,
+    "pinterest": 6,
+}
+DEFAULT_PLATFORM_LIMIT = 5
+DEFAULT_ACCOUNT_LIMIT = 2
+
+
+@dataclass
+class DispatchStats:
+    """Outcome of a dispatch run"""
+    claimed: int = 0
+    published: int = 0
+    failed: int = 0
+    skipped: int = 0
+    batches: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "claimed": self.claimed,
+            "published": self.published,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "errors": self.errors[:20],
+        }
+
+
+class PublishDispatcher:
+    """Claims due posts and publishes them in parallel with concurrency limits"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        max_concurrency: int = 20,
+        platform_limits: Optional[Dict[str, int]] = None,
+        account_limit: int = DEFAULT_ACCOUNT_LIMIT,
+        publish_fn: Optional[Callable[[UUID, Optional[UUID]], Awaitable[Optional[PublishResult]]]] = None,
+        heartbeat_seconds: float = CLAIM_HEARTBEAT_SECONDS
+    ):
+        """
+        Initialize dispatcher
+
+        Args:
+            session_factory: async_sessionmaker (or compatible) for DB sessions
+            max_concurrency: Posts in flight across all platforms; keep at or
+                below the DB pool size since each publish holds a session
+            platform_limits: Per-platform in-flight caps
+            account_limit: In-flight cap per platform account
+            publish_fn: Override for publishing one claimed post (tests/benchmarks),
+                called with the post ID and its claim token
+            heartbeat_seconds: Interval between claim heartbeats during a publish
+        """
+        self.session_factory = session_factory
+        self.max_concurrency = max_concurrency
+        self.platform_limits = {**DEFAULT_PLATFORM_LIMITS, **(platform_limits or {})}
+        self.account_limit = account_limit
+        self.publish_fn = publish_fn or self._publish_claimed_post
+        self.heartbeat_seconds = heartbeat_seconds
+
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._platform_sems: Dict[str, asyncio.Semaphore] = {}
+        self._account_sems: Dict[str, asyncio.Semaphore] = {}
+
+    # ------------------------------------------------------------------
+    # Claiming
+    # ------------------------------------------------------------------
+
+    async def claim_due_posts(self, limit: int = 500, retries: bool = False) -> List[Dict[str, Any]]:
+        """Claim due (or retry-ready) posts in one atomic statement"""
+        async with self.session_factory() as db:
+            publisher = PublisherService(db)
+            if retries:
+                return await publisher.claim_failed_posts_for_retry(limit=limit)
+            return await publisher.claim_due_posts(limit=limit)
+
+    @staticmethod
+    def plan_batches(claimed: List[Dict[str, Any]], batch_size: int = 100) -> List[List[Dict[str, str]]]:
+        """
+        Split claimed posts into JSON-serializable batches
+
+        Posts for the same platform account are kept together so one batch
+        worker can enforce that account's in-flight limit on its own.
+        """
+        by_account: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        for row in claimed:
+            by_account[_account_key(row)].append({
+                "id": str(row["id"]),
+                "platform": row.get("platform") or "unknown",
+                "platform_account_id": str(row["platform_account_id"]) if row.get("platform_account_id") else None,
+                "claim_token": str(row["claim_token"]) if row.get("claim_token") else None,
+            })
+
+        batches: List[List[Dict[str, str]]] = []
+        current: List[Dict[str, str]] = []
+        for rows in by_account.values():
+            if current and len(current) + len(rows) > batch_size:
+                batches.append(current)
+                current = []
+            while len(rows) > batch_size:
+                batches.append(rows[:batch_size])
+                rows = rows[batch_size:]
+            current.extend(rows)
+        if current:
+            batches.append(current)
+        return batches
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    def _platform_sem(self, platform: str) -> asyncio.Semaphore:
+        if platform not in self._platform_sems:
+            limit = self.platform_limits.get(platform, DEFAULT_PLATFORM_LIMIT)
+            self._platform_sems[platform] = asyncio.Semaphore(limit)
+        return self._platform_sems[platform]
+
+    def _account_sem(self, key: str) -> asyncio.Semaphore:
+        if key not in self._account_sems:
+            self._account_sems[key] = asyncio.Semaphore(self.account_limit)
+        return self._account_sems[key]
+
+    async def _publish_claimed_post(self, post_id: UUID, claim_token: Optional[UUID]) -> Optional[PublishResult]:
+        heartbeat = asyncio.create_task(self._heartbeat(post_id, claim_token)) if claim_token else None
+        try:
+            async with self.session_factory() as db:
+                return await PublisherService(db).publish_scheduled_post(post_id, claim_token=claim_token)
+        finally:
+            if heartbeat:
+                heartbeat.cancel()
+
+    async def _heartbeat(self, post_id: UUID, claim_token: UUID) -> None:
+        """Keep a claim alive until cancelled or the claim is lost"""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            async with self.session_factory() as db:
+                if not await PublisherService(db).heartbeat_claim(post_id, claim_token):
+                    return
+
+    async def _publish_one(self, row: Dict[str, Any], stats: DispatchStats) -> Optional[PublishResult]:
+        platform = row.get("platform") or "unknown"
+        async with self._account_sem(_account_key(row)):
+            async with self._platform_sem(platform):
+                async with self._global:
+                    token = row.get("claim_token")
+                    try:
+                        result = await self.publish_fn(UUID(str(row["id"])), UUID(str(token)) if token else None)
+                    except Exception as e:
+                        stats.failed += 1
+                        stats.errors.append(f"{row['id']}: {e}")
+                        logger.error(f"Failed to publish claimed post {row['id']}: {e}")
+                        return None
+
+        if result is None:
+            stats.skipped += 1
+        elif result.success:
+            stats.published += 1
+        else:
+            stats.failed += 1
+        return result
+
+    async def publish_claimed(self, claimed: List[Dict[str, Any]]) -> DispatchStats:
+        """
+        Publish already-claimed posts concurrently
+
+        Args:
+            claimed: Rows with id, platform, platform_account_id and claim_token
+
+        Returns:
+            DispatchStats for this run
+        """
+        stats = DispatchStats(claimed=len(claimed), batches=1 if claimed else 0)
+        await asyncio.gather(*(self._publish_one(row, stats) for row in claimed))
+        return stats
+
+    async def run_once(self, limit: int = 500, retries: bool = False) -> DispatchStats:
+        """Claim one batch of due posts and publish it in-process"""
+        claimed = await self.claim_due_posts(limit=limit, retries=retries)
+        if not claimed:
+            return DispatchStats()
+        stats = await self.publish_claimed(claimed)
+        logger.info(
+            f"Dispatched {stats.claimed} posts: {stats.published} published, {stats.failed} failed"
+        )
+        return stats
+
+
+def _account_key(row: Dict[str, Any]) -> str:
+    return f"{row.get('platform') or 'unknown'}:{row.get('platform_account_id') or 'default'}"
@@ -6,7 +6,7 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, text
 from loguru import logger
 
 from database.models import ScheduledPost, VideoClip, ContentVariant
@@ -15,6 +15,122 @@ from services.platform_adapters.base import PublishRequest, PublishResult
 from services.exceptions import ServiceError
 
 
+# Claims run as one statement so the row lock, status flip and read are atomic.
+# Each claimed row gets a fresh claim_token; every later write by the claim
+# holder is conditional on it, so a redelivered batch or a worker whose lease
+# was released cannot publish or complete the post a second time.
+CLAIM_DUE_POSTS_SQL = """
+UPDATE scheduled_posts
+SET status = 'publishing', claim_token = gen_random_uuid(),
+    heartbeat_at = NOW(), publish_started_at = NULL, updated_at = NOW()
+WHERE id IN (
+    SELECT id FROM scheduled_posts
+    WHERE status = 'scheduled' AND scheduled_time <= :cutoff
+    ORDER BY scheduled_time ASC
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, platform, platform_account_id, scheduled_time, claim_token
+"""
+
+CLAIM_RETRY_POSTS_SQL = """
+UPDATE scheduled_posts
+SET status = 'publishing', claim_token = gen_random_uuid(),
+    heartbeat_at = NOW(), publish_started_at = NULL, updated_at = NOW()
+WHERE id IN (
+    SELECT id FROM scheduled_posts
+    WHERE status = 'failed'
+      AND retry_count < :max_retries
+      AND next_retry_at <= :now
+    ORDER BY next_retry_at ASC
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, platform, platform_account_id, scheduled_time, claim_token
+"""
+
+# Only the first delivery of a claim may reach the platform
+START_CLAIMED_PUBLISH_SQL = """
+UPDATE scheduled_posts
+SET publish_started_at = NOW(), heartbeat_at = NOW(), updated_at = NOW()
+WHERE id = :id AND status = 'publishing' AND claim_token = :claim_token
+  AND publish_started_at IS NULL
+RETURNING id
+"""
+
+HEARTBEAT_CLAIM_SQL = """
+UPDATE scheduled_posts
+SET heartbeat_at = NOW()
+WHERE id = :id AND status = 'publishing' AND claim_token = :claim_token
+"""
+
+# A released claim ('failed' or 'needs_review', same token, not yet
+# re-claimed) may still be completed by its holder; once re-claimed the token
+# no longer matches
+CLAIMED_POST_SQL = """
+SELECT retry_count FROM scheduled_posts
+WHERE id = :id AND status IN ('publishing', 'failed', 'needs_review') AND claim_token = :claim_token
+"""
+
+COMPLETE_CLAIMED_POST_SQL = """
+UPDATE scheduled_posts
+SET status = 'published', published_at = NOW(), platform_post_id = :platform_post_id,
+    platform_url = :platform_url, last_error = NULL, updated_at = NOW()
+WHERE id = :id AND status IN ('publishing', 'failed', 'needs_review') AND claim_token = :claim_token
+"""
+
+FAIL_CLAIMED_POST_SQL = """
+UPDATE scheduled_posts
+SET status = :status, retry_count = :retry_count, next_retry_at = :next_retry_at,
+    last_error = :error, updated_at = NOW()
+WHERE id = :id AND status IN ('publishing', 'failed', 'needs_review') AND claim_token = :claim_token
+"""
+
+# Seconds without a heartbeat before a claim counts as abandoned. Heartbeats
+# run on the event loop; platforms whose adapters upload large files with
+# blocking calls get longer leases so a slow upload is not mistaken for a
+# dead worker.
+CLAIM_HEARTBEAT_SECONDS = 30
+DEFAULT_CLAIM_LEASE_SECONDS = 300
+PLATFORM_CLAIM_LEASES: Dict[str, int] = {
+    "youtube": 1800,
+    "facebook": 1200,
+    "tiktok": 900,
+    "instagram": 900,
+    "linkedin": 900,
+}
+
+_LEASE_SECONDS = "CASE platform {} ELSE {} END".format(
+    " ".join(f"WHEN '{platform}' THEN {seconds}" for platform, seconds in PLATFORM_CLAIM_LEASES.items()),
+    DEFAULT_CLAIM_LEASE_SECONDS,
+)
+
+# A stale claim costs a retry. If the platform call had already started the
+# post may be live, so it goes to 'needs_review' instead of being re-posted;
+# otherwise it is retried until max_retries. Right-hand sides see the old row.
+RELEASE_STALE_CLAIMS_SQL = f"""
+UPDATE scheduled_posts
+SET status = CASE
+        WHEN publish_started_at IS NOT NULL THEN 'needs_review'
+        WHEN COALESCE(retry_count, 0) + 1 >= :max_retries THEN 'max_retries_reached'
+        ELSE 'failed'
+    END,
+    retry_count = COALESCE(retry_count, 0) + 1,
+    last_error = CASE
+        WHEN publish_started_at IS NOT NULL
+            THEN 'Publishing claim expired after the platform call started; check whether the post is live'
+        ELSE 'Publishing claim expired before completion'
+    END,
+    next_retry_at = CASE
+        WHEN publish_started_at IS NULL AND COALESCE(retry_count, 0) + 1 < :max_retries THEN NOW()
+    END,
+    updated_at = NOW()
+WHERE status = 'publishing'
+  AND COALESCE(heartbeat_at, updated_at) < NOW() - ({_LEASE_SECONDS}) * INTERVAL '1 second'
+RETURNING id, status
+"""
+
+
 class PublisherService:
     """Service for orchestrating scheduled post publishing"""
     
@@ -25,15 +141,22 @@ class PublisherService:
         self.db = db
         self.multi_publisher = MultiPlatformPublisher(db)
     
-    async def publish_scheduled_post(self, post_id: UUID) -> PublishResult:
+    async def publish_scheduled_post(
+        self,
+        post_id: UUID,
+        claim_token: Optional[UUID] = None
+    ) -> Optional[PublishResult]:
         """
         Publish a single scheduled post
         
         Args:
             post_id: ID of scheduled post
+            claim_token: Token from the atomic claim that moved the post to
+                'publishing'; every status write is then conditional on it
             
         Returns:
-            PublishResult with status and platform post ID
+            PublishResult with status and platform post ID, or None when the
+            claim is no longer held or this delivery of it already ran
         """
         try:
             # Get scheduled post
@@ -45,8 +168,12 @@ class PublisherService:
             if not post:
                 raise ServiceError(f"Scheduled post {post_id} not found")
             
-            # Mark as publishing
-            await self.mark_post_as_publishing(post_id)
+            # Mark as publishing (claimed posts were marked by the claim itself)
+            if claim_token is None:
+                await self.mark_post_as_publishing(post_id)
+            elif not await self.start_claimed_publish(post_id, claim_token):
+                logger.warning(f"Skipping post {post_id}: claim {claim_token} is no longer held or already ran")
+                return None
             
             # Get content (clip or variant)
             clip = None
@@ -88,16 +215,22 @@ class PublisherService:
             
             # Update post status based on result
             if publish_result.success:
-                await self.mark_post_as_published(
-                    post_id=post_id,
-                    platform_post_id=publish_result.platform_post_id,
-                    platform_url=publish_result.post_url
-                )
+                if claim_token is not None:
+                    await self.complete_claimed_post(
+                        post_id, claim_token, publish_result.platform_post_id, publish_result.post_url
+                    )
+                else:
+                    await self.mark_post_as_published(
+                        post_id=post_id,
+                        platform_post_id=publish_result.platform_post_id,
+                        platform_url=publish_result.post_url
+                    )
                 logger.success(f"✓ Published post {post_id} to {post.platform}")
             else:
                 await self.handle_publish_failure(
                     post_id=post_id,
-                    error=publish_result.error_message or "Unknown error"
+                    error=publish_result.error_message or "Unknown error",
+                    claim_token=claim_token
                 )
                 logger.error(f"✗ Failed to publish post {post_id}: {publish_result.error_message}")
             
@@ -105,12 +238,17 @@ class PublisherService:
             
         except Exception as e:
             logger.error(f"Error publishing post {post_id}: {e}")
-            await self.handle_publish_failure(post_id, str(e))
+            await self.handle_publish_failure(post_id, str(e), claim_token=claim_token)
             raise ServiceError(f"Failed to publish post: {str(e)}")
     
     async def publish_batch(self, post_ids: list[UUID]) -> list[PublishResult]:
         """
-        Publish multiple posts
+        Publish multiple posts, one after another
+        
+        All posts go through this service's single AsyncSession, which cannot
+        run statements concurrently, so this stays sequential. Scheduled
+        publishing fans out through PublishDispatcher instead, which gives
+        every post its own session under per-platform and per-account limits.
         
         Args:
             post_ids: List of post IDs to publish
@@ -243,14 +381,24 @@ class PublisherService:
             logger.error(f"Failed to mark post as failed: {e}")
             return False
     
-    async def handle_publish_failure(self, post_id: UUID, error: str) -> None:
+    async def handle_publish_failure(
+        self,
+        post_id: UUID,
+        error: str,
+        claim_token: Optional[UUID] = None
+    ) -> None:
         """
         Handle publish failure with retry logic
         
         Args:
             post_id: Post ID
             error: Error message
+            claim_token: Claim the failure is recorded under, if any
         """
+        if claim_token is not None:
+            await self._fail_claimed_post(post_id, error, claim_token)
+            return
+        
         try:
             result = await self.db.execute(
                 select(ScheduledPost).where(ScheduledPost.id == post_id)
@@ -282,6 +430,211 @@ class PublisherService:
         except Exception as e:
             logger.error(f"Error handling failure for post {post_id}: {e}")
     
+    async def start_claimed_publish(self, post_id: UUID, claim_token: UUID) -> bool:
+        """
+        Record that the holder of a claim is about to call the platform
+        
+        Succeeds once per claim: a redelivered batch (acks_late) or a worker
+        whose claim was released and re-issued finds no matching row.
+        
+        Returns:
+            True if this caller may publish the post
+        """
+        try:
+            result = await self.db.execute(
+                text(START_CLAIMED_PUBLISH_SQL),
+                {"id": post_id, "claim_token": claim_token}
+            )
+            started = result.first() is not None
+            await self.db.commit()
+            return started
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Failed to start claimed publish for {post_id}: {e}")
+            return False
+    
+    async def heartbeat_claim(self, post_id: UUID, claim_token: UUID) -> bool:
+        """
+        Refresh a claim's heartbeat while its upload runs
+        
+        Returns:
+            False once the claim is no longer held
+        """
+        try:
+            result = await self.db.execute(
+                text(HEARTBEAT_CLAIM_SQL),
+                {"id": post_id, "claim_token": claim_token}
+            )
+            await self.db.commit()
+            return bool(result.rowcount)
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Failed to heartbeat claim for {post_id}: {e}")
+            return True  # Transient; keep heartbeating
+    
+    async def complete_claimed_post(
+        self,
+        post_id: UUID,
+        claim_token: UUID,
+        platform_post_id: Optional[str],
+        platform_url: Optional[str] = None
+    ) -> bool:
+        """
+        Mark a claimed post as published, if the claim is still ours
+        
+        Returns:
+            True if updated
+        """
+        try:
+            result = await self.db.execute(
+                text(COMPLETE_CLAIMED_POST_SQL),
+                {
+                    "id": post_id,
+                    "claim_token": claim_token,
+                    "platform_post_id": platform_post_id,
+                    "platform_url": platform_url,
+                }
+            )
+            await self.db.commit()
+            if not result.rowcount:
+                logger.error(
+                    f"Post {post_id} reached the platform as {platform_post_id} after its claim "
+                    f"was re-issued; not overwriting the newer claim"
+                )
+                return False
+            logger.info(f"Marked post {post_id} as published")
+            return True
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Failed to mark post as published: {e}")
+            return False
+    
+    async def _fail_claimed_post(self, post_id: UUID, error: str, claim_token: UUID) -> None:
+        try:
+            result = await self.db.execute(
+                text(CLAIMED_POST_SQL),
+                {"id": post_id, "claim_token": claim_token}
+            )
+            row = result.first()
+            if row is None:
+                await self.db.rollback()
+                logger.warning(f"Not recording failure of post {post_id}: claim {claim_token} is no longer held")
+                return
+            
+            retry_count = (row[0] or 0) + 1
+            if retry_count < self.MAX_RETRIES:
+                retry_delay = self.RETRY_DELAYS[retry_count - 1]
+                status, next_retry_at = 'failed', datetime.now() + timedelta(seconds=retry_delay)
+                last_error = error
+                logger.warning(
+                    f"Post {post_id} failed ({retry_count}/{self.MAX_RETRIES}). "
+                    f"Retrying in {retry_delay}s"
+                )
+            else:
+                status, next_retry_at = 'max_retries_reached', None
+                last_error = f"Max retries reached. Last error: {error}"
+                logger.error(f"Post {post_id} failed permanently after {self.MAX_RETRIES} retries")
+            
+            await self.db.execute(
+                text(FAIL_CLAIMED_POST_SQL),
+                {
+                    "id": post_id,
+                    "claim_token": claim_token,
+                    "status": status,
+                    "retry_count": retry_count,
+                    "next_retry_at": next_retry_at,
+                    "error": last_error,
+                }
+            )
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error handling failure for post {post_id}: {e}")
+    
+    async def claim_due_posts(
+        self,
+        limit: int = 500,
+        cutoff_time: Optional[datetime] = None
+    ) -> list[Dict[str, Any]]:
+        """
+        Atomically claim posts that are due for publishing
+        
+        Moves up to ``limit`` due posts from 'scheduled' to 'publishing' in a
+        single statement. ``FOR UPDATE SKIP LOCKED`` lets overlapping beats or
+        several dispatchers run at once without ever claiming the same row.
+        
+        Args:
+            limit: Maximum posts to claim
+            cutoff_time: Posts scheduled before this time (default: now)
+            
+        Returns:
+            Claimed rows as dicts with id, platform, platform_account_id
+            and claim_token
+        """
+        return await self._claim_posts(
+            CLAIM_DUE_POSTS_SQL,
+            {"cutoff": cutoff_time or datetime.now(), "limit": limit}
+        )
+    
+    async def claim_failed_posts_for_retry(self, limit: int = 500) -> list[Dict[str, Any]]:
+        """
+        Atomically claim failed posts whose retry time has passed
+        
+        Args:
+            limit: Maximum posts to claim
+            
+        Returns:
+            Claimed rows as dicts with id, platform, platform_account_id
+            and claim_token
+        """
+        return await self._claim_posts(
+            CLAIM_RETRY_POSTS_SQL,
+            {"now": datetime.now(), "max_retries": self.MAX_RETRIES, "limit": limit}
+        )
+    
+    async def release_stale_claims(self) -> int:
+        """
+        Release posts whose claim stopped heartbeating
+        
+        A claim is stale once its holder has not heartbeated for the
+        platform's lease (PLATFORM_CLAIM_LEASES), so a long upload that is
+        still running keeps its claim. Each release uses up one retry.
+        Claims that never reached the platform go back to 'failed' for the
+        normal retry path (or 'max_retries_reached'); claims whose platform
+        call had started may already be live and go to 'needs_review'
+        rather than being posted again.
+        
+        Returns:
+            Number of posts released
+        """
+        try:
+            result = await self.db.execute(text(RELEASE_STALE_CLAIMS_SQL), {"max_retries": self.MAX_RETRIES})
+            released = result.mappings().all()
+            await self.db.commit()
+            review = [str(row["id"]) for row in released if row["status"] == "needs_review"]
+            if released:
+                logger.warning(f"Released {len(released)} stale publishing claims")
+            if review:
+                logger.error(f"Posts {', '.join(review)} need review: claim expired after the platform call started")
+            return len(released)
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error releasing stale claims: {e}")
+            return 0
+    
+    async def _claim_posts(self, sql: str, params: Dict[str, Any]) -> list[Dict[str, Any]]:
+        try:
+            result = await self.db.execute(text(sql), params)
+            rows = [dict(row) for row in result.mappings().all()]
+            await self.db.commit()
+            if rows:
+                logger.info(f"Claimed {len(rows)} posts for publishing")
+            return rows
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error claiming posts: {e}")
+            return []
+    
     async def get_posts_due_for_publishing(self, cutoff_time: Optional[datetime] = None) -> list[ScheduledPost]:
         """
         Get posts that are due for publishing
@@ -64,6 +64,9 @@ class PostMetrics(BaseModel):
     engagement_rate: float = 0.0
     posted_at: Optional[str] = None
     fetched_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+    # False when the provider could not be reached or did not return the post;
+    # the counters are then placeholders, not a real all-zero snapshot
+    fetched: bool = True
 
 
 class GrowthMetrics(BaseModel):
@@ -217,7 +220,7 @@ class RealTimeMetricsService:
         
         try:
             if not await self._check_rate_limit(Platform.INSTAGRAM):
-                return PostMetrics(platform=Platform.INSTAGRAM, post_id=post_id)
+                return PostMetrics(platform=Platform.INSTAGRAM, post_id=post_id, fetched=False)
             
             client = await self._get_client()
             response = await client.get(
@@ -249,7 +252,7 @@ class RealTimeMetricsService:
         except Exception as e:
             logger.error(f"Instagram post fetch error: {e}")
         
-        return PostMetrics(platform=Platform.INSTAGRAM, post_id=post_id)
+        return PostMetrics(platform=Platform.INSTAGRAM, post_id=post_id, fetched=False)
     
     # =========================================================================
     # TIKTOK METRICS
@@ -307,7 +310,7 @@ class RealTimeMetricsService:
         
         try:
             if not await self._check_rate_limit(Platform.TIKTOK):
-                return PostMetrics(platform=Platform.TIKTOK, post_id=video_id)
+                return PostMetrics(platform=Platform.TIKTOK, post_id=video_id, fetched=False)
             
             client = await self._get_client()
             response = await client.get(
@@ -338,7 +341,7 @@ class RealTimeMetricsService:
         except Exception as e:
             logger.error(f"TikTok video fetch error: {e}")
         
-        return PostMetrics(platform=Platform.TIKTOK, post_id=video_id)
+        return PostMetrics(platform=Platform.TIKTOK, post_id=video_id, fetched=False)
     
     # =========================================================================
     # YOUTUBE METRICS
@@ -401,7 +404,7 @@ class RealTimeMetricsService:
         
         try:
             if not await self._check_rate_limit(Platform.YOUTUBE):
-                return PostMetrics(platform=Platform.YOUTUBE, post_id=video_id)
+                return PostMetrics(platform=Platform.YOUTUBE, post_id=video_id, fetched=False)
             
             client = await self._get_client()
             response = await client.get(
@@ -439,8 +442,46 @@ class RealTimeMetricsService:
         except Exception as e:
             logger.error(f"YouTube video fetch error: {e}")
         
-        return PostMetrics(platform=Platform.YOUTUBE, post_id=video_id)
-    
+        return PostMetrics(platform=Platform.YOUTUBE, post_id=video_id, fetched=False)
+
+    async def get_youtube_videos(self, video_ids: List[str]) -> List[PostMetrics]:
+        """Fetch metrics for up to 50 YouTube videos in one request (uncached)"""
+        try:
+            if not await self._check_rate_limit(Platform.YOUTUBE):
+                return []
+
+            client = await self._get_client()
+            response = await client.get(
+                f"https://{self.RAPIDAPI_HOSTS[Platform.YOUTUBE]}/videos",
+                headers={
+                    "X-RapidAPI-Key": self.RAPIDAPI_KEY,
+                    "X-RapidAPI-Host": self.RAPIDAPI_HOSTS[Platform.YOUTUBE],
+                },
+                params={
+                    "part": "statistics",
+                    "id": ",".join(video_ids[:50]),
+                },
+            )
+
+            if response.status_code == 200:
+                results = []
+                for data in response.json().get("items", []):
+                    stats = data.get("statistics", {})
+                    results.append(PostMetrics(
+                        platform=Platform.YOUTUBE,
+                        post_id=data.get("id", ""),
+                        post_url=f"https://youtube.com/watch?v={data.get('id', '')}",
+                        views=int(stats.get("viewCount", 0)),
+                        likes=int(stats.get("likeCount", 0)),
+                        comments=int(stats.get("commentCount", 0)),
+                    ))
+                return results
+
+        except Exception as e:
+            logger.error(f"YouTube batch fetch error: {e}")
+
+        return []
+
     # =========================================================================
     # AGGREGATION & BATCH METHODS
     # =========================================================================
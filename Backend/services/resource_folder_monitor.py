@@ -9,11 +9,19 @@ from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
 import asyncio
 
+from modules.video_ingestion.file_stability import FileStabilityTracker
+
 logger = logging.getLogger(__name__)
 
 
 class ResourceFolderHandler(FileSystemEventHandler):
-    """Handles file system events in resource folder"""
+    """
+    Handles file system events in resource folder
+
+    Events only feed a FileStabilityTracker; on_new_content runs once per
+    file after it has finished being written, however many created /
+    modified / moved events the write produced.
+    """
     
     def __init__(self, on_new_content: Callable[[Path], None]):
         """
@@ -21,6 +29,7 @@ class ResourceFolderHandler(FileSystemEventHandler):
             on_new_content: Callback when new content is detected
         """
         self.on_new_content = on_new_content
+        self.tracker = FileStabilityTracker(self._dispatch)
         self.supported_extensions = {
             '.mp4', '.mov', '.avi', '.mkv', '.webm',  # Video
             '.jpg', '.jpeg', '.png', '.heic', '.heif'  # Images
@@ -36,17 +45,31 @@ class ResourceFolderHandler(FileSystemEventHandler):
         if not event.is_directory:
             self._handle_file(event.src_path)
     
-    def _handle_file(self, file_path: str):
+    def on_moved(self, event: FileSystemEvent):
+        """Called when a file is moved into place (e.g. temp file renamed)"""
+        if not event.is_directory:
+            self._handle_file(event.dest_path)
+    
+    def on_closed(self, event: FileSystemEvent):
+        """Called when a writer closes a file (inotify only)"""
+        if not event.is_directory:
+            self._handle_file(event.src_path, closed=True)
+    
+    def _handle_file(self, file_path: str, closed: bool = False):
         """Handle a file event"""
         path = Path(file_path)
         
         # Check if it's a supported content file
         if path.suffix.lower() in self.supported_extensions:
-            logger.info(f"New content detected: {file_path}")
-            try:
-                self.on_new_content(path)
-            except Exception as e:
-                logger.error(f"Error handling new content {file_path}: {e}")
+            self.tracker.note(path, closed=closed)
+    
+    def _dispatch(self, path: Path):
+        """Called by the tracker once a file is stable"""
+        logger.info(f"New content detected: {path}")
+        try:
+            self.on_new_content(path)
+        except Exception as e:
+            logger.error(f"Error handling new content {path}: {e}")
 
 
 class ResourceFolderMonitor:
@@ -94,6 +117,7 @@ class ResourceFolderMonitor:
         if self.observer:
             self.observer.stop()
             self.observer.join()
+            self.handler.tracker.stop()
             logger.info("Stopped monitoring resource folder")
     
     def is_running(self) -> bool:
@@ -0,0 +1,363 @@
+"""
+Resumable Uploads
+Chunked, crash-safe uploads shared by the platform publishers.
+
+Files are streamed from disk one chunk at a time, so memory use is one chunk
+rather than the whole file. After every acknowledged chunk the session URI
+and committed offset are written to an UploadSessionStore; a dropped
+connection, crash or worker restart continues from the last byte the server
+confirmed instead of byte 0. Concurrent uploads are bounded per platform.
+
+Two acknowledgement styles are supported:
+    GoogleResumableProtocol - 308 + Range header, offset can be queried (YouTube)
+    ContentRangeProtocol    - 206 per chunk, fixed chunk plan, no query (TikTok)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import weakref
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_RETRIES = 8                 # Consecutive failures without progress
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+MAX_CONCURRENT_UPLOADS = {"youtube": 2, "tiktok": 2}
+DEFAULT_MAX_CONCURRENT = 2
+STATE_DIR = Path(os.getenv("UPLOAD_STATE_DIR", "data/upload_sessions"))
+
+
+class UploadError(Exception):
+    """Upload failed and retrying the same session won't help"""
+
+
+class UploadSessionExpired(UploadError):
+    """The server no longer knows the session; a new one must be started"""
+
+
+class RetryableUploadStatus(Exception):
+    """Transient server response (5xx/429); retry after a backoff"""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+# ============================================================================
+# SESSION STATE
+# ============================================================================
+
+@dataclass
+class UploadSession:
+    """An in-progress upload as persisted between attempts"""
+    key: str
+    platform: str
+    session_uri: str
+    total_bytes: int
+    chunk_size: int
+    offset: int = 0
+    extra: Dict = field(default_factory=dict)
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    updated_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+
+class UploadSessionStore:
+    """One JSON file per in-progress upload, replaced atomically on each update"""
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory or STATE_DIR)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def load(self, key: str) -> Optional[UploadSession]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            return UploadSession(**json.loads(path.read_text()))
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Discarding unreadable upload state {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def save(self, session: UploadSession) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        session.updated_at = datetime.now().isoformat()
+        tmp = self._path(session.key).with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(session)))
+        os.replace(tmp, self._path(session.key))
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+
+def upload_key(platform: str, account_id: str, file_path: str) -> str:
+    """Identify an upload by destination and file version (size + mtime)"""
+    stat = os.stat(file_path)
+    raw = f"{platform}:{account_id}:{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+# ============================================================================
+# PROTOCOLS
+# ============================================================================
+
+@dataclass
+class ChunkResult:
+    """Server state after a chunk or status query"""
+    offset: int
+    response: Optional[httpx.Response] = None   # Set once the upload is complete
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    if response.status_code in (404, 410):
+        raise UploadSessionExpired(f"Upload session gone (HTTP {response.status_code})")
+    if response.status_code in RETRYABLE_STATUS:
+        raise RetryableUploadStatus(response)
+    raise UploadError(f"Upload failed (HTTP {response.status_code}): {response.text[:500]}")
+
+
+class GoogleResumableProtocol:
+    """Google resumable upload: 308 + `Range: bytes=0-N` acknowledges N+1 bytes"""
+
+    GRANULARITY = 256 * 1024   # Chunks must be multiples of 256 KiB
+    supports_query = True
+
+    def chunk_size_for(self, total_bytes: int, requested: int) -> int:
+        return max(self.GRANULARITY, requested - requested % self.GRANULARITY)
+
+    def next_chunk(self, offset: int, total_bytes: int, chunk_size: int) -> Tuple[int, int]:
+        return offset, min(offset + chunk_size, total_bytes)
+
+    def chunk_headers(self, start: int, end: int, total_bytes: int) -> Dict[str, str]:
+        return {"Content-Range": f"bytes {start}-{end - 1}/{total_bytes}"}
+
+    def interpret(self, response: httpx.Response, start: int, end: int, total_bytes: int) -> ChunkResult:
+        if response.status_code in (200, 201):
+            return ChunkResult(total_bytes, response)
+        if response.status_code == 308:
+            # Server may keep fewer bytes than were sent; trust its Range
+            committed = response.headers.get("Range")
+            return ChunkResult(int(committed.rsplit("-", 1)[1]) + 1 if committed else 0)
+        _raise_for_status(response)
+
+    async def query(self, client: httpx.AsyncClient, session: UploadSession, headers: Dict[str, str]) -> ChunkResult:
+        response = await client.put(
+            session.session_uri,
+            content=b"",
+            headers={**headers, "Content-Range": f"bytes */{session.total_bytes}"},
+        )
+        return self.interpret(response, 0, 0, session.total_bytes)
+
+
+class ContentRangeProtocol:
+    """
+    Fixed chunk plan acknowledged with 206 per chunk and 201 at the end (TikTok)
+
+    The chunk count is declared when the session starts; the last chunk
+    absorbs the remainder. Files under MIN_CHUNK go up in one chunk.
+    """
+
+    MIN_CHUNK = 5 * 1024 * 1024
+    MAX_CHUNK = 64 * 1024 * 1024
+    supports_query = False
+
+    def chunk_size_for(self, total_bytes: int, requested: int) -> int:
+        if total_bytes < self.MIN_CHUNK:
+            return total_bytes
+        return min(max(requested, self.MIN_CHUNK), self.MAX_CHUNK, total_bytes)
+
+    def chunk_count(self, total_bytes: int, chunk_size: int) -> int:
+        return max(1, total_bytes // chunk_size)
+
+    def next_chunk(self, offset: int, total_bytes: int, chunk_size: int) -> Tuple[int, int]:
+        if offset // chunk_size >= self.chunk_count(total_bytes, chunk_size) - 1:
+            return offset, total_bytes
+        return offset, offset + chunk_size
+
+    def chunk_headers(self, start: int, end: int, total_bytes: int) -> Dict[str, str]:
+        return {
+            "Content-Type": "video/mp4",
+            "Content-Range": f"bytes {start}-{end - 1}/{total_bytes}",
+        }
+
+    def interpret(self, response: httpx.Response, start: int, end: int, total_bytes: int) -> ChunkResult:
+        if response.status_code in (200, 201) and end >= total_bytes:
+            return ChunkResult(total_bytes, response)
+        if response.status_code in (200, 201, 206):
+            return ChunkResult(end)
+        _raise_for_status(response)
+
+
+# ============================================================================
+# UPLOADER
+# ============================================================================
+
+StartSession = Callable[[int, int], Awaitable[Tuple[str, Dict]]]
+
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+
+def _platform_slot(platform: str) -> asyncio.Semaphore:
+    """Per-platform concurrency limit (per process, per event loop)"""
+    loop_slots = _slots.setdefault(asyncio.get_running_loop(), {})
+    if platform not in loop_slots:
+        loop_slots[platform] = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS.get(platform, DEFAULT_MAX_CONCURRENT))
+    return loop_slots[platform]
+
+
+def _read_chunk(file_path: str, start: int, length: int) -> bytes:
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+
+@dataclass
+class UploadResult:
+    """Final server response plus what the session start returned"""
+    response: httpx.Response
+    extra: Dict
+    resumed_from: int = 0
+
+
+class ResumableUploader:
+    """Streams a file to an upload session, persisting progress after each chunk"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        store: Optional[UploadSessionStore] = None,
+        chunk_size: Optional[int] = None,
+        max_retries: int = MAX_RETRIES,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.client = client
+        self.store = store or UploadSessionStore()
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self.max_retries = max_retries
+        self.sleep = sleep
+
+    async def upload(
+        self,
+        key: str,
+        platform: str,
+        file_path: str,
+        protocol,
+        start_session: StartSession,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> UploadResult:
+        """
+        Upload a file, resuming a stored session for the same key if present
+
+        Args:
+            key: Stable id for this file + destination (see upload_key)
+            platform: Platform name, for concurrency limits
+            file_path: File to upload
+            protocol: GoogleResumableProtocol or ContentRangeProtocol
+            start_session: async (total_bytes, chunk_size) -> (session_uri, extra)
+            headers: Extra headers for every chunk request (e.g. auth)
+
+        Returns:
+            UploadResult with the server's final response
+        """
+        total = os.path.getsize(file_path)
+        if total == 0:
+            raise UploadError(f"{file_path} is empty")
+        chunk_size = protocol.chunk_size_for(total, self.chunk_size)
+
+        async with _platform_slot(platform):
+            session = self.store.load(key)
+            if session and (session.total_bytes != total or session.chunk_size != chunk_size):
+                self.store.delete(key)
+                session = None
+            resumed_from = session.offset if session else 0
+            if session:
+                logger.info(f"Resuming {platform} upload {key} at byte {session.offset}/{total}")
+
+            for attempt in range(2):
+                if session is None:
+                    session_uri, extra = await start_session(total, chunk_size)
+                    session = UploadSession(key, platform, session_uri, total, chunk_size, extra=extra)
+                    self.store.save(session)
+                try:
+                    response = await self._send(session, file_path, protocol, headers or {}, resumed=resumed_from > 0)
+                    self.store.delete(key)
+                    return UploadResult(response, session.extra, resumed_from)
+                except UploadSessionExpired:
+                    self.store.delete(key)
+                    if attempt:
+                        raise
+                    logger.warning(f"{platform} upload session expired, starting over")
+                    session = None
+                    resumed_from = 0
+                except UploadError:
+                    self.store.delete(key)
+                    raise
+
+    async def _send(self, session: UploadSession, file_path: str, protocol, headers: Dict[str, str], resumed: bool) -> httpx.Response:
+        total = session.total_bytes
+        # After a restart or failure, ask the server what it actually has
+        needs_sync = resumed and protocol.supports_query
+        failures = 0
+
+        while True:
+            queried = needs_sync
+            try:
+                if needs_sync:
+                    result = await protocol.query(self.client, session, headers)
+                else:
+                    start, end = protocol.next_chunk(session.offset, total, session.chunk_size)
+                    data = await asyncio.to_thread(_read_chunk, file_path, start, end - start)
+                    response = await self.client.put(
+                        session.session_uri,
+                        content=data,
+                        headers={**headers, **protocol.chunk_headers(start, end, total)},
+                    )
+                    result = protocol.interpret(response, start, end, total)
+                needs_sync = False
+            except (httpx.TransportError, RetryableUploadStatus) as e:
+                failures += 1
+                if failures > self.max_retries:
+                    raise UploadError(f"Upload stalled at byte {session.offset}/{total} after {failures} failures: {e}")
+                delay = self._backoff(failures, e)
+                logger.warning(f"{session.platform} chunk failed at byte {session.offset} ({e}); retry {failures} in {delay:.1f}s")
+                await self.sleep(delay)
+                needs_sync = protocol.supports_query
+                continue
+
+            if result.response is not None:
+                return result.response
+            if result.offset > session.offset:
+                failures = 0
+            elif not queried:
+                # Chunk acknowledged without committing anything new; resending
+                # it immediately would spin forever against a stuck server
+                failures += 1
+                if failures > self.max_retries:
+                    raise UploadError(f"Upload stalled at byte {session.offset}/{total} after {failures} chunks without progress")
+                delay = self._backoff(failures)
+                logger.warning(f"{session.platform} chunk at byte {session.offset} made no progress; retry {failures} in {delay:.1f}s")
+                await self.sleep(delay)
+            session.offset = result.offset
+            self.store.save(session)
+
+    @staticmethod
+    def _backoff(failures: int, error: Optional[Exception] = None) -> float:
+        if isinstance(error, RetryableUploadStatus):
+            retry_after = error.response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+        delay = min(BACKOFF_BASE_SECONDS * 2 ** (failures - 1), BACKOFF_MAX_SECONDS)
+        return delay * random.uniform(0.5, 1.0)
@@ -0,0 +1,421 @@
+"""
+Stitch Planner
+Assembles clips into one video by stream copy instead of re-encoding it all.
+
+1. Probe every clip (codec, size, frame rate, pixel format, audio layout,
+   keyframes near the cut points).
+2. Pick the profile most of the footage already has; only clips that differ
+   are re-encoded to it ("outliers").
+3. At boundaries with a transition, re-encode just the tail of one clip and
+   the head of the next (keyframe to keyframe) into a short xfade segment.
+4. Concatenate bodies and transition segments with the concat demuxer using
+   inpoint/outpoint and `-c copy`, muxing the soundtrack in the same pass.
+
+plan_stitch() is pure (probe data in, plan out); execute_plan() runs it.
+Anything the plan can't handle raises StitchUnsupported so callers can fall
+back to a full re-encode.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from services.instrumentation import record_subprocess
+
+TRANSITION_SECONDS = 0.5
+VIDEO_ENCODERS = {'h264': 'libx264', 'hevc': 'libx265'}
+AUDIO_ENCODERS = {'aac': 'aac', 'mp3': 'libmp3lame', 'opus': 'libopus'}
+XFADE_EFFECTS = {'crossfade': 'fade', 'dissolve': 'dissolve', 'fade': 'fadeblack'}
+H264_PROFILES = {'High': 'high', 'Main': 'main', 'Baseline': 'baseline', 'Constrained Baseline': 'baseline'}
+ENCODE_PRESET = 'veryfast'     # Short segments only; quality comes from CRF
+ENCODE_CRF = '20'
+
+
+class StitchUnsupported(Exception):
+    """The clips can't be stitched by stream copy; re-encode instead"""
+
+
+@dataclass
+class ClipProfile:
+    """What ffprobe reports about a clip"""
+    path: str
+    duration: float
+    vcodec: str
+    width: int
+    height: int
+    fps: str                       # Rational, e.g. "30/1"
+    pix_fmt: str
+    time_base: str                 # Video stream time base, e.g. "1/15360"
+    vprofile: Optional[str] = None
+    acodec: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    keyframes: List[float] = field(default_factory=list)
+
+    def video_key(self) -> Tuple:
+        return (self.vcodec, self.width, self.height, self.fps, self.pix_fmt)
+
+    def audio_key(self) -> Optional[Tuple]:
+        return (self.acodec, self.sample_rate, self.channels) if self.acodec else None
+
+
+@dataclass
+class Transition:
+    """Re-encoded segment joining clip `index` to clip `index + 1`"""
+    index: int
+    effect: str                    # xfade transition name
+    duration: float
+    tail_start: float              # Keyframe in clip index where the segment starts
+    head_end: float                # Keyframe in clip index + 1 where it ends
+    output: str
+
+
+@dataclass
+class StitchPlan:
+    target: ClipProfile
+    sources: List[str]             # Per clip: original or normalized path
+    normalize: Dict[int, List[float]]   # Clip index -> keyframes to force
+    inpoints: List[float]
+    outpoints: List[float]
+    transitions: List[Transition]
+    keep_clip_audio: bool
+    total_seconds: float
+
+    @property
+    def reencoded_seconds(self) -> float:
+        """Footage that goes through an encoder (for logging / benchmarks)"""
+        normalized = sum(self._durations[i] for i in self.normalize)
+        joined = sum((self._durations[t.index] - t.tail_start) + t.head_end for t in self.transitions)
+        return normalized + joined
+
+    _durations: List[float] = field(default_factory=list, repr=False)
+
+
+# ============================================================================
+# PLANNING
+# ============================================================================
+
+def _majority(profiles: List[ClipProfile], key) -> Optional[Tuple]:
+    """The key covering the most footage"""
+    weights = Counter()
+    for p in profiles:
+        if key(p) is not None:
+            weights[key(p)] += p.duration
+    return weights.most_common(1)[0][0] if weights else None
+
+
+def _first_at_or_after(keyframes: List[float], t: float) -> Optional[float]:
+    return next((k for k in keyframes if k >= t - 1e-3), None)
+
+
+def _last_at_or_before(keyframes: List[float], t: float) -> Optional[float]:
+    return next((k for k in reversed(keyframes) if k <= t + 1e-3), None)
+
+
+def plan_stitch(
+    profiles: List[ClipProfile],
+    transitions: List[str],
+    workdir: str,
+    keep_clip_audio: bool = True,
+    transition_seconds: float = TRANSITION_SECONDS,
+) -> StitchPlan:
+    """
+    Decide which clips to normalize and where to cut for transitions
+
+    Args:
+        profiles: Probed clips, in order
+        transitions: Effect name per boundary (len(profiles) - 1); "cut" = none
+        workdir: Where normalized clips and transition segments will be written
+        keep_clip_audio: Carry the clips' own audio (False when a soundtrack replaces it)
+        transition_seconds: Crossfade length
+
+    Returns:
+        StitchPlan for execute_plan()
+    """
+    if not profiles:
+        raise StitchUnsupported("No clips")
+
+    video_key = _majority(profiles, ClipProfile.video_key)
+    if video_key[0] not in VIDEO_ENCODERS:
+        raise StitchUnsupported(f"No encoder to match {video_key[0]} clips")
+    audio_key = _majority(profiles, ClipProfile.audio_key) if keep_clip_audio else None
+    if audio_key and audio_key[0] not in AUDIO_ENCODERS:
+        raise StitchUnsupported(f"No encoder to match {audio_key[0]} audio")
+    keep_clip_audio = audio_key is not None
+
+    reference = next(p for p in profiles if p.video_key() == video_key)
+    target = ClipProfile(
+        path='', duration=0, vcodec=video_key[0], width=video_key[1], height=video_key[2],
+        fps=video_key[3], pix_fmt=video_key[4], time_base=reference.time_base,
+        vprofile=reference.vprofile,
+        acodec=audio_key[0] if audio_key else None,
+        sample_rate=audio_key[1] if audio_key else None,
+        channels=audio_key[2] if audio_key else None,
+    )
+
+    count = len(profiles)
+    durations = [p.duration for p in profiles]
+    effects = [XFADE_EFFECTS.get(name) for name in (transitions + ['cut'] * count)[:count - 1]]
+    fade = [min(transition_seconds, durations[i] / 3, durations[i + 1] / 3) for i in range(count - 1)]
+
+    normalize: Dict[int, List[float]] = {}
+    for i, p in enumerate(profiles):
+        if p.video_key() != video_key or (keep_clip_audio and p.audio_key() != audio_key):
+            normalize[i] = []
+
+    # Cut points must be keyframes so the bodies can be stream-copied
+    inpoints, outpoints = [0.0] * count, list(durations)
+    for i, p in enumerate(profiles):
+        head_needed = fade[i - 1] if i > 0 and effects[i - 1] else 0.0
+        tail_needed = durations[i] - fade[i] if i < count - 1 and effects[i] else durations[i]
+        if i in normalize:
+            inpoints[i], outpoints[i] = head_needed, tail_needed
+        else:
+            head = _first_at_or_after(p.keyframes, head_needed) if head_needed else 0.0
+            tail = _last_at_or_before(p.keyframes, tail_needed) if tail_needed < durations[i] else durations[i]
+            if head is None or tail is None or head >= tail:
+                # Keyframes too sparse; re-encode and place them where needed
+                normalize[i] = []
+                inpoints[i], outpoints[i] = head_needed, tail_needed
+            else:
+                inpoints[i], outpoints[i] = head, tail
+        if i in normalize:
+            normalize[i] = [t for t in (inpoints[i], outpoints[i]) if 0 < t < durations[i]]
+
+    sources = [
+        os.path.join(workdir, f"norm_{i}.mp4") if i in normalize else p.path
+        for i, p in enumerate(profiles)
+    ]
+    joins = [
+        Transition(
+            index=i,
+            effect=effects[i],
+            duration=fade[i],
+            tail_start=outpoints[i],
+            head_end=inpoints[i + 1],
+            output=os.path.join(workdir, f"xfade_{i}.mp4"),
+        )
+        for i in range(count - 1) if effects[i]
+    ]
+    total = sum(durations) - sum(t.duration for t in joins)
+
+    return StitchPlan(
+        target=target,
+        sources=sources,
+        normalize=normalize,
+        inpoints=inpoints,
+        outpoints=outpoints,
+        transitions=joins,
+        keep_clip_audio=keep_clip_audio,
+        total_seconds=total,
+        _durations=durations,
+    )
+
+
+# ============================================================================
+# COMMANDS
+# ============================================================================
+
+def _video_encode_args(target: ClipProfile) -> List[str]:
+    args = ['-c:v', VIDEO_ENCODERS[target.vcodec], '-preset', ENCODE_PRESET, '-crf', ENCODE_CRF,
+            '-pix_fmt', target.pix_fmt, '-r', target.fps,
+            '-video_track_timescale', str(Fraction(target.time_base).denominator)]
+    if target.vcodec == 'h264' and target.vprofile in H264_PROFILES:
+        args += ['-profile:v', H264_PROFILES[target.vprofile]]
+    return args
+
+
+def _audio_encode_args(target: ClipProfile) -> List[str]:
+    return ['-c:a', AUDIO_ENCODERS[target.acodec], '-ar', str(target.sample_rate), '-ac', str(target.channels)]
+
+
+def _conform_filter(target: ClipProfile) -> str:
+    w, h = target.width, target.height
+    return (f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+            f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={target.fps},format={target.pix_fmt}")
+
+
+def normalize_cmd(plan: StitchPlan, index: int, profile: ClipProfile) -> List[str]:
+    """Re-encode one outlier clip to the target profile"""
+    target = plan.target
+    cmd = ['ffmpeg', '-y', '-i', profile.path]
+    if plan.keep_clip_audio and not profile.acodec:
+        layout = 'mono' if target.channels == 1 else 'stereo'
+        cmd += ['-f', 'lavfi', '-t', f"{profile.duration:.3f}",
+                '-i', f"anullsrc=channel_layout={layout}:sample_rate={target.sample_rate}"]
+    cmd += ['-vf', _conform_filter(target), *_video_encode_args(target)]
+    if plan.normalize[index]:
+        cmd += ['-force_key_frames', ','.join(f"{t:.3f}" for t in plan.normalize[index])]
+    cmd += ['-map', '0:v:0']
+    if plan.keep_clip_audio:
+        cmd += ['-map', '1:a:0' if not profile.acodec else '0:a:0', *_audio_encode_args(target)]
+    else:
+        cmd += ['-an']
+    return cmd + [plan.sources[index]]
+
+
+def transition_cmd(plan: StitchPlan, t: Transition) -> List[str]:
+    """Re-encode the tail of clip t.index and head of the next into an xfade segment"""
+    target = plan.target
+    tail_length = plan._durations[t.index] - t.tail_start
+    video = (f"[0:v]settb=AVTB,fps={target.fps}[a];[1:v]settb=AVTB,fps={target.fps}[b];"
+             f"[a][b]xfade=transition={t.effect}:duration={t.duration:.3f}:"
+             f"offset={tail_length - t.duration:.3f},format={target.pix_fmt}[v]")
+    cmd = ['ffmpeg', '-y',
+           '-ss', f"{t.tail_start:.3f}", '-i', plan.sources[t.index],
+           '-t', f"{t.head_end:.3f}", '-i', plan.sources[t.index + 1]]
+    if plan.keep_clip_audio:
+        cmd += ['-filter_complex', f"{video};[0:a][1:a]acrossfade=d={t.duration:.3f}[au]",
+                '-map', '[v]', '-map', '[au]', *_audio_encode_args(target)]
+    else:
+        cmd += ['-filter_complex', video, '-map', '[v]', '-an']
+    return cmd + [*_video_encode_args(target), t.output]
+
+
+def concat_list(plan: StitchPlan) -> str:
+    """Concat demuxer script: clip bodies (trimmed at keyframes) and transition segments"""
+    joins = {t.index: t for t in plan.transitions}
+    lines = []
+    for i, source in enumerate(plan.sources):
+        lines.append(f"file '{source}'")
+        if plan.inpoints[i] > 0:
+            lines.append(f"inpoint {plan.inpoints[i]:.6f}")
+        if plan.outpoints[i] < plan._durations[i]:
+            lines.append(f"outpoint {plan.outpoints[i]:.6f}")
+        if i in joins:
+            lines.append(f"file '{joins[i].output}'")
+    return '\n'.join(lines) + '\n'
+
+
+def concat_cmd(plan: StitchPlan, list_path: str, output_path: str, audio_path: Optional[str] = None) -> List[str]:
+    """Stream-copy the pieces together, muxing the soundtrack in the same pass"""
+    cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path]
+    if audio_path:
+        cmd += ['-i', audio_path, '-map', '0:v:0', '-map', '1:a:0', '-c:v', 'copy', '-c:a', 'aac', '-shortest']
+    elif plan.keep_clip_audio:
+        cmd += ['-map', '0:v:0', '-map', '0:a:0', '-c', 'copy']
+    else:
+        cmd += ['-map', '0:v:0', '-c', 'copy']
+    return cmd + ['-movflags', '+faststart', output_path]
+
+
+# ============================================================================
+# EXECUTION
+# ============================================================================
+
+async def _run(cmd: List[str], tool: str = 'ffmpeg') -> bytes:
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    record_subprocess(tool, time.perf_counter() - started, process.returncode)
+    if process.returncode != 0:
+        raise StitchUnsupported(f"{tool} failed: {stderr.decode(errors='replace')[-500:]}")
+    return stdout
+
+
+def _rate(value: Optional[str]) -> Optional[str]:
+    if not value or value == '0/0':
+        return None
+    return str(Fraction(value))
+
+
+async def probe_clip(path: str, with_keyframes: bool = True) -> ClipProfile:
+    """ffprobe a clip's streams (and keyframe times)"""
+    info = json.loads(await _run([
+        'ffprobe', '-v', 'error', '-show_streams', '-show_format', '-of', 'json', path,
+    ], 'ffprobe'))
+    video = next((s for s in info.get('streams', []) if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in info.get('streams', []) if s.get('codec_type') == 'audio'), None)
+    if video is None:
+        raise StitchUnsupported(f"No video stream in {path}")
+
+    keyframes: List[float] = []
+    if with_keyframes:
+        out = await _run([
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0', '-skip_frame', 'nokey',
+            '-show_entries', 'frame=pts_time', '-of', 'csv=p=0', path,
+        ], 'ffprobe')
+        keyframes = sorted(float(line) for line in out.decode().split() if line and line != 'N/A')
+
+    fps = _rate(video.get('avg_frame_rate')) or _rate(video.get('r_frame_rate'))
+    if fps is None:
+        raise StitchUnsupported(f"Unknown frame rate for {path}")
+    return ClipProfile(
+        path=path,
+        duration=float(info.get('format', {}).get('duration') or video.get('duration') or 0),
+        vcodec=video.get('codec_name'),
+        width=int(video.get('width', 0)),
+        height=int(video.get('height', 0)),
+        fps=fps,
+        pix_fmt=video.get('pix_fmt', 'yuv420p'),
+        time_base=video.get('time_base', '1/15360'),
+        vprofile=video.get('profile'),
+        acodec=audio.get('codec_name') if audio else None,
+        sample_rate=int(audio['sample_rate']) if audio and audio.get('sample_rate') else None,
+        channels=audio.get('channels') if audio else None,
+        keyframes=keyframes,
+    )
+
+
+async def execute_plan(
+    plan: StitchPlan,
+    profiles: List[ClipProfile],
+    output_path: str,
+    workdir: str,
+    audio_path: Optional[str] = None,
+    parallel: int = 2,
+) -> str:
+    """Run the normalize / transition encodes (in parallel) and the final copy"""
+    os.makedirs(workdir, exist_ok=True)
+    slots = asyncio.Semaphore(parallel)
+
+    async def bounded(cmd):
+        async with slots:
+            await _run(cmd)
+
+    await asyncio.gather(*(bounded(normalize_cmd(plan, i, profiles[i])) for i in plan.normalize))
+    await asyncio.gather(*(bounded(transition_cmd(plan, t)) for t in plan.transitions))
+
+    list_path = os.path.join(workdir, 'concat.txt')
+    with open(list_path, 'w') as f:
+        f.write(concat_list(plan))
+    await _run(concat_cmd(plan, list_path, output_path, audio_path))
+    return output_path
+
+
+async def stitch_clips(
+    clip_paths: List[str],
+    transitions: List[str],
+    output_path: str,
+    workdir: str,
+    audio_path: Optional[str] = None,
+) -> StitchPlan:
+    """
+    Probe, plan and stitch clips; raises StitchUnsupported when a full
+    re-encode is needed instead
+    """
+    transitions = (list(transitions) + ['cut'] * len(clip_paths))[:max(len(clip_paths) - 1, 0)]
+    needs_keyframes = [
+        (i > 0 and XFADE_EFFECTS.get(transitions[i - 1]) is not None)
+        or (i < len(clip_paths) - 1 and XFADE_EFFECTS.get(transitions[i]) is not None)
+        for i in range(len(clip_paths))
+    ]
+    profiles = await asyncio.gather(*(
+        probe_clip(path, with_keyframes=needs) for path, needs in zip(clip_paths, needs_keyframes)
+    ))
+    plan = plan_stitch(list(profiles), transitions, workdir, keep_clip_audio=audio_path is None)
+    logger.info(
+        f"Stitch plan: {len(plan.normalize)}/{len(profiles)} clips normalized, "
+        f"{len(plan.transitions)} transitions, {plan.reencoded_seconds:.1f}s of "
+        f"{plan.total_seconds:.1f}s re-encoded"
+    )
+    await execute_plan(plan, list(profiles), output_path, workdir, audio_path)
+    return plan
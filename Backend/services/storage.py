@@ -2,6 +2,7 @@
 Storage Service - Unified interface for media storage
 Automatically uses Supabase Storage (content bucket) when available
 """
+import asyncio
 import os
 from typing import Optional
 from loguru import logger
@@ -18,32 +19,37 @@ else:
 
 
 class StorageService:
-    """Unified storage interface - delegates to Supabase or local storage"""
+    """
+    Unified storage interface - delegates to Supabase or local storage
+
+    Both backends block (HTTP uploads, file copies), so transfers and deletes
+    run in a worker thread; URL lookups are local and stay synchronous.
+    """
     
     def __init__(self):
         self.backend = _storage
         self.using_supabase = USE_SUPABASE
     
-    def upload_video(self, file_path: str, video_id: str, extension: str = 'mp4') -> Optional[str]:
+    async def upload_video(self, file_path: str, video_id: str, extension: str = 'mp4') -> Optional[str]:
         """Upload a video and return its URL/path"""
         if self.using_supabase:
-            return self.backend.upload_video(file_path, video_id, extension)
+            return await asyncio.to_thread(self.backend.upload_video, file_path, video_id, extension)
         else:
-            return self.backend.save_video(file_path, video_id, extension)
+            return await asyncio.to_thread(self.backend.save_video, file_path, video_id, extension)
     
-    def upload_thumbnail(self, file_path: str, video_id: str) -> Optional[str]:
+    async def upload_thumbnail(self, file_path: str, video_id: str) -> Optional[str]:
         """Upload a thumbnail and return its URL/path"""
         if self.using_supabase:
-            return self.backend.upload_thumbnail(file_path, video_id)
+            return await asyncio.to_thread(self.backend.upload_thumbnail, file_path, video_id)
         else:
-            return self.backend.save_thumbnail(file_path, video_id)
+            return await asyncio.to_thread(self.backend.save_thumbnail, file_path, video_id)
     
-    def upload_clip(self, file_path: str, clip_id: str) -> Optional[str]:
+    async def upload_clip(self, file_path: str, clip_id: str) -> Optional[str]:
         """Upload a clip and return its URL/path"""
         if self.using_supabase:
-            return self.backend.upload_clip(file_path, clip_id)
+            return await asyncio.to_thread(self.backend.upload_clip, file_path, clip_id)
         else:
-            return self.backend.save_clip(file_path, clip_id)
+            return await asyncio.to_thread(self.backend.save_clip, file_path, clip_id)
     
     def get_video_url(self, video_id: str, extension: str = 'mp4') -> Optional[str]:
         """Get the URL/path for a video"""
@@ -69,17 +75,17 @@ class StorageService:
             path = self.backend.get_clip_path(clip_id)
             return str(path) if path else None
     
-    def delete_video(self, video_id: str, extension: str = 'mp4') -> bool:
+    async def delete_video(self, video_id: str, extension: str = 'mp4') -> bool:
         """Delete a video"""
-        return self.backend.delete_video(video_id, extension)
+        return await asyncio.to_thread(self.backend.delete_video, video_id, extension)
     
-    def delete_thumbnail(self, video_id: str) -> bool:
+    async def delete_thumbnail(self, video_id: str) -> bool:
         """Delete a thumbnail"""
-        return self.backend.delete_thumbnail(video_id)
+        return await asyncio.to_thread(self.backend.delete_thumbnail, video_id)
     
-    def delete_clip(self, clip_id: str) -> bool:
+    async def delete_clip(self, clip_id: str) -> bool:
         """Delete a clip"""
-        return self.backend.delete_clip(clip_id)
+        return await asyncio.to_thread(self.backend.delete_clip, clip_id)
 
 
 # Global storage instance - use this throughout the app
@@ -4,16 +4,22 @@ Selects best frames and generates platform-specific thumbnails with AI enhanceme
 """
 import logging
 import os
-from typing import Dict, List, Optional, Tuple, Any
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Any, Union
 from pathlib import Path
 import subprocess
 import json
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageEnhance, ImageFilter
 import openai
 from dataclasses import dataclass
 import base64
 from io import BytesIO
 
+from services.media_probe import probe_duration
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,6 +50,155 @@ PLATFORM_DIMENSIONS = {
 }
 
 
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff'}
+HEIC_EXTENSIONS = {'.heic', '.heif'}
+
+# Candidates are ranked on downscaled copies; the ranking is stable well below
+# source resolution and the batch stays small enough to score in one pass.
+SCORING_WIDTH = 320
+# Faces are looked for at a larger size so small faces still register
+FACE_DETECTION_WIDTH = 640
+FACE_DETECTION_TOP_K = 3
+DECODED_FRAME_CACHE_SIZE = 8
+
+_detectors = threading.local()
+
+
+def get_face_cascade():
+    """Haar face cascade, loaded once per thread and reused across frames"""
+    cascade = getattr(_detectors, "face_cascade", None)
+    if cascade is None:
+        import cv2
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        _detectors.face_cascade = cascade
+    return cascade
+
+
+def _resize_to_width(frame: np.ndarray, width: int) -> np.ndarray:
+    import cv2
+
+    height, source_width = frame.shape[:2]
+    if source_width <= width:
+        return frame
+    new_height = max(1, round(height * width / source_width))
+    return cv2.resize(frame, (width, new_height), interpolation=cv2.INTER_AREA)
+
+
+def detect_faces(frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Detect faces in an RGB frame with the shared cascade"""
+    import cv2
+
+    small = _resize_to_width(frame, FACE_DETECTION_WIDTH)
+    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY) if small.ndim == 3 else small
+    return list(get_face_cascade().detectMultiScale(gray, 1.1, 4))
+
+
+def score_frames(
+    frames: List[np.ndarray],
+    face_top_k: int = FACE_DETECTION_TOP_K
+) -> List[Dict[str, Any]]:
+    """
+    Score RGB frames for thumbnail suitability
+
+    Sharpness (Laplacian variance), brightness, contrast and saturation are
+    computed for the whole batch at once on downscaled copies. Face detection
+    is the expensive part, so it only runs on the face_top_k best candidates.
+
+    Args:
+        frames: RGB uint8 arrays
+        face_top_k: How many top-ranked frames get face detection
+
+    Returns:
+        Quality metrics dicts, in the same order as frames
+    """
+    import cv2
+
+    if not frames:
+        return []
+
+    first = _resize_to_width(frames[0], SCORING_WIDTH)
+    height, width = first.shape[:2]
+    batch = np.stack([
+        small if small.shape[:2] == (height, width)
+        else cv2.resize(small, (width, height), interpolation=cv2.INTER_AREA)
+        for small in (_resize_to_width(frame, SCORING_WIDTH) for frame in frames)
+    ]).astype(np.float32)
+
+    gray = batch @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    laplacian = (
+        gray[:, :-2, 1:-1] + gray[:, 2:, 1:-1] +
+        gray[:, 1:-1, :-2] + gray[:, 1:-1, 2:] -
+        4 * gray[:, 1:-1, 1:-1]
+    )
+    laplacian_var = laplacian.reshape(len(frames), -1).var(axis=1) if laplacian.size else np.zeros(len(frames))
+    sharpness = np.minimum(laplacian_var / 500, 1.0)
+
+    brightness = 1.0 - np.abs(gray.mean(axis=(1, 2)) / 255.0 - 0.5) * 2  # Prefer mid-range
+    contrast = np.minimum(gray.std(axis=(1, 2)) / 128.0, 1.0)
+
+    # HSV saturation: (max - min) / max per pixel
+    channel_max = batch.max(axis=3)
+    channel_min = batch.min(axis=3)
+    vibrancy = np.where(
+        channel_max > 0, (channel_max - channel_min) / np.maximum(channel_max, 1.0), 0.0
+    ).mean(axis=(1, 2))
+
+    base_score = sharpness * 0.3 + brightness * 0.2 + contrast * 0.2 + vibrancy * 0.1
+
+    faces = np.zeros(len(frames), dtype=int)
+    for index in np.argsort(-base_score, kind="stable")[:face_top_k]:
+        faces[index] = len(detect_faces(frames[index]))
+    face_score = np.minimum(faces * 0.3, 1.0)  # Bonus for faces
+
+    overall = base_score + face_score * 0.2
+
+    return [
+        {
+            "sharpness": round(float(sharpness[i]), 3),
+            "brightness": round(float(brightness[i]), 3),
+            "contrast": round(float(contrast[i]), 3),
+            "faces_detected": int(faces[i]),
+            "face_score": round(float(face_score[i]), 3),
+            "vibrancy": round(float(vibrancy[i]), 3),
+            "overall_score": round(float(overall[i]), 3),
+        }
+        for i in range(len(frames))
+    ]
+
+
+def decode_video_frames(video_path: str, num_frames: int) -> List[Tuple[Optional[float], np.ndarray]]:
+    """
+    Decode evenly spaced frames from a video with a single OpenCV capture
+
+    Returns:
+        List of (timestamp_seconds, rgb_frame); empty if OpenCV can't read the file
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(video_path)
+    try:
+        if not capture.isOpened():
+            return []
+
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0
+        frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        if fps <= 0 or frame_count <= 0:
+            ok, bgr = capture.read()
+            return [(0.0, np.ascontiguousarray(bgr[:, :, ::-1]))] if ok else []
+
+        interval = frame_count / fps / (num_frames + 1)
+        frames = []
+        for i in range(1, num_frames + 1):
+            timestamp = interval * i
+            capture.set(cv2.CAP_PROP_POS_MSEC, timestamp * 1000)
+            ok, bgr = capture.read()
+            if ok:
+                frames.append((timestamp, np.ascontiguousarray(bgr[:, :, ::-1])))
+        return frames
+    finally:
+        capture.release()
+
+
 class ThumbnailGenerator:
     """
     Intelligent thumbnail generation with best frame selection
@@ -60,6 +215,8 @@ class ThumbnailGenerator:
         self.openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
         if self.openai_api_key:
             openai.api_key = self.openai_api_key
+        # Keyed by (path, size, mtime) so a file rewritten in place is re-read
+        self._decoded_frames: "OrderedDict[Tuple[str, int, int], Image.Image]" = OrderedDict()
     
     def extract_frames(
         self,
@@ -85,14 +242,11 @@ class ThumbnailGenerator:
         
         # Check if input is an image
         ext = Path(video_path).suffix.lower()
-        image_extensions = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff'}
-        heic_extensions = {'.heic', '.heif'}
-        
-        if ext in image_extensions:
+        if ext in IMAGE_EXTENSIONS:
             logger.info(f"Input is an image {ext}, skipping frame extraction")
             return [video_path]
             
-        if ext in heic_extensions:
+        if ext in HEIC_EXTENSIONS:
             logger.info(f"Input is HEIC image {ext}, converting to color JPG")
             output_path = f"{output_dir}/{Path(video_path).stem}.jpg"
             
@@ -241,6 +395,96 @@ class ThumbnailGenerator:
             logger.error(f"Error extracting frames: {e}")
             return []
     
+    def decode_candidates(
+        self,
+        video_path: str,
+        num_frames: int = 10
+    ) -> List[Tuple[Optional[float], np.ndarray]]:
+        """
+        Decode candidate frames straight into memory as RGB arrays
+
+        Videos are opened once and seeked to evenly spaced timestamps; images
+        (including HEIC) yield a single frame. Nothing is written to disk.
+
+        Args:
+            video_path: Path to video or image file
+            num_frames: Number of frames to decode from a video
+
+        Returns:
+            List of (timestamp_seconds, rgb_frame); timestamp is None for images
+        """
+        ext = Path(video_path).suffix.lower()
+
+        if ext in IMAGE_EXTENSIONS or ext in HEIC_EXTENSIONS:
+            try:
+                if ext in HEIC_EXTENSIONS:
+                    import pillow_heif
+                    pillow_heif.register_heif_opener()
+                img = Image.open(video_path)
+                if img.mode != 'RGB':
+                    img = img.convert('RGB')
+                return [(None, np.asarray(img))]
+            except Exception as e:
+                if ext in IMAGE_EXTENSIONS:
+                    logger.error(f"Error decoding image {video_path}: {e}")
+                    return []
+                # Same ffmpeg conversion extract_frames falls back to
+                logger.warning(f"In-memory HEIC decode failed ({e}), converting via extract_frames")
+                frames = self._read_frame_files(self.extract_frames(video_path, num_frames=1))
+                return [(None, frame) for _, frame in frames]
+
+        frames = decode_video_frames(video_path, num_frames)
+        if not frames:
+            frames = self._decode_with_ffmpeg(video_path, num_frames)
+        return frames
+
+    def _decode_with_ffmpeg(
+        self,
+        video_path: str,
+        num_frames: int
+    ) -> List[Tuple[Optional[float], np.ndarray]]:
+        """Fallback for containers OpenCV cannot open: pipe PNG frames from ffmpeg"""
+        import cv2
+
+        try:
+            duration = probe_duration(video_path)
+            timestamps = (
+                [duration / (num_frames + 1) * i for i in range(1, num_frames + 1)]
+                if duration else [0.0]
+            )
+
+            frames = []
+            for timestamp in timestamps:
+                result = subprocess.run(
+                    [
+                        "ffmpeg", "-ss", str(timestamp), "-i", video_path,
+                        "-vframes", "1", "-f", "image2pipe", "-vcodec", "png", "-"
+                    ],
+                    capture_output=True,
+                    check=True
+                )
+                bgr = cv2.imdecode(np.frombuffer(result.stdout, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if bgr is not None:
+                    frames.append((timestamp, np.ascontiguousarray(bgr[:, :, ::-1])))
+            return frames
+
+        except Exception as e:
+            logger.error(f"Error extracting frames: {e}")
+            return []
+
+    def _read_frame_files(self, frame_paths: List[str]) -> List[Tuple[str, np.ndarray]]:
+        """Read frame files once each into RGB arrays, skipping unreadable ones"""
+        import cv2
+
+        frames = []
+        for frame_path in frame_paths:
+            bgr = cv2.imread(frame_path)
+            if bgr is None:
+                logger.error(f"Error reading frame {frame_path}")
+                continue
+            frames.append((frame_path, np.ascontiguousarray(bgr[:, :, ::-1])))
+        return frames
+
     def analyze_frame_quality(self, frame_path: str) -> Dict[str, Any]:
         """
         Analyze a frame's suitability for thumbnail use
@@ -250,7 +494,6 @@ class ThumbnailGenerator:
         - Brightness/contrast
         - Face detection
         - Color vibrancy
-        - Composition (rule of thirds)
         
         Args:
             frame_path: Path to frame image
@@ -259,58 +502,13 @@ class ThumbnailGenerator:
             Quality metrics dict
         """
         try:
-            img = Image.open(frame_path)
-            
-            # Convert to RGB if needed
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Calculate sharpness (Laplacian variance)
-            import cv2
-            import numpy as np
-            
-            cv_img = cv2.imread(frame_path)
-            gray = cv2.cvtColor(cv_img, cv2.COLOR_BGR2GRAY)
-            laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-            sharpness_score = min(laplacian_var / 500, 1.0)  # Normalize
-            
-            # Calculate brightness
-            brightness = np.mean(gray) / 255.0
-            brightness_score = 1.0 - abs(brightness - 0.5) * 2  # Prefer mid-range
-            
-            # Calculate contrast
-            contrast = gray.std() / 128.0
-            contrast_score = min(contrast, 1.0)
-            
-            # Detect faces (simple Haar cascade)
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-            face_score = min(len(faces) * 0.3, 1.0)  # Bonus for faces
-            
-            # Calculate color vibrancy
-            hsv = cv2.cvtColor(cv_img, cv2.COLOR_BGR2HSV)
-            saturation = np.mean(hsv[:, :, 1]) / 255.0
-            vibrancy_score = saturation
-            
-            # Overall score (weighted average)
-            overall_score = (
-                sharpness_score * 0.3 +
-                brightness_score * 0.2 +
-                contrast_score * 0.2 +
-                face_score * 0.2 +
-                vibrancy_score * 0.1
-            )
+            frames = self._read_frame_files([frame_path])
+            if not frames:
+                raise ValueError("unreadable image")
             
-            return {
-                "sharpness": round(sharpness_score, 3),
-                "brightness": round(brightness_score, 3),
-                "contrast": round(contrast_score, 3),
-                "faces_detected": len(faces),
-                "face_score": round(face_score, 3),
-                "vibrancy": round(vibrancy_score, 3),
-                "overall_score": round(overall_score, 3),
-                "frame_path": frame_path
-            }
+            analysis = score_frames([frames[0][1]])[0]
+            analysis["frame_path"] = frame_path
+            return analysis
             
         except Exception as e:
             logger.error(f"Error analyzing frame {frame_path}: {e}")
@@ -319,38 +517,45 @@ class ThumbnailGenerator:
     def select_best_frame(
         self,
         video_path: str,
-        num_candidates: int = 10
+        num_candidates: int = 10,
+        output_dir: Optional[str] = None
     ) -> Tuple[str, Dict[str, Any]]:
         """
         Select the best frame from video for thumbnail
         
+        Candidates are decoded and scored in memory; only the winning frame is
+        written to disk (image inputs are returned as-is).
+
         Args:
             video_path: Path to video file
             num_candidates: Number of candidate frames to analyze
+            output_dir: Directory for the selected frame
             
         Returns:
             Tuple of (best_frame_path, analysis_data)
         """
-        # Extract candidate frames
-        frames = self.extract_frames(video_path, num_frames=num_candidates)
+        candidates = self.decode_candidates(video_path, num_frames=num_candidates)
         
-        if not frames:
+        if not candidates:
             raise ValueError("No frames could be extracted from video")
         
-        # Analyze each frame
-        analyses = []
-        for frame_path in frames:
-            analysis = self.analyze_frame_quality(frame_path)
-            analyses.append(analysis)
+        analyses = score_frames([frame for _, frame in candidates])
+        best_index = max(range(len(analyses)), key=lambda i: analyses[i]["overall_score"])
+        timestamp, frame = candidates[best_index]
         
-        # Sort by overall score
-        analyses.sort(key=lambda x: x["overall_score"], reverse=True)
+        if Path(video_path).suffix.lower() in IMAGE_EXTENSIONS:
+            frame_path = video_path
+        else:
+            frame_path = self._save_frame(frame, video_path, output_dir)
         
-        best_frame = analyses[0]
+        best_frame = analyses[best_index]
+        best_frame["frame_path"] = frame_path
+        best_frame["timestamp"] = timestamp
+        self._remember_frame(frame_path, frame)
         
-        logger.info(f"Best frame selected: {best_frame['frame_path']} (score: {best_frame['overall_score']})")
+        logger.info(f"Best frame selected: {frame_path} (score: {best_frame['overall_score']})")
         
-        return best_frame["frame_path"], best_frame
+        return frame_path, best_frame
 
     def select_best_from_frames(
         self,
@@ -362,23 +567,67 @@ class ThumbnailGenerator:
         if not frame_paths:
             raise ValueError("No frames provided")
             
-        # Analyze each frame
-        analyses = []
-        for frame_path in frame_paths:
-            analysis = self.analyze_frame_quality(frame_path)
-            analyses.append(analysis)
+        frames = self._read_frame_files(frame_paths)
+        if not frames:
+            return frame_paths[0], {"overall_score": 0.0, "frame_path": frame_paths[0]}
         
-        # Sort by overall score
-        analyses.sort(key=lambda x: x["overall_score"], reverse=True)
+        analyses = score_frames([frame for _, frame in frames])
+        for (frame_path, _), analysis in zip(frames, analyses):
+            analysis["frame_path"] = frame_path
         
-        best_frame = analyses[0]
+        best_index = max(range(len(analyses)), key=lambda i: analyses[i]["overall_score"])
+        best_frame = analyses[best_index]
+        self._remember_frame(best_frame["frame_path"], frames[best_index][1])
+
         logger.info(f"Best frame selected: {best_frame['frame_path']} (score: {best_frame['overall_score']})")
         
         return best_frame["frame_path"], best_frame
     
+    def _save_frame(self, frame: np.ndarray, video_path: str, output_dir: Optional[str]) -> str:
+        """Write the selected frame as a high-quality JPEG with a collision-free name"""
+        if output_dir is None:
+            output_dir = "/tmp/thumbnail_candidates"
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+        output_path = f"{output_dir}/{Path(video_path).stem}_{uuid.uuid4().hex[:8]}.jpg"
+        Image.fromarray(frame).save(output_path, "JPEG", quality=95)
+        return output_path
+
+    @staticmethod
+    def _frame_key(frame_path: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            stat = os.stat(frame_path)
+        except OSError:
+            return None
+        return (os.path.abspath(frame_path), stat.st_size, stat.st_mtime_ns)
+
+    def _remember_frame(self, frame_path: str, frame: np.ndarray):
+        """Keep the decoded frame so platform crops don't re-read it from disk"""
+        key = self._frame_key(frame_path)
+        if key is None:
+            return
+        self._decoded_frames[key] = Image.fromarray(frame)
+        self._decoded_frames.move_to_end(key)
+        while len(self._decoded_frames) > DECODED_FRAME_CACHE_SIZE:
+            self._decoded_frames.popitem(last=False)
+
+    def _load_source(self, source_image: Union[str, Image.Image]) -> Image.Image:
+        """Return an RGB image, reusing a frame decoded by select_best_frame"""
+        key = None if isinstance(source_image, Image.Image) else self._frame_key(source_image)
+        if isinstance(source_image, Image.Image):
+            img = source_image
+        elif key in self._decoded_frames:
+            img = self._decoded_frames[key]
+        else:
+            img = Image.open(source_image)
+
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        return img
+
     def generate_thumbnail(
         self,
-        source_image: str,
+        source_image: Union[str, Image.Image],
         platform: str,
         output_path: str,
         crop_mode: str = "smart"
@@ -387,7 +636,7 @@ class ThumbnailGenerator:
         Generate platform-specific thumbnail from source image
         
         Args:
-            source_image: Path to source image
+            source_image: Path to source image, or an already decoded image
             platform: Platform key (e.g., 'youtube', 'tiktok')
             output_path: Where to save thumbnail
             crop_mode: 'smart', 'center', 'top', 'bottom'
@@ -399,11 +648,7 @@ class ThumbnailGenerator:
             raise ValueError(f"Unknown platform: {platform}")
         
         dims = PLATFORM_DIMENSIONS[platform]
-        img = Image.open(source_image)
-        
-        # Convert to RGB if needed
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
+        img = self._load_source(source_image)
         
         # Calculate aspect ratios
         source_ratio = img.width / img.height
@@ -437,15 +682,17 @@ class ThumbnailGenerator:
     
     def generate_all_platforms(
         self,
-        source_image: str,
+        source_image: Union[str, Image.Image],
         output_dir: str,
         base_name: str = "thumbnail"
     ) -> Dict[str, str]:
         """
         Generate thumbnails for all social media platforms
         
+        The source is decoded once and every platform crop is cut from it.
+
         Args:
-            source_image: Path to source image
+            source_image: Path to source image, or an already decoded image
             output_dir: Directory to save thumbnails
             base_name: Base filename for thumbnails
             
@@ -455,12 +702,13 @@ class ThumbnailGenerator:
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         
         thumbnails = {}
+        img = self._load_source(source_image)
         
         for platform in PLATFORM_DIMENSIONS.keys():
             output_path = f"{output_dir}/{base_name}_{platform}.jpg"
             
             try:
-                self.generate_thumbnail(source_image, platform, output_path)
+                self.generate_thumbnail(img, platform, output_path)
                 thumbnails[platform] = output_path
             except Exception as e:
                 logger.error(f"Error generating {platform} thumbnail: {e}")
@@ -0,0 +1,386 @@
+"""
+OAuth Token Vault
+Encrypted, database-backed storage for OAuth tokens and pending OAuth
+states, shared by every worker process.
+
+- Token and state payloads are encrypted with Fernet before they reach the
+  database (TOKEN_VAULT_KEY; a comma-separated list rotates keys: the first
+  encrypts, all of them decrypt).
+- Refreshes are serialized per token by a lease column
+  (refresh_claimed_until): one worker claims it, everyone else waits for the
+  new token instead of spending the refresh token a second time.
+- Each token gets a refresh_due_at ahead of its expiry, jittered so tokens
+  issued together don't all come due together; TokenRefresher renews them
+  in the background.
+- Pending states expire after STATE_TTL_SECONDS and can be consumed once.
+
+Times are stored as epoch seconds so the same SQL runs on Postgres and on
+SQLite (tests).
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import text
+
+REFRESH_LEAD_FRACTION = 0.2     # Renew when ~20% of a token's lifetime is left...
+MIN_REFRESH_LEAD_SECONDS = 300  # ...but never later than 5 minutes before expiry
+REFRESH_LEASE_SECONDS = 60
+MAX_REFRESH_BACKOFF_SECONDS = 3600
+STATE_TTL_SECONDS = 600
+
+UPSERT_TOKEN_SQL = """
+INSERT INTO oauth_tokens (user_id, provider, ciphertext, expires_at, refresh_due_at, refresh_claimed_until, refresh_failures, updated_at)
+VALUES (:user_id, :provider, :ciphertext, :expires_at, :refresh_due_at, NULL, 0, :now)
+ON CONFLICT (user_id, provider) DO UPDATE SET
+    ciphertext = excluded.ciphertext,
+    expires_at = excluded.expires_at,
+    refresh_due_at = excluded.refresh_due_at,
+    refresh_claimed_until = NULL,
+    refresh_failures = 0,
+    updated_at = excluded.updated_at
+"""
+
+SELECT_TOKEN_SQL = """
+SELECT ciphertext, expires_at, refresh_claimed_until, updated_at
+FROM oauth_tokens
+WHERE user_id = :user_id AND provider = :provider
+"""
+
+LIST_USER_TOKENS_SQL = """
+SELECT provider, ciphertext FROM oauth_tokens WHERE user_id = :user_id ORDER BY provider
+"""
+
+DELETE_TOKEN_SQL = """
+DELETE FROM oauth_tokens WHERE user_id = :user_id AND provider = :provider
+"""
+
+# The claim condition is in the outer WHERE so a worker that loses the race
+# re-evaluates it against the winner's row and matches nothing
+CLAIM_TOKEN_SQL = """
+UPDATE oauth_tokens
+SET refresh_claimed_until = :lease_until
+WHERE user_id = :user_id AND provider = :provider
+  AND (refresh_claimed_until IS NULL OR refresh_claimed_until < :now)
+RETURNING ciphertext, refresh_failures
+"""
+
+CLAIM_DUE_SQL = """
+UPDATE oauth_tokens
+SET refresh_claimed_until = :lease_until
+WHERE (user_id, provider) IN (
+    SELECT user_id, provider FROM oauth_tokens
+    WHERE refresh_due_at <= :now
+      AND (refresh_claimed_until IS NULL OR refresh_claimed_until < :now)
+    ORDER BY refresh_due_at
+    LIMIT :limit
+)
+  AND (refresh_claimed_until IS NULL OR refresh_claimed_until < :now)
+RETURNING user_id, provider, ciphertext, refresh_failures
+"""
+
+REFRESH_FAILED_SQL = """
+UPDATE oauth_tokens
+SET refresh_claimed_until = NULL,
+    refresh_failures = refresh_failures + 1,
+    refresh_due_at = :retry_at
+WHERE user_id = :user_id AND provider = :provider
+"""
+
+INSERT_STATE_SQL = """
+INSERT INTO oauth_states (state_key, ciphertext, expires_at) VALUES (:state_key, :ciphertext, :expires_at)
+"""
+
+CONSUME_STATE_SQL = """
+DELETE FROM oauth_states WHERE state_key = :state_key RETURNING ciphertext, expires_at
+"""
+
+PURGE_STATES_SQL = """
+DELETE FROM oauth_states WHERE expires_at < :now
+"""
+
+
+class TokenVaultError(ValueError):
+    """Raised when the vault can't store, find or refresh a token"""
+
+
+class TokenCipher:
+    """Fernet encryption for vault payloads (MultiFernet for key rotation)"""
+
+    def __init__(self, keys: Optional[str] = None):
+        from cryptography.fernet import Fernet, MultiFernet
+
+        keys = keys if keys is not None else os.getenv("TOKEN_VAULT_KEY", "")
+        fernets = [Fernet(k.strip().encode()) for k in keys.split(",") if k.strip()]
+        if not fernets:
+            raise TokenVaultError(
+                "TOKEN_VAULT_KEY is not set (generate one with "
+                "`python -c 'from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())'`)"
+            )
+        self._fernet = MultiFernet(fernets)
+
+    def encrypt(self, payload: Dict[str, Any]) -> str:
+        return self._fernet.encrypt(json.dumps(payload).encode()).decode()
+
+    def decrypt(self, ciphertext: str) -> Dict[str, Any]:
+        from cryptography.fernet import InvalidToken
+
+        try:
+            return json.loads(self._fernet.decrypt(ciphertext.encode()))
+        except InvalidToken:
+            raise TokenVaultError("Stored token can't be decrypted with the configured TOKEN_VAULT_KEY")
+
+
+def token_vault_configured() -> bool:
+    return bool(os.getenv("TOKEN_VAULT_KEY"))
+
+
+def refresh_due_at(issued_at: float, expires_at: float, rng: random.Random = random) -> float:
+    """
+    When to renew a token: a lead proportional to its lifetime (so an hour
+    token renews ~12 minutes early and a 60-day token ~12 days early), then
+    pulled earlier by up to half that lead at random to spread out tokens
+    that were issued together.
+    """
+    lifetime = max(0.0, expires_at - issued_at)
+    lead = min(max(lifetime * REFRESH_LEAD_FRACTION, MIN_REFRESH_LEAD_SECONDS), lifetime / 2)
+    return expires_at - lead - rng.uniform(0, lead / 2)
+
+
+# (payload) -> (new payload, new expires_at epoch seconds)
+RefreshFn = Callable[[Dict[str, Any]], Awaitable[Tuple[Dict[str, Any], float]]]
+
+
+@dataclass
+class VaultToken:
+    """A decrypted token row"""
+    payload: Dict[str, Any]
+    expires_at: float
+    refresh_claimed_until: Optional[float]
+    updated_at: float
+
+
+class TokenVault:
+    """Token and OAuth-state storage; see module docstring"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable] = None,
+        cipher: Optional[TokenCipher] = None,
+        clock: Callable[[], float] = time.time,
+        lease_seconds: float = REFRESH_LEASE_SECONDS,
+        wait_interval: float = 0.2,
+    ):
+        self._session_factory = session_factory
+        self._cipher = cipher
+        self.clock = clock
+        self.lease_seconds = lease_seconds
+        self.wait_interval = wait_interval
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    @property
+    def cipher(self) -> TokenCipher:
+        if self._cipher is None:
+            self._cipher = TokenCipher()
+        return self._cipher
+
+    def _session(self):
+        factory = self._session_factory
+        if factory is None:
+            from database import connection
+            factory = connection.async_session_maker
+        if factory is None:
+            raise TokenVaultError("Database not initialized")
+        return factory()
+
+    async def _execute(self, sql: str, params: Dict[str, Any]) -> list:
+        async with self._session() as session:
+            result = await session.execute(text(sql), params)
+            rows = result.fetchall() if result.returns_rows else []
+            await session.commit()
+            return rows
+
+    # ------------------------------------------------------------------
+    # Tokens
+    # ------------------------------------------------------------------
+
+    async def save_token(
+        self,
+        user_id: str,
+        provider: str,
+        payload: Dict[str, Any],
+        expires_at: float,
+        issued_at: Optional[float] = None,
+    ):
+        """Store (or replace) a token; also releases any refresh lease on it"""
+        now = self.clock()
+        await self._execute(UPSERT_TOKEN_SQL, {
+            'user_id': user_id,
+            'provider': provider,
+            'ciphertext': self.cipher.encrypt(payload),
+            'expires_at': expires_at,
+            'refresh_due_at': refresh_due_at(issued_at or now, expires_at) if payload.get('refresh_token') else None,
+            'now': now,
+        })
+
+    async def get_token(self, user_id: str, provider: str) -> Optional[VaultToken]:
+        rows = await self._execute(SELECT_TOKEN_SQL, {'user_id': user_id, 'provider': provider})
+        if not rows:
+            return None
+        ciphertext, expires_at, claimed_until, updated_at = rows[0]
+        return VaultToken(self.cipher.decrypt(ciphertext), expires_at, claimed_until, updated_at)
+
+    async def list_tokens(self, user_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+        rows = await self._execute(LIST_USER_TOKENS_SQL, {'user_id': user_id})
+        return [(provider, self.cipher.decrypt(ciphertext)) for provider, ciphertext in rows]
+
+    async def delete_token(self, user_id: str, provider: str):
+        await self._execute(DELETE_TOKEN_SQL, {'user_id': user_id, 'provider': provider})
+
+    async def refresh(
+        self,
+        user_id: str,
+        provider: str,
+        refresh_fn: RefreshFn,
+        min_valid_seconds: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Refresh a token unless it's still valid for `min_valid_seconds`
+        (None: always refresh). If another worker holds the refresh lease,
+        wait for its result instead of refreshing again.
+        """
+        lock = self._locks.setdefault((user_id, provider), asyncio.Lock())
+        async with lock:
+            token = await self.get_token(user_id, provider)
+            if token is None:
+                raise TokenVaultError("No token found for user/provider")
+            if min_valid_seconds is not None and token.expires_at - self.clock() > min_valid_seconds:
+                return token.payload  # Refreshed by someone else while we waited for the lock
+
+            now = self.clock()
+            rows = await self._execute(CLAIM_TOKEN_SQL, {
+                'user_id': user_id, 'provider': provider, 'now': now, 'lease_until': now + self.lease_seconds,
+            })
+            if not rows:
+                return await self._wait_for_refresh(user_id, provider, token.updated_at)
+            ciphertext, failures = rows[0]
+            return await self.refresh_claimed(user_id, provider, self.cipher.decrypt(ciphertext), failures, refresh_fn)
+
+    async def refresh_claimed(
+        self,
+        user_id: str,
+        provider: str,
+        payload: Dict[str, Any],
+        failures: int,
+        refresh_fn: RefreshFn,
+    ) -> Dict[str, Any]:
+        """Run the refresh for a token whose lease we hold; failures back off exponentially"""
+        try:
+            new_payload, expires_at = await refresh_fn(payload)
+        except Exception as e:
+            await self._execute(REFRESH_FAILED_SQL, {
+                'user_id': user_id,
+                'provider': provider,
+                'retry_at': self.clock() + min(60 * 2 ** failures, MAX_REFRESH_BACKOFF_SECONDS),
+            })
+            logger.warning(f"Token refresh failed for {provider} user {user_id} (attempt {failures + 1}): {e}")
+            raise
+        await self.save_token(user_id, provider, new_payload, expires_at)
+        return new_payload
+
+    async def _wait_for_refresh(self, user_id: str, provider: str, seen_updated_at: float) -> Dict[str, Any]:
+        """Another worker is refreshing: wait for its lease to clear and use what it stored"""
+        deadline = self.clock() + self.lease_seconds
+        while self.clock() < deadline:
+            await asyncio.sleep(self.wait_interval)
+            token = await self.get_token(user_id, provider)
+            if token is None:
+                raise TokenVaultError("Token was removed during refresh")
+            if token.updated_at != seen_updated_at or not token.refresh_claimed_until:
+                if token.expires_at <= self.clock():
+                    raise TokenVaultError("Token refresh failed in another worker")
+                return token.payload
+        raise TokenVaultError("Timed out waiting for another worker's token refresh")
+
+    async def claim_due(self, limit: int = 50) -> List[Tuple[str, str, Dict[str, Any], int]]:
+        """Lease up to `limit` tokens whose refresh is due: (user_id, provider, payload, failures)"""
+        now = self.clock()
+        rows = await self._execute(CLAIM_DUE_SQL, {'now': now, 'lease_until': now + self.lease_seconds, 'limit': limit})
+        return [
+            (user_id, provider, self.cipher.decrypt(ciphertext), failures)
+            for user_id, provider, ciphertext, failures in rows
+        ]
+
+    # ------------------------------------------------------------------
+    # Pending OAuth states
+    # ------------------------------------------------------------------
+
+    async def save_state(self, state_key: str, payload: Dict[str, Any], ttl_seconds: float = STATE_TTL_SECONDS):
+        await self._execute(INSERT_STATE_SQL, {
+            'state_key': state_key,
+            'ciphertext': self.cipher.encrypt(payload),
+            'expires_at': self.clock() + ttl_seconds,
+        })
+
+    async def consume_state(self, state_key: str) -> Optional[Dict[str, Any]]:
+        """Remove and return a pending state; None if unknown, used or expired"""
+        rows = await self._execute(CONSUME_STATE_SQL, {'state_key': state_key})
+        if not rows or rows[0][1] < self.clock():
+            return None
+        return self.cipher.decrypt(rows[0][0])
+
+    async def purge_expired_states(self) -> int:
+        async with self._session() as session:
+            result = await session.execute(text(PURGE_STATES_SQL), {'now': self.clock()})
+            await session.commit()
+            return result.rowcount or 0
+
+
+class TokenRefresher:
+    """Background loop renewing tokens as their refresh_due_at comes up"""
+
+    def __init__(
+        self,
+        vault: TokenVault,
+        refresh_fn_for: Callable[[str, str], RefreshFn],
+        interval: float = 30,
+        batch_size: int = 50,
+        concurrency: int = 4,
+    ):
+        self.vault = vault
+        self.refresh_fn_for = refresh_fn_for
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    async def run_once(self) -> Dict[str, int]:
+        claimed = await self.vault.claim_due(self.batch_size)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def renew(user_id: str, provider: str, payload: Dict[str, Any], failures: int) -> bool:
+            async with semaphore:
+                try:
+                    refresh_fn = self.refresh_fn_for(user_id, provider)
+                    await self.vault.refresh_claimed(user_id, provider, payload, failures, refresh_fn)
+                    return True
+                except Exception:
+                    return False
+
+        results = await asyncio.gather(*(renew(*item) for item in claimed))
+        purged = await self.vault.purge_expired_states()
+        return {'refreshed': sum(results), 'failed': len(results) - sum(results), 'states_purged': purged}
+
+    async def run(self):
+        while True:
+            try:
+                stats = await self.run_once()
+                if stats['refreshed'] or stats['failed']:
+                    logger.info(f"Token refresher: {stats}")
+            except Exception as e:
+                logger.error(f"Token refresher pass failed: {e}")
+            await asyncio.sleep(self.interval)
@@ -7,6 +7,7 @@ from typing import Dict, List, Optional, Any
 from pathlib import Path
 from openai import OpenAI
 from config import get_settings
+from services.transcription_engine import get_transcription_engine
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -24,6 +25,7 @@ class TranscriptionService:
         """
         self.api_key = api_key or settings.OPENAI_API_KEY
         self.client = OpenAI(api_key=self.api_key) if self.api_key else None
+        self.engine = get_transcription_engine(api_key=self.api_key) if self.api_key else None
         
         if not self.client:
             logger.warning("OpenAI API key not configured - transcription disabled")
@@ -56,59 +58,18 @@ class TranscriptionService:
         try:
             logger.info(f"Transcribing video: {video_path}")
             
-            # Open audio file
-            with open(video_path, "rb") as audio_file:
-                # Call Whisper API with timestamp granularities
-                transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format=response_format,
-                    timestamp_granularities=["word", "segment"],
-                    language=language
-                )
+            # Engine extracts audio once, chunks long files on silence and
+            # caches the stitched transcript by content hash
+            result = self.engine.transcribe(Path(video_path), language=language)
             
-            # Parse response
             if response_format == "verbose_json":
-                result = {
-                    "text": transcript.text,
-                    "language": getattr(transcript, 'language', None),
-                    "duration": getattr(transcript, 'duration', None),
-                    "words": [],
-                    "segments": []
-                }
-                
-                # Extract word-level timestamps
-                if hasattr(transcript, 'words') and transcript.words:
-                    result["words"] = [
-                        {
-                            "word": word.word,
-                            "start": word.start,
-                            "end": word.end
-                        }
-                        for word in transcript.words
-                    ]
-                
-                # Extract segment-level data
-                if hasattr(transcript, 'segments') and transcript.segments:
-                    result["segments"] = [
-                        {
-                            "id": seg.id,
-                            "start": seg.start,
-                            "end": seg.end,
-                            "text": seg.text,
-                            "avg_logprob": getattr(seg, 'avg_logprob', None),
-                            "no_speech_prob": getattr(seg, 'no_speech_prob', None)
-                        }
-                        for seg in transcript.segments
-                    ]
-                
                 logger.info(f"Transcription complete: {len(result['words'])} words, {len(result['segments'])} segments")
                 return result
             
             else:
                 # Simple text response
                 return {
-                    "text": transcript.text if hasattr(transcript, 'text') else str(transcript),
+                    "text": result.get("text", ""),
                     "words": [],
                     "segments": []
                 }
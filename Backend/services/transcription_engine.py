@@ -0,0 +1,497 @@
+"""
+Transcription Engine
+Single Whisper pipeline shared by every transcription wrapper.
+
+- Audio is extracted once per source file into a cached 16kHz mono track
+- Long audio is split on silence into chunks under the API upload limit
+- Chunks are transcribed concurrently and word/segment timestamps are
+  shifted back onto the source timeline
+- Finished transcripts are cached by content hash so re-analysis is free
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from services.media_probe import probe_duration
+
+
+# Whisper API rejects uploads above 25 MB; leave headroom for container overhead
+WHISPER_MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_BITRATE_KBPS = 64
+DEFAULT_CACHE_DIR = os.getenv("TRANSCRIPTION_CACHE_DIR", "/tmp/mediaposter/transcription_cache")
+# Per-run chunk directories are recognised (and removed) by this suffix
+CHUNK_DIR_SUFFIX = ".chunks"
+
+_SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+
+@dataclass
+class AudioChunk:
+    """A slice of the extracted audio track"""
+    index: int
+    path: Path
+    start: float
+    end: float
+
+
+class TranscriptionBackend(ABC):
+    """Speech-to-text provider used by the engine for a single chunk"""
+
+    name: str = "base"
+
+    @property
+    def identity(self) -> str:
+        """Backend and model, as used in transcript cache keys"""
+        return self.name
+
+    @abstractmethod
+    def transcribe_chunk(self, audio_path: Path, language: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Transcribe one audio file
+
+        Returns:
+            Dict with text, language, duration, words and segments where
+            timestamps are relative to the start of the file
+        """
+
+
+class OpenAIWhisperBackend(TranscriptionBackend):
+    """OpenAI Whisper API backend"""
+
+    name = "openai-whisper"
+
+    def __init__(self, api_key: Optional[str] = None, model: str = "whisper-1"):
+        from openai import OpenAI
+
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment")
+        self.model = model
+        self.client = OpenAI(api_key=self.api_key)
+
+    @property
+    def identity(self) -> str:
+        return f"{self.name}-{self.model}"
+
+    def transcribe_chunk(self, audio_path: Path, language: Optional[str] = None) -> Dict[str, Any]:
+        with open(audio_path, "rb") as audio_file:
+            transcript = self.client.audio.transcriptions.create(
+                model=self.model,
+                file=audio_file,
+                language=language,
+                response_format="verbose_json",
+                timestamp_granularities=["word", "segment"]
+            )
+
+        return {
+            "text": transcript.text,
+            "language": getattr(transcript, "language", None),
+            "duration": getattr(transcript, "duration", None),
+            "words": [
+                {"word": w.word, "start": w.start, "end": w.end}
+                for w in (getattr(transcript, "words", None) or [])
+            ],
+            "segments": [
+                {
+                    "id": seg.id,
+                    "start": seg.start,
+                    "end": seg.end,
+                    "text": seg.text,
+                    "avg_logprob": getattr(seg, "avg_logprob", None),
+                    "no_speech_prob": getattr(seg, "no_speech_prob", None)
+                }
+                for seg in (getattr(transcript, "segments", None) or [])
+            ]
+        }
+
+
+class StubTranscriptionBackend(TranscriptionBackend):
+    """
+    Offline backend for tests and local development
+
+    Emits one placeholder word per second of audio so timestamp stitching
+    can be verified without network access.
+    """
+
+    name = "stub"
+
+    def __init__(self, durations: Optional[Dict[str, float]] = None, text: str = "word"):
+        self.durations = durations or {}
+        self.text = text
+        self.calls: List[Path] = []
+        self._lock = threading.Lock()
+
+    def transcribe_chunk(self, audio_path: Path, language: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            self.calls.append(Path(audio_path))
+        duration = self.durations.get(Path(audio_path).name)
+        if duration is None:
+            duration = probe_duration(Path(audio_path)) or 1.0
+
+        words = [
+            {"word": self.text, "start": float(i), "end": float(i) + 0.5}
+            for i in range(int(duration))
+        ]
+        text = " ".join(w["word"] for w in words)
+        return {
+            "text": text,
+            "language": language or "en",
+            "duration": duration,
+            "words": words,
+            "segments": [{"id": 0, "start": 0.0, "end": duration, "text": text}] if words else []
+        }
+
+
+def file_content_hash(path: Path, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's contents, streamed in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def plan_chunks(
+    duration: float,
+    silences: List[Tuple[float, float]],
+    max_chunk_seconds: float,
+    min_chunk_seconds: float = 30.0
+) -> List[Tuple[float, float]]:
+    """
+    Choose chunk boundaries that fall inside silences where possible
+
+    Each boundary is the midpoint of the latest silence that keeps the chunk
+    under ``max_chunk_seconds``; if no silence fits, the chunk is hard-cut.
+
+    Returns:
+        List of (start, end) tuples covering [0, duration]
+    """
+    if duration <= max_chunk_seconds:
+        return [(0.0, duration)]
+
+    cut_points = sorted((s + e) / 2 for s, e in silences if e > s)
+    chunks = []
+    start = 0.0
+    while duration - start > max_chunk_seconds:
+        limit = start + max_chunk_seconds
+        candidates = [p for p in cut_points if start + min_chunk_seconds <= p <= limit]
+        end = candidates[-1] if candidates else limit
+        chunks.append((start, end))
+        start = end
+    chunks.append((start, duration))
+    return chunks
+
+
+def merge_chunk_results(results: List[Tuple[AudioChunk, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Stitch per-chunk transcripts onto the source timeline"""
+    words: List[Dict[str, Any]] = []
+    segments: List[Dict[str, Any]] = []
+    texts: List[str] = []
+    language = None
+
+    for chunk, result in sorted(results, key=lambda item: item[0].start):
+        offset = chunk.start
+        language = language or result.get("language")
+        text = (result.get("text") or "").strip()
+        if text:
+            texts.append(text)
+        for word in result.get("words", []):
+            words.append({**word, "start": word["start"] + offset, "end": word["end"] + offset})
+        for seg in result.get("segments", []):
+            segments.append({
+                **seg,
+                "id": len(segments),
+                "start": seg["start"] + offset,
+                "end": seg["end"] + offset
+            })
+
+    # A chunk whose length couldn't be probed reports end 0; trust the backend then
+    duration = max((chunk.end or result.get("duration") or 0.0 for chunk, result in results), default=0.0)
+    return {
+        "text": " ".join(texts),
+        "language": language,
+        "duration": duration,
+        "words": words,
+        "segments": segments
+    }
+
+
+class TranscriptionEngine:
+    """Chunked, cached, concurrent Whisper transcription"""
+
+    def __init__(
+        self,
+        backend: Optional[TranscriptionBackend] = None,
+        cache_dir: Optional[Path] = None,
+        max_workers: int = 4,
+        max_upload_bytes: int = WHISPER_MAX_UPLOAD_BYTES,
+        silence_db: int = -35,
+        min_silence_seconds: float = 0.4
+    ):
+        """
+        Initialize engine
+
+        Args:
+            backend: Speech-to-text backend (defaults to OpenAI Whisper)
+            cache_dir: Where extracted audio and transcripts are cached
+            max_workers: Concurrent chunk uploads
+            max_upload_bytes: Per-request upload limit
+            silence_db: Noise floor for silence detection
+            min_silence_seconds: Minimum pause length treated as a cut point
+        """
+        self.backend = backend or OpenAIWhisperBackend()
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self.audio_dir = self.cache_dir / "audio"
+        self.transcript_dir = self.cache_dir / "transcripts"
+        self.audio_dir.mkdir(parents=True, exist_ok=True)
+        self.transcript_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.max_upload_bytes = max_upload_bytes
+        self.silence_db = silence_db
+        self.min_silence_seconds = min_silence_seconds
+
+        # 95% of the limit at the extraction bitrate, in seconds of audio
+        bytes_per_second = AUDIO_BITRATE_KBPS * 1000 / 8
+        self.max_chunk_seconds = (max_upload_bytes * 0.95) / bytes_per_second
+
+    # ------------------------------------------------------------------
+    # Caching
+    # ------------------------------------------------------------------
+
+    def _transcript_cache_path(self, content_hash: str, language: Optional[str]) -> Path:
+        # Transcripts from another backend or model must never be served
+        identity = re.sub(r"[^A-Za-z0-9._-]", "_", self.backend.identity)
+        key = f"{content_hash}-{identity}-{language or 'auto'}"
+        return self.transcript_dir / f"{key}.json"
+
+    def get_cached_transcript(self, media_path: Path, language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return a previously computed transcript for this file, if any"""
+        cache_path = self._transcript_cache_path(file_content_hash(Path(media_path)), language)
+        if not cache_path.exists():
+            return None
+        try:
+            return json.loads(cache_path.read_text())
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable transcript cache {cache_path.name}: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Audio preparation
+    # ------------------------------------------------------------------
+
+    def _audio_cache_path(self, content_hash: str) -> Path:
+        """Shared audio track for a content hash; never deleted by a run"""
+        return self.audio_dir / f"{content_hash}.mp3"
+
+    def extract_audio(self, media_path: Path, content_hash: Optional[str] = None, keep: bool = True) -> Path:
+        """
+        Extract a 16kHz mono audio track, reusing the cached copy if present
+
+        Args:
+            media_path: Video or audio file
+            content_hash: Precomputed content hash of media_path
+            keep: Cache the track for later runs; otherwise it is written to
+                a private file the caller deletes. An already cached track is
+                returned either way and belongs to the cache, not the caller
+
+        Returns:
+            Path to the audio file
+        """
+        media_path = Path(media_path)
+        content_hash = content_hash or file_content_hash(media_path)
+        audio_path = self._audio_cache_path(content_hash)
+        if audio_path.exists() and audio_path.stat().st_size > 0:
+            return audio_path
+        if not keep:
+            audio_path = self.audio_dir / f"{content_hash}.{uuid.uuid4().hex[:8]}.mp3"
+
+        tmp_path = audio_path.with_suffix(".part.mp3")
+        cmd = [
+            "ffmpeg", "-i", str(media_path),
+            "-vn",
+            "-acodec", "libmp3lame",
+            "-ar", str(AUDIO_SAMPLE_RATE),
+            "-ac", "1",
+            "-b:a", f"{AUDIO_BITRATE_KBPS}k",
+            "-y", str(tmp_path)
+        ]
+        logger.info(f"Extracting audio from {media_path.name}")
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800)
+        if result.returncode != 0:
+            tmp_path.unlink(missing_ok=True)
+            raise RuntimeError(f"FFmpeg failed: {result.stderr[-500:]}")
+
+        tmp_path.replace(audio_path)
+        return audio_path
+
+    def detect_silences(self, audio_path: Path) -> List[Tuple[float, float]]:
+        """Find silent stretches with ffmpeg's silencedetect filter"""
+        cmd = [
+            "ffmpeg", "-i", str(audio_path),
+            "-af", f"silencedetect=noise={self.silence_db}dB:d={self.min_silence_seconds}",
+            "-f", "null", "-"
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+        starts = [float(m) for m in _SILENCE_START_RE.findall(result.stderr)]
+        ends = [float(m) for m in _SILENCE_END_RE.findall(result.stderr)]
+        return list(zip(starts, ends))
+
+    def split_audio(self, audio_path: Path, boundaries: List[Tuple[float, float]]) -> List[AudioChunk]:
+        """
+        Cut the audio track into chunk files using stream copy
+
+        Chunks go into a fresh directory per call so concurrent runs over the
+        same track never share (or delete) each other's chunk files.
+        """
+        if len(boundaries) == 1:
+            start, end = boundaries[0]
+            return [AudioChunk(index=0, path=audio_path, start=start, end=end)]
+
+        chunk_dir = Path(tempfile.mkdtemp(prefix=f"{audio_path.stem}.", suffix=CHUNK_DIR_SUFFIX, dir=audio_path.parent))
+        chunks = []
+        for index, (start, end) in enumerate(boundaries):
+            chunk_path = chunk_dir / f"chunk{index:03d}.mp3"
+            cmd = [
+                "ffmpeg", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+                "-i", str(audio_path),
+                "-c", "copy", "-y", str(chunk_path)
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            if result.returncode != 0:
+                shutil.rmtree(chunk_dir, ignore_errors=True)
+                raise RuntimeError(f"FFmpeg chunk split failed: {result.stderr[-500:]}")
+            chunks.append(AudioChunk(index=index, path=chunk_path, start=start, end=end))
+        return chunks
+
+    def prepare_chunks(self, audio_path: Path) -> List[AudioChunk]:
+        """Plan and cut chunks for an extracted audio track"""
+        duration = probe_duration(audio_path) or 0.0
+        if duration <= self.max_chunk_seconds:
+            return [AudioChunk(index=0, path=audio_path, start=0.0, end=duration)]
+
+        boundaries = plan_chunks(duration, self.detect_silences(audio_path), self.max_chunk_seconds)
+        logger.info(f"Split {duration:.0f}s of audio into {len(boundaries)} chunks")
+        return self.split_audio(audio_path, boundaries)
+
+    # ------------------------------------------------------------------
+    # Transcription
+    # ------------------------------------------------------------------
+
+    def transcribe_chunks(self, chunks: List[AudioChunk], language: Optional[str] = None) -> Dict[str, Any]:
+        """Transcribe chunks concurrently and merge the results"""
+        if len(chunks) == 1:
+            return merge_chunk_results([(chunks[0], self.backend.transcribe_chunk(chunks[0].path, language))])
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+            futures = [
+                (chunk, pool.submit(self.backend.transcribe_chunk, chunk.path, language))
+                for chunk in chunks
+            ]
+            results = [(chunk, future.result()) for chunk, future in futures]
+        return merge_chunk_results(results)
+
+    def transcribe(
+        self,
+        media_path: Path,
+        language: Optional[str] = None,
+        use_cache: bool = True,
+        keep_audio: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Transcribe a video or audio file
+
+        Args:
+            media_path: Path to video or audio file
+            language: ISO language code or None for auto-detect
+            use_cache: Reuse a cached transcript for identical content
+            keep_audio: Keep the extracted audio track cached for re-runs
+
+        Returns:
+            Dict with text, language, duration, words, segments and chunk count
+        """
+        media_path = Path(media_path).expanduser()
+        if not media_path.exists():
+            raise FileNotFoundError(f"Media file not found: {media_path}")
+
+        content_hash = file_content_hash(media_path)
+        cache_path = self._transcript_cache_path(content_hash, language)
+        if use_cache and cache_path.exists():
+            try:
+                cached = json.loads(cache_path.read_text())
+                logger.info(f"Transcript cache hit for {media_path.name}")
+                return cached
+            except (OSError, json.JSONDecodeError):
+                logger.warning(f"Discarding corrupt transcript cache {cache_path.name}")
+
+        try:
+            audio_path = self.extract_audio(media_path, content_hash=content_hash, keep=keep_audio)
+        except (RuntimeError, FileNotFoundError, subprocess.TimeoutExpired) as e:
+            # No usable audio track (or no ffmpeg): Whisper takes common
+            # video containers directly, so a file within one upload still goes
+            if media_path.stat().st_size > self.max_upload_bytes:
+                raise
+            logger.warning(f"Audio extraction failed for {media_path.name}, uploading it as is: {e}")
+            audio_path = media_path
+        # A cached track may be in use by other runs; only a private one is ours
+        owns_audio = (
+            not keep_audio
+            and audio_path != media_path
+            and audio_path != self._audio_cache_path(content_hash)
+        )
+        chunks = []
+        try:
+            if audio_path == media_path:
+                chunks = [AudioChunk(index=0, path=media_path, start=0.0, end=probe_duration(media_path) or 0.0)]
+            else:
+                chunks = self.prepare_chunks(audio_path)
+            result = self.transcribe_chunks(chunks, language)
+        finally:
+            for chunk in chunks:
+                if chunk.path != audio_path:
+                    chunk.path.unlink(missing_ok=True)
+            for chunk_dir in {chunk.path.parent for chunk in chunks if chunk.path != audio_path}:
+                if chunk_dir.name.endswith(CHUNK_DIR_SUFFIX):
+                    shutil.rmtree(chunk_dir, ignore_errors=True)
+            if owns_audio:
+                audio_path.unlink(missing_ok=True)
+        result["content_hash"] = content_hash
+        result["chunks"] = len(chunks)
+
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(result))
+        tmp_path.replace(cache_path)
+
+        logger.success(
+            f"Transcribed {media_path.name}: {len(result['words'])} words in {len(chunks)} chunk(s)"
+        )
+        return result
+
+
+_default_engines: Dict[Tuple[str, str], TranscriptionEngine] = {}
+_default_engines_lock = threading.Lock()
+
+
+def get_transcription_engine(api_key: Optional[str] = None, model: str = "whisper-1") -> TranscriptionEngine:
+    """Get the shared OpenAI-backed engine for an API key/model pair"""
+    key = (api_key or os.getenv("OPENAI_API_KEY") or "", model)
+    with _default_engines_lock:
+        engine = _default_engines.get(key)
+        if engine is None:
+            engine = TranscriptionEngine(backend=OpenAIWhisperBackend(api_key=key[0] or None, model=model))
+            _default_engines[key] = engine
+        return engine
@@ -9,6 +9,8 @@ from pathlib import Path
 from openai import OpenAI
 from loguru import logger
 
+from services.transcription_engine import get_transcription_engine
+
 
 class WhisperTranscriber:
     """Handle video transcription using Whisper API"""
@@ -25,6 +27,7 @@ class WhisperTranscriber:
             raise ValueError("OPENAI_API_KEY not found in environment")
         
         self.client = OpenAI(api_key=self.api_key)
+        self.engine = get_transcription_engine(api_key=self.api_key)
     
     def extract_audio(self, video_path: str) -> str:
         """
@@ -117,21 +120,15 @@ class WhisperTranscriber:
         """
         logger.info(f"Starting transcription for {Path(video_path).name}")
         
-        # Extract audio
-        audio_path = self.extract_audio(video_path)
-        
+        # The engine caches transcripts by content hash; the extracted audio
+        # is only kept when cleanup is off.
         try:
-            # Transcribe
-            result = self.transcribe(audio_path)
-            
-            logger.success(f"Video transcription complete")
-            return result
-            
-        finally:
-            # Cleanup temp audio file
-            if cleanup and os.path.exists(audio_path):
-                try:
-                    os.remove(audio_path)
-                    logger.info(f"Cleaned up temp audio file")
-                except Exception as e:
-                    logger.warning(f"Failed to clean up {audio_path}: {e}")
+            result = self.engine.transcribe(Path(video_path), language="en", keep_audio=not cleanup)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"Whisper API error: {e}")
+            raise RuntimeError(f"Transcription failed: {e}")
+        
+        logger.success(f"Video transcription complete")
+        return result
@@ -7,10 +7,13 @@ from celery import shared_task
 from tasks.scheduled_publishing import (
     check_scheduled_posts,
     publish_scheduled_post,
+    publish_claimed_batch,
     retry_failed_posts,
     collect_post_metrics
 )
 
+from tasks.ai_context import refresh_context_snapshots
+
 from tasks.monitoring import (
     cleanup_old_results,
     health_check
@@ -19,8 +22,10 @@ from tasks.monitoring import (
 __all__ = [
     'check_scheduled_posts',
     'publish_scheduled_post',
+    'publish_claimed_batch',
     'retry_failed_posts',
     'collect_post_metrics',
+    'refresh_context_snapshots',
     'cleanup_old_results',
     'health_check',
 ]
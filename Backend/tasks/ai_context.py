@@ -0,0 +1,26 @@
+"""
+Celery Tasks for AI Chat Context Snapshots
+"""
+from loguru import logger
+
+from tasks.async_runtime import async_task, session_maker as async_session_maker
+from services.chat_context import ContextSnapshotService
+
+
+@async_task(name='tasks.ai_context.refresh_context_snapshots')
+async def refresh_context_snapshots():
+    """
+    Periodic task to rebuild chat context snapshots
+    Runs every minute via Celery Beat
+    
+    Rebuilds sections that are missing, marked stale by a write to their
+    source tables, or older than an hour.
+    """
+    try:
+        async with async_session_maker() as db:
+            stats = await ContextSnapshotService(db).refresh_due()
+        logger.info(f"Refreshed {stats['sections']} chat context sections across {stats['workspaces']} workspaces")
+        return stats['sections']
+    except Exception as e:
+        logger.error(f"Error refreshing chat context snapshots: {e}")
+        return 0
@@ -0,0 +1,172 @@
+"""
+Async Task Runtime for Celery Workers
+
+Each worker process owns one persistent event loop. The SQLAlchemy engine is
+created on that loop in ``worker_process_init`` (or lazily on the first task),
+so its connection pool stays bound to a live loop and is reused across tasks
+instead of being rebuilt by every ``asyncio.run``.
+
+The loop and engine are per process, not per thread: run the worker with the
+prefork (default) or solo pool. Thread, eventlet and gevent pools would drive
+one loop from several threads at once, so ``run_async`` refuses calls from any
+thread other than the one that created the loop.
+
+Usage:
+    from tasks.async_runtime import async_task, session_maker
+
+    @async_task(name='tasks.example.do_work')
+    async def do_work(item_id: str):
+        async with session_maker() as db:
+            ...
+"""
+import asyncio
+import functools
+import os
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+from celery import shared_task
+from celery.signals import worker_process_init, worker_process_shutdown
+from loguru import logger
+
+
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[int] = None
+_loop_lock = threading.Lock()
+_resources_ready = False
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Return this process's event loop, creating it on first use"""
+    global _worker_loop, _loop_thread
+    with _loop_lock:
+        if _worker_loop is None or _worker_loop.is_closed():
+            _worker_loop = asyncio.new_event_loop()
+            _loop_thread = threading.get_ident()
+        elif _loop_thread != threading.get_ident():
+            raise RuntimeError(
+                "The async task runtime is per process; run the Celery worker "
+                "with the prefork or solo pool"
+            )
+        return _worker_loop
+
+
+def run_async(coro: Awaitable[Any]) -> Any:
+    """
+    Run a coroutine to completion on the persistent worker loop
+
+    Drop-in replacement for ``asyncio.run`` inside sync Celery task bodies.
+    """
+    return get_worker_loop().run_until_complete(coro)
+
+
+async def init_worker_resources() -> None:
+    """Initialize the DB engine on the current loop (idempotent)"""
+    global _resources_ready
+    if _resources_ready:
+        return
+
+    from database import connection
+
+    if connection.async_session_maker is None:
+        try:
+            await connection.init_db()
+        except Exception as e:
+            logger.error(f"Worker DB initialization failed: {e}")
+            return
+
+    _resources_ready = True
+    logger.info(f"Async task runtime ready in worker pid {os.getpid()}")
+
+
+async def close_worker_resources() -> None:
+    """Dispose of the engine pool"""
+    global _resources_ready
+    from database import connection
+
+    await connection.close_db()
+    _resources_ready = False
+
+
+class _SessionMakerProxy:
+    """
+    Resolves ``database.connection.async_session_maker`` at call time
+
+    Importing ``async_session_maker`` directly binds the ``None`` it holds
+    before ``init_db`` has run; this proxy always sees the live factory.
+    """
+
+    def __call__(self):
+        from database import connection
+
+        if connection.async_session_maker is None:
+            raise RuntimeError("Database not initialized in this worker")
+        return connection.async_session_maker()
+
+
+session_maker = _SessionMakerProxy()
+
+
+async def _run_with_resources(fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+    await init_worker_resources()
+    return await fn(*args, **kwargs)
+
+
+def async_task(*task_args, **task_kwargs):
+    """
+    Register an ``async def`` function as a Celery task
+
+    Accepts the same arguments as ``shared_task``. With ``bind=True`` the task
+    instance is passed as the first argument, as for sync tasks.
+    """
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        if not asyncio.iscoroutinefunction(fn):
+            raise TypeError(f"async_task requires an async function, got {fn!r}")
+
+        @functools.wraps(fn)
+        def runner(*args, **kwargs):
+            return run_async(_run_with_resources(fn, *args, **kwargs))
+
+        return shared_task(*task_args, **task_kwargs)(runner)
+
+    return decorator
+
+
+@worker_process_init.connect
+def _on_worker_process_init(**kwargs):
+    # Forked children must not reuse the parent's loop or pooled sockets
+    global _worker_loop, _loop_thread, _resources_ready
+    _worker_loop = None
+    _loop_thread = None
+    _resources_ready = False
+
+    from database import connection
+    connection.engine = None
+    connection.async_session_maker = None
+
+    from services.instrumentation import install_instrumentation, start_metrics_server
+    install_instrumentation()
+    metrics_port = os.getenv("CELERY_METRICS_PORT")
+    if metrics_port:
+        # One port per pool child: base, base+1, ...
+        from celery.utils.log import current_process_index
+        try:
+            start_metrics_server(int(metrics_port) + (current_process_index(base=0) or 0))
+        except OSError as e:
+            logger.warning(f"Worker metrics server not started: {e}")
+
+    run_async(init_worker_resources())
+
+
+@worker_process_shutdown.connect
+def _on_worker_process_shutdown(**kwargs):
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    try:
+        _worker_loop.run_until_complete(close_worker_resources())
+    except Exception as e:
+        logger.warning(f"Error closing worker resources: {e}")
+    finally:
+        _worker_loop.close()
+        _worker_loop = None
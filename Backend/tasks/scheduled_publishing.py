@@ -1,170 +1,160 @@
 """
 Celery Tasks for Scheduled Publishing
 """
-from celery import shared_task
 from datetime import datetime
 from uuid import UUID
 from loguru import logger
 
-from database.connection import async_session_maker
+from tasks.async_runtime import async_task, run_async, session_maker as async_session_maker
 from services.publisher_service import PublisherService
+from services.publish_dispatcher import PublishDispatcher
+from services.checkback_queue import CheckbackQueue
 
 
-@shared_task(name='tasks.scheduled_publishing.check_scheduled_posts')
-def check_scheduled_posts():
+# Claim sizing: 20 claims x 500 rows covers a 10k-post minute in one beat
+CLAIM_BATCH_SIZE = 500
+MAX_CLAIMS_PER_BEAT = 10000
+PUBLISH_BATCH_SIZE = 100
+
+
+async def _claim_and_enqueue(retries: bool = False) -> int:
+    """Claim due posts in chunks and fan them out as batch publish tasks"""
+    dispatcher = PublishDispatcher(async_session_maker)
+    total = 0
+    
+    while total < MAX_CLAIMS_PER_BEAT:
+        claimed = await dispatcher.claim_due_posts(limit=CLAIM_BATCH_SIZE, retries=retries)
+        if not claimed:
+            break
+        
+        for batch in dispatcher.plan_batches(claimed, PUBLISH_BATCH_SIZE):
+            publish_claimed_batch.delay(batch)
+        total += len(claimed)
+        
+        if len(claimed) < CLAIM_BATCH_SIZE:
+            break
+    
+    return total
+
+
+@async_task(name='tasks.scheduled_publishing.check_scheduled_posts')
+async def check_scheduled_posts():
     """
     Periodic task to check for posts due for publishing
     Runs every minute via Celery Beat
+    
+    Posts are claimed with FOR UPDATE SKIP LOCKED, so overlapping beats or
+    multiple beat instances never enqueue the same post twice.
+    """
+    try:
+        claimed = await _claim_and_enqueue()
+        logger.info(f"Claimed {claimed} posts due for publishing")
+        return claimed
+    except Exception as e:
+        logger.error(f"Error checking scheduled posts: {e}")
+        return 0
+
+
+@async_task(
+    name='tasks.scheduled_publishing.publish_claimed_batch',
+    acks_late=True
+)
+async def publish_claimed_batch(claimed: list):
     """
-    import asyncio
+    Publish a batch of already-claimed posts concurrently
     
-    async def _check():
-        async with async_session_maker() as db:
-            try:
-                publisher = PublisherService(db)
-                due_posts = await publisher.get_posts_due_for_publishing()
-                
-                logger.info(f"Found {len(due_posts)} posts due for publishing")
-                
-                # Trigger publishing task for each post
-                for post in due_posts:
-                    publish_scheduled_post.delay(str(post.id))
-                    logger.info(f"Queued post {post.id} for publishing")
-                
-                return len(due_posts)
-                
-            except Exception as e:
-                logger.error(f"Error checking scheduled posts: {e}")
-                return 0
+    Acked late so a batch lost with its worker is redelivered; posts the
+    first delivery already started are skipped by their claim token.
     
-    return asyncio.run(_check())
+    Args:
+        claimed: Rows from PublishDispatcher.plan_batches
+    """
+    dispatcher = PublishDispatcher(async_session_maker)
+    stats = await dispatcher.publish_claimed(claimed)
+    logger.info(
+        f"Batch of {stats.claimed}: {stats.published} published, {stats.failed} failed, "
+        f"{stats.skipped} skipped"
+    )
+    return stats.to_dict()
 
 
-@shared_task(
+@async_task(
     name='tasks.scheduled_publishing.publish_scheduled_post',
     bind=True,
     max_retries=3,
     default_retry_delay=300  # 5 minutes
 )
-def publish_scheduled_post(self, post_id: str):
+async def publish_scheduled_post(self, post_id: str):
     """
     Publish a single scheduled post
     
     Args:
         post_id: UUID of scheduled post as string
     """
-    import asyncio
-    
-    async def _publish():
-        async with async_session_maker() as db:
-            try:
-                publisher = PublisherService(db)
-                post_uuid = UUID(post_id)
-                
-                result = await publisher.publish_scheduled_post(post_uuid)
+    async with async_session_maker() as db:
+        try:
+            publisher = PublisherService(db)
+            post_uuid = UUID(post_id)
+            
+            result = await publisher.publish_scheduled_post(post_uuid)
+            
+            if result.success:
+                logger.success(f"✓ Successfully published post {post_id}")
+                return {
+                    'success': True,
+                    'post_id': post_id,
+                    'platform_post_id': result.post_id,
+                    'url': result.url
+                }
+            else:
+                logger.error(f"✗ Failed to publish post {post_id}: {result.error}")
+                # Let the PublisherService handle retry logic
+                return {
+                    'success': False,
+                    'post_id': post_id,
+                    'error': result.error
+                }
                 
-                if result.success:
-                    logger.success(f"✓ Successfully published post {post_id}")
-                    return {
-                        'success': True,
-                        'post_id': post_id,
-                        'platform_post_id': result.post_id,
-                        'url': result.url
-                    }
-                else:
-                    logger.error(f"✗ Failed to publish post {post_id}: {result.error}")
-                    # Let the PublisherService handle retry logic
-                    return {
-                        'success': False,
-                        'post_id': post_id,
-                        'error': result.error
-                    }
-                    
-            except Exception as e:
-                logger.error(f"Error in publish task for {post_id}: {e}")
-                # Retry the Celery task itself for transient errors
-                raise self.retry(exc=e)
-    
-    return asyncio.run(_publish())
+        except Exception as e:
+            logger.error(f"Error in publish task for {post_id}: {e}")
+            # Retry the Celery task itself for transient errors
+            raise self.retry(exc=e)
 
 
-@shared_task(name='tasks.scheduled_publishing.retry_failed_posts')
-def retry_failed_posts():
+@async_task(name='tasks.scheduled_publishing.retry_failed_posts')
+async def retry_failed_posts():
     """
     Periodic task to retry failed posts
     Runs every hour via Celery Beat
     """
-    import asyncio
-    
-    async def _retry():
+    try:
+        # Posts stuck in 'publishing' after a worker crash re-enter via retry
         async with async_session_maker() as db:
-            try:
-                publisher = PublisherService(db)
-                retry_posts = await publisher.get_failed_posts_for_retry()
-                
-                logger.info(f"Found {len(retry_posts)} posts ready for retry")
-                
-                # Re-queue for publishing
-                for post in retry_posts:
-                    publish_scheduled_post.delay(str(post.id))
-                    logger.info(f"Re-queued post {post.id} for retry")
-                
-                return len(retry_posts)
-                
-            except Exception as e:
-                logger.error(f"Error retrying failed posts: {e}")
-                return 0
-    
-    return asyncio.run(_retry())
+            await PublisherService(db).release_stale_claims()
+        
+        claimed = await _claim_and_enqueue(retries=True)
+        logger.info(f"Re-queued {claimed} failed posts for retry")
+        return claimed
+        
+    except Exception as e:
+        logger.error(f"Error retrying failed posts: {e}")
+        return 0
 
 
-@shared_task(name='tasks.scheduled_publishing.collect_post_metrics')
-def collect_post_metrics():
-    """
-    Periodic task to collect metrics for recently published posts
-    Runs every 15 minutes via Celery Beat
+@async_task(name='tasks.scheduled_publishing.collect_post_metrics')
+async def collect_post_metrics():
     """
-    import asyncio
-    from datetime import timedelta
-    from database.models import ScheduledPost
-    from sqlalchemy import select, and_
+    Periodic task to run due metric check-backs
+    Runs every 5 minutes via Celery Beat
     
-    async def _collect():
-        async with async_session_maker() as db:
-            try:
-                # Find posts published in last 7 days
-                cutoff_date = datetime.now() - timedelta(days=7)
-                result = await db.execute(
-                    select(ScheduledPost).where(
-                        and_(
-                            ScheduledPost.status == 'published',
-                            ScheduledPost.published_at >= cutoff_date
-                        )
-                    )
-                )
-                
-                published_posts = result.scalars().all()
-                logger.info(f"Collecting metrics for {len(published_posts)} published posts")
-                
-                # For each post, collect metrics via platform adapters
-                # This would integrate with MultiPlatformPublisher.collect_metrics
-                metrics_collected = 0
-                for post in published_posts:
-                    try:
-                        # TODO: Implement metric collection via publisher
-                        # publisher = MultiPlatformPublisher(db)
-                        # if post.platform_post_id:
-                        #     hours_since = (datetime.now() - post.published_at).total_seconds() / 3600
-                        #     publisher.collect_metrics(post_id, int(hours_since))
-                        metrics_collected += 1
-                    except Exception as e:
-                        logger.warning(f"Failed to collect metrics for post {post.id}: {e}")
-                
-                logger.info(f"Collected metrics for {metrics_collected} posts")
-                return metrics_collected
-                
-            except Exception as e:
-                logger.error(f"Error collecting post metrics: {e}")
-                return 0
-    
-    return asyncio.run(_collect())
+    Posts are checked when their adaptive next_check_at comes due, within
+    each provider's paced API budget; claims are row-locked, so overlapping
+    beats or several workers never check the same post twice.
+    """
+    try:
+        stats = await CheckbackQueue(async_session_maker).run_once()
+        logger.info(f"Checked {stats['checked']} posts ({stats['enqueued']} newly queued)")
+        return stats['checked']
+    except Exception as e:
+        logger.error(f"Error collecting post metrics: {e}")
+        return 0
@@ -0,0 +1,87 @@
+"""
+Metrics polling throughput with mocked adapters
+Compares the old sequential loop (one request and one commit per variant)
+against MetricsPoller fan-out with batching and a bulk insert, for 5k variants
+"""
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+
+from connectors.base import PlatformMetricSnapshot, SourceAdapter
+from services.metrics_poller import MetricsPoller
+
+
+NUM_VARIANTS = 5000
+LEGACY_SAMPLE = 250
+REQUEST_LATENCY = 0.004  # simulated platform API round trip
+COMMIT_LATENCY = 0.001   # simulated database commit round trip
+PLATFORMS = {"youtube": 50, "instagram": 50, "tiktok": 1, "linkedin": 1}
+
+
+class MockAdapter(SourceAdapter):
+    def __init__(self, platform, batch_size):
+        self.platform = platform
+        self.metrics_batch_size = batch_size
+
+    @property
+    def id(self):
+        return f"mock_{self.platform}"
+
+    def is_enabled(self):
+        return True
+
+    def list_supported_platforms(self):
+        return [self.platform]
+
+    async def fetch_metrics_for_variant(self, variant):
+        return await self.fetch_metrics_for_variants([variant])
+
+    async def fetch_metrics_for_variants(self, variants):
+        await asyncio.sleep(REQUEST_LATENCY)
+        return [
+            PlatformMetricSnapshot(platform=v.platform, platform_post_id=v.platform_post_id,
+                                   snapshot_at=datetime.utcnow(), views=100, likes=5)
+            for v in variants
+        ]
+
+
+@pytest.mark.asyncio
+async def test_parallel_polling_faster_than_sequential():
+    adapters = {platform: MockAdapter(platform, size) for platform, size in PLATFORMS.items()}
+    registry = MagicMock()
+    registry.get_adapters_for_platform.side_effect = lambda platform: [adapters[platform]]
+
+    platforms = list(PLATFORMS)
+    variants = [
+        SimpleNamespace(id=uuid4(), content_id=uuid4(), platform=platforms[i % len(platforms)],
+                        platform_post_id=f"post_{i}", is_paid=False)
+        for i in range(NUM_VARIANTS)
+    ]
+
+    # Old path: fetch, then commit, one variant at a time
+    start = time.perf_counter()
+    for variant in variants[:LEGACY_SAMPLE]:
+        await adapters[variant.platform].fetch_metrics_for_variant(variant)
+        await asyncio.sleep(COMMIT_LATENCY)
+    before = (time.perf_counter() - start) * NUM_VARIANTS / LEGACY_SAMPLE
+
+    # New path: fan out, then one bulk insert per 1000 rows
+    poller = MetricsPoller(registry)
+    start = time.perf_counter()
+    rows = await poller.fetch(variants)
+    for _ in range(0, len(rows), 1000):
+        await asyncio.sleep(COMMIT_LATENCY)
+    after = time.perf_counter() - start
+
+    print(f"\n📊 Metrics polling ({NUM_VARIANTS:,} variants, {REQUEST_LATENCY * 1000:.0f}ms mocked API latency):")
+    print(f"   sequential (extrapolated): {before:.2f}s")
+    print(f"   parallel + batched:        {after:.2f}s ({poller.stats['requests']:,} adapter requests)")
+    print(f"   Speedup:                   {before / after:.1f}x")
+
+    assert len(rows) == NUM_VARIANTS
+    assert after * 5 < before
@@ -0,0 +1,59 @@
+"""
+Thumbnail frame scoring throughput
+Compares the old per-file analysis (JPEG round trip + new cascade per frame)
+against batch scoring of in-memory frames with the shared detector
+"""
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from services.thumbnail_generator import score_frames
+
+
+NUM_FRAMES = 10
+
+
+def _legacy_analyze(frame_path: str) -> float:
+    """The pre-batch analyze_frame_quality body, kept here as the baseline"""
+    cv_img = cv2.imread(frame_path)
+    gray = cv2.cvtColor(cv_img, cv2.COLOR_BGR2GRAY)
+    sharpness = min(cv2.Laplacian(gray, cv2.CV_64F).var() / 500, 1.0)
+    brightness = 1.0 - abs(np.mean(gray) / 255.0 - 0.5) * 2
+    contrast = min(gray.std() / 128.0, 1.0)
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+    hsv = cv2.cvtColor(cv_img, cv2.COLOR_BGR2HSV)
+    vibrancy = np.mean(hsv[:, :, 1]) / 255.0
+    return sharpness * 0.3 + brightness * 0.2 + contrast * 0.2 + min(len(faces) * 0.3, 1.0) * 0.2 + vibrancy * 0.1
+
+
+def test_batch_scoring_faster_than_per_file():
+    """Scoring 1080p candidates in memory should be several times faster"""
+    rng = np.random.default_rng(0)
+    frames = [
+        cv2.GaussianBlur(rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8), (15, 15), 0)
+        for _ in range(NUM_FRAMES)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        start = time.perf_counter()
+        for i, frame in enumerate(frames):
+            path = os.path.join(tmpdir, f"frame_{i:03d}.jpg")
+            cv2.imwrite(path, frame[:, :, ::-1], [cv2.IMWRITE_JPEG_QUALITY, 95])
+            _legacy_analyze(path)
+        before = time.perf_counter() - start
+
+    score_frames(frames[:1])  # load the shared cascade outside the timing
+    start = time.perf_counter()
+    score_frames(frames)
+    after = time.perf_counter() - start
+
+    print(f"\n📊 Thumbnail scoring ({NUM_FRAMES} x 1080p candidates):")
+    print(f"   per-file + new cascade: {before * 1000:.0f}ms")
+    print(f"   in-memory batch:        {after * 1000:.0f}ms")
+    print(f"   Speedup:                {before / after:.1f}x")
+
+    assert after * 2 < before
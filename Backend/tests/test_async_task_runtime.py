@@ -0,0 +1,119 @@
+"""
+Tests for the Celery async task runtime
+"""
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from tasks import async_runtime
+from tasks.async_runtime import async_task, run_async, session_maker
+
+
+@pytest.fixture(autouse=True)
+def resources_ready():
+    """Skip real DB/HTTP initialization"""
+    with patch.object(async_runtime, 'init_worker_resources', AsyncMock()):
+        yield
+
+
+class TestRunAsync:
+    """Persistent per-process loop"""
+
+    def test_reuses_one_loop_across_calls(self):
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        first = run_async(current_loop())
+        second = run_async(current_loop())
+
+        assert first is second
+        assert not first.is_closed()
+
+    def test_recreates_closed_loop(self):
+        loop = async_runtime.get_worker_loop()
+        loop.close()
+
+        async def ok():
+            return "ok"
+
+        assert run_async(ok()) == "ok"
+        assert async_runtime.get_worker_loop() is not loop
+
+
+    def test_refuses_other_threads(self):
+        import threading
+
+        async def ok():
+            return "ok"
+
+        run_async(ok())
+        errors = []
+
+        def other_thread():
+            try:
+                run_async(ok())
+            except RuntimeError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+
+        assert len(errors) == 1
+        assert "prefork or solo" in str(errors[0])
+
+
+class TestAsyncTaskDecorator:
+    """async def functions registered as Celery tasks"""
+
+    def test_runs_coroutine_and_returns_result(self):
+        @async_task(name='tests.async_runtime.add')
+        async def add(a, b):
+            await asyncio.sleep(0)
+            return a + b
+
+        assert add(2, 3) == 5
+        assert add.name == 'tests.async_runtime.add'
+
+    def test_bind_passes_task_instance(self):
+        @async_task(name='tests.async_runtime.bound', bind=True)
+        async def bound(self, value):
+            return self.name, value
+
+        assert bound(7) == ('tests.async_runtime.bound', 7)
+
+    def test_initializes_resources_before_body(self):
+        calls = []
+
+        @async_task(name='tests.async_runtime.ordered')
+        async def ordered():
+            calls.append('body')
+
+        async_runtime.init_worker_resources.side_effect = lambda: calls.append('init')
+        ordered()
+
+        assert calls == ['init', 'body']
+
+    def test_rejects_sync_functions(self):
+        with pytest.raises(TypeError):
+            @async_task(name='tests.async_runtime.sync')
+            def not_async():
+                return 1
+
+
+class TestSessionMakerProxy:
+    """Session factory is resolved at call time"""
+
+    def test_raises_when_db_not_initialized(self):
+        from database import connection
+
+        with patch.object(connection, 'async_session_maker', None):
+            with pytest.raises(RuntimeError):
+                session_maker()
+
+    def test_uses_live_factory(self):
+        from database import connection
+
+        sentinel = object()
+        with patch.object(connection, 'async_session_maker', lambda: sentinel):
+            assert session_maker() is sentinel
@@ -31,6 +31,31 @@ async def test_schedule_post():
     mock_db.add.assert_called_once()
     mock_db.commit.assert_called_once()
 
+def _calendar_row(**overrides):
+    row = {
+        'id': uuid4(),
+        'platform': "tiktok",
+        'scheduled_time': datetime.now(),
+        'status': "scheduled",
+        'is_ai_recommended': False,
+        'recommendation_score': None,
+        'recommendation_reasoning': None,
+        'published_at': None,
+        'error_message': None,
+        'created_at': datetime.now(),
+        'variant_id': None,
+        'variant_platform': None,
+        'content_title': None,
+        'content_caption': None,
+        'clip_id': None,
+        'clip_title': None,
+        'clip_start_time': None,
+        'clip_end_time': None,
+        'clip_rendered_url': None,
+    }
+    row.update(overrides)
+    return row
+
 @pytest.mark.asyncio
 async def test_get_calendar_posts():
     mock_db = AsyncMock()
@@ -39,21 +64,72 @@ async def test_get_calendar_posts():
     
     # Mock execute result
     mock_result = MagicMock()
-    mock_post = ScheduledPost(
-        id=uuid4(),
-        platform="tiktok",
-        scheduled_time=datetime.now(),
-        status="scheduled",
-        created_at=datetime.now(),
-        published_at=None
-    )
-    mock_result.scalars.return_value.all.return_value = [mock_post]
+    mock_result.mappings.return_value.all.return_value = [_calendar_row()]
     mock_db.execute.return_value = mock_result
     
     posts = await service.get_calendar_posts(user_id)
     
     assert len(posts) == 1
     assert posts[0]['platform'] == "tiktok"
+    assert 'content' not in posts[0]
+    assert 'clip' not in posts[0]
+
+@pytest.mark.asyncio
+async def test_get_calendar_posts_single_query_for_month():
+    """Regression: related variant/clip data must not cost a query per post"""
+    mock_db = AsyncMock()
+    service = CalendarService(mock_db)
+    
+    rows = [
+        _calendar_row(
+            variant_id=uuid4(),
+            variant_platform="tiktok",
+            content_title=f"Post {i}",
+            clip_id=uuid4(),
+            clip_title=f"Clip {i}",
+            clip_start_time=5.0,
+            clip_end_time=35.0,
+        )
+        for i in range(600)
+    ]
+    mock_result = MagicMock()
+    mock_result.mappings.return_value.all.return_value = rows
+    mock_db.execute.return_value = mock_result
+    
+    posts = await service.get_calendar_posts(uuid4())
+    
+    assert len(posts) == 600
+    assert mock_db.execute.await_count == 1
+    assert posts[0]['content']['title'] == "Post 0"
+    assert posts[0]['clip']['duration_seconds'] == 30.0
+
+def test_calendar_query_joins_related_tables():
+    sql = str(CalendarService._calendar_query())
+    assert sql.count("LEFT OUTER JOIN") == 3
+    assert "content_variants" in sql and "video_clips" in sql
+
+@pytest.mark.asyncio
+async def test_get_calendar_view_week_groups_by_day():
+    mock_db = AsyncMock()
+    service = CalendarService(mock_db)
+    
+    anchor = datetime(2025, 3, 12, 15, 0)  # Wednesday
+    rows = [
+        _calendar_row(scheduled_time=datetime(2025, 3, 10, 9, 0)),
+        _calendar_row(scheduled_time=datetime(2025, 3, 10, 18, 0)),
+        _calendar_row(scheduled_time=datetime(2025, 3, 14, 12, 0)),
+    ]
+    mock_result = MagicMock()
+    mock_result.mappings.return_value.all.return_value = rows
+    mock_db.execute.return_value = mock_result
+    
+    view = await service.get_calendar_view(uuid4(), view='week', anchor=anchor)
+    
+    assert view['start_date'].startswith("2025-03-10")
+    assert view['end_date'].startswith("2025-03-17")
+    assert view['total_posts'] == 3
+    assert len(view['days']["2025-03-10"]) == 2
+    assert mock_db.execute.await_count == 1
 
 @pytest.mark.asyncio
 async def test_reschedule_post():
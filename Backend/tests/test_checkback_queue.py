@@ -0,0 +1,351 @@
+"""
+Tests for the adaptive check-back queue
+"""
+import json
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from services.api_rate_limiter import monthly_limit, paced_allowance
+from services.checkback_queue import (
+    CheckbackQueue,
+    CheckbackProvider,
+    MAX_INTERVAL_HOURS,
+    MIN_INTERVAL_HOURS,
+    CLAIM_DUE_CHECKS_SQL,
+    INSERT_SNAPSHOT_SQL,
+    LOG_CALL_SQL,
+    MAX_CHECK_FAILURES,
+    PROVIDER_USAGE_SQL,
+    RESCHEDULE_SQL,
+    RETRY_SQL,
+    explain_checkback,
+    fetch_post_metrics,
+    plan_next_check,
+    plan_retry,
+)
+from services.realtime_metrics import Platform, PostMetrics
+
+
+NOW = datetime(2026, 10, 15, 12, 0)
+
+
+class TestPlanNextCheck:
+    def test_fast_growth_checks_sooner(self):
+        posted = NOW - timedelta(hours=8)
+        fast = plan_next_check(posted, NOW, 20000, prev_views=10000, prev_checked_at=NOW - timedelta(hours=1))
+        slow = plan_next_check(posted, NOW, 20000, prev_views=19990, prev_checked_at=NOW - timedelta(hours=1))
+
+        assert fast.interval_hours < fast.base_interval_hours < slow.interval_hours
+        assert "sooner" in fast.reason
+        assert "later" in slow.reason
+
+    def test_interval_grows_with_age(self):
+        young = plan_next_check(NOW - timedelta(hours=4), NOW, 1000, 900, NOW - timedelta(hours=1))
+        old = plan_next_check(NOW - timedelta(days=10), NOW, 1000, 900, NOW - timedelta(hours=1))
+
+        assert young.base_interval_hours < old.base_interval_hours
+
+    def test_bounds(self):
+        viral = plan_next_check(NOW - timedelta(minutes=20), NOW, 5000, 0, NOW - timedelta(minutes=10))
+        stalled = plan_next_check(NOW - timedelta(days=20), NOW, 5000, 5000, NOW - timedelta(days=2))
+
+        assert viral.interval_hours == MIN_INTERVAL_HOURS
+        assert stalled.interval_hours == MAX_INTERVAL_HOURS
+
+    def test_first_check_uses_lifetime_average(self):
+        decision = plan_next_check(NOW - timedelta(hours=10), NOW, 1000)
+
+        assert decision.velocity == 100.0
+        assert abs((decision.next_check_at - NOW).total_seconds() / 3600 - decision.interval_hours) < 0.01
+
+    def test_stops_after_tracking_window(self):
+        decision = plan_next_check(NOW - timedelta(days=31), NOW, 1000, 990, NOW - timedelta(days=1))
+
+        assert decision.next_check_at is None
+        assert "ended" in decision.reason
+        assert decision.to_dict()["next_check_at"] is None
+
+    def test_final_check_lands_on_window_end(self):
+        decision = plan_next_check(NOW - timedelta(hours=710), NOW, 1000, 1000, NOW - timedelta(hours=72))
+
+        assert decision.interval_hours == 10.0
+
+
+class TestPlanRetry:
+    def test_backoff_doubles_up_to_cap(self):
+        delays = [
+            (datetime.fromisoformat(plan_retry(NOW - timedelta(hours=2), NOW, n)['next_check_at']) - NOW)
+            for n in range(1, MAX_CHECK_FAILURES)
+        ]
+
+        assert delays[:3] == [timedelta(minutes=30), timedelta(hours=1), timedelta(hours=2)]
+        assert all(a <= b for a, b in zip(delays, delays[1:]))
+        assert max(delays) <= timedelta(hours=24)
+
+    def test_dead_after_max_failures(self):
+        decision = plan_retry(NOW - timedelta(hours=2), NOW, MAX_CHECK_FAILURES)
+
+        assert decision['next_check_at'] is None
+        assert "dead" in decision['reason']
+
+    def test_stops_after_tracking_window(self):
+        decision = plan_retry(NOW - timedelta(days=31), NOW, 1)
+
+        assert decision['next_check_at'] is None
+        assert "window ended" in decision['reason']
+
+
+class TestPacedAllowance:
+    def test_budget_released_across_month(self):
+        limit = monthly_limit("tiktok_scraper")
+        start = paced_allowance("tiktok_scraper", 0, datetime(2026, 10, 1, 0, 0))
+        middle = paced_allowance("tiktok_scraper", 0, datetime(2026, 10, 16, 12, 0))
+
+        assert start == max(1, int(limit * 0.02))
+        assert abs(middle - limit // 2) <= start + 1
+        assert paced_allowance("tiktok_scraper", limit, datetime(2026, 10, 31, 23, 0)) == 0
+
+    def test_unknown_api_uses_default(self):
+        assert monthly_limit("unknown_api") == 900
+
+
+class FakeSession:
+    """Session that answers queue SQL from canned rows and records writes"""
+
+    def __init__(self, used=0, in_flight=0, due=None, reclaimed=()):
+        self.used = used
+        self.in_flight = in_flight
+        self.due = due or []
+        # Posts whose lease expired and were claimed again by another worker
+        self.reclaimed = set(reclaimed)
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        result = MagicMock()
+        if "AS in_flight" in sql:
+            result.first.return_value = SimpleNamespace(used=self.used, in_flight=self.in_flight)
+        elif sql == CLAIM_DUE_CHECKS_SQL:
+            rows = self.due[:params["limit"]]
+            result.__iter__.return_value = iter([SimpleNamespace(_mapping=row) for row in rows])
+        elif sql == RESCHEDULE_SQL:
+            result.__iter__.return_value = iter([(i,) for i in params["post_ids"] if i not in self.reclaimed])
+        return result
+
+    async def commit(self):
+        self.commits += 1
+
+    def executed(self, sql):
+        return [params for statement, params in self.statements if statement == sql]
+
+
+class SessionFactory:
+    def __init__(self, session):
+        self.session = session
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self.session
+
+    async def __aexit__(self, *args):
+        pass
+
+
+def due_post(post_id, hours_old=6, last_views=None, failures=0):
+    return {
+        "id": post_id,
+        "platform": "youtube",
+        "external_post_id": f"vid_{post_id}",
+        "posted_at": datetime.now() - timedelta(hours=hours_old),
+        "next_check_at": datetime.now() - timedelta(minutes=5),
+        "last_checked_at": datetime.now() - timedelta(hours=1) if last_views is not None else None,
+        "last_check_views": last_views,
+        "check_failures": failures,
+        "check_claimed_until": datetime.now() + timedelta(minutes=10),
+    }
+
+
+class TestClaim:
+    @pytest.mark.asyncio
+    async def test_claim_limited_by_budget_and_batch_size(self):
+        # 180 calls released on the 1st, 178 already spent
+        session = FakeSession(used=178, due=[due_post(i) for i in range(500)])
+        providers = {"youtube": CheckbackProvider("youtube_v31", batch_size=50)}
+        queue = CheckbackQueue(SessionFactory(session), providers=providers, max_claim=1000)
+
+        claimed, budget = await queue.claim("youtube", now=datetime(2026, 10, 1, 0, 0))
+
+        assert budget["available_calls"] == 2
+        assert len(claimed) == 100
+        assert session.statements[0][1] == {"lock_key": "checkback:youtube_v31"}
+        assert session.commits == 1
+
+    @pytest.mark.asyncio
+    async def test_in_flight_claims_reserve_budget(self):
+        limit = monthly_limit("tiktok_scraper")
+        session = FakeSession(used=limit - 1, in_flight=1, due=[due_post(1)])
+        queue = CheckbackQueue(SessionFactory(session))
+
+        claimed, budget = await queue.claim("tiktok", now=datetime(2026, 10, 31, 23, 0))
+
+        assert claimed == []
+        assert budget["available_calls"] == 0
+        assert not session.executed(CLAIM_DUE_CHECKS_SQL)
+
+    def test_failed_calls_count_against_budget(self):
+        assert "success" not in PROVIDER_USAGE_SQL
+
+
+class TestComplete:
+    @pytest.mark.asyncio
+    async def test_reschedules_checked_and_retries_failed(self):
+        session = FakeSession()
+        queue = CheckbackQueue(SessionFactory(session))
+        claimed = [due_post(1, last_views=1000), due_post(2, last_views=1000), due_post(3)]
+        results = {
+            1: {"views": 5000, "likes": 10},
+            2: {"views": 1001, "likes": 10},
+        }
+
+        stored = await queue.complete("youtube", claimed, results, elapsed_ms=40.0)
+
+        assert stored == 2
+        snapshots = session.executed(INSERT_SNAPSHOT_SQL)[0]
+        assert [row["post_id"] for row in snapshots] == [1, 2]
+        assert snapshots[0]["comments"] == 0
+
+        update = session.executed(RESCHEDULE_SQL)[0]
+        assert update["post_ids"] == [1, 2]
+        assert update["leases"] == [claimed[0]["check_claimed_until"], claimed[1]["check_claimed_until"]]
+        assert update["next_checks"][0] < update["next_checks"][1]
+        assert json.loads(update["decisions"][0])["velocity"] > 0
+
+        retry = session.executed(RETRY_SQL)[0]
+        assert retry["post_ids"] == [3] and retry["failures"] == [1]
+        assert retry["leases"] == [claimed[2]["check_claimed_until"]]
+        # Three YouTube posts fit in one batched request
+        assert len(session.executed(LOG_CALL_SQL)[0]) == 1
+        assert session.commits == 1
+
+    @pytest.mark.asyncio
+    async def test_repeated_failures_back_off_then_die(self):
+        session = FakeSession()
+        queue = CheckbackQueue(SessionFactory(session))
+        claimed = [due_post(1, failures=2), due_post(2, failures=MAX_CHECK_FAILURES - 1)]
+
+        await queue.complete("youtube", claimed, {}, now=NOW)
+
+        retry = session.executed(RETRY_SQL)[0]
+        assert retry["failures"] == [3, MAX_CHECK_FAILURES]
+        assert retry["next_checks"] == [NOW + timedelta(hours=2), None]
+        assert "dead" in json.loads(retry["decisions"][1])["reason"]
+        assert not session.executed(RESCHEDULE_SQL)
+
+    @pytest.mark.asyncio
+    async def test_results_for_reclaimed_posts_are_dropped(self):
+        session = FakeSession(reclaimed={2})
+        queue = CheckbackQueue(SessionFactory(session))
+        claimed = [due_post(1), due_post(2)]
+
+        stored = await queue.complete("youtube", claimed, {1: {"views": 10}, 2: {"views": 20}})
+
+        assert stored == 1
+        assert [row["post_id"] for row in session.executed(INSERT_SNAPSHOT_SQL)[0]] == [1]
+
+
+class TestFetchPostMetrics:
+    @pytest.mark.asyncio
+    async def test_zero_engagement_is_a_result_and_failures_are_not(self, monkeypatch):
+        async def get_youtube_videos(self, video_ids):
+            return [
+                PostMetrics(platform=Platform.YOUTUBE, post_id="vid_1"),
+                PostMetrics(platform=Platform.YOUTUBE, post_id="vid_2", fetched=False),
+            ]
+
+        async def close(self):
+            pass
+
+        monkeypatch.setattr("services.realtime_metrics.RealTimeMetricsService.get_youtube_videos", get_youtube_videos)
+        monkeypatch.setattr("services.realtime_metrics.RealTimeMetricsService.close", close)
+
+        results = await fetch_post_metrics("youtube", [due_post(1), due_post(2)])
+
+        assert results == {1: {"views": 0, "likes": 0, "comments": 0, "shares": 0, "saves": 0}}
+
+
+class TestRunOnce:
+    @pytest.mark.asyncio
+    async def test_fetches_claimed_posts_per_provider(self):
+        session = FakeSession(due=[due_post(i) for i in range(3)])
+        fetched = []
+
+        async def fetch(platform, posts):
+            fetched.append((platform, [p["id"] for p in posts]))
+            return {p["id"]: {"views": 100} for p in posts}
+
+        providers = {"youtube": CheckbackProvider("youtube_v31", batch_size=50)}
+        stats = await CheckbackQueue(SessionFactory(session), fetch_fn=fetch, providers=providers).run_once()
+
+        assert fetched == [("youtube", [0, 1, 2])]
+        assert stats["checked"] == 3
+        assert stats["providers"]["youtube"]["failed"] == 0
+
+    @pytest.mark.asyncio
+    async def test_provider_error_does_not_stop_others(self):
+        session = FakeSession(due=[due_post(1)])
+
+        async def fetch(platform, posts):
+            return {p["id"]: {"views": 100} for p in posts}
+
+        providers = {
+            "youtube": CheckbackProvider("youtube_v31"),
+            "tiktok": CheckbackProvider("tiktok_scraper"),
+        }
+        queue = CheckbackQueue(SessionFactory(session), fetch_fn=fetch, providers=providers)
+        original = queue.run_provider
+
+        async def run_provider(platform):
+            if platform == "tiktok":
+                raise RuntimeError("boom")
+            return await original(platform)
+
+        queue.run_provider = run_provider
+        stats = await queue.run_once()
+
+        assert stats["providers"]["tiktok"] == {"error": "boom"}
+        assert stats["checked"] == 1
+
+
+class TestExplain:
+    @pytest.mark.asyncio
+    async def test_due_post_waiting_for_budget(self):
+        decision = plan_next_check(datetime.now() - timedelta(hours=30), datetime.now() - timedelta(hours=2), 500)
+        row = SimpleNamespace(
+            id=7, platform="tiktok", external_post_id="123", posted_at=None,
+            next_check_at=datetime.now() - timedelta(minutes=1), tracking_complete=False,
+            checks_completed=2, last_checked_at=datetime.now() - timedelta(hours=2),
+            last_check_views=500, check_velocity=decision.velocity,
+            check_decision=json.dumps(decision.to_dict()), check_claimed_until=None, check_failures=0,
+        )
+        session = FakeSession(used=10_000)
+        original = session.execute
+
+        async def execute(statement, params=None):
+            if "check_failures\nFROM" in str(statement):
+                result = MagicMock()
+                result.first.return_value = row
+                return result
+            return await original(statement, params)
+
+        session.execute = execute
+        explanation = await explain_checkback(session, 7)
+
+        assert explanation["status"] == "waiting_for_budget"
+        assert explanation["decision"]["reason"] == decision.reason
+        assert explanation["budget"]["api_name"] == "tiktok_scraper"
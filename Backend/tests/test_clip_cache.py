@@ -0,0 +1,223 @@
+"""
+Tests for the clip cache and long video partial-failure recovery
+"""
+import os
+import time
+
+import pytest
+
+from modules.ai.video_model_interface import VideoGenerationJob, VideoStatus
+from services import long_video_orchestrator
+from services.clip_cache import ClipCache, scene_key
+from services.job_waiter import JobStateStore, PollBudget, RemoteJobWaiter
+from services.long_video_orchestrator import LongVideoOrchestrator, LongVideoStatus, SceneSpec
+
+FAST = PollBudget(initial_delay=0.001, base_interval=0.001, max_interval=0.01, timeout=5)
+
+
+class FakeProviders:
+    """Video models that record calls; providers in `broken` fail every job"""
+
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.created = []
+        self.polled = []
+
+    def model(self, provider):
+        providers = self
+
+        class Model:
+            def create_video(self, request):
+                job_id = f"{provider}-{len(providers.created)}"
+                providers.created.append((provider, request.prompt))
+                return VideoGenerationJob(job_id=job_id, status=VideoStatus.QUEUED)
+
+            def get_status(self, job_id):
+                providers.polled.append(job_id)
+                if provider in providers.broken:
+                    return VideoGenerationJob(job_id=job_id, status=VideoStatus.FAILED, error_message="render error")
+                return VideoGenerationJob(job_id=job_id, status=VideoStatus.COMPLETED)
+
+            def download_video(self, job_id, output_path):
+                with open(output_path, 'w') as f:
+                    f.write(job_id)
+
+        return Model()
+
+
+def make_orchestrator(tmp_path, monkeypatch, providers, fallback_providers=None):
+    waiter = RemoteJobWaiter(
+        store=JobStateStore(":memory:"),
+        budgets={p: FAST for p in ("kling", "runway", "luma", "hailuo")},
+    )
+    monkeypatch.setattr(long_video_orchestrator, "get_job_waiter", lambda: waiter)
+    monkeypatch.setattr(long_video_orchestrator, "create_video_model", providers.model)
+    return LongVideoOrchestrator(
+        output_dir=str(tmp_path / "out"),
+        clip_cache=ClipCache(tmp_path / "cache"),
+        fallback_providers={} if fallback_providers is None else fallback_providers,
+    ), waiter
+
+
+def scenes(*providers):
+    return [SceneSpec(scene_number=i, prompt=f"shot {i}", provider=p) for i, p in enumerate(providers)]
+
+
+async def generate_clips(orch, job):
+    """Clip phase only; stitching needs ffmpeg"""
+    try:
+        await orch._generate_all_clips(job)
+    except Exception as e:
+        return e
+
+
+class TestSceneKey:
+    def test_key_tracks_scene_spec(self):
+        base = SceneSpec(scene_number=1, prompt="sunrise", provider="kling")
+
+        assert scene_key(base, 1920, 1080) == scene_key(SceneSpec(scene_number=7, prompt="sunrise"), 1920, 1080)
+        assert scene_key(base, 1920, 1080) != scene_key(SceneSpec(scene_number=1, prompt="sunset"), 1920, 1080)
+        assert scene_key(base, 1920, 1080) != scene_key(base, 1280, 720)
+
+    def test_local_input_image_hashed_by_content(self, tmp_path):
+        image = tmp_path / "ref.png"
+        image.write_bytes(b"first")
+        scene = SceneSpec(scene_number=1, prompt="p", input_image=str(image))
+        before = scene_key(scene, 1920, 1080)
+
+        image.write_bytes(b"second")
+
+        assert scene_key(scene, 1920, 1080) != before
+
+
+class TestPartialFailure:
+    @pytest.mark.asyncio
+    async def test_successful_clips_kept_and_retry_regenerates_only_failures(self, tmp_path, monkeypatch):
+        providers = FakeProviders(broken={"runway"})
+        orch, waiter = make_orchestrator(tmp_path, monkeypatch, providers)
+        job = orch.create_from_scenes(scenes("kling", "runway", "kling"))
+
+        error = await generate_clips(orch, job)
+
+        assert "1/3 scenes failed" in str(error)
+        assert set(job.scene_clips) == {0, 2}
+        assert set(job.failed_scenes) == {1}
+        assert len(providers.created) == 3
+
+        providers.broken.clear()
+        assert await generate_clips(orch, job) is None
+
+        assert providers.created[3:] == [("runway", "shot 1")]
+        assert job.failed_scenes == {}
+        assert len(job.clip_paths) == 3 and all(orch.clip_cache.owns(p) for p in job.clip_paths)
+        await waiter.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_job_can_be_regenerated(self, tmp_path, monkeypatch):
+        providers = FakeProviders(broken={"runway"})
+        orch, waiter = make_orchestrator(tmp_path, monkeypatch, providers)
+        job = orch.create_from_scenes(scenes("runway"))
+
+        with pytest.raises(Exception, match="scenes failed"):
+            await orch.generate(job.job_id)
+
+        assert job.status == LongVideoStatus.FAILED
+        assert "render error" in job.failed_scenes[0]
+        await waiter.close()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_next_provider(self, tmp_path, monkeypatch):
+        providers = FakeProviders(broken={"kling", "hailuo"})
+        orch, waiter = make_orchestrator(tmp_path, monkeypatch, providers, {"kling": ["hailuo", "runway"]})
+        job = orch.create_from_scenes(scenes("kling"))
+
+        assert await generate_clips(orch, job) is None
+
+        assert [p for p, _ in providers.created] == ["kling", "hailuo", "runway"]
+        key = scene_key(job.spec.scenes[0], 1920, 1080)
+        assert orch.clip_cache.state(key)['provider'] == "runway"
+        await waiter.close()
+
+
+class TestReuse:
+    @pytest.mark.asyncio
+    async def test_identical_scenes_reused_across_jobs(self, tmp_path, monkeypatch):
+        providers = FakeProviders()
+        orch, waiter = make_orchestrator(tmp_path, monkeypatch, providers)
+        first = orch.create_from_scenes(scenes("kling", "kling"))
+        await generate_clips(orch, first)
+        orch.cleanup(first.job_id)
+
+        second = orch.create_from_scenes(scenes("kling", "kling"))
+        await generate_clips(orch, second)
+
+        assert len(providers.created) == 2
+        assert second.clip_paths == first.clip_paths
+        await waiter.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_scenes_generate_once(self, tmp_path, monkeypatch):
+        providers = FakeProviders()
+        orch, waiter = make_orchestrator(tmp_path, monkeypatch, providers)
+        scene = SceneSpec(scene_number=0, prompt="same", provider="kling")
+        job = orch.create_from_scenes([scene, SceneSpec(scene_number=1, prompt="same", provider="kling")])
+
+        await generate_clips(orch, job)
+
+        assert len(providers.created) == 1
+        assert job.clip_paths[0] == job.clip_paths[1]
+        await waiter.close()
+
+    @pytest.mark.asyncio
+    async def test_in_flight_provider_job_resumed_not_recreated(self, tmp_path, monkeypatch):
+        providers = FakeProviders()
+        orch, waiter = make_orchestrator(tmp_path, monkeypatch, providers)
+        job = orch.create_from_scenes(scenes("kling"))
+        key = scene_key(job.spec.scenes[0], 1920, 1080)
+        # State left behind by a worker that died mid-generation
+        ClipCache(tmp_path / "cache").mark_generating(key, "kling", "kling-earlier")
+
+        await generate_clips(orch, job)
+
+        assert providers.created == []
+        assert providers.polled == ["kling-earlier"]
+        assert orch.clip_cache.state(key)['state'] == "completed"
+        await waiter.close()
+
+
+def cached_clip(cache, tmp_path, key, size, used_at):
+    clip = tmp_path / f"{key}.mp4"
+    clip.write_bytes(b"x" * size)
+    path = cache.store(key, "kling", str(clip))
+    cache.conn.execute("UPDATE scene_clips SET last_used_at = ? WHERE scene_key = ?", (used_at, key))
+    return path
+
+
+class TestEviction:
+    def test_least_recently_used_clips_evicted_over_budget(self, tmp_path):
+        cache = ClipCache(tmp_path / "cache", max_bytes=250)
+        now = time.time()
+        old = cached_clip(cache, tmp_path, "old", 100, now - 3 * 86400)
+        used = cached_clip(cache, tmp_path, "used", 100, now - 2 * 86400)
+        cache.get("used")  # refreshed: now the most recently used
+
+        newest = cached_clip(cache, tmp_path, "newest", 100, now - 86400)
+
+        assert not os.path.exists(old) and cache.state("old") is None
+        assert os.path.exists(used) and os.path.exists(newest)
+
+    def test_expired_clips_evicted_under_budget(self, tmp_path):
+        cache = ClipCache(tmp_path / "cache", max_age_days=7)
+        fresh = cached_clip(cache, tmp_path, "fresh", 10, time.time() - 86400)
+        stale = cached_clip(cache, tmp_path, "stale", 10, time.time() - 8 * 86400)
+
+        assert cache.evict() == 1
+        assert cache.get("stale") is None and not os.path.exists(stale)
+        assert cache.get("fresh") == fresh
+
+    def test_recently_used_clips_kept_over_budget(self, tmp_path):
+        cache = ClipCache(tmp_path / "cache", max_bytes=50)
+        first = cached_clip(cache, tmp_path, "a", 100, time.time())
+        second = cached_clip(cache, tmp_path, "b", 100, time.time())
+
+        assert os.path.exists(first) and os.path.exists(second)
@@ -9,6 +9,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from database.models import Base, AnalyzedVideo, VideoSegment, VideoWord
 from services.transcription import TranscriptionService
+from services.transcription_engine import OpenAIWhisperBackend, TranscriptionEngine
 from services.psychology_tagger import PsychologyTagger
 from services.content_analysis_orchestrator import ContentAnalysisOrchestrator
 
@@ -40,7 +41,7 @@ class TestTranscriptionService:
         assert service.client is not None
     
     @patch('openai.OpenAI')
-    def test_transcribe_video(self, mock_openai_class):
+    def test_transcribe_video(self, mock_openai_class, tmp_path):
         """Test video transcription with word timestamps"""
         # Mock OpenAI response
         mock_client = Mock()
@@ -63,6 +64,10 @@ class TestTranscriptionService:
         
         service = TranscriptionService(api_key="fake-key")
         service.client = mock_client
+        service.engine = TranscriptionEngine(
+            backend=OpenAIWhisperBackend(api_key="fake-key"),
+            cache_dir=tmp_path
+        )
         
         # Create a fake video file
         import tempfile
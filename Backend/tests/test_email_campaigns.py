@@ -0,0 +1,220 @@
+"""
+Tests for segment email campaigns, against a local SMTP sink
+"""
+import asyncio
+import email
+import time
+import uuid
+from collections import Counter
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import services.email_campaigns as email_campaigns
+from services.email_campaigns import CampaignEngine, DomainThrottle, SMTPConnectionPool
+
+SCHEMA = [
+    "CREATE TABLE people (id TEXT PRIMARY KEY, full_name TEXT, primary_email TEXT, company TEXT, role TEXT)",
+    "CREATE TABLE segment_members (segment_id TEXT, person_id TEXT, PRIMARY KEY (segment_id, person_id))",
+    """CREATE TABLE outbound_messages (
+        id TEXT PRIMARY KEY, person_id TEXT, segment_id TEXT, campaign_id TEXT, channel TEXT, goal_type TEXT,
+        variant TEXT, subject TEXT, body TEXT, sent_at TIMESTAMP, delivery_status TEXT)""",
+    "CREATE UNIQUE INDEX idx_campaign_person ON outbound_messages (campaign_id, person_id)",
+    """CREATE TABLE email_campaigns (
+        id TEXT PRIMARY KEY, segment_id TEXT NOT NULL, subject TEXT NOT NULL, body_template TEXT NOT NULL,
+        goal_type TEXT, variant TEXT, personalization TEXT, status TEXT NOT NULL DEFAULT 'pending',
+        cursor_person_id TEXT, sent INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0,
+        skipped INTEGER NOT NULL DEFAULT 0, claimed_until REAL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, completed_at TIMESTAMP)""",
+]
+SEGMENT = str(uuid.uuid4())
+
+
+class SMTPSink:
+    """Minimal SMTP server that keeps every message it accepts"""
+
+    def __init__(self, delay: float = 0.0, reject=()):
+        self.delay = delay
+        self.reject = set(reject)
+        self.messages = []
+        self.connections = 0
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"220 sink ESMTP\r\n")
+        while line := await reader.readline():
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb == "RCPT":
+                address = command.split(":", 1)[1].strip(" <>")
+                writer.write(b"550 no such user\r\n" if address in self.reject else b"250 OK\r\n")
+            elif verb == "DATA":
+                writer.write(b"354 go ahead\r\n")
+                await writer.drain()
+                data = b""
+                while (chunk := await reader.readline()) != b".\r\n":
+                    if not chunk:
+                        return  # Client went away mid-message
+                    data += chunk
+                await asyncio.sleep(self.delay)
+                self.messages.append(email.message_from_bytes(data))
+                writer.write(b"250 queued\r\n")
+            elif verb == "QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:  # EHLO, MAIL, RSET, NOOP
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def recipients(self) -> Counter:
+        return Counter(m["To"].rpartition("<")[2].rstrip(">") for m in self.messages)
+
+
+async def make_engine(tmp_path, people):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'campaigns.sqlite3'}")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def wal(dbapi_connection, _):
+        # The member stream stays open while batches are written
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    async with engine.begin() as conn:
+        for statement in SCHEMA:
+            await conn.execute(text(statement))
+        for i, address in enumerate(people):
+            person_id = str(uuid.uuid4())
+            await conn.execute(text("INSERT INTO people VALUES (:id, :name, :email, 'Acme', NULL)"),
+                               {'id': person_id, 'name': f"Person {i}", 'email': address})
+            await conn.execute(text("INSERT INTO segment_members VALUES (:segment, :id)"),
+                               {'segment': SEGMENT, 'id': person_id})
+    return engine
+
+
+async def make_campaign(engine, port, **kwargs):
+    sender = SMTPConnectionPool("127.0.0.1", port, starttls=False, size=kwargs.pop('pool_size', 4))
+    campaigns = CampaignEngine(sender, "MediaPoster <hi@mediaposter.test>", async_sessionmaker(engine), **kwargs)
+    campaign_id = await campaigns.create(
+        segment_id=SEGMENT,
+        subject="Hi {{ full_name }}",
+        body_template="<p>{{ person.company }} x {{ launch }}</p>",
+        goal_type="launch",
+        personalization={'launch': "v2"},
+    )
+    return campaigns, campaign_id
+
+
+async def delivery_statuses(engine) -> Counter:
+    async with engine.connect() as conn:
+        rows = (await conn.execute(text("SELECT delivery_status FROM outbound_messages"))).fetchall()
+    return Counter(r[0] for r in rows)
+
+
+class TestCampaign:
+    @pytest.mark.asyncio
+    async def test_sends_each_member_once_over_pooled_connections(self, tmp_path, monkeypatch):
+        compiled, template = [], email_campaigns.Template
+        monkeypatch.setattr(email_campaigns, "Template", lambda source: compiled.append(source) or template(source))
+        addresses = [f"user{i}@{'gmail.com' if i % 2 else 'example.org'}" for i in range(25)]
+        engine = await make_engine(tmp_path, addresses + [None])
+        sink = SMTPSink(reject={"user3@gmail.com"})
+        port = await sink.start()
+        campaigns, campaign_id = await make_campaign(engine, port, batch_size=10, window_size=10)
+        compiled.clear()
+
+        stats = await campaigns.run(campaign_id)
+        await campaigns.sender.close()
+        await sink.stop()
+
+        assert stats['sent'] == 24 and stats['failed'] == 2 and stats['total'] == 26
+        assert stats['status'] == "completed"
+        assert sorted(sink.recipients()) == sorted(a for a in addresses if a != "user3@gmail.com")
+        assert set(sink.recipients().values()) == {1}
+        assert sink.connections <= 4 + 1  # pool size, plus one replaced after the rejection at most
+        assert len(compiled) == 2  # subject and body, once per run
+        message = sink.messages[0]
+        assert message["Subject"].startswith("Hi Person")
+        assert "Acme x v2" in message.get_payload()[0].get_payload()
+        assert await delivery_statuses(engine) == Counter({'sent': 24, 'failed': 2})
+
+        # Running a finished campaign again sends nothing
+        assert (await campaigns.run(campaign_id))['sent'] == 24
+        assert len(sink.messages) == 24
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_interrupted_campaign_resumes_without_double_sending(self, tmp_path):
+        addresses = [f"user{i}@example.org" for i in range(40)]
+        engine = await make_engine(tmp_path, addresses)
+        sink = SMTPSink(delay=0.01)
+        port = await sink.start()
+        campaigns, campaign_id = await make_campaign(engine, port, batch_size=8, pool_size=2)
+
+        run = asyncio.create_task(campaigns.run(campaign_id))
+        while len(sink.messages) < 13:
+            await asyncio.sleep(0.002)
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        await asyncio.sleep(0.1)  # let sends already handed to SMTP threads land
+        delivered_before = len(sink.messages)
+
+        resumed = CampaignEngine(
+            SMTPConnectionPool("127.0.0.1", port, starttls=False), "MediaPoster <hi@mediaposter.test>",
+            async_sessionmaker(engine), batch_size=8,
+        )
+        stats = await resumed.run(campaign_id)
+        await resumed.sender.close()
+        await sink.stop()
+
+        received = sink.recipients()
+        statuses = await delivery_statuses(engine)
+        assert set(received.values()) == {1}
+        assert delivered_before < 40 and len(received) >= 40 - statuses['interrupted']
+        assert sum(statuses.values()) == 40 and statuses['queued'] == 0
+        assert stats['total'] == 40 and stats['status'] == "completed"
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_unconfigured_smtp_records_messages_as_skipped(self, tmp_path):
+        engine = await make_engine(tmp_path, ["a@example.org", "b@example.org"])
+        campaigns = CampaignEngine(None, "MediaPoster <hi@mediaposter.test>", async_sessionmaker(engine))
+        campaign_id = await campaigns.create(SEGMENT, "Hello", "<p>Body</p>")
+
+        stats = await campaigns.run(campaign_id)
+
+        assert (stats['sent'], stats['skipped']) == (0, 2)
+        assert await delivery_statuses(engine) == Counter({'skipped': 2})
+        await engine.dispose()
+
+
+class TestDomainThrottle:
+    @pytest.mark.asyncio
+    async def test_caps_concurrency_and_spaces_sends_per_domain(self):
+        throttle = DomainThrottle(max_concurrent=2, min_interval=0.02)
+        active, peak, started = Counter(), Counter(), {}
+
+        async def send(domain, i):
+            async with throttle.slot(domain):
+                started.setdefault(domain, []).append(time.monotonic())
+                active[domain] += 1
+                peak[domain] = max(peak[domain], active[domain])
+                await asyncio.sleep(0.05)
+                active[domain] -= 1
+
+        await asyncio.gather(*(send("gmail.com", i) for i in range(6)), *(send("example.org", i) for i in range(2)))
+
+        assert peak["gmail.com"] == 2 and peak["example.org"] == 2
+        gaps = [b - a for a, b in zip(started["gmail.com"], started["gmail.com"][1:])]
+        assert min(gaps) >= 0.015
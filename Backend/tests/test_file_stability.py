@@ -0,0 +1,210 @@
+"""
+Tests for the file stability tracker and the watchers built on it
+"""
+import threading
+import time
+from pathlib import Path
+
+from watchdog.events import FileClosedEvent, FileCreatedEvent, FileModifiedEvent, FileMovedEvent
+
+from modules.video_ingestion.file_stability import FileStabilityTracker, TimerWheel
+from modules.video_ingestion.file_watcher import VideoFileHandler, VideoFileWatcher
+from services.resource_folder_monitor import ResourceFolderHandler
+
+FAST = dict(quiet_period=0.05, settle=0.02, tick=0.005)
+
+
+class Recorder:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.paths = []
+        self.event = threading.Event()
+
+    def __call__(self, path: Path):
+        time.sleep(self.delay)
+        self.paths.append((path.name, path.stat().st_size))
+        self.event.set()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return condition()
+
+
+class TestTimerWheel:
+    def test_items_expire_in_order_including_past_one_rotation(self):
+        now = [0.0]
+        wheel = TimerWheel(tick=0.1, slots=8, clock=lambda: now[0])
+        wheel.schedule("late", 2.0)  # more than one turn of the wheel
+        wheel.schedule("soon", 0.2)
+
+        now[0] = 0.5
+        assert wheel.advance() == ["soon"]
+        now[0] = 1.9
+        assert wheel.advance() == []
+        now[0] = 2.05
+        assert wheel.advance() == ["late"]
+        assert wheel.size == 0
+
+
+class TestTracker:
+    def test_event_burst_dispatches_once(self, tmp_path):
+        recorder = Recorder()
+        tracker = FileStabilityTracker(recorder, **FAST)
+        video = tmp_path / "IMG_0001.MOV"
+        video.write_bytes(b"x" * 100)
+
+        for _ in range(20):
+            tracker.note(video)
+        tracker.note(video, closed=True)
+
+        assert recorder.event.wait(2)
+        time.sleep(0.2)
+        tracker.stop()
+        assert recorder.paths == [("IMG_0001.MOV", 100)]
+
+    def test_waits_for_writes_to_stop(self, tmp_path):
+        recorder = Recorder()
+        tracker = FileStabilityTracker(recorder, **FAST)
+        video = tmp_path / "airdrop.mov"
+
+        with open(video, "wb") as f:
+            tracker.note(video)
+            for _ in range(10):
+                f.write(b"x" * 1000)
+                f.flush()
+                time.sleep(0.02)
+        assert recorder.paths == []
+
+        assert recorder.event.wait(2)
+        tracker.stop()
+        assert recorder.paths == [("airdrop.mov", 10000)]
+
+    def test_close_write_dispatches_before_poll_window(self, tmp_path):
+        recorder = Recorder()
+        tracker = FileStabilityTracker(recorder, quiet_period=5, settle=0.02, tick=0.005)
+        video = tmp_path / "clip.mp4"
+        video.write_bytes(b"data")
+
+        tracker.note(video)
+        tracker.note(video, closed=True)
+
+        assert recorder.event.wait(1)
+        tracker.stop()
+
+    def test_note_never_blocks_on_slow_callbacks(self, tmp_path):
+        recorder = Recorder(delay=0.1)
+        tracker = FileStabilityTracker(recorder, dispatch_workers=8, **FAST)
+        files = []
+        for i in range(16):
+            path = tmp_path / f"burst_{i}.mov"
+            path.write_bytes(b"x")
+            files.append(path)
+
+        started = time.perf_counter()
+        for path in files:
+            tracker.note(path, closed=True)
+        noted = time.perf_counter() - started
+
+        assert noted < 0.05
+        assert wait_for(lambda: len(recorder.paths) == 16)
+        # 16 x 100ms callbacks on 8 workers, not one after another
+        assert time.perf_counter() - started < 1.0
+        tracker.stop()
+
+    def test_rewritten_file_dispatched_again_unchanged_file_not(self, tmp_path):
+        recorder = Recorder()
+        tracker = FileStabilityTracker(recorder, **FAST)
+        video = tmp_path / "edit.mov"
+        video.write_bytes(b"v1")
+
+        tracker.note(video, closed=True)
+        assert wait_for(lambda: len(recorder.paths) == 1)
+        tracker.note(video, closed=True)
+        time.sleep(0.1)
+        assert len(recorder.paths) == 1
+
+        video.write_bytes(b"version 2")
+        tracker.note(video, closed=True)
+        assert wait_for(lambda: len(recorder.paths) == 2)
+        tracker.stop()
+        assert recorder.paths[1] == ("edit.mov", 9)
+
+    def test_dispatch_records_expire_after_max_wait(self, tmp_path):
+        recorder = Recorder()
+        tracker = FileStabilityTracker(recorder, max_wait=0.2, **FAST)
+        first, second = tmp_path / "first.mov", tmp_path / "second.mov"
+        first.write_bytes(b"1")
+        second.write_bytes(b"2")
+
+        tracker.note(first, closed=True)
+        assert wait_for(lambda: len(recorder.paths) == 1)
+        time.sleep(0.3)
+        tracker.note(second, closed=True)
+        assert wait_for(lambda: len(recorder.paths) == 2)
+        tracker.stop()
+        assert list(tracker._dispatched) == [str(second.absolute())]
+
+    def test_vanished_file_dropped(self, tmp_path):
+        recorder = Recorder()
+        tracker = FileStabilityTracker(recorder, **FAST)
+        temp = tmp_path / "partial.mov"
+        temp.write_bytes(b"x")
+
+        tracker.note(temp)
+        temp.unlink()
+
+        assert wait_for(lambda: tracker.pending_count == 0)
+        tracker.stop()
+        assert recorder.paths == []
+
+
+class TestHandlers:
+    def test_resource_folder_duplicate_events_collapse(self, tmp_path):
+        recorder = Recorder()
+        handler = ResourceFolderHandler(recorder)
+        handler.tracker = FileStabilityTracker(handler._dispatch, **FAST)
+        photo = tmp_path / "photo.jpg"
+        photo.write_bytes(b"jpeg")
+
+        handler.on_created(FileCreatedEvent(str(photo)))
+        handler.on_modified(FileModifiedEvent(str(photo)))
+        handler.on_modified(FileModifiedEvent(str(photo)))
+        handler.on_closed(FileClosedEvent(str(photo)))
+
+        assert recorder.event.wait(2)
+        time.sleep(0.1)
+        handler.tracker.stop()
+        assert recorder.paths == [("photo.jpg", 4)]
+
+    def test_video_handler_ignores_modifies_of_untracked_files(self, tmp_path):
+        recorder = Recorder()
+        handler = VideoFileHandler(recorder, {".mov"})
+        handler.tracker = FileStabilityTracker(recorder, **FAST)
+        old, new = tmp_path / "old.mov", tmp_path / "new.mov"
+        old.write_bytes(b"old")
+        new.write_bytes(b"new")
+
+        handler.on_modified(FileModifiedEvent(str(old)))
+        handler.on_moved(FileMovedEvent(str(tmp_path / ".new.mov.tmp"), str(new)))
+
+        assert recorder.event.wait(2)
+        time.sleep(0.1)
+        handler.stop()
+        assert recorder.paths == [("new.mov", 3)]
+
+    def test_watcher_detects_written_file(self, tmp_path):
+        recorder = Recorder()
+        watcher = VideoFileWatcher([str(tmp_path)])
+        watcher.start(recorder)
+        time.sleep(0.2)
+
+        (tmp_path / "IMG_0042.MOV").write_bytes(b"x" * 4096)
+
+        assert recorder.event.wait(3)
+        watcher.stop()
+        assert recorder.paths == [("IMG_0042.MOV", 4096)]
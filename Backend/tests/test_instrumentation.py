@@ -0,0 +1,140 @@
+"""
+Tests for request/SQL/subprocess/LLM instrumentation
+"""
+import sys
+import pytest
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from middleware.request_metrics import RequestMetricsMiddleware
+from services import instrumentation
+from services.instrumentation import (
+    DB_QUERY_SECONDS,
+    EXTERNAL_CALL_COST,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUEST_SQL_QUERIES,
+    LLM_TOKENS,
+    SUBPROCESS_SECONDS,
+    Histogram,
+    MetricsRegistry,
+    _TimedPopen,
+    instrument_engine,
+    llm_cost_usd,
+    start_request_stats,
+    end_request_stats,
+)
+
+
+class TestRegistry:
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("job_seconds", "Job time", ("queue",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value, 'say "hi"')
+
+        lines = registry.render().splitlines()
+
+        assert lines[:2] == ["# HELP job_seconds Job time", "# TYPE job_seconds histogram"]
+        assert 'job_seconds_bucket{queue="say \\"hi\\"",le="0.1"} 1' in lines
+        assert 'job_seconds_bucket{queue="say \\"hi\\"",le="1.0"} 3' in lines
+        assert 'job_seconds_bucket{queue="say \\"hi\\"",le="+Inf"} 4' in lines
+        assert 'job_seconds_count{queue="say \\"hi\\""} 4' in lines
+        assert 'job_seconds_sum{queue="say \\"hi\\""} 4.25' in lines
+
+    def test_registry_returns_existing_metric(self):
+        registry = MetricsRegistry()
+        first = registry.counter("calls_total", "Calls")
+
+        assert registry.counter("calls_total", "Calls") is first
+        assert isinstance(registry.histogram("h", "H"), Histogram)
+
+
+async def get(*paths):
+    """Request paths from a small instrumented app backed by in-memory SQLite"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine)
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        async with engine.connect() as conn:
+            for _ in range(3):
+                await conn.execute(text("SELECT :id"), {"id": item_id})
+        return {"id": item_id}
+
+    app.add_middleware(RequestMetricsMiddleware)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = [await client.get(path) for path in paths]
+    await engine.dispose()
+    return responses
+
+
+class TestRequestMetricsMiddleware:
+    @pytest.mark.asyncio
+    async def test_route_latency_and_sql_counts(self):
+        before = HTTP_REQUEST_SECONDS.count("GET", "/items/{item_id}", "200")
+        queries_before = HTTP_REQUEST_SQL_QUERIES._series.get(("/items/{item_id}",), [0] * 11)[-1]
+
+        response, = await get("/items/7")
+
+        assert response.status_code == 200
+        assert 'desc="3 queries"' in response.headers["server-timing"]
+        assert HTTP_REQUEST_SECONDS.count("GET", "/items/{item_id}", "200") == before + 1
+        assert HTTP_REQUEST_SQL_QUERIES._series[("/items/{item_id}",)][-1] == queries_before + 3
+        assert DB_QUERY_SECONDS.count("SELECT") >= 3
+
+    @pytest.mark.asyncio
+    async def test_unknown_paths_share_one_label(self):
+        before = HTTP_REQUEST_SECONDS.count("GET", "unmatched", "404")
+
+        await get("/nope/1", "/nope/2")
+
+        assert HTTP_REQUEST_SECONDS.count("GET", "unmatched", "404") == before + 2
+
+
+class TestSubprocess:
+    def test_wait_records_once(self):
+        stats, token = start_request_stats()
+        before = SUBPROCESS_SECONDS.count("other", "ok")
+        try:
+            process = _TimedPopen([sys.executable, "-c", "pass"])
+            process.wait()
+            process.wait()
+        finally:
+            end_request_stats(token)
+
+        assert SUBPROCESS_SECONDS.count("other", "ok") == before + 1
+        assert stats.subprocess_seconds > 0
+
+    def test_tool_name_from_path(self):
+        assert instrumentation._tool_name(["/usr/local/bin/ffmpeg", "-i", "x"]) == "ffmpeg"
+        assert instrumentation._tool_name("ffprobe -v quiet in.mp4") == "ffprobe"
+
+
+class TestLLMAccounting:
+    def test_cost_uses_longest_model_prefix(self):
+        assert llm_cost_usd("gpt-4o-mini-2024-07-18", 1000, 1000) == pytest.approx(0.00075)
+        assert llm_cost_usd("gpt-4o-2024-08-06", 1000, 0) == pytest.approx(0.0025)
+        assert llm_cost_usd("some-local-model", 1000, 1000) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_wrapped_create_records_tokens_and_cost(self):
+        class FakeCompletions:
+            async def create(self, **kwargs):
+                return SimpleNamespace(
+                    model="gpt-4o-mini",
+                    usage=SimpleNamespace(prompt_tokens=2000, completion_tokens=500),
+                )
+
+        instrumentation._wrap_openai(FakeCompletions, "test_chat")
+        tokens_before = LLM_TOKENS.value("gpt-4o-mini", "prompt")
+
+        await FakeCompletions().create(model="gpt-4o-mini", messages=[])
+
+        assert LLM_TOKENS.value("gpt-4o-mini", "prompt") == tokens_before + 2000
+        assert EXTERNAL_CALL_COST.value("openai", "test_chat") == pytest.approx(0.0006)
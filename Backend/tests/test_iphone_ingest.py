@@ -0,0 +1,248 @@
+"""
+Tests for the staged iPhone media import pipeline
+"""
+import asyncio
+import os
+import pytest
+
+from scripts import ingest_iphone_media as ingest
+from scripts.ingest_iphone_media import (
+    IngestionPipeline,
+    IngestionStore,
+    MediaIngester,
+    MediaStatus,
+    quick_fingerprint,
+    scan_directory,
+)
+
+
+class FakeIngester(MediaIngester):
+    """Instant ingest/analysis that records calls; names in `failing` fail ingest"""
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.ingested = []
+        self.analyzed = []
+        self.in_flight = self.peak = 0
+
+    async def ingest_file(self, media_file):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        self.ingested.append(media_file.filename)
+        if media_file.filename in self.failing:
+            self._record_failure(media_file, RuntimeError("db down"))
+            return False
+        media_file.status = MediaStatus.INGESTED
+        return True
+
+    async def analyze_file(self, media_file):
+        self.analyzed.append(media_file.filename)
+        media_file.status = MediaStatus.ANALYZED
+        media_file.analysis_result = {"score": 80}
+        return True
+
+
+def make_library(root, count):
+    root.mkdir(exist_ok=True)
+    for i in range(count):
+        (root / f"IMG_{i:04d}.MOV").write_bytes(f"clip {i}".encode() * 100)
+    (root / "notes.txt").write_text("ignored")
+    return root
+
+
+async def run_import(directory, store, ingester, **workers):
+    pipeline = IngestionPipeline(store, ingester, **workers)
+    await pipeline.run(scan_directory(directory))
+    return pipeline
+
+
+class TestFingerprint:
+    def test_sampled_fingerprint_ignores_name_and_mtime(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ingest, "SAMPLE_BLOCK", 4)
+        data = bytes(range(256)) * 4
+        a, b = tmp_path / "a.mov", tmp_path / "b.mov"
+        a.write_bytes(data)
+        b.write_bytes(data)
+        os.utime(b, ns=(0, 0))
+
+        assert quick_fingerprint(str(a), len(data)) == quick_fingerprint(str(b), len(data))
+
+        # A change in a sampled block (the middle) is detected
+        changed = bytearray(data)
+        changed[len(data) // 2] ^= 0xFF
+        b.write_bytes(bytes(changed))
+        assert quick_fingerprint(str(a), len(data)) != quick_fingerprint(str(b), len(data))
+
+
+class TestPipeline:
+    @pytest.mark.asyncio
+    async def test_imports_everything_with_bounded_workers(self, tmp_path):
+        library = make_library(tmp_path / "lib", 30)
+        store = IngestionStore(tmp_path / "state.sqlite3")
+        ingester = FakeIngester()
+
+        await run_import(library, store, ingester, ingest_workers=3)
+
+        assert store.counts() == {"analyzed": 30}
+        assert 1 < ingester.peak <= 3
+        assert store.load(str(library / "IMG_0000.MOV")).analysis_result == {"score": 80}
+
+    @pytest.mark.asyncio
+    async def test_resume_only_touches_changed_files(self, tmp_path, monkeypatch):
+        library = make_library(tmp_path / "lib", 20)
+        store = IngestionStore(tmp_path / "state.sqlite3")
+        await run_import(library, store, FakeIngester())
+
+        hashed = []
+        real_fingerprint = ingest.quick_fingerprint
+        monkeypatch.setattr(ingest, "quick_fingerprint", lambda p, s: hashed.append(p) or real_fingerprint(p, s))
+        (library / "IMG_0007.MOV").write_bytes(b"re-exported")
+        (library / "IMG_0100.MOV").write_bytes(b"new clip")
+        ingester = FakeIngester()
+
+        pipeline = await run_import(library, store, ingester)
+
+        assert sorted(ingester.ingested) == ["IMG_0007.MOV", "IMG_0100.MOV"]
+        assert len(hashed) == 2
+        assert pipeline.unchanged_count == 19
+        assert store.counts() == {"analyzed": 21}
+
+    @pytest.mark.asyncio
+    async def test_failed_ingest_retried_on_next_run(self, tmp_path):
+        library = make_library(tmp_path / "lib", 3)
+        store = IngestionStore(tmp_path / "state.sqlite3")
+
+        await run_import(library, store, FakeIngester(failing={"IMG_0001.MOV"}))
+        row = store.load(str(library / "IMG_0001.MOV"))
+        assert row.status == MediaStatus.INGESTING and row.retry_count == 1
+
+        ingester = FakeIngester()
+        await run_import(library, store, ingester)
+
+        assert ingester.ingested == ["IMG_0001.MOV"]
+        assert store.counts() == {"analyzed": 3}
+
+    @pytest.mark.asyncio
+    async def test_duplicate_content_skipped(self, tmp_path):
+        library = make_library(tmp_path / "lib", 2)
+        (library / "IMG_0000 (1).MOV").write_bytes((library / "IMG_0000.MOV").read_bytes())
+        store = IngestionStore(tmp_path / "state.sqlite3")
+        ingester = FakeIngester()
+
+        await run_import(library, store, ingester)
+
+        assert len(ingester.ingested) == 2
+        assert store.counts() == {"analyzed": 2, "skipped": 1}
+
+    @pytest.mark.asyncio
+    async def test_copy_of_failed_original_imported_instead(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ingest, "MAX_RETRIES", 1)
+        library = make_library(tmp_path / "lib", 1)
+        copy = library / "IMG_0000 (1).MOV"
+        copy.write_bytes((library / "IMG_0000.MOV").read_bytes())
+        store = IngestionStore(tmp_path / "state.sqlite3")
+        ingester = FakeIngester()
+
+        # Whichever copy is fingerprinted first becomes the original, and fails
+        async def fail_first(media_file):
+            ingester.ingested.append(media_file.filename)
+            if len(ingester.ingested) == 1:
+                ingester._record_failure(media_file, RuntimeError("corrupt upload"))
+                return False
+            media_file.status = MediaStatus.INGESTED
+            return True
+
+        monkeypatch.setattr(ingester, "ingest_file", fail_first)
+
+        await run_import(library, store, ingester)
+
+        assert len(ingester.ingested) == 2
+        assert store.counts() == {"failed": 1, "analyzed": 1}
+
+    @pytest.mark.asyncio
+    async def test_skipped_copy_revisited_when_original_fails_later(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ingest, "MAX_RETRIES", 2)
+        library = make_library(tmp_path / "lib", 1)
+        original = library / "IMG_0000.MOV"
+        copy = library / "IMG_0000 (1).MOV"
+        copy.write_bytes(original.read_bytes())
+        store = IngestionStore(tmp_path / "state.sqlite3")
+        pipeline = IngestionPipeline(store, FakeIngester(failing={"IMG_0000.MOV"}), hash_workers=1)
+        scanned = sorted(scan_directory(library), key=lambda m: m.filename != "IMG_0000.MOV")
+
+        await pipeline.run(scanned)
+        assert store.load(str(copy)).status == MediaStatus.SKIPPED  # original still retryable
+
+        ingester = FakeIngester(failing={"IMG_0000.MOV"})
+        await IngestionPipeline(store, ingester).run(scanned)
+
+        assert store.load(str(original)).status == MediaStatus.FAILED
+        assert store.load(str(copy)).status == MediaStatus.ANALYZED
+        assert ingester.ingested == ["IMG_0000.MOV", "IMG_0000 (1).MOV"]
+
+    @pytest.mark.asyncio
+    async def test_one_of_two_copies_replaces_failed_original(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ingest, "MAX_RETRIES", 2)
+        library = make_library(tmp_path / "lib", 1)
+        original = library / "IMG_0000.MOV"
+        copies = [library / "IMG_0000 (1).MOV", library / "IMG_0000 (2).MOV"]
+        for copy in copies:
+            copy.write_bytes(original.read_bytes())
+        store = IngestionStore(tmp_path / "state.sqlite3")
+        scanned = sorted(scan_directory(library), key=lambda m: m.filename != "IMG_0000.MOV")
+        await IngestionPipeline(store, FakeIngester(failing={"IMG_0000.MOV"}), hash_workers=1).run(scanned)
+        assert [store.load(str(c)).duplicate_of for c in copies] == [str(original)] * 2
+
+        ingester = FakeIngester(failing={"IMG_0000.MOV"})
+        pipeline = IngestionPipeline(store, ingester, hash_workers=1)
+        await pipeline.run(scanned)
+
+        # The original fails for good during this run; one copy is imported
+        # in its place and the other becomes a duplicate of that copy
+        assert ingester.ingested == ["IMG_0000.MOV", "IMG_0000 (1).MOV"]
+        assert store.counts() == {"failed": 1, "analyzed": 1, "skipped": 1}
+        assert store.load(str(copies[1])).duplicate_of == str(copies[0])
+        assert pipeline.plan(scanned) == []
+
+    @pytest.mark.asyncio
+    async def test_copies_of_original_failed_in_earlier_run_planned_once(self, tmp_path):
+        library = make_library(tmp_path / "lib", 1)
+        original = library / "IMG_0000.MOV"
+        for name in ("b.MOV", "c.MOV"):
+            (library / name).write_bytes(original.read_bytes())
+        store = IngestionStore(tmp_path / "state.sqlite3")
+        scanned = sorted(scan_directory(library), key=lambda m: m.filename != "IMG_0000.MOV")
+        await IngestionPipeline(store, FakeIngester(), hash_workers=1).run(scanned)
+        failed = store.load(str(original))
+        failed.status = MediaStatus.FAILED
+        store.save(failed)
+
+        pipeline = IngestionPipeline(store, FakeIngester(), hash_workers=1)
+        planned = pipeline.plan(scanned)
+
+        assert sorted(m.filename for m in planned) == ["b.MOV", "c.MOV"]
+        assert all(m.status == MediaStatus.PENDING for m in planned)
+        await pipeline._process(planned)
+        statuses = {m.filename: store.load(m.path) for m in planned}
+        assert statuses["b.MOV"].status == MediaStatus.ANALYZED
+        assert (statuses["c.MOV"].status, statuses["c.MOV"].duplicate_of) == (MediaStatus.SKIPPED, statuses["b.MOV"].path)
+
+    @pytest.mark.asyncio
+    async def test_skipped_copy_gets_media_id_of_finished_original(self, tmp_path):
+        library = make_library(tmp_path / "lib", 1)
+        copy = library / "IMG_0000 (1).MOV"
+        copy.write_bytes((library / "IMG_0000.MOV").read_bytes())
+        store = IngestionStore(tmp_path / "state.sqlite3")
+
+        class WithIds(FakeIngester):
+            async def ingest_file(self, media_file):
+                media_file.media_id = f"media-{media_file.filename}"
+                return await super().ingest_file(media_file)
+
+        await run_import(library, store, WithIds())
+
+        skipped, = [m for m in (store.load(str(p)) for p in library.glob("*.MOV")) if m.status == MediaStatus.SKIPPED]
+        assert skipped.media_id == store.load(skipped.duplicate_of).media_id is not None
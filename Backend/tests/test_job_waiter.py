@@ -0,0 +1,222 @@
+"""
+Tests for the remote job waiter
+"""
+import asyncio
+import json
+import pytest
+
+from services import blotato_api, job_waiter
+from services.blotato_api import BlotatoAPI
+from services.job_waiter import (
+    DONE,
+    FAILED,
+    TIMEOUT,
+    JobPoll,
+    JobStateStore,
+    PollBudget,
+    RemoteJobWaiter,
+    handle_job_event,
+)
+
+FAST = PollBudget(initial_delay=0.001, base_interval=0.001, max_interval=0.01, timeout=5)
+
+
+def make_waiter(store=None, **budget):
+    budgets = {'test': PollBudget(**{**FAST.__dict__, **budget})}
+    return RemoteJobWaiter(store=store or JobStateStore(":memory:"), budgets=budgets)
+
+
+def finishes_after(polls_needed, counter=None):
+    """Poll function reporting DONE on the Nth call"""
+    calls = {'n': 0}
+
+    async def poll():
+        calls['n'] += 1
+        if counter is not None:
+            counter.append(1)
+        return JobPoll(DONE, result=calls['n']) if calls['n'] >= polls_needed else JobPoll()
+
+    poll.calls = calls
+    return poll
+
+
+class TestWaiting:
+    @pytest.mark.asyncio
+    async def test_multiplexes_many_jobs_on_one_dispatcher(self):
+        waiter = make_waiter(max_concurrent=50)
+
+        outcomes = await asyncio.gather(*(
+            waiter.wait('test', f"job-{i}", finishes_after(1 + i % 4)) for i in range(500)
+        ))
+
+        assert all(o.state == DONE for o in outcomes)
+        assert [o.result for o in outcomes[:4]] == [1, 2, 3, 4]
+        assert waiter.pending_count == 0
+        await waiter.close()
+
+    @pytest.mark.asyncio
+    async def test_callers_on_same_job_share_polls(self):
+        waiter = make_waiter()
+        polls = []
+        poll = finishes_after(3, polls)
+
+        first, second = await asyncio.gather(waiter.wait('test', 'shared', poll), waiter.wait('test', 'shared', poll))
+
+        assert first.state == second.state == DONE
+        assert len(polls) == 3
+        await waiter.close()
+
+    @pytest.mark.asyncio
+    async def test_deadline_enforced(self):
+        waiter = make_waiter()
+
+        async def never_done():
+            return JobPoll()
+
+        outcome = await asyncio.wait_for(waiter.wait('test', 'slow', never_done, timeout=0.05), 2)
+
+        assert outcome.state == TIMEOUT
+        await waiter.close()
+
+    @pytest.mark.asyncio
+    async def test_poll_errors_retry_then_fail(self):
+        waiter = make_waiter(max_errors=3)
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ConnectionError("reset")
+            return JobPoll(DONE)
+
+        async def broken():
+            raise ConnectionError("down")
+
+        assert (await waiter.wait('test', 'flaky', flaky)).state == DONE
+        outcome = await waiter.wait('test', 'broken', broken)
+        assert outcome.state == FAILED
+        assert "down" in outcome.error
+        await waiter.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_polls_bounded_per_provider(self):
+        waiter = make_waiter(max_concurrent=2)
+        in_flight = peak = 0
+
+        async def slow_poll():
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.005)
+            in_flight -= 1
+            return JobPoll(DONE)
+
+        await asyncio.gather(*(waiter.wait('test', f"j{i}", slow_poll) for i in range(10)))
+
+        assert peak == 2
+        await waiter.close()
+
+
+class TestBackoff:
+    def test_interval_grows_to_cap_with_jitter(self, monkeypatch):
+        monkeypatch.setattr(job_waiter.random, "uniform", lambda a, b: b)
+        waiter = make_waiter(base_interval=1, factor=2, max_interval=5)
+        job = job_waiter._PendingJob('test', 'x', None, waiter.budgets['test'], interval=1, deadline=0)
+
+        intervals = []
+        for attempts in range(5):
+            job.attempts = attempts
+            intervals.append(waiter._next_interval(job))
+
+        assert intervals == pytest.approx([1.2, 2.4, 4.8, 6.0, 6.0])
+
+
+class TestEvents:
+    @pytest.mark.asyncio
+    async def test_event_triggers_immediate_poll(self):
+        waiter = make_waiter(initial_delay=30, base_interval=30, max_interval=30)
+        job_waiter._waiters[asyncio.get_running_loop()] = waiter
+        poll = finishes_after(1)
+
+        task = asyncio.create_task(waiter.wait('test', 'hooked', poll))
+        await asyncio.sleep(0.01)
+        assert poll.calls['n'] == 0
+
+        handle_job_event(json.dumps({'provider': 'test', 'job_id': 'hooked'}))
+        outcome = await asyncio.wait_for(task, 1)
+
+        assert outcome.state == DONE
+        del job_waiter._waiters[asyncio.get_running_loop()]
+        await waiter.close()
+
+    def test_malformed_event_ignored(self):
+        handle_job_event("not json")
+        handle_job_event(json.dumps({'provider': 'test'}))
+
+
+class TestRestart:
+    @pytest.mark.asyncio
+    async def test_resumed_wait_keeps_deadline_and_attempts(self, tmp_path):
+        path = tmp_path / "waiter.sqlite3"
+        first = make_waiter(JobStateStore(path), timeout=60)
+
+        async def pending():
+            return JobPoll()
+
+        task = asyncio.create_task(first.wait('test', 'render-1', pending))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await first.close()
+        saved = JobStateStore(path).load('test', 'render-1')
+        assert saved['state'] == 'pending' and saved['attempts'] > 0
+
+        # "Restarted" process: new waiter and store on the same file
+        second = make_waiter(JobStateStore(path), timeout=60)
+        poll = finishes_after(1)
+        outcome = await second.wait('test', 'render-1', poll)
+        await second.close()
+
+        restored = JobStateStore(path).load('test', 'render-1')
+        assert outcome.state == DONE
+        assert restored['deadline'] == saved['deadline']
+        assert restored['attempts'] == saved['attempts']
+        assert restored['state'] == DONE
+
+
+class TestBlotatoWait:
+    @pytest.mark.asyncio
+    async def test_wait_for_video_uses_waiter(self, monkeypatch):
+        waiter = RemoteJobWaiter(store=JobStateStore(":memory:"), budgets={'blotato': FAST})
+        monkeypatch.setattr(blotato_api, "get_job_waiter", lambda: waiter)
+        statuses = iter([
+            {"item": {"status": "Processing"}},
+            {"item": {"status": "Done", "mediaUrl": "https://cdn/video.mp4"}},
+        ])
+        client = BlotatoAPI(api_key="test")
+
+        async def get_video_status(video_id):
+            return next(statuses)
+
+        monkeypatch.setattr(client, "get_video_status", get_video_status)
+
+        result = await client.wait_for_video("vid-1", timeout_seconds=5, poll_interval=0.001)
+
+        assert result["item"]["mediaUrl"] == "https://cdn/video.mp4"
+        await waiter.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_video_raises(self, monkeypatch):
+        waiter = RemoteJobWaiter(store=JobStateStore(":memory:"), budgets={'blotato': FAST})
+        monkeypatch.setattr(blotato_api, "get_job_waiter", lambda: waiter)
+        client = BlotatoAPI(api_key="test")
+
+        async def get_video_status(video_id):
+            return {"item": {"status": "Failed"}}
+
+        monkeypatch.setattr(client, "get_video_status", get_video_status)
+
+        with pytest.raises(Exception, match="Video creation failed"):
+            await client.wait_for_video("vid-2", timeout_seconds=5, poll_interval=0.001)
+        await waiter.close()
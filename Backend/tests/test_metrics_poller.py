@@ -0,0 +1,157 @@
+"""
+Tests for the parallel metrics polling engine
+"""
+import asyncio
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+from connectors.base import PlatformMetricSnapshot, SourceAdapter
+from services.content_metrics import ContentMetricsService, METRICS_INSERT_CHUNK
+from services.metrics_poller import MetricsPoller
+
+
+class FakeAdapter(SourceAdapter):
+    """Adapter that records calls and in-flight concurrency"""
+
+    def __init__(self, platforms, batch_size=1, latency=0.0, fail_platform=None):
+        self.platforms = platforms
+        self.metrics_batch_size = batch_size
+        self.latency = latency
+        self.fail_platform = fail_platform
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def id(self):
+        return "fake"
+
+    def is_enabled(self):
+        return True
+
+    def list_supported_platforms(self):
+        return self.platforms
+
+    async def fetch_metrics_for_variant(self, variant):
+        return await self.fetch_metrics_for_variants([variant])
+
+    async def fetch_metrics_for_variants(self, variants):
+        self.calls.append(len(variants))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if variants[0].platform == self.fail_platform:
+                raise RuntimeError("rate limited")
+            return [
+                PlatformMetricSnapshot(
+                    platform=v.platform, platform_post_id=v.platform_post_id,
+                    snapshot_at=datetime.utcnow(), views=100, likes=10, reach=80
+                )
+                for v in variants
+            ]
+        finally:
+            self.in_flight -= 1
+
+
+def make_registry(adapter):
+    registry = MagicMock()
+    registry.get_adapters_for_platform.side_effect = (
+        lambda platform: [adapter] if platform in adapter.platforms else []
+    )
+    return registry
+
+
+def make_variants(count, platform="instagram", content_id=None, published=True):
+    return [
+        SimpleNamespace(
+            id=uuid4(), content_id=content_id or uuid4(), platform=platform,
+            platform_post_id=f"{platform}_{i}" if published else None, is_paid=i % 5 == 0
+        )
+        for i in range(count)
+    ]
+
+
+class TestMetricsPoller:
+    @pytest.mark.asyncio
+    async def test_batches_by_adapter_batch_size(self):
+        adapter = FakeAdapter(["youtube"], batch_size=50)
+        poller = MetricsPoller(make_registry(adapter))
+
+        rows = await poller.fetch(make_variants(120, "youtube"))
+
+        assert sorted(adapter.calls) == [20, 50, 50]
+        assert len(rows) == 120
+        assert rows[0]["reach"] == 80
+
+    @pytest.mark.asyncio
+    async def test_per_platform_concurrency_limit(self):
+        adapter = FakeAdapter(["tiktok"], latency=0.01)
+        poller = MetricsPoller(make_registry(adapter), platform_concurrency={"tiktok": 3})
+
+        await poller.fetch(make_variants(20, "tiktok"))
+
+        assert adapter.max_in_flight == 3
+        assert poller.stats["requests"] == 20
+
+    @pytest.mark.asyncio
+    async def test_failing_platform_does_not_block_others(self):
+        adapter = FakeAdapter(["instagram", "facebook"], fail_platform="facebook")
+        poller = MetricsPoller(make_registry(adapter))
+
+        rows = await poller.fetch(make_variants(3, "instagram") + make_variants(2, "facebook"))
+
+        assert len(rows) == 3
+        assert poller.stats["errors"] == 2
+
+    @pytest.mark.asyncio
+    async def test_skips_unpublished_and_unsupported(self):
+        adapter = FakeAdapter(["instagram"])
+        poller = MetricsPoller(make_registry(adapter))
+
+        rows = await poller.fetch(make_variants(2, published=False) + make_variants(2, "pinterest"))
+
+        assert rows == []
+        assert adapter.calls == []
+
+    @pytest.mark.asyncio
+    async def test_row_shape(self):
+        adapter = FakeAdapter(["instagram"])
+        variant = make_variants(1)[0]
+
+        rows = await MetricsPoller(make_registry(adapter)).fetch([variant])
+
+        assert rows[0]["variant_id"] == variant.id
+        assert rows[0]["traffic_type"] == "paid"
+        assert rows[0]["views"] == 100
+
+
+class TestPollAllRecentContent:
+    @pytest.mark.asyncio
+    async def test_bulk_insert_and_one_rollup_per_content(self):
+        contents = [uuid4() for _ in range(3)]
+        variants = [v for cid in contents for v in make_variants(900, "youtube", content_id=cid)]
+        adapter = FakeAdapter(["youtube"], batch_size=50)
+
+        db = MagicMock()
+        scalars = MagicMock()
+        scalars.scalars.return_value.all.return_value = variants
+        db.execute = AsyncMock(return_value=scalars)
+        db.commit = AsyncMock()
+        db.begin_nested = MagicMock(return_value=AsyncMock())
+
+        service = ContentMetricsService(db, poller=MetricsPoller(make_registry(adapter)))
+        with patch.object(service, "recompute_rollup", AsyncMock(return_value=MagicMock())) as rollup:
+            stats = await service.poll_all_recent_content(hours=48)
+
+        inserts = [c for c in db.execute.call_args_list if len(c.args) == 2]
+        assert [len(c.args[1]) for c in inserts] == [METRICS_INSERT_CHUNK, METRICS_INSERT_CHUNK, 700]
+        assert sorted(c.args[0] for c in rollup.call_args_list) == sorted(contents)
+        assert all(c.kwargs == {"commit": False} for c in rollup.call_args_list)
+        assert db.commit.await_count == 2
+        assert stats["metrics_collected"] == 2700
+        assert stats["rollups_updated"] == 3
+        assert stats["adapter_requests"] == 54
@@ -0,0 +1,133 @@
+"""
+Tests for the precomputed engagement surface behind optimal posting times
+"""
+import random
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.optimal_timing import DayOfWeek, EngagementSurface, OptimalTimingService
+
+START = datetime(2026, 10, 14, 10, 30)  # a Wednesday
+
+
+def reference_score(service, history, platform, hour, day):
+    """The previous per-request computation: filter history and average"""
+    base = service.DEFAULT_PATTERNS.get(platform, {}).get(hour, 50)
+    if day in (DayOfWeek.SATURDAY, DayOfWeek.SUNDAY):
+        base *= service.WEEKEND_MODIFIERS.get(platform, 1.0)
+    matching = [e for posted_at, e in history if posted_at.hour == hour and posted_at.weekday() == day]
+    if matching:
+        base = statistics.mean(matching) * 0.7 + base * 0.3
+    return min(100, max(0, base))
+
+
+def reference_times(service, history, platform, start, num_slots, min_gap_hours):
+    slots = []
+    for day_offset in range(7):
+        check_date = start + timedelta(days=day_offset)
+        for hour in range(24):
+            slot_time = check_date.replace(hour=hour, minute=0, second=0, microsecond=0)
+            if slot_time > start:
+                slots.append((slot_time, reference_score(service, history, platform, hour, DayOfWeek(check_date.weekday()))))
+    slots.sort(key=lambda x: x[1], reverse=True)
+    selected = []
+    for slot_time, score in slots:
+        if all(abs((slot_time - s).total_seconds() / 3600) >= min_gap_hours for s, _ in selected):
+            selected.append((slot_time, score))
+            if len(selected) >= num_slots:
+                break
+    return selected
+
+
+def random_history(service, platform, count, seed=7, account_id=None):
+    rng = random.Random(seed)
+    history = []
+    for _ in range(count):
+        posted_at = START - timedelta(hours=rng.randrange(1, 24 * 90))
+        views, likes = rng.randrange(100, 5000), rng.randrange(0, 400)
+        service.add_historical_data(platform, posted_at, views, likes, account_id=account_id)
+        history.append((posted_at, service._calculate_engagement(views, likes)))
+    return history
+
+
+class TestScores:
+    @pytest.mark.parametrize("platform", ["instagram", "linkedin", "youtube", "mastodon"])
+    def test_matches_per_slot_computation_without_decay(self, platform):
+        service = OptimalTimingService(half_life_days=None)
+        history = random_history(service, platform, 300)
+
+        for day in DayOfWeek:
+            for hour in range(24):
+                assert service.get_platform_score(platform, hour, day) == pytest.approx(
+                    reference_score(service, history, platform, hour, day))
+
+    @pytest.mark.parametrize("num_slots,min_gap_hours", [(5, 4), (10, 0), (3, 12), (200, 6)])
+    def test_selection_matches_greedy_spacing(self, num_slots, min_gap_hours):
+        service = OptimalTimingService(half_life_days=None)
+        history = random_history(service, "tiktok", 150)
+
+        expected = reference_times(service, history, "tiktok", START, num_slots, min_gap_hours)
+        actual = service.get_optimal_times("TikTok", START, num_slots, min_gap_hours)
+
+        assert [(r.datetime, pytest.approx(r.expected_engagement)) for r in actual] == expected
+        assert all(r.datetime > START for r in actual)
+
+    def test_recent_posts_outweigh_old_ones(self):
+        service = OptimalTimingService(half_life_days=7)
+        slot = START.replace(hour=13) - timedelta(days=7)  # same weekday and hour
+        for weeks in range(8, 12):
+            service.add_historical_data("twitter", slot - timedelta(weeks=weeks), views=100, likes=10)  # 100
+        service.add_historical_data("twitter", slot, views=1000, likes=1)  # 1
+
+        mean = service.surfaces[("twitter", None)].means()[START.weekday(), 13]
+
+        # Unweighted mean would be ~80; the recent post dominates after 8+ half-lives
+        assert mean < 5
+
+    def test_landmark_rebase_keeps_means(self):
+        surface = EngagementSurface(half_life_days=1)
+        surface.add(datetime(2020, 1, 6, 9), 40.0)
+        surface.add(datetime(2026, 1, 5, 9), 80.0)  # ~2000 half-lives later
+
+        assert surface.means()[0, 9] == pytest.approx(80.0)
+        assert surface.landmark == datetime(2026, 1, 5, 9).timestamp()
+
+
+class TestAccounts:
+    def test_account_surface_with_platform_fallback(self):
+        service = OptimalTimingService()
+        posted_at = START - timedelta(days=7)
+        for _ in range(10):
+            service.add_historical_data("instagram", posted_at.replace(hour=3), 100, 10, account_id="night-owl")
+
+        night_owl = service.score_matrix("instagram", account_id="night-owl")
+        unknown = service.score_matrix("instagram", account_id="someone-else")
+
+        # 70% of the account's 100 engagement, 30% of Instagram's 3am default of 10
+        assert night_owl[posted_at.weekday(), 3] == pytest.approx(73.0)
+        assert (unknown == service.score_matrix("instagram")).all()
+        assert service.surfaces[("instagram", None)].samples == 10
+
+    def test_score_matrix_cached_until_new_data(self):
+        service = OptimalTimingService()
+        random_history(service, "youtube", 20)
+        first = service.score_matrix("youtube")
+
+        assert service.score_matrix("youtube") is first
+        service.add_historical_data("youtube", START - timedelta(hours=5), 100, 50)
+        assert service.score_matrix("youtube") is not first
+
+    def test_confidence_drops_as_history_ages(self):
+        fresh, stale = OptimalTimingService(half_life_days=14), OptimalTimingService(half_life_days=14)
+        for i in range(30):
+            fresh.add_historical_data("tiktok", START - timedelta(days=1, hours=i), 100, 5)
+            stale.add_historical_data("tiktok", START - timedelta(days=120, hours=i), 100, 5)
+
+        assert fresh.surfaces[("tiktok", None)].effective_samples(START) > 20
+        assert stale.surfaces[("tiktok", None)].effective_samples(START) < 5
+        for rec in fresh.get_optimal_times("tiktok", START, num_slots=10):
+            assert rec.confidence == pytest.approx(min(0.95, rec.expected_engagement / 100 * 1.2))
+        for rec in stale.get_optimal_times("tiktok", START, num_slots=10):
+            assert rec.confidence == pytest.approx(rec.expected_engagement / 100)
@@ -0,0 +1,266 @@
+"""
+Tests for the batch person_insights recompute engine
+"""
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from services.intelligence.person_recompute import (
+    PersonRecomputeEngine,
+    compute_insights_batch,
+    compute_lens_batch,
+    recompute_engagement_scores,
+)
+from services.intelligence.person_insights import PersonInsightsService
+from services.person_lens import PersonLensComputer
+
+
+EXCERPTS = [
+    'I love AI automation! This is so technical and cool.',
+    'Great tutorial on API integration!',
+    None,
+    'Nice system design walkthrough, covering queues and caching in a lot of depth. Thanks for sharing this.',
+    'lol this automation is wild',
+]
+CHANNELS = ['instagram', 'facebook', 'email', 'tiktok']
+LENS_TYPES = ['commented', 'liked', 'shared', 'saved', 'viewed', 'clicked_link']
+INSIGHT_TYPES = ['comment', 'dm_reply', 'click', 'save', 'like', 'open']
+
+
+def make_events(num_people, event_types, now, per_person=6, naive=False):
+    """Events for several people, newest first per person, with varied ages"""
+    rows = []
+    for p in range(num_people):
+        person_id = str(uuid4())
+        for e in range(per_person + p % 4):
+            occurred = now - timedelta(days=(p * 5 + e * 7) % 85, hours=2)
+            rows.append({
+                'person_id': person_id,
+                'channel': CHANNELS[(p + e) % len(CHANNELS)],
+                'event_type': event_types[(p * 3 + e) % len(event_types)],
+                'occurred_at': occurred.replace(tzinfo=None) if naive else occurred,
+                'content_excerpt': EXCERPTS[(p + e) % len(EXCERPTS)],
+            })
+    rows.sort(key=lambda r: (r['person_id'], r['occurred_at']), reverse=True)
+    return rows
+
+
+def by_person(rows):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row['person_id'], []).append(row)
+    return grouped
+
+
+class TestVectorizedScoring:
+    @pytest.mark.asyncio
+    async def test_lens_matches_per_person_computer(self):
+        now = datetime.now(timezone.utc)
+        rows = make_events(12, LENS_TYPES, now, naive=True)
+        computer = PersonLensComputer(db=None)
+
+        batch = {r['person_id']: r for r in compute_lens_batch(rows, now)}
+
+        assert len(batch) == 12
+        for person_id, events in by_person(rows).items():
+            events = [SimpleNamespace(**e) for e in events]
+            result = batch[person_id]
+            assert result['warmth_score'] == await computer._calculate_warmth_score(events)
+            assert result['activity_state'] == await computer._determine_activity_state(events)
+            assert result['channel_preferences'] == pytest.approx(await computer._compute_channel_preferences(events))
+            assert result['interests'] == await computer._extract_interests(events)
+            assert result['tone_preferences'] == pytest.approx(await computer._analyze_tone(events))
+
+    def test_insights_match_per_person_service(self):
+        now = datetime.now().astimezone()
+        rows = make_events(12, INSIGHT_TYPES, now)
+        service = PersonInsightsService()
+
+        batch = {r['person_id']: r for r in compute_insights_batch(rows, now)}
+
+        for person_id, events in by_person(rows).items():
+            result = batch[person_id]
+            assert result['warmth_score'] == pytest.approx(service._calculate_warmth_score(events))
+            assert result['activity_state'] == service._determine_activity_state(events)
+            assert result['channel_preferences'] == service._calculate_channel_preferences(events)
+
+    def test_rows_need_not_be_grouped(self):
+        now = datetime.now(timezone.utc)
+        rows = make_events(5, LENS_TYPES, now)
+        shuffled = rows[::2] + rows[1::2]
+
+        grouped = {r['person_id']: r for r in compute_lens_batch(rows, now)}
+        ungrouped = {r['person_id']: r for r in compute_lens_batch(shuffled, now)}
+
+        for person_id, result in grouped.items():
+            assert ungrouped[person_id]['warmth_score'] == result['warmth_score']
+            assert ungrouped[person_id]['last_active_at'] == result['last_active_at']
+
+    def test_empty_batch(self):
+        assert compute_lens_batch([]) == []
+        assert compute_insights_batch([]) == []
+
+
+class FakeSession:
+    """Async session that answers the engine's queries from canned data"""
+
+    def __init__(self, person_ids, events, watermark=0, high_water=500):
+        self.person_ids = person_ids
+        self.events = events
+        self.watermark = watermark
+        self.high_water = high_water
+        self.statements = []
+        self.upserts = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        result = MagicMock()
+        if 'MAX(id)' in sql:
+            result.scalar.return_value = self.high_water
+        elif 'SELECT last_id FROM recompute_watermarks' in sql:
+            result.scalar.return_value = self.watermark
+        elif 'SELECT DISTINCT e.person_id' in sql:
+            result.fetchall.return_value = [(pid,) for pid in self.person_ids]
+        elif 'FROM person_events' in sql:
+            ids = set(params['ids'])
+            result.__iter__.return_value = iter([
+                SimpleNamespace(_mapping=e) for e in self.events if e['person_id'] in ids
+            ])
+        elif 'INSERT INTO person_insights' in sql:
+            self.upserts.append(json.loads(params['rows']))
+        return result
+
+    async def commit(self):
+        self.commits += 1
+
+
+class TestPersonRecomputeEngine:
+    @pytest.mark.asyncio
+    async def test_full_run_chunks_and_bulk_upserts(self):
+        rows = make_events(25, LENS_TYPES, datetime.now(timezone.utc))
+        people = sorted(by_person(rows))
+        session = FakeSession(people, rows)
+
+        stats = await PersonRecomputeEngine(session, scorer='lens', chunk_size=10).run()
+
+        assert stats == {'people': 25, 'events': len(rows), 'chunks': 3}
+        assert [len(batch) for batch in session.upserts] == [10, 10, 5]
+        event_queries = [p for sql, p in session.statements if 'FROM person_events' in sql and 'ids' in (p or {})]
+        assert len(event_queries) == 3
+        watermark = [p for sql, p in session.statements if 'INSERT INTO recompute_watermarks' in sql]
+        assert watermark == [{'name': 'person_lens', 'last_id': 500}]
+
+    @pytest.mark.asyncio
+    async def test_incremental_reads_watermark(self):
+        rows = make_events(3, INSIGHT_TYPES, datetime.now(timezone.utc))
+        session = FakeSession(sorted(by_person(rows)), rows, watermark=420)
+
+        stats = await PersonRecomputeEngine(session, scorer='insights', rescan_ids=100).run(incremental=True)
+
+        # Ids 321-420 are re-scanned in case they committed after the last run
+        selection = next(p for sql, p in session.statements if 'UNION' in sql)
+        assert selection['last_id'] == 320
+        assert selection['high_water'] == 500
+        assert stats['people'] == 3
+
+    @pytest.mark.asyncio
+    async def test_explicit_people_skip_watermark(self):
+        rows = make_events(2, LENS_TYPES, datetime.now(timezone.utc))
+        session = FakeSession([], rows)
+
+        await PersonRecomputeEngine(session).run(person_ids=sorted(by_person(rows)))
+
+        assert not any('recompute_watermarks' in sql for sql, _ in session.statements)
+        assert len(session.upserts[0]) == 2
+
+    @pytest.mark.asyncio
+    async def test_workspace_run_keeps_global_watermark(self):
+        rows = make_events(2, LENS_TYPES, datetime.now(timezone.utc))
+        session = FakeSession(sorted(by_person(rows)), rows)
+
+        await PersonRecomputeEngine(session).run(workspace_id=str(uuid4()))
+
+        assert not any('INSERT INTO recompute_watermarks' in sql for sql, _ in session.statements)
+
+    @pytest.mark.asyncio
+    async def test_people_without_window_events_are_marked_dormant(self):
+        now = datetime.now(timezone.utc)
+        rows = make_events(2, LENS_TYPES, now)
+        lapsed = str(uuid4())
+        session = FakeSession(sorted(by_person(rows)) + [lapsed], rows)
+
+        stats = await PersonRecomputeEngine(session).run(incremental=True)
+
+        assert stats['people'] == 2
+        dormant = [p for sql, p in session.statements if "activity_state = 'dormant'" in sql]
+        assert dormant == [{'ids': [lapsed]}]
+
+    def test_unknown_scorer(self):
+        with pytest.raises(ValueError):
+            PersonRecomputeEngine(MagicMock(), scorer='nope')
+
+
+class EngagementSession:
+    """Async session answering the follower engagement queries"""
+
+    def __init__(self, follower_ids, watermark=0):
+        self.follower_ids = follower_ids
+        self.watermark = watermark
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        result = MagicMock()
+        if 'MAX(id)' in sql:
+            result.scalar.return_value = 900
+        elif 'SELECT last_id' in sql:
+            result.scalar.return_value = self.watermark
+        elif 'SELECT DISTINCT follower_id' in sql:
+            result.scalars.return_value.all.return_value = self.follower_ids
+        return result
+
+    async def commit(self):
+        self.commits += 1
+
+
+class TestFollowerEngagementScores:
+    @pytest.mark.asyncio
+    async def test_full_update_runs_in_chunks(self):
+        session = EngagementSession([uuid4() for _ in range(12)])
+
+        updated = await recompute_engagement_scores(session, chunk_size=5)
+
+        assert updated == 12
+        upserts = [p for sql, p in session.statements if 'INSERT INTO follower_engagement_scores' in sql]
+        assert [len(p['ids']) for p in upserts] == [5, 5, 2]
+        assert all(isinstance(i, str) for i in upserts[0]['ids'])
+        watermark = [p for sql, p in session.statements if 'INSERT INTO recompute_watermarks' in sql]
+        assert watermark == [{'name': 'follower_engagement', 'last_id': 900}]
+        assert session.commits == 4
+
+    @pytest.mark.asyncio
+    async def test_incremental_update_rescans_below_watermark(self):
+        session = EngagementSession([str(uuid4())], watermark=850)
+
+        await recompute_engagement_scores(session, incremental=True, rescan_ids=50)
+
+        selection = next(p for sql, p in session.statements if 'SELECT DISTINCT follower_id' in sql)
+        assert selection == {'last_id': 800, 'high_water': 900}
+
+    @pytest.mark.asyncio
+    async def test_single_follower(self):
+        session = EngagementSession([])
+
+        assert await recompute_engagement_scores(session, follower_id='abc') == 1
+
+        sql, params = session.statements[0]
+        assert 'follower_id = :follower_id' in sql
+        assert 'GROUP BY follower_id' in sql
+        assert params == {'follower_id': 'abc'}
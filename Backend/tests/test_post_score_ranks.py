@@ -0,0 +1,173 @@
+"""
+Tests for precomputed post score percentile ranks
+"""
+import random
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from services.post_score_ranks import PercentileRankCache, ScoreDistribution
+from services import post_score_ranks
+from services.post_social_score import (
+    PostSocialScoreCalculator,
+    LATEST_ANALYTICS_SQL,
+    STORE_SCORES_SQL,
+)
+
+
+def brute_force(scores, post_id, score):
+    """The old COUNT(*) FILTER query, with the post counted at its new score"""
+    others = [s for pid, s in scores.items() if pid != post_id] + [score]
+    return len(others), sum(s < score for s in others), sum(s == score for s in others)
+
+
+class TestScoreDistribution:
+    def test_rank_matches_brute_force(self):
+        rng = random.Random(7)
+        scores = {pid: round(rng.uniform(0, 100), 1) for pid in range(500)}
+        distribution = ScoreDistribution(scores)
+
+        for post_id in list(range(0, 500, 37)) + [9999]:
+            score = round(rng.uniform(0, 100), 1)
+            assert distribution.rank(score, post_id) == brute_force(scores, post_id, score)
+
+        # Ties with the post's own stored score
+        assert distribution.rank(scores[3], 3) == brute_force(scores, 3, scores[3])
+
+    def test_update_replaces_previous_score(self):
+        distribution = ScoreDistribution({1: 10.0, 2: 20.0, 3: 30.0})
+
+        distribution.update(1, 40.0)
+        distribution.update(4, 5.0)
+
+        assert distribution.sorted_scores == [5.0, 20.0, 30.0, 40.0]
+        assert distribution.rank(40.0, 1) == (4, 3, 1)
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        for marker, rows in self.responses.items():
+            if marker in sql:
+                result = MagicMock()
+                result.__iter__.return_value = iter(rows)
+                result.fetchall.return_value = rows
+                result.scalar.return_value = rows[0] if rows else None
+                return result
+        return MagicMock()
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture(autouse=True)
+def fresh_rank_cache(monkeypatch):
+    monkeypatch.setattr(post_score_ranks, "_rank_cache", PercentileRankCache())
+
+
+class TestPercentileRank:
+    @pytest.mark.asyncio
+    async def test_lookups_reuse_cached_distribution(self):
+        stored = [SimpleNamespace(post_id=i, score=float(i)) for i in range(1, 101)]
+        session = FakeSession({"FROM post_score_latest": stored})
+        calculator = PostSocialScoreCalculator(session)
+
+        top = await calculator._calculate_percentile_rank(session, 100, "instagram", "reel", 99.5, account_id=1)
+        bottom = await calculator._calculate_percentile_rank(session, 1, "instagram", "reel", 0.5, account_id=1)
+
+        assert len(session.statements) == 1
+        assert top["rank"] == 1
+        assert top["description"] == "Top 10% of your reels"
+        assert bottom["rank"] == 100
+        assert bottom["description"] == "Bottom 50% of your reels"
+
+    @pytest.mark.asyncio
+    async def test_no_other_posts(self):
+        session = FakeSession({"FROM post_score_latest": []})
+
+        rank = await PostSocialScoreCalculator()._calculate_percentile_rank(session, 5, "tiktok", "video", 50, account_id=2)
+
+        assert rank["description"] == "No comparison data"
+
+    @pytest.mark.asyncio
+    async def test_account_looked_up_when_missing(self):
+        session = FakeSession({"SELECT account_id": [7], "FROM post_score_latest": []})
+
+        await PostSocialScoreCalculator()._calculate_percentile_rank(session, 5, "tiktok", "video", 50)
+
+        assert session.statements[1][1]["account_id"] == 7
+
+
+class TestScoreAccountPosts:
+    def _session(self, num_posts):
+        posted_at = datetime.now() - timedelta(hours=30)
+        posts = [
+            SimpleNamespace(id=i, platform="instagram", media_type="reel", posted_at=posted_at, followers_count=10000)
+            for i in range(num_posts)
+        ]
+        analytics = [
+            SimpleNamespace(id=1000 + i, post_id=i, views_count=500 * (i + 1), likes_count=20 * (i + 1),
+                            comments_count=i, shares_count=i // 2, saves_count=i // 3)
+            for i in range(num_posts)
+        ]
+        stored = [SimpleNamespace(post_id=i, platform="instagram", media_type="reel", score=1.0) for i in range(num_posts)]
+        return FakeSession({
+            "FROM social_media_posts smp": posts,
+            "FROM social_media_post_analytics": analytics,
+            "FROM post_score_latest": stored,
+        })
+
+    @pytest.mark.asyncio
+    async def test_constant_queries_for_whole_account(self):
+        session = self._session(200)
+
+        scored = await PostSocialScoreCalculator().score_account_posts(session, account_id=1)
+
+        assert len(scored) == 200
+        assert len(session.statements) == 3
+        assert session.statements[1][0] == LATEST_ANALYTICS_SQL
+        assert session.statements[1][1]["post_ids"] == list(range(200))
+
+        # Ranked against each other's new scores, not the stale stored ones
+        best = max(scored, key=lambda s: s["post_social_score"])
+        ties = sum(s["post_social_score"] == best["post_social_score"] for s in scored)
+        assert best["percentile_rank"]["rank"] == ties < 200
+        assert all(s["percentile_rank"]["total_posts"] == 200 for s in scored)
+        assert "snapshot_id" not in best
+
+    @pytest.mark.asyncio
+    async def test_store_writes_latest_snapshots_in_one_statement(self):
+        session = self._session(5)
+
+        scored = await PostSocialScoreCalculator().score_account_posts(session, account_id=1, store=True)
+
+        sql, params = session.statements[-1]
+        assert sql == STORE_SCORES_SQL
+        assert params["snapshot_ids"] == [1000, 1001, 1002, 1003, 1004]
+        assert params["scores"] == [s["post_social_score"] for s in scored]
+        assert session.commits == 1
+
+        cached = post_score_ranks.get_rank_cache()._fresh((1, "instagram", "reel"))
+        assert cached.by_post == {s["post_id"]: s["post_social_score"] for s in scored}
+
+    @pytest.mark.asyncio
+    async def test_matches_single_post_scoring(self):
+        session = self._session(3)
+        calculator = PostSocialScoreCalculator()
+
+        scored = await calculator.score_account_posts(session, account_id=1)
+
+        row = session.responses["FROM social_media_post_analytics"][2]
+        post = session.responses["FROM social_media_posts smp"][2]
+        single = calculator.score_metrics("instagram", "reel", 10000, post.posted_at, {
+            "views": row.views_count, "likes": row.likes_count, "comments": row.comments_count,
+            "shares": row.shares_count, "saves": row.saves_count,
+        })
+        assert scored[2]["post_social_score"] == single["post_social_score"]
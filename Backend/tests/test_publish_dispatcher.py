@@ -0,0 +1,363 @@
+"""
+Tests for the concurrency-safe scheduled post dispatcher
+"""
+import asyncio
+import time
+import pytest
+from collections import defaultdict
+from unittest.mock import Mock, AsyncMock, MagicMock
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import services.publish_dispatcher as publish_dispatcher
+import services.publisher_service as publisher_service
+from services.publish_dispatcher import PublishDispatcher
+from services.publisher_service import (
+    PublisherService,
+    CLAIM_DUE_POSTS_SQL,
+    CLAIM_RETRY_POSTS_SQL,
+    RELEASE_STALE_CLAIMS_SQL,
+)
+
+SCHEDULED_POSTS = """
+CREATE TABLE scheduled_posts (
+    id TEXT PRIMARY KEY, status TEXT, claim_token TEXT, publish_started_at TEXT, heartbeat_at TEXT,
+    retry_count INTEGER DEFAULT 0, next_retry_at TEXT, last_error TEXT, published_at TEXT,
+    platform_post_id TEXT, platform_url TEXT, updated_at TEXT
+)
+"""
+
+
+def rows(count, platform="tiktok", accounts=1):
+    return [
+        {"id": uuid4(), "platform": platform, "platform_account_id": f"acct-{i % accounts}"}
+        for i in range(count)
+    ]
+
+
+class ConcurrencyProbe:
+    """Fake publish function that records peak in-flight counts"""
+
+    def __init__(self, delay=0.001, routing=None):
+        self.delay = delay
+        self.routing = routing or {}
+        self.in_flight = 0
+        self.peak = 0
+        self.per_key = defaultdict(int)
+        self.peak_per_key = defaultdict(int)
+        self.published = []
+
+    async def __call__(self, post_id, claim_token=None):
+        key = self.routing.get(post_id)
+        self.in_flight += 1
+        self.per_key[key] += 1
+        self.peak = max(self.peak, self.in_flight)
+        self.peak_per_key[key] = max(self.peak_per_key[key], self.per_key[key])
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        self.per_key[key] -= 1
+        self.published.append(post_id)
+        return Mock(success=True)
+
+
+class TestClaimSql:
+    """Claims must be atomic and skip rows locked by other dispatchers"""
+
+    @pytest.mark.parametrize("sql", [CLAIM_DUE_POSTS_SQL, CLAIM_RETRY_POSTS_SQL])
+    def test_claim_uses_skip_locked_update_returning(self, sql):
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "SET status = 'publishing'" in sql
+        assert "RETURNING id" in sql
+
+    @pytest.mark.asyncio
+    async def test_claim_commits_and_returns_rows(self):
+        db = AsyncMock()
+        db.add = MagicMock()
+        result = MagicMock()
+        claimed = rows(3)
+        result.mappings.return_value.all.return_value = claimed
+        db.execute.return_value = result
+
+        service = PublisherService(db)
+        returned = await service.claim_due_posts(limit=3)
+
+        assert [r["id"] for r in returned] == [r["id"] for r in claimed]
+        assert db.execute.call_args[0][1]["limit"] == 3
+        db.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_claim_failure_rolls_back(self):
+        db = AsyncMock()
+        db.execute.side_effect = Exception("connection reset")
+
+        returned = await PublisherService(db).claim_due_posts()
+
+        assert returned == []
+        db.rollback.assert_awaited_once()
+
+
+async def claimed_posts_db(tmp_path):
+    """SQLite scheduled_posts with one post claimed under token 'claim-1'"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'posts.sqlite3'}")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def now(dbapi_connection, _):
+        dbapi_connection.create_function("NOW", 0, lambda: datetime.now().isoformat())
+
+    async with engine.begin() as conn:
+        await conn.execute(text(SCHEDULED_POSTS))
+        await conn.execute(text(
+            "INSERT INTO scheduled_posts (id, status, claim_token) VALUES ('post-1', 'publishing', 'claim-1')"
+        ))
+    return engine
+
+
+async def post_row(engine):
+    async with engine.connect() as conn:
+        return (await conn.execute(text("SELECT * FROM scheduled_posts WHERE id = 'post-1'"))).mappings().one()
+
+
+class TestClaimTokens:
+    """Writes by a claim holder only land while the claim is still theirs"""
+
+    def test_claims_issue_tokens_and_release_uses_heartbeats(self):
+        for sql in (CLAIM_DUE_POSTS_SQL, CLAIM_RETRY_POSTS_SQL):
+            assert "claim_token = gen_random_uuid()" in sql and "publish_started_at = NULL" in sql
+        assert "COALESCE(heartbeat_at, updated_at)" in RELEASE_STALE_CLAIMS_SQL
+        assert "WHEN 'youtube' THEN 1800" in RELEASE_STALE_CLAIMS_SQL
+
+    @pytest.mark.asyncio
+    async def test_redelivered_claim_does_not_start_twice(self, tmp_path):
+        engine = await claimed_posts_db(tmp_path)
+        async with AsyncSession(engine) as db:
+            publisher = PublisherService(db)
+            assert await publisher.start_claimed_publish("post-1", "claim-1") is True
+            assert await publisher.start_claimed_publish("post-1", "claim-1") is False
+            assert await publisher.start_claimed_publish("post-1", "other-claim") is False
+
+        row = await post_row(engine)
+        assert row["publish_started_at"] is not None and row["heartbeat_at"] is not None
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_completion_requires_current_token(self, tmp_path):
+        engine = await claimed_posts_db(tmp_path)
+        async with AsyncSession(engine) as db:
+            publisher = PublisherService(db)
+            assert await publisher.complete_claimed_post("post-1", "stale-claim", "p-0") is False
+            assert (await post_row(engine))["status"] == "publishing"
+
+            assert await publisher.complete_claimed_post("post-1", "claim-1", "p-1", "https://x/p-1") is True
+
+        row = await post_row(engine)
+        assert (row["status"], row["platform_post_id"], row["platform_url"]) == ("published", "p-1", "https://x/p-1")
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_released_claim_can_still_complete_until_reclaimed(self, tmp_path):
+        engine = await claimed_posts_db(tmp_path)
+        async with engine.begin() as conn:
+            await conn.execute(text("UPDATE scheduled_posts SET status = 'failed'"))
+        async with AsyncSession(engine) as db:
+            assert await PublisherService(db).heartbeat_claim("post-1", "claim-1") is False
+            assert await PublisherService(db).complete_claimed_post("post-1", "claim-1", "p-1") is True
+
+        assert (await post_row(engine))["status"] == "published"
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_failure_recorded_only_under_current_claim(self, tmp_path):
+        engine = await claimed_posts_db(tmp_path)
+        async with AsyncSession(engine) as db:
+            publisher = PublisherService(db)
+            await publisher.handle_publish_failure("post-1", "stale worker", claim_token="stale-claim")
+            assert (await post_row(engine))["retry_count"] == 0
+
+            await publisher.handle_publish_failure("post-1", "upload rejected", claim_token="claim-1")
+
+        row = await post_row(engine)
+        assert (row["status"], row["retry_count"], row["last_error"]) == ("failed", 1, "upload rejected")
+        assert row["next_retry_at"] is not None
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_release_spends_retries_and_holds_started_posts(self, tmp_path, monkeypatch):
+        engine = await claimed_posts_db(tmp_path)
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "INSERT INTO scheduled_posts (id, status, claim_token, retry_count, publish_started_at) VALUES "
+                "('last-try', 'publishing', 'c2', 2, NULL), ('started', 'publishing', 'c3', 0, '2026-10-18')"
+            ))
+        # SQLite has no INTERVAL; every claim here counts as stale
+        stale_sql = publisher_service.RELEASE_STALE_CLAIMS_SQL.split("  AND COALESCE(heartbeat_at")[0]
+        monkeypatch.setattr(publisher_service, "RELEASE_STALE_CLAIMS_SQL", stale_sql + "RETURNING id, status")
+
+        async with AsyncSession(engine) as db:
+            assert await PublisherService(db).release_stale_claims() == 3
+
+        async with engine.connect() as conn:
+            rows = {
+                r.id: (r.status, r.retry_count, r.next_retry_at is not None)
+                for r in await conn.execute(text("SELECT * FROM scheduled_posts"))
+            }
+        assert rows == {
+            "post-1": ("failed", 1, True),
+            "last-try": ("max_retries_reached", 3, False),
+            "started": ("needs_review", 1, False),
+        }
+        async with AsyncSession(engine) as db:
+            # The holder of a post held for review can still report it live
+            assert await PublisherService(db).complete_claimed_post("started", "c3", "p-3") is True
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_claimed_post_skipped_without_calling_platform(self):
+        db = AsyncMock()
+        post = Mock(platform="tiktok", clip_id=None, content_variant_id=None)
+        loaded, not_started = MagicMock(), MagicMock()
+        loaded.scalar_one_or_none.return_value = post
+        not_started.first.return_value = None
+        db.execute.side_effect = [loaded, not_started]
+
+        service = PublisherService(db)
+        service.multi_publisher = Mock(publish_to_platform=AsyncMock())
+
+        assert await service.publish_scheduled_post(uuid4(), claim_token=uuid4()) is None
+        service.multi_publisher.publish_to_platform.assert_not_awaited()
+
+
+class TestHeartbeat:
+    @pytest.mark.asyncio
+    async def test_heartbeats_while_publishing_and_stops_after(self, monkeypatch):
+        beats = []
+
+        class FakePublisher:
+            def __init__(self, db):
+                pass
+
+            async def publish_scheduled_post(self, post_id, claim_token=None):
+                await asyncio.sleep(0.06)
+                return Mock(success=True)
+
+            async def heartbeat_claim(self, post_id, claim_token):
+                beats.append(claim_token)
+                return True
+
+        class Sessions:
+            async def __aenter__(self):
+                return None
+
+            async def __aexit__(self, *args):
+                pass
+
+        monkeypatch.setattr(publish_dispatcher, "PublisherService", FakePublisher)
+        dispatcher = PublishDispatcher(Sessions, heartbeat_seconds=0.01)
+        token = uuid4()
+        row = {"id": str(uuid4()), "platform": "youtube", "claim_token": str(token)}
+
+        stats = await dispatcher.publish_claimed([row])
+        count = len(beats)
+        await asyncio.sleep(0.03)
+
+        assert stats.published == 1
+        assert count >= 3 and set(beats) == {token}
+        assert len(beats) == count
+
+    @pytest.mark.asyncio
+    async def test_skipped_claims_are_counted(self):
+        async def already_started(post_id, claim_token=None):
+            return None
+
+        stats = await PublishDispatcher(None, publish_fn=already_started).publish_claimed(rows(3))
+
+        assert (stats.published, stats.failed, stats.skipped) == (0, 0, 3)
+
+
+class TestPlanBatches:
+    """Batches keep an account's posts together"""
+
+    def test_accounts_not_split_when_they_fit(self):
+        claimed = rows(30, accounts=3) + rows(30, platform="youtube", accounts=2)
+        batches = PublishDispatcher.plan_batches(claimed, batch_size=25)
+
+        assert sum(len(b) for b in batches) == 60
+        for batch in batches:
+            assert len(batch) <= 25
+
+        locations = defaultdict(set)
+        for index, batch in enumerate(batches):
+            for row in batch:
+                locations[(row["platform"], row["platform_account_id"])].add(index)
+        assert all(len(v) == 1 for v in locations.values())
+
+    def test_batches_are_json_serializable(self):
+        import json
+        batches = PublishDispatcher.plan_batches(rows(5))
+        assert json.loads(json.dumps(batches)) == batches
+
+
+class TestPublishClaimed:
+    """Parallel publishing under limits"""
+
+    @pytest.mark.asyncio
+    async def test_respects_account_and_global_limits(self):
+        claimed = rows(60, accounts=4)
+        routing = {r["id"]: r["platform_account_id"] for r in claimed}
+        probe = ConcurrencyProbe(routing=routing)
+        dispatcher = PublishDispatcher(
+            None, max_concurrency=6, platform_limits={"tiktok": 6}, account_limit=2, publish_fn=probe
+        )
+
+        stats = await dispatcher.publish_claimed(claimed)
+
+        assert stats.published == 60
+        assert probe.peak <= 6
+        assert max(probe.peak_per_key.values()) <= 2
+
+    @pytest.mark.asyncio
+    async def test_respects_platform_limit(self):
+        claimed = rows(40, platform="youtube", accounts=20)
+        probe = ConcurrencyProbe()
+        dispatcher = PublishDispatcher(None, max_concurrency=50, platform_limits={"youtube": 3}, publish_fn=probe)
+
+        await dispatcher.publish_claimed(claimed)
+
+        assert probe.peak <= 3
+
+    @pytest.mark.asyncio
+    async def test_failures_are_counted_not_raised(self):
+        claimed = rows(4, accounts=4)
+
+        async def flaky(post_id, claim_token=None):
+            if post_id == claimed[0]["id"]:
+                raise RuntimeError("upload rejected")
+            return Mock(success=post_id != claimed[1]["id"])
+
+        stats = await PublishDispatcher(None, publish_fn=flaky).publish_claimed(claimed)
+
+        assert stats.published == 2
+        assert stats.failed == 2
+        assert "upload rejected" in stats.errors[0]
+
+    @pytest.mark.asyncio
+    async def test_ten_thousand_due_in_one_minute(self):
+        """10k posts across many accounts publish once each, well inside a minute"""
+        platforms = ["tiktok", "instagram", "youtube", "twitter", "threads"]
+        claimed = []
+        for platform in platforms:
+            claimed.extend(rows(2000, platform=platform, accounts=400))
+
+        probe = ConcurrencyProbe(delay=0)
+        dispatcher = PublishDispatcher(None, max_concurrency=20, publish_fn=probe)
+
+        start = time.perf_counter()
+        stats = await dispatcher.publish_claimed(claimed)
+        elapsed = time.perf_counter() - start
+
+        assert stats.published == 10000
+        assert len(set(probe.published)) == 10000
+        assert probe.peak <= 20
+        assert elapsed < 60
@@ -0,0 +1,284 @@
+"""
+Tests for resumable chunked uploads against a local fake upload server
+"""
+import asyncio
+import pytest
+
+import httpx
+
+from services import resumable_upload
+from services.platform_publishers import (
+    MediaType,
+    Platform,
+    PublishRequest,
+    PublishStatus,
+    YouTubePublisher,
+)
+from services.resumable_upload import (
+    ContentRangeProtocol,
+    GoogleResumableProtocol,
+    ResumableUploader,
+    UploadError,
+    UploadSessionStore,
+)
+
+CHUNK = GoogleResumableProtocol.GRANULARITY
+SESSION_URI = "https://upload.test/session/1"
+
+
+class WorkerCrash(Exception):
+    """Stands in for the process dying mid-upload"""
+
+
+class FakeUploadServer:
+    """
+    Google-style resumable upload endpoint with scripted faults
+
+    faults is consumed one entry per chunk PUT: "disconnect", "partial"
+    (commit half the chunk), "stall" (acknowledge without committing),
+    "crash", an int status, or None for normal.
+    """
+
+    def __init__(self, faults=(), chunk_mode="google"):
+        self.received = bytearray()
+        self.faults = list(faults)
+        self.chunk_mode = chunk_mode
+        self.sessions_started = 0
+        self.chunk_sizes = []
+        self.queries = 0
+        self.expired = False
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    async def start_session(self, total_bytes, chunk_size):
+        self.sessions_started += 1
+        self.received = bytearray()
+        self.expired = False
+        return SESSION_URI, {"publish_id": f"pub-{self.sessions_started}"}
+
+    def _ack(self, total):
+        if len(self.received) == total:
+            return httpx.Response(201 if self.chunk_mode == "tiktok" else 200, json={"id": "vid123"})
+        if self.chunk_mode == "tiktok":
+            return httpx.Response(206)
+        headers = {"Range": f"bytes=0-{len(self.received) - 1}"} if self.received else {}
+        return httpx.Response(308, headers=headers)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return httpx.Response(200, headers={"Location": SESSION_URI})
+
+        if self.expired:
+            return httpx.Response(404)
+        spec = request.headers["Content-Range"].split(" ")[1]
+        rng, total = spec.split("/")
+        total = int(total)
+        if rng == "*":
+            self.queries += 1
+            return self._ack(total)
+
+        start, end = (int(x) for x in rng.split("-"))
+        body = request.content
+        self.chunk_sizes.append(len(body))
+        assert start <= len(self.received), "chunk skips bytes the server never committed"
+
+        fault = self.faults.pop(0) if self.faults else None
+        if fault == "crash":
+            raise WorkerCrash()
+        if fault == "disconnect":
+            raise httpx.RemoteProtocolError("peer closed connection", request=request)
+        if fault == "expire":
+            self.expired = True
+            return httpx.Response(404)
+        if isinstance(fault, int):
+            return httpx.Response(fault, headers={"Retry-After": "0"})
+
+        if fault == "stall":
+            return self._ack(total)
+        if fault == "partial":
+            body = body[: len(body) // 2]
+        del self.received[start:]
+        self.received += body
+        return self._ack(total)
+
+
+async def no_sleep(delay):
+    pass
+
+
+def make_file(tmp_path, size):
+    data = bytes(i % 251 for i in range(size))
+    path = tmp_path / "video.mp4"
+    path.write_bytes(data)
+    return str(path), data
+
+
+async def run_upload(server, store, path, protocol=None, chunk_size=CHUNK, platform="youtube"):
+    async with server.client() as client:
+        uploader = ResumableUploader(client, store, chunk_size=chunk_size, sleep=no_sleep)
+        return await uploader.upload("key1", platform, path, protocol or GoogleResumableProtocol(), server.start_session)
+
+
+class TestGoogleResumable:
+    @pytest.mark.asyncio
+    async def test_streams_fixed_chunks_and_clears_state(self, tmp_path):
+        path, data = make_file(tmp_path, CHUNK * 3 + 1000)
+        store = UploadSessionStore(tmp_path / "state")
+        server = FakeUploadServer()
+
+        result = await run_upload(server, store, path)
+
+        assert result.response.json()["id"] == "vid123"
+        assert bytes(server.received) == data
+        assert server.chunk_sizes == [CHUNK, CHUNK, CHUNK, 1000]
+        assert store.load("key1") is None
+
+    @pytest.mark.asyncio
+    async def test_recovers_from_disconnects_5xx_and_partial_commits(self, tmp_path):
+        path, data = make_file(tmp_path, CHUNK * 4)
+        server = FakeUploadServer(faults=[None, "disconnect", "partial", 503, None, 429])
+
+        result = await run_upload(server, UploadSessionStore(tmp_path / "state"), path)
+
+        assert result.response.status_code == 200
+        assert bytes(server.received) == data
+        assert server.sessions_started == 1
+        assert server.queries == 3   # Offset re-synced after each failure
+
+    @pytest.mark.asyncio
+    async def test_resumes_after_crash_from_persisted_offset(self, tmp_path):
+        path, data = make_file(tmp_path, CHUNK * 4)
+        store = UploadSessionStore(tmp_path / "state")
+        server = FakeUploadServer(faults=[None, None, "crash"])
+
+        with pytest.raises(WorkerCrash):
+            await run_upload(server, store, path)
+        assert store.load("key1").offset == CHUNK * 2
+
+        server.chunk_sizes.clear()
+        result = await run_upload(server, store, path)
+
+        assert result.resumed_from == CHUNK * 2
+        assert server.sessions_started == 1
+        assert server.chunk_sizes == [CHUNK, CHUNK]
+        assert bytes(server.received) == data
+
+    @pytest.mark.asyncio
+    async def test_expired_session_restarts_once(self, tmp_path):
+        path, data = make_file(tmp_path, CHUNK * 2)
+        server = FakeUploadServer(faults=[None, "expire"])
+
+        await run_upload(server, UploadSessionStore(tmp_path / "state"), path)
+
+        assert server.sessions_started == 2
+        assert bytes(server.received) == data
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, tmp_path):
+        path, _ = make_file(tmp_path, CHUNK)
+        store = UploadSessionStore(tmp_path / "state")
+        server = FakeUploadServer(faults=[500] * 20)
+
+        with pytest.raises(UploadError):
+            await run_upload(server, store, path)
+        assert store.load("key1") is None
+
+    @pytest.mark.asyncio
+    async def test_acknowledgements_without_progress_back_off_then_fail(self, tmp_path):
+        path, data = make_file(tmp_path, CHUNK * 2)
+        delays = []
+
+        async def record_sleep(delay):
+            delays.append(delay)
+
+        server = FakeUploadServer(faults=[None, "stall", "stall"])
+        async with server.client() as client:
+            uploader = ResumableUploader(client, UploadSessionStore(tmp_path / "state"), chunk_size=CHUNK, sleep=record_sleep)
+            await uploader.upload("key1", "youtube", path, GoogleResumableProtocol(), server.start_session)
+        assert bytes(server.received) == data
+        assert len(delays) == 2 and delays[1] >= delays[0]  # exponential, with jitter
+
+        server = FakeUploadServer(faults=["stall"] * 20)
+        with pytest.raises(UploadError, match="without progress"):
+            await run_upload(server, UploadSessionStore(tmp_path / "state2"), path)
+        assert len(server.chunk_sizes) == resumable_upload.MAX_RETRIES + 1
+
+
+class TestContentRange:
+    def test_chunk_plan_last_chunk_absorbs_remainder(self):
+        protocol = ContentRangeProtocol()
+        mb = 1024 * 1024
+
+        assert protocol.chunk_size_for(3 * mb, 10 * mb) == 3 * mb
+        size = protocol.chunk_size_for(23 * mb, 10 * mb)
+        assert size == 10 * mb
+        assert protocol.chunk_count(23 * mb, size) == 2
+        assert protocol.next_chunk(10 * mb, 23 * mb, size) == (10 * mb, 23 * mb)
+
+    @pytest.mark.asyncio
+    async def test_retries_chunk_without_status_query(self, tmp_path):
+        mb = 1024 * 1024
+        path, data = make_file(tmp_path, 11 * mb)
+        server = FakeUploadServer(faults=[None, 502], chunk_mode="tiktok")
+
+        result = await run_upload(
+            server, UploadSessionStore(tmp_path / "state"), path,
+            protocol=ContentRangeProtocol(), chunk_size=5 * mb, platform="tiktok",
+        )
+
+        assert result.response.status_code == 201
+        assert result.extra == {"publish_id": "pub-1"}
+        assert server.queries == 0
+        assert server.chunk_sizes == [5 * mb, 6 * mb, 6 * mb]
+        assert bytes(server.received) == data
+
+
+class TestConcurrency:
+    @pytest.mark.asyncio
+    async def test_uploads_bounded_per_platform(self, tmp_path, monkeypatch):
+        monkeypatch.setitem(resumable_upload.MAX_CONCURRENT_UPLOADS, "bounded", 1)
+        in_flight = peak = 0
+
+        async def handle(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, json={"id": "x"})
+
+        async def start_session(total, chunk):
+            return SESSION_URI, {}
+
+        async def one(i):
+            path = tmp_path / f"v{i}.mp4"
+            path.write_bytes(b"x" * 1000)
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+                uploader = ResumableUploader(client, UploadSessionStore(tmp_path / "state"))
+                await uploader.upload(f"k{i}", "bounded", str(path), GoogleResumableProtocol(), start_session)
+
+        await asyncio.gather(*(one(i) for i in range(3)))
+
+        assert peak == 1
+
+
+class TestYouTubePublisher:
+    @pytest.mark.asyncio
+    async def test_publish_uses_resumable_engine(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(resumable_upload, "STATE_DIR", tmp_path / "state")
+        monkeypatch.setattr(resumable_upload, "DEFAULT_CHUNK_SIZE", CHUNK)
+        path, data = make_file(tmp_path, CHUNK * 2 + 10)
+        server = FakeUploadServer(faults=[None, "disconnect"])
+        publisher = YouTubePublisher({"access_token": "token"})
+        publisher._client = server.client()
+
+        result = await publisher.publish(PublishRequest(
+            media_path=path, media_type=MediaType.VIDEO, description="hello",
+            account_id="acct", platform=Platform.YOUTUBE,
+        ))
+        await publisher.close()
+
+        assert result.status == PublishStatus.PUBLISHED
+        assert result.post_id == "vid123"
+        assert bytes(server.received) == data
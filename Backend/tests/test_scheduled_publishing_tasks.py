@@ -12,52 +12,96 @@ from tasks.scheduled_publishing import (
     check_scheduled_posts,
     publish_scheduled_post,
     retry_failed_posts,
-    collect_post_metrics
+    collect_post_metrics,
+    publish_claimed_batch,
+    run_async
 )
+from services.publish_dispatcher import PublishDispatcher
+
+
+def make_dispatcher(*claims, error=None):
+    """Mock dispatcher whose successive claims return the given row lists"""
+    dispatcher = Mock()
+    if error:
+        dispatcher.claim_due_posts = AsyncMock(side_effect=error)
+    else:
+        dispatcher.claim_due_posts = AsyncMock(side_effect=list(claims) + [[]])
+    dispatcher.plan_batches = PublishDispatcher.plan_batches
+    return dispatcher
+
+
+def claimed_row(platform="tiktok", account=None):
+    return {"id": uuid4(), "platform": platform, "platform_account_id": account}
+
+
+class MockSessionMaker:
+    """Async context manager standing in for async_session_maker()"""
+    def __init__(self, db=None):
+        self.db = db or AsyncMock()
+    
+    def __call__(self):
+        return self
+    
+    async def __aenter__(self):
+        return self.db
+    
+    async def __aexit__(self, *args):
+        pass
 
 
 class TestCheckScheduledPosts:
     """Test the check_scheduled_posts periodic task"""
     
     def test_finds_and_queues_due_posts(self):
-        """Test that due posts are found and queued for publishing"""
-        # Create mock posts
-        post1 = Mock()
-        post1.id = uuid4()
-        post2 = Mock()
-        post2.id = uuid4()
+        """Test that due posts are claimed and queued as one batch"""
+        dispatcher = make_dispatcher([claimed_row(), claimed_row()])
         
-        mock_publisher = Mock()
-        mock_publisher.get_posts_due_for_publishing = AsyncMock(return_value=[post1, post2])
-        
-        with patch('tasks.scheduled_publishing.PublisherService', return_value=mock_publisher):
-            with patch('tasks.scheduled_publishing.publish_scheduled_post.delay') as mock_delay:
+        with patch('tasks.scheduled_publishing.PublishDispatcher', return_value=dispatcher):
+            with patch('tasks.scheduled_publishing.publish_claimed_batch.delay') as mock_delay:
                 result = check_scheduled_posts()
         
-        # Should have queued both posts
-        assert mock_delay.call_count == 2
+        # Both posts fit in a single batch task
+        assert mock_delay.call_count == 1
+        assert len(mock_delay.call_args[0][0]) == 2
         assert result == 2
     
     def test_no_posts_due(self):
         """Test when no posts are due for publishing"""
-        mock_publisher = Mock()
-        mock_publisher.get_posts_due_for_publishing = AsyncMock(return_value=[])
+        dispatcher = make_dispatcher()
         
-        with patch('tasks.scheduled_publishing.PublisherService', return_value=mock_publisher):
-            result = check_scheduled_posts()
+        with patch('tasks.scheduled_publishing.PublishDispatcher', return_value=dispatcher):
+            with patch('tasks.scheduled_publishing.publish_claimed_batch.delay') as mock_delay:
+                result = check_scheduled_posts()
         
         assert result == 0
+        mock_delay.assert_not_called()
     
     def test_handles_errors_gracefully(self):
         """Test that errors are handled gracefully"""
-        mock_publisher = Mock()
-        mock_publisher.get_posts_due_for_publishing = AsyncMock(side_effect=Exception("Database error"))
+        dispatcher = make_dispatcher(error=Exception("Database error"))
         
-        with patch('tasks.scheduled_publishing.PublisherService', return_value=mock_publisher):
+        with patch('tasks.scheduled_publishing.PublishDispatcher', return_value=dispatcher):
             result = check_scheduled_posts()
         
         # Should return 0 and not crash
         assert result == 0
+    
+    def test_keeps_claiming_full_chunks(self):
+        """A full claim chunk means more may be due - claim again"""
+        from tasks import scheduled_publishing
+        
+        full = [claimed_row(account=str(i % 40)) for i in range(scheduled_publishing.CLAIM_BATCH_SIZE)]
+        rest = [claimed_row() for _ in range(10)]
+        dispatcher = make_dispatcher(full, rest)
+        
+        with patch('tasks.scheduled_publishing.PublishDispatcher', return_value=dispatcher):
+            with patch('tasks.scheduled_publishing.publish_claimed_batch.delay') as mock_delay:
+                result = check_scheduled_posts()
+        
+        assert result == scheduled_publishing.CLAIM_BATCH_SIZE + 10
+        assert dispatcher.claim_due_posts.await_count == 2
+        queued = sum(len(call[0][0]) for call in mock_delay.call_args_list)
+        assert queued == result
 
 
 class TestPublishScheduledPost:
@@ -116,116 +160,96 @@ class TestRetryFailedPosts:
     """Test the retry_failed_posts periodic task"""
     
     def test_retries_eligible_posts(self):
-        """Test that eligible failed posts are retried"""
-        post1 = Mock()
-        post1.id = uuid4()
-        post2 = Mock()
-        post2.id = uuid4()
+        """Test that eligible failed posts are claimed and re-queued"""
+        dispatcher = make_dispatcher([claimed_row(), claimed_row()])
         
-        mock_publisher = Mock()
-        mock_publisher.get_failed_posts_for_retry = AsyncMock(return_value=[post1, post2])
-        
-        with patch('tasks.scheduled_publishing.PublisherService', return_value=mock_publisher):
-            with patch('tasks.scheduled_publishing.publish_scheduled_post.delay') as mock_delay:
-                result = retry_failed_posts()
+        with patch('tasks.scheduled_publishing.async_session_maker', MockSessionMaker()):
+            with patch('tasks.scheduled_publishing.PublishDispatcher', return_value=dispatcher):
+                with patch('tasks.scheduled_publishing.publish_claimed_batch.delay') as mock_delay:
+                    result = retry_failed_posts()
         
-        assert mock_delay.call_count == 2
+        assert mock_delay.call_count == 1
         assert result == 2
+        assert dispatcher.claim_due_posts.call_args.kwargs['retries'] is True
     
     def test_no_posts_to_retry(self):
         """Test when no posts are ready for retry"""
-        mock_publisher = Mock()
-        mock_publisher.get_failed_posts_for_retry = AsyncMock(return_value=[])
+        dispatcher = make_dispatcher()
         
-        with patch('tasks.scheduled_publishing.PublisherService', return_value=mock_publisher):
-            result = retry_failed_posts()
+        with patch('tasks.scheduled_publishing.async_session_maker', MockSessionMaker()):
+            with patch('tasks.scheduled_publishing.PublishDispatcher', return_value=dispatcher):
+                result = retry_failed_posts()
         
         assert result == 0
     
     def test_handles_errors(self):
         """Test error handling in retry task"""
-        mock_publisher = Mock()
-        mock_publisher.get_failed_posts_for_retry = AsyncMock(side_effect=Exception("DB error"))
+        dispatcher = make_dispatcher(error=Exception("DB error"))
         
-        with patch('tasks.scheduled_publishing.PublisherService', return_value=mock_publisher):
-            result = retry_failed_posts()
+        with patch('tasks.scheduled_publishing.async_session_maker', MockSessionMaker()):
+            with patch('tasks.scheduled_publishing.PublishDispatcher', return_value=dispatcher):
+                result = retry_failed_posts()
         
         assert result == 0
 
 
+class TestPublishClaimedBatch:
+    """Test the publish_claimed_batch task"""
+    
+    def test_publishes_batch_and_reports_stats(self):
+        batch = PublishDispatcher.plan_batches([claimed_row(), claimed_row("youtube")])[0]
+        
+        async def fake_publish(post_id, claim_token=None):
+            return Mock(success=True)
+        
+        real_init = PublishDispatcher.__init__
+        
+        def init_with_fake(self, session_factory, **kwargs):
+            real_init(self, session_factory, publish_fn=fake_publish)
+        
+        with patch.object(PublishDispatcher, '__init__', init_with_fake):
+            result = publish_claimed_batch(batch)
+        
+        assert result['claimed'] == 2
+        assert result['published'] == 2
+        assert result['failed'] == 0
+
+
 class TestCollectPostMetrics:
     """Test the collect_post_metrics periodic task"""
     
-    def test_collects_metrics_for_recent_posts(self):
-        """Test collecting metrics for recently published posts"""
-        # Create mock published posts
-        post1 = Mock()
-        post1.id = uuid4()
-        post1.platform_post_id = "platform_123"
-        post1.published_at = datetime.now() - timedelta(hours=2)
-        
-        post2 = Mock()
-        post2.id = uuid4()
-        post2.platform_post_id = "platform_456"
-        post2.published_at = datetime.now() - timedelta(days=1)
-        
-        # Mock database query result
-        mock_result = AsyncMock()
-        mock_result.scalars = Mock(return_value=Mock(all=Mock(return_value=[post1, post2])))
-        
-        mock_db = AsyncMock()
-        mock_db.execute = AsyncMock(return_value=mock_result)
-        
-        # Mock session maker
-        class MockSessionMaker:
-            def __init__(self):
-                pass
-            
-            async def __aenter__(self):
-                return mock_db
-            
-            async def __aexit__(self, *args):
-                pass
-        
-        with patch('tasks.scheduled_publishing.async_session_maker', MockSessionMaker()):
+    def test_runs_checkback_queue(self):
+        """Test that due check-backs are run through the shared queue"""
+        queue = Mock()
+        queue.run_once = AsyncMock(return_value={
+            "enqueued": 4,
+            "checked": 12,
+            "providers": {"youtube": {"claimed": 12, "checked": 12, "failed": 0}},
+        })
+        
+        with patch('tasks.scheduled_publishing.CheckbackQueue', return_value=queue) as queue_cls:
             result = collect_post_metrics()
         
-        # Should have processed posts (implementation returns count)
-        assert result >= 0  # Basic sanity check
+        assert result == 12
+        queue_cls.assert_called_once()
+        queue.run_once.assert_awaited_once()
     
-    def test_handles_no_recent_posts(self):
-        """Test when there are no recent posts to collect metrics for"""
-        mock_result = AsyncMock()
-        mock_result.scalars = Mock(return_value=Mock(all=Mock(return_value=[])))
-        
-        mock_db = AsyncMock()
-        mock_db.execute = AsyncMock(return_value=mock_result)
-        
-        class MockSessionMaker:
-            async def __aenter__(self):
-                return mock_db
-            
-            async def __aexit__(self, *args):
-                pass
+    def test_handles_nothing_due(self):
+        """Test when no check-backs are due"""
+        queue = Mock()
+        queue.run_once = AsyncMock(return_value={"enqueued": 0, "checked": 0, "providers": {}})
         
-        with patch('tasks.scheduled_publishing.async_session_maker', MockSessionMaker()):
+        with patch('tasks.scheduled_publishing.CheckbackQueue', return_value=queue):
             result = collect_post_metrics()
         
         assert result == 0
     
     def test_handles_collection_errors(self):
         """Test graceful error handling during metrics collection"""
-        mock_db = AsyncMock()
-        mock_db.execute = AsyncMock(side_effect=Exception("DB connection failed"))
-        
-        class MockSessionMaker:
-            async def __aenter__(self):
-                return mock_db
-            
-            async def __aexit__(self, *args):
-                pass
+        queue = Mock()
+        queue.run_once = AsyncMock(side_effect=Exception("DB connection failed"))
         
-        with patch('tasks.scheduled_publishing.async_session_maker', MockSessionMaker()):
+        with patch('tasks.scheduled_publishing.CheckbackQueue', return_value=queue):
             result = collect_post_metrics()
         
         # Should return 0 and not crash
@@ -236,21 +260,18 @@ class TestTaskReliability:
     """Test task reliability and error scenarios"""
     
     def test_check_scheduled_posts_is_idempotent(self):
-        """Test that running check multiple times is safe"""
-        post = Mock()
-        post.id = uuid4()
+        """Test that running check multiple times never re-queues a claimed post"""
+        # The claim flips status to 'publishing', so the second run sees nothing
+        dispatcher = make_dispatcher([claimed_row()])
         
-        mock_publisher = Mock()
-        mock_publisher.get_posts_due_for_publishing = AsyncMock(return_value=[post])
-        
-        with patch('tasks.scheduled_publishing.PublisherService', return_value=mock_publisher):
-            with patch('tasks.scheduled_publishing.publish_scheduled_post.delay'):
+        with patch('tasks.scheduled_publishing.PublishDispatcher', return_value=dispatcher):
+            with patch('tasks.scheduled_publishing.publish_claimed_batch.delay') as mock_delay:
                 result1 = check_scheduled_posts()
                 result2 = check_scheduled_posts()
         
-        # Each call should find the same post (until it's published)
         assert result1 == 1
-        assert result2 == 1
+        assert result2 == 0
+        assert mock_delay.call_count == 1
     
     def test_publish_task_retries_on_exception(self):
         """Test that publish task retries on transient exceptions"""
@@ -277,52 +298,40 @@ class TestTaskIntegration:
     
     def test_publish_workflow(self):
         """Test complete publish workflow"""
-        post_id = uuid4()
-        
-        # Create post that's due
-        post = Mock()
-        post.id = post_id
-        post.status = "scheduled"
-        post.scheduled_time = datetime.now() - timedelta(minutes=1)
+        row = claimed_row()
+        dispatcher = make_dispatcher([row])
         
-        # Mock successful publish
-        mock_result = Mock()
-        mock_result.success = True
-        mock_result.post_id = "platform_123"
-        
-        mock_publisher = Mock()
-        mock_publisher.get_posts_due_for_publishing = AsyncMock(return_value=[post])
-        mock_publisher.publish_scheduled_post = AsyncMock(return_value=mock_result)
-        
-        with patch('tasks.scheduled_publishing.PublisherService', return_value=mock_publisher):
-            with patch('tasks.scheduled_publishing.publish_scheduled_post.delay') as mock_delay:
-                # Step 1: Check finds the post
+        with patch('tasks.scheduled_publishing.PublishDispatcher', return_value=dispatcher):
+            with patch('tasks.scheduled_publishing.publish_claimed_batch.delay') as mock_delay:
+                # Step 1: Check claims the post
                 found_count = check_scheduled_posts()
                 assert found_count == 1
                 assert mock_delay.called
-                
-                # Step 2: Publish task executes
-                result = publish_scheduled_post(str(post_id))
-                assert result['success'] is True
+        
+        # Step 2: Batch task publishes it
+        batch = mock_delay.call_args[0][0]
+        assert batch[0]['id'] == str(row['id'])
+        
+        published = []
+        
+        async def fake_publish(post_id, claim_token=None):
+            published.append(post_id)
+            return Mock(success=True)
+        
+        stats = run_async(PublishDispatcher(None, publish_fn=fake_publish).publish_claimed(batch))
+        assert stats.published == 1
+        assert published == [row['id']]
     
     def test_retry_workflow(self):
         """Test retry workflow for failed posts"""
-        post_id = uuid4()
+        row = claimed_row()
+        dispatcher = make_dispatcher([row])
         
-        #Create failed post ready for retry
-        post = Mock()
-        post.id = post_id
-        post.status = "failed"
-        post.retry_count = 1
-        post.next_retry_at = datetime.now() - timedelta(minutes=1)
-        
-        mock_publisher = Mock()
-        mock_publisher.get_failed_posts_for_retry = AsyncMock(return_value=[post])
-        
-        with patch('tasks.scheduled_publishing.PublisherService', return_value=mock_publisher):
-            with patch('tasks.scheduled_publishing.publish_scheduled_post.delay') as mock_delay:
-                # Retry task finds and re-queues the post
-                retry_count = retry_failed_posts()
-                assert retry_count == 1
-                assert mock_delay.called
-                mock_delay.assert_called_with(str(post_id))
+        with patch('tasks.scheduled_publishing.async_session_maker', MockSessionMaker()):
+            with patch('tasks.scheduled_publishing.PublishDispatcher', return_value=dispatcher):
+                with patch('tasks.scheduled_publishing.publish_claimed_batch.delay') as mock_delay:
+                    # Retry task claims and re-queues the post
+                    retry_count = retry_failed_posts()
+                    assert retry_count == 1
+                    assert mock_delay.called
+                    assert mock_delay.call_args[0][0][0]['id'] == str(row['id'])
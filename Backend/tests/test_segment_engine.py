@@ -0,0 +1,220 @@
+"""
+Tests for diff-based dynamic segment refresh
+"""
+import json
+import sqlite3
+import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from services.intelligence.person_recompute import compute_lens_batch
+from services.intelligence.segment_engine import (
+    SegmentCompiler,
+    SegmentEngine,
+    ADD_MEMBERS_SQL,
+    REMOVE_MEMBERS_SQL,
+)
+
+
+class TestSegmentCompiler:
+    def test_shorthand_definition(self):
+        predicate, params = SegmentCompiler("s0").compile({"min_warmth": 50, "activity_state": "active"})
+
+        assert predicate == "pi.warmth_score >= :s0_0 AND pi.activity_state = :s0_1"
+        assert params == {"s0_0": 50, "s0_1": "active"}
+
+    def test_dsl_with_nested_groups(self):
+        definition = {
+            "operator": "AND",
+            "conditions": [
+                {"field": "interests", "operator": "contains", "value": "AI"},
+                {"operator": "OR", "conditions": [
+                    {"field": "activity_state", "operator": "in", "value": ["active", "warming"]},
+                    {"field": "channel_preferences", "key": "email", "operator": "gte", "value": 0.8},
+                ]},
+            ],
+        }
+
+        predicate, params = SegmentCompiler("s1").compile(definition)
+
+        assert predicate == (
+            "(pi.interests @> CAST(:s1_0 AS jsonb) AND "
+            "(pi.activity_state = ANY(:s1_1) OR "
+            "CAST(pi.channel_preferences ->> :s1_2 AS numeric) >= :s1_3))"
+        )
+        assert json.loads(params["s1_0"]) == ["AI"]
+        assert params["s1_1"] == ["active", "warming"]
+        assert params["s1_2"] == "email"
+
+    def test_definition_stored_as_json_text(self):
+        predicate, _ = SegmentCompiler("s0").compile('{"activity_state": ["cool", "dormant"]}')
+
+        assert predicate == "pi.activity_state = ANY(:s0_0)"
+
+    def test_empty_definition_matches_everyone(self):
+        assert SegmentCompiler("s0").compile(None) == ("TRUE", {})
+
+    def test_recency_operator(self):
+        predicate, params = SegmentCompiler("s0").compile({"conditions": [
+            {"field": "last_active_at", "operator": "within_days", "value": "7"}
+        ]})
+
+        assert "make_interval(days => :s0_0)" in predicate
+        assert params == {"s0_0": 7}
+
+    @pytest.mark.parametrize("condition", [
+        {"field": "email; DROP TABLE people", "operator": "eq", "value": 1},
+        {"field": "warmth_score", "operator": "contains", "value": 1},
+        {"field": "interests", "operator": "gte", "value": 1},
+    ])
+    def test_rejects_unknown_fields_and_operators(self, condition):
+        with pytest.raises(ValueError):
+            SegmentCompiler("s0").compile({"conditions": [condition]})
+
+
+class TestToneConditions:
+    """tone_preferences is stored as {tone: share}, with every tone present"""
+
+    def _matching(self, insights, condition):
+        predicate, params = SegmentCompiler("s0").compile({"conditions": [condition]})
+        db = sqlite3.connect(":memory:")
+        db.execute("CREATE TABLE person_insights (person_id TEXT, tone_preferences TEXT)")
+        db.executemany(
+            "INSERT INTO person_insights VALUES (?, ?)",
+            [(row["person_id"], json.dumps(row["tone_preferences"])) for row in insights],
+        )
+        rows = db.execute(f"SELECT person_id FROM person_insights pi WHERE {predicate}", params)
+        return {person_id for (person_id,) in rows}
+
+    def _insights(self):
+        now = datetime.now(timezone.utc)
+        rows = [
+            {"person_id": person_id, "channel": "email", "event_type": "commented",
+             "occurred_at": now, "content_excerpt": excerpt}
+            for person_id, excerpt in [
+                ("dev", "Great walkthrough of the API"),
+                ("fan", "lol love it"),
+                ("quiet", None),
+            ]
+        ]
+        insights = compute_lens_batch(rows, now)
+        assert all(set(row["tone_preferences"]) == {"casual", "formal", "enthusiastic", "technical"} for row in insights)
+        return insights + [{"person_id": "legacy", "tone_preferences": []}]
+
+    def test_contains_requires_a_positive_share(self):
+        matched = self._matching(self._insights(), {"field": "tone_preferences", "operator": "contains", "value": "technical"})
+
+        assert matched == {"dev"}
+
+    def test_contains_any(self):
+        matched = self._matching(
+            self._insights(),
+            {"field": "tone_preferences", "operator": "contains_any", "value": ["technical", "enthusiastic"]},
+        )
+
+        assert matched == {"dev", "fan"}
+
+    def test_share_comparison(self):
+        matched = self._matching(
+            self._insights(),
+            {"field": "tone_preferences", "key": "casual", "operator": "gte", "value": 0.5},
+        )
+
+        assert matched == {"dev", "fan"}
+
+
+class FakeSession:
+    """Records statements and answers the count/diff queries"""
+
+    def __init__(self, segments, members=None, added=None, removed=None):
+        self.segments = segments
+        self.members = members or {}
+        self.added = added or {}
+        self.removed = removed or {}
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        if "FROM segments WHERE is_dynamic" in sql:
+            return [SimpleNamespace(_mapping=s) for s in self.segments]
+        if sql == ADD_MEMBERS_SQL:
+            return [SimpleNamespace(segment_id=k, changed=v) for k, v in self.added.items()]
+        if sql == REMOVE_MEMBERS_SQL:
+            return [SimpleNamespace(segment_id=k, changed=v) for k, v in self.removed.items()]
+        if "FROM segment_eval GROUP BY" in sql:
+            return [SimpleNamespace(segment_id=k, members=v) for k, v in self.members.items()]
+        return MagicMock()
+
+    async def commit(self):
+        self.commits += 1
+
+
+class TestRefreshDynamicSegments:
+    @pytest.mark.asyncio
+    async def test_single_pass_over_person_insights(self):
+        session = FakeSession(
+            segments=[
+                {"id": "seg-a", "definition": {"min_warmth": 50}},
+                {"id": "seg-b", "definition": {"activity_state": "dormant"}},
+            ],
+            members={"seg-a": 120, "seg-b": 40},
+            added={"seg-a": 5},
+            removed={"seg-a": 2, "seg-b": 1},
+        )
+
+        summary = await SegmentEngine().refresh_dynamic_segments(session)
+
+        scans = [(sql, p) for sql, p in session.statements if "FROM person_insights" in sql]
+        assert len(scans) == 1
+        sql, params = scans[0]
+        assert "CASE WHEN pi.warmth_score >= :s0_0 THEN CAST(:sid0 AS uuid) END" in sql
+        assert "CASE WHEN pi.activity_state = :s1_0 THEN CAST(:sid1 AS uuid) END" in sql
+        assert params == {"s0_0": 50, "sid0": "seg-a", "s1_0": "dormant", "sid1": "seg-b"}
+
+        assert summary == {
+            "seg-a": {"members": 120, "added": 5, "removed": 2},
+            "seg-b": {"members": 40, "added": 0, "removed": 1},
+        }
+        assert session.commits == 1
+
+    @pytest.mark.asyncio
+    async def test_writes_only_the_diff(self):
+        session = FakeSession(segments=[{"id": "seg-a", "definition": {}}])
+
+        await SegmentEngine().refresh_dynamic_segments(session)
+
+        statements = [sql for sql, _ in session.statements]
+        assert not any(s.strip().startswith("DELETE FROM segment_members WHERE segment_id = :sid") for s in statements)
+        assert ADD_MEMBERS_SQL in statements
+        remove = next(p for sql, p in session.statements if sql == REMOVE_MEMBERS_SQL)
+        assert remove == {"segment_ids": ["seg-a"]}
+
+    def test_diff_statements_log_change_events(self):
+        for sql, change in ((ADD_MEMBERS_SQL, "'added'"), (REMOVE_MEMBERS_SQL, "'removed'")):
+            assert "INSERT INTO segment_membership_events" in sql
+            assert change in sql
+        assert "NOT EXISTS" in ADD_MEMBERS_SQL
+        assert "ON CONFLICT DO NOTHING" in ADD_MEMBERS_SQL
+
+    @pytest.mark.asyncio
+    async def test_invalid_definition_leaves_segment_untouched(self):
+        session = FakeSession(segments=[
+            {"id": "seg-bad", "definition": {"conditions": [{"field": "nope", "value": 1}]}},
+            {"id": "seg-ok", "definition": {"min_warmth": 10}},
+        ])
+
+        summary = await SegmentEngine().refresh_dynamic_segments(session)
+
+        assert list(summary) == ["seg-ok"]
+        remove = next(p for sql, p in session.statements if sql == REMOVE_MEMBERS_SQL)
+        assert remove == {"segment_ids": ["seg-ok"]}
+
+    @pytest.mark.asyncio
+    async def test_no_dynamic_segments(self):
+        session = FakeSession(segments=[])
+
+        assert await SegmentEngine().refresh_dynamic_segments(session) == {}
+        assert session.commits == 0
@@ -0,0 +1,123 @@
+"""
+Tests for the stream-copy stitch planner
+"""
+import pytest
+
+from services import long_video_orchestrator
+from services.long_video_orchestrator import LongVideoOrchestrator, SceneSpec
+from services.stitch_planner import (
+    ClipProfile,
+    StitchUnsupported,
+    concat_cmd,
+    concat_list,
+    normalize_cmd,
+    plan_stitch,
+    transition_cmd,
+)
+
+
+def clip(path, duration=10.0, width=1920, height=1080, vcodec="h264", acodec="aac", keyframes=None):
+    return ClipProfile(
+        path=path, duration=duration, vcodec=vcodec, width=width, height=height,
+        fps="30", pix_fmt="yuv420p", time_base="1/15360", vprofile="High",
+        acodec=acodec, sample_rate=48000 if acodec else None, channels=2 if acodec else None,
+        keyframes=keyframes if keyframes is not None else [float(t) for t in range(0, int(duration), 2)],
+    )
+
+
+class TestPlan:
+    def test_matching_clips_with_cuts_are_pure_stream_copy(self):
+        plan = plan_stitch([clip("a.mp4"), clip("b.mp4"), clip("c.mp4")], ["cut", "cut"], "/w")
+
+        assert plan.normalize == {} and plan.transitions == []
+        assert plan.reencoded_seconds == 0
+        assert concat_list(plan) == "file 'a.mp4'\nfile 'b.mp4'\nfile 'c.mp4'\n"
+        assert concat_cmd(plan, "/w/list.txt", "out.mp4")[-6:-3] == ["0:a:0", "-c", "copy"]
+
+    def test_only_outliers_are_normalized(self):
+        profiles = [clip("a.mp4"), clip("small.mp4", width=1280, height=720), clip("c.mp4")]
+
+        plan = plan_stitch(profiles, ["cut", "cut"], "/w")
+
+        assert list(plan.normalize) == [1]
+        assert plan.sources == ["a.mp4", "/w/norm_1.mp4", "c.mp4"]
+        cmd = normalize_cmd(plan, 1, profiles[1])
+        assert "scale=1920:1080:force_original_aspect_ratio=decrease" in cmd[cmd.index("-vf") + 1]
+        assert cmd[cmd.index("-c:v") + 1] == "libx264"
+        assert cmd[cmd.index("-profile:v") + 1] == "high"
+
+    def test_crossfade_reencodes_only_keyframe_aligned_boundary(self):
+        plan = plan_stitch([clip("a.mp4"), clip("b.mp4")], ["crossfade"], "/w")
+
+        t, = plan.transitions
+        assert (t.tail_start, t.head_end, t.effect) == (8.0, 2.0, "fade")
+        assert plan.reencoded_seconds == pytest.approx(4.0)
+        assert plan.total_seconds == pytest.approx(19.5)
+        assert concat_list(plan) == (
+            "file 'a.mp4'\noutpoint 8.000000\nfile '/w/xfade_0.mp4'\n"
+            "file 'b.mp4'\ninpoint 2.000000\n"
+        )
+        cmd = transition_cmd(plan, t)
+        assert cmd[cmd.index("-ss") + 1] == "8.000"
+        assert "offset=1.500" in cmd[cmd.index("-filter_complex") + 1]
+        assert "acrossfade=d=0.500" in cmd[cmd.index("-filter_complex") + 1]
+
+    def test_sparse_keyframes_force_normalization_with_placed_keyframes(self):
+        profiles = [clip("a.mp4", keyframes=[0.0]), clip("b.mp4")]
+
+        plan = plan_stitch(profiles, ["dissolve"], "/w")
+
+        assert plan.normalize == {0: [9.5]}
+        cmd = normalize_cmd(plan, 0, profiles[0])
+        assert cmd[cmd.index("-force_key_frames") + 1] == "9.500"
+
+    def test_soundtrack_replaces_clip_audio(self):
+        profiles = [clip("a.mp4"), clip("b.mp4", acodec=None), clip("c.mp4", width=720)]
+
+        plan = plan_stitch(profiles, ["cut", "cut"], "/w", keep_clip_audio=False)
+
+        assert list(plan.normalize) == [2]          # Missing audio doesn't matter
+        assert "-an" in normalize_cmd(plan, 2, profiles[2])
+        cmd = concat_cmd(plan, "/w/list.txt", "out.mp4", audio_path="music.mp3")
+        assert cmd[cmd.index("-c:v") + 1] == "copy"
+        assert "1:a:0" in cmd and "-shortest" in cmd
+
+    def test_silent_clip_gets_silence_when_clip_audio_kept(self):
+        profiles = [clip("a.mp4"), clip("b.mp4"), clip("mute.mp4", acodec=None)]
+
+        plan = plan_stitch(profiles, ["cut", "cut"], "/w")
+
+        cmd = normalize_cmd(plan, 2, profiles[2])
+        assert "anullsrc=channel_layout=stereo:sample_rate=48000" in cmd
+        assert cmd[cmd.index("-map", cmd.index("-map") + 1) + 1] == "1:a:0"
+
+    def test_unencodable_majority_codec_is_unsupported(self):
+        with pytest.raises(StitchUnsupported):
+            plan_stitch([clip("a.mov", vcodec="prores"), clip("b.mov", vcodec="prores")], ["cut"], "/w")
+
+
+class TestOrchestratorFallback:
+    @pytest.mark.asyncio
+    async def test_falls_back_to_reencode_and_audio_pass(self, tmp_path, monkeypatch):
+        async def unsupported(*args, **kwargs):
+            raise StitchUnsupported("prores")
+
+        monkeypatch.setattr(long_video_orchestrator, "stitch_clips", unsupported)
+        orchestrator = LongVideoOrchestrator(output_dir=str(tmp_path))
+        job = orchestrator.create_from_scenes([SceneSpec(1, "a"), SceneSpec(2, "b")])
+        job.spec.audio_track = "music.mp3"
+        calls = []
+
+        async def reencode(job):
+            calls.append("reencode")
+            return "stitched.mp4"
+
+        async def add_audio(job, path):
+            calls.append(("audio", path))
+            return "with_audio.mp4"
+
+        monkeypatch.setattr(orchestrator, "_stitch_reencode", reencode)
+        monkeypatch.setattr(orchestrator, "_add_audio", add_audio)
+
+        assert await orchestrator._stitch_clips(job) == "with_audio.mp4"
+        assert calls == ["reencode", ("audio", "stitched.mp4")]
@@ -0,0 +1,134 @@
+"""
+Tests for the storage transfer engine (local filesystem backend)
+"""
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+
+from modules.cloud_staging import (
+    GoogleDriveBackend,
+    LocalFilesystemBackend,
+    StorageManager,
+    TransferEngine,
+    TransferItem,
+)
+from modules.cloud_staging.transfer import RemoteObject
+
+
+def make_clips(tmp_path, sizes):
+    items = []
+    for i, size in enumerate(sizes):
+        path = tmp_path / "src" / f"clip_{i}.mp4"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(bytes((i + j) % 256 for j in range(size)))
+        items.append(TransferItem(path=path, key=f"clips/{path.name}"))
+    return items
+
+
+class TestTransferEngine:
+    @pytest.mark.asyncio
+    async def test_multipart_upload_and_progress(self, tmp_path):
+        items = make_clips(tmp_path, [100_000, 3_000, 0])
+        backend = LocalFilesystemBackend(tmp_path / "remote", part_size=16_384)
+        updates = []
+
+        results = await TransferEngine().upload_many(items, backend, lambda p, key: updates.append((p.done_bytes, key)))
+
+        assert all(r.success and r.verified and not r.skipped for r in results)
+        for item in items:
+            assert (tmp_path / "remote" / item.key).read_bytes() == item.path.read_bytes()
+        assert updates[-1][0] == 103_000
+        assert {key for _, key in updates} == {"clips/clip_0.mp4", "clips/clip_1.mp4"}
+
+    @pytest.mark.asyncio
+    async def test_skips_content_already_stored(self, tmp_path):
+        items = make_clips(tmp_path, [50_000])
+        backend = LocalFilesystemBackend(tmp_path / "remote")
+        await TransferEngine().upload_many(items, backend)
+
+        # Same bytes under a different name
+        renamed = tmp_path / "src" / "copy.mp4"
+        renamed.write_bytes(items[0].path.read_bytes())
+        result, = await TransferEngine().upload_many([TransferItem(renamed, "clips/copy.mp4")], backend)
+
+        assert result.skipped
+        assert result.remote.key == "clips/clip_0.mp4"
+        assert not (tmp_path / "remote" / "clips" / "copy.mp4").exists()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded_per_backend(self, tmp_path):
+        class SlowBackend(LocalFilesystemBackend):
+            in_flight = peak = 0
+
+            async def put(self, item, size, digests, progress):
+                SlowBackend.in_flight += 1
+                SlowBackend.peak = max(SlowBackend.peak, SlowBackend.in_flight)
+                await asyncio.sleep(0.01)
+                try:
+                    return await super().put(item, size, digests, progress)
+                finally:
+                    SlowBackend.in_flight -= 1
+
+        backend = SlowBackend(tmp_path / "remote", max_concurrency=2)
+        results = await TransferEngine().upload_many(make_clips(tmp_path, [1000 + i for i in range(8)]), backend)
+
+        assert all(r.success for r in results)
+        assert SlowBackend.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_checksum_mismatch_retried_then_failed(self, tmp_path):
+        class CorruptingBackend(LocalFilesystemBackend):
+            puts = deletes = 0
+
+            async def put(self, item, size, digests, progress):
+                CorruptingBackend.puts += 1
+                obj = await super().put(item, size, digests, progress)
+                obj.checksums['sha256'] = "0" * 64
+                return obj
+
+            async def delete(self, obj):
+                CorruptingBackend.deletes += 1
+                await super().delete(obj)
+
+        backend = CorruptingBackend(tmp_path / "remote")
+        result, = await TransferEngine().upload_many(make_clips(tmp_path, [5000]), backend)
+
+        assert not result.success
+        assert "verification" in result.error
+        assert CorruptingBackend.puts == 2 and CorruptingBackend.deletes == 2
+
+
+class TestGoogleDriveBackend:
+    @pytest.mark.asyncio
+    async def test_each_worker_thread_gets_its_own_service(self, monkeypatch):
+        uploader = SimpleNamespace(credentials=None, authenticate=lambda: setattr(uploader, "credentials", "creds") or True)
+        backend = GoogleDriveBackend(uploader)
+        built = []
+        monkeypatch.setattr(backend, "_build_service", lambda: built.append(threading.get_ident()) or object())
+        barrier = threading.Barrier(3)
+
+        def worker():
+            barrier.wait()  # hold all three threads so none is reused
+            return threading.get_ident(), backend._service(), backend._service()
+
+        results = await asyncio.gather(*(asyncio.to_thread(worker) for _ in range(3)))
+
+        assert uploader.credentials == "creds"
+        assert all(first is second for _, first, second in results)
+        assert len({id(service) for _, service, _ in results}) == 3
+        assert sorted(built) == sorted(ident for ident, _, _ in results)
+
+
+class TestStorageManager:
+    @pytest.mark.asyncio
+    async def test_upload_batch_async_uses_engine(self, tmp_path):
+        manager = StorageManager()
+        manager.add_provider("local", LocalFilesystemBackend(tmp_path / "remote"), set_default=True)
+        items = make_clips(tmp_path, [2000, 3000])
+
+        results = await manager.upload_batch_async([i.path for i in items])
+
+        assert [r['name'] for r in results] == ["clip_0.mp4", "clip_1.mp4"]
+        assert all(r['provider'] == "local" and len(r['sha256']) == 64 for r in results)
@@ -9,10 +9,14 @@ from pathlib import Path
 from PIL import Image
 import tempfile
 
+import numpy as np
+
 from services.thumbnail_generator import (
     ThumbnailGenerator,
     PLATFORM_DIMENSIONS,
-    PlatformDimensions
+    PlatformDimensions,
+    get_face_cascade,
+    score_frames
 )
 
 
@@ -117,32 +121,12 @@ class TestFrameExtraction:
 class TestFrameQualityAnalysis:
     """Test frame quality analysis"""
     
-    @patch('cv2.imread')
-    @patch('cv2.cvtColor')
-    @patch('cv2.Laplacian')
-    @patch('cv2.CascadeClassifier')
-    def test_analyze_frame_quality(
-        self,
-        mock_cascade,
-        mock_laplacian,
-        mock_cvt,
-        mock_imread,
-        generator,
-        test_image
-    ):
+    @patch('services.thumbnail_generator.get_face_cascade')
+    def test_analyze_frame_quality(self, mock_get_cascade, generator, test_image):
         """Test frame quality analysis"""
-        # Mock OpenCV operations
-        import numpy as np
-        
-        mock_imread.return_value = np.zeros((1080, 1920, 3), dtype=np.uint8)
-        mock_cvt.return_value = np.zeros((1080, 1920), dtype=np.uint8)
-        mock_laplacian_result = Mock()
-        mock_laplacian_result.var.return_value = 250.0
-        mock_laplacian.return_value = mock_laplacian_result
-        
-        mock_cascade_instance = Mock()
-        mock_cascade_instance.detectMultiScale.return_value = [(100, 100, 50, 50)]
-        mock_cascade.return_value = mock_cascade_instance
+        mock_cascade = Mock()
+        mock_cascade.detectMultiScale.return_value = [(100, 100, 50, 50)]
+        mock_get_cascade.return_value = mock_cascade
         
         analysis = generator.analyze_frame_quality(test_image)
         
@@ -151,8 +135,39 @@ class TestFrameQualityAnalysis:
         assert "brightness" in analysis
         assert "contrast" in analysis
         assert "faces_detected" in analysis
+        assert analysis["faces_detected"] == 1
         assert analysis["overall_score"] >= 0.0
         assert analysis["overall_score"] <= 1.0
+    
+    def test_score_frames_ranks_sharp_mid_exposure_higher(self):
+        """Textured, well-exposed frames should beat flat or dark ones"""
+        rng = np.random.default_rng(0)
+        flat = np.full((720, 1280, 3), 128, dtype=np.uint8)
+        dark = np.zeros((720, 1280, 3), dtype=np.uint8)
+        textured = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+        
+        with patch('services.thumbnail_generator.get_face_cascade') as mock_get_cascade:
+            mock_get_cascade.return_value.detectMultiScale.return_value = []
+            analyses = score_frames([flat, dark, textured])
+        
+        scores = [a["overall_score"] for a in analyses]
+        assert scores.index(max(scores)) == 2
+        assert analyses[1]["brightness"] == 0.0
+    
+    def test_face_detection_only_on_top_k(self):
+        """The face detector should run on the top-k candidates only"""
+        frames = [np.full((360, 640, 3), v, dtype=np.uint8) for v in range(0, 250, 25)]
+        
+        with patch('services.thumbnail_generator.get_face_cascade') as mock_get_cascade:
+            mock_get_cascade.return_value.detectMultiScale.return_value = []
+            analyses = score_frames(frames, face_top_k=3)
+        
+        assert len(analyses) == len(frames)
+        assert mock_get_cascade.return_value.detectMultiScale.call_count == 3
+    
+    def test_face_cascade_loaded_once(self):
+        """The Haar cascade is built once and shared across calls"""
+        assert get_face_cascade() is get_face_cascade()
 
 
 class TestThumbnailGeneration:
@@ -303,42 +318,91 @@ class TestImageEnhancement:
 class TestBestFrameSelection:
     """Test best frame selection workflow"""
     
-    @patch.object(ThumbnailGenerator, 'extract_frames')
-    @patch.object(ThumbnailGenerator, 'analyze_frame_quality')
+    @patch('services.thumbnail_generator.score_frames')
+    @patch.object(ThumbnailGenerator, 'decode_candidates')
     def test_select_best_frame(
         self,
-        mock_analyze,
-        mock_extract,
+        mock_decode,
+        mock_score,
         generator,
         test_video,
         temp_dir
     ):
         """Test selecting best frame from video"""
-        # Mock frame extraction
-        mock_frames = [
-            f"{temp_dir}/frame_001.jpg",
-            f"{temp_dir}/frame_002.jpg",
-            f"{temp_dir}/frame_003.jpg"
+        frames = [
+            (2.5, np.full((1080, 1920, 3), 50, dtype=np.uint8)),
+            (5.0, np.full((1080, 1920, 3), 120, dtype=np.uint8)),
+            (7.5, np.full((1080, 1920, 3), 200, dtype=np.uint8))
         ]
-        mock_extract.return_value = mock_frames
-        
-        # Create actual test files
-        for frame_path in mock_frames:
-            img = Image.new('RGB', (1920, 1080), color='blue')
-            img.save(frame_path)
-        
-        # Mock analysis with different scores
-        mock_analyze.side_effect = [
-            {"overall_score": 0.6, "frame_path": mock_frames[0]},
-            {"overall_score": 0.9, "frame_path": mock_frames[1]},  # Best
-            {"overall_score": 0.7, "frame_path": mock_frames[2]}
+        mock_decode.return_value = frames
+        mock_score.return_value = [
+            {"overall_score": 0.6},
+            {"overall_score": 0.9},  # Best
+            {"overall_score": 0.7}
         ]
         
-        best_frame, analysis = generator.select_best_frame(test_video, num_candidates=3)
+        best_frame, analysis = generator.select_best_frame(
+            test_video, num_candidates=3, output_dir=temp_dir
+        )
         
-        # Should select frame with highest score
-        assert best_frame == mock_frames[1]
+        # Should select frame with highest score, and only write that one
         assert analysis["overall_score"] == 0.9
+        assert analysis["timestamp"] == 5.0
+        assert sorted(os.listdir(temp_dir)) == sorted([
+            os.path.basename(test_video), os.path.basename(best_frame)
+        ])
+        assert Image.open(best_frame).size == (1920, 1080)
+    
+    def test_select_best_frame_decodes_video_in_memory(self, generator, temp_dir):
+        """A real video is decoded in one pass and platform crops reuse the frame"""
+        import cv2
+        
+        video_path = os.path.join(temp_dir, "clip.avi")
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (320, 180))
+        rng = np.random.default_rng(1)
+        for i in range(40):
+            frame = np.full((180, 320, 3), i * 6, dtype=np.uint8)
+            if i == 20:
+                frame = rng.integers(0, 255, (180, 320, 3), dtype=np.uint8)
+            writer.write(frame)
+        writer.release()
+        
+        frame_dir = os.path.join(temp_dir, "frames")
+        best_frame, analysis = generator.select_best_frame(
+            video_path, num_candidates=5, output_dir=frame_dir
+        )
+        
+        assert os.listdir(frame_dir) == [os.path.basename(best_frame)]
+        assert analysis["timestamp"] is not None
+        
+        with patch('services.thumbnail_generator.Image.open') as mock_open:
+            thumbnails = generator.generate_all_platforms(best_frame, os.path.join(temp_dir, "out"))
+        
+        mock_open.assert_not_called()
+        assert len(thumbnails) == len(PLATFORM_DIMENSIONS)
+    
+    def test_select_best_frame_image_input(self, generator, test_image):
+        """Image inputs are scored directly and returned unchanged"""
+        best_frame, analysis = generator.select_best_frame(test_image)
+        
+        assert best_frame == test_image
+        assert analysis["timestamp"] is None
+    
+    def test_rewritten_image_is_not_served_from_cache(self, generator, test_image):
+        """A file replaced at the same path is decoded again"""
+        best_frame, _ = generator.select_best_frame(test_image)
+        Image.new('RGB', (640, 640), color='red').save(best_frame)
+        
+        img = generator._load_source(best_frame)
+        
+        assert img.size == (640, 640)
+        assert img.getpixel((0, 0))[0] > 200
+    
+    def test_select_best_frame_no_frames(self, generator, test_video):
+        """Unreadable input should raise"""
+        with patch.object(ThumbnailGenerator, 'decode_candidates', return_value=[]):
+            with pytest.raises(ValueError):
+                generator.select_best_frame(test_video)
 
 
 def test_platform_dimensions_dataclass():
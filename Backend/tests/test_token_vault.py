@@ -0,0 +1,188 @@
+"""
+Tests for the encrypted OAuth token vault, against a local fake OAuth provider
+"""
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+from cryptography.fernet import Fernet
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from services.oauth_manager import OAuthManager, OAuthProvider
+from services.token_vault import TokenCipher, TokenVault, TokenVaultError, refresh_due_at
+
+MIGRATION = Path(__file__).parents[2] / "supabase" / "migrations" / "20261018000700_oauth_token_vault.sql"
+KEY = Fernet.generate_key().decode()
+
+
+class FakeOAuthProvider:
+    """Token endpoint issuing short-lived tokens; counts refresh grants"""
+
+    def __init__(self, expires_in=3600, refresh_delay=0.0):
+        self.expires_in = expires_in
+        self.refresh_delay = refresh_delay
+        self.refreshes = 0
+        self.fail_refresh = False
+        self.issued = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if body['grant_type'] == 'authorization_code':
+            assert body['code'] == 'good-code' and body.get('code_verifier')
+        elif body['grant_type'] == 'refresh_token':
+            self.refreshes += 1
+            await asyncio.sleep(self.refresh_delay)
+            if self.fail_refresh:
+                return httpx.Response(400, json={'error': 'invalid_grant'})
+        self.issued += 1
+        return httpx.Response(200, json={
+            'access_token': f"access-{self.issued}",
+            'refresh_token': f"refresh-{self.issued}",
+            'expires_in': self.expires_in,
+            'scope': 'tweet.read tweet.write',
+        })
+
+
+async def make_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'vault.sqlite3'}")
+    sql = "\n".join(line for line in MIGRATION.read_text().splitlines() if not line.startswith('--'))
+    async with engine.begin() as conn:
+        for statement in (s.strip() for s in sql.split(';')):
+            # Postgres-only statements (RLS, comments) are skipped on SQLite
+            if statement and not statement.startswith(('ALTER', 'COMMENT')):
+                await conn.execute(text(statement))
+    return engine
+
+
+def make_manager(engine, provider: FakeOAuthProvider, **vault_kwargs):
+    """One 'worker': its own vault and HTTP client on the shared database"""
+    vault = TokenVault(async_sessionmaker(engine), cipher=TokenCipher(KEY), wait_interval=0.01, **vault_kwargs)
+    manager = OAuthManager(vault=vault)
+    manager.configure_provider(OAuthProvider.TWITTER, "client", "secret", "http://localhost/callback")
+    manager._http_client = httpx.AsyncClient(transport=httpx.MockTransport(provider.handler))
+    return manager
+
+
+async def connect(manager, user_id="user-1"):
+    url = await manager.get_authorization_url(OAuthProvider.TWITTER, user_id)
+    state = parse_qs(urlparse(url).query)['state'][0]
+    return await manager.handle_callback(OAuthProvider.TWITTER, "good-code", state)
+
+
+class TestStorage:
+    @pytest.mark.asyncio
+    async def test_tokens_survive_restart_and_are_encrypted(self, tmp_path):
+        engine = await make_engine(tmp_path)
+        provider = FakeOAuthProvider()
+        await connect(make_manager(engine, provider))
+
+        # A second worker (or a restarted one) sees the account
+        other = make_manager(engine, provider)
+        accounts = await other.get_connected_accounts("user-1")
+        token = await other.get_valid_token("user-1", OAuthProvider.TWITTER)
+
+        assert [a['provider'] for a in accounts] == ["twitter"]
+        assert token.access_token == "access-1"
+        async with engine.connect() as conn:
+            raw = (await conn.execute(text("SELECT ciphertext FROM oauth_tokens"))).scalar()
+        assert "access-1" not in raw and "refresh-1" not in raw
+
+        wrong_key = TokenVault(async_sessionmaker(engine), cipher=TokenCipher(Fernet.generate_key().decode()))
+        with pytest.raises(TokenVaultError):
+            await wrong_key.get_token("user-1", "twitter")
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_state_is_single_use_and_expires(self, tmp_path):
+        engine = await make_engine(tmp_path)
+        provider = FakeOAuthProvider()
+        now = [time.time()]
+        manager = make_manager(engine, provider, clock=lambda: now[0])
+
+        url = await manager.get_authorization_url(OAuthProvider.TWITTER, "user-1")
+        state = parse_qs(urlparse(url).query)['state'][0]
+        await manager.handle_callback(OAuthProvider.TWITTER, "good-code", state)
+        with pytest.raises(ValueError, match="Invalid or expired state"):
+            await manager.handle_callback(OAuthProvider.TWITTER, "good-code", state)
+
+        url = await manager.get_authorization_url(OAuthProvider.TWITTER, "user-1")
+        stale = parse_qs(urlparse(url).query)['state'][0]
+        now[0] += 601
+        with pytest.raises(ValueError, match="Invalid or expired state"):
+            await manager.handle_callback(OAuthProvider.TWITTER, "good-code", stale)
+        await engine.dispose()
+
+
+class TestRefresh:
+    @pytest.mark.asyncio
+    async def test_concurrent_workers_refresh_once(self, tmp_path):
+        engine = await make_engine(tmp_path)
+        provider = FakeOAuthProvider(expires_in=60, refresh_delay=0.05)  # inside the 5-minute window
+        await connect(make_manager(engine, provider))
+        provider.expires_in = 3600
+        workers = [make_manager(engine, provider) for _ in range(3)]
+
+        tokens = await asyncio.gather(*(
+            w.get_valid_token("user-1", OAuthProvider.TWITTER) for w in workers for _ in range(3)
+        ))
+
+        assert provider.refreshes == 1
+        assert {t.access_token for t in tokens} == {"access-2"}
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_background_refresher_renews_due_tokens(self, tmp_path):
+        engine = await make_engine(tmp_path)
+        provider = FakeOAuthProvider(expires_in=3600)
+        now = [time.time()]
+        manager = make_manager(engine, provider, clock=lambda: now[0])
+        for user in ("a", "b", "c"):
+            await connect(manager, user)
+        refresher = manager.create_refresher()
+
+        assert (await refresher.run_once())['refreshed'] == 0
+
+        now[0] += 3600 - 300  # every token's due time has passed
+        stats = await refresher.run_once()
+
+        assert stats == {'refreshed': 3, 'failed': 0, 'states_purged': 0}
+        assert provider.refreshes == 3
+        token = await manager.get_valid_token("a", OAuthProvider.TWITTER)
+        assert token.access_token.startswith("access-") and token.access_token != "access-1"
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_backs_off(self, tmp_path):
+        engine = await make_engine(tmp_path)
+        provider = FakeOAuthProvider(expires_in=3600)
+        now = [time.time()]
+        manager = make_manager(engine, provider, clock=lambda: now[0])
+        await connect(manager)
+        refresher = manager.create_refresher()
+        provider.fail_refresh = True
+
+        now[0] += 3500
+        assert (await refresher.run_once())['failed'] == 1
+        assert (await refresher.run_once())['failed'] == 0  # not due again until the backoff passes
+
+        async with engine.connect() as conn:
+            failures, due = (await conn.execute(
+                text("SELECT refresh_failures, refresh_due_at FROM oauth_tokens")
+            )).one()
+        assert failures == 1 and due == pytest.approx(now[0] + 60)
+        await engine.dispose()
+
+    def test_refresh_times_spread_out(self):
+        rng = random.Random(1)
+        issued = 1_000_000.0
+        due = [refresh_due_at(issued, issued + 3600, rng) for _ in range(200)]
+
+        # Hour tokens: renewed 12-18 minutes early, spread across that window
+        assert min(due) >= issued + 3600 - 18 * 60 and max(due) <= issued + 3600 - 12 * 60
+        assert max(due) - min(due) > 5 * 60
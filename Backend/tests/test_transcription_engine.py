@@ -0,0 +1,230 @@
+"""
+Tests for the chunked, cached Whisper transcription engine
+Runs fully offline with the stub backend
+"""
+import pytest
+from pathlib import Path
+
+from services.transcription_engine import (
+    AudioChunk,
+    StubTranscriptionBackend,
+    TranscriptionEngine,
+    file_content_hash,
+    merge_chunk_results,
+    plan_chunks,
+)
+
+
+def fake_ffmpeg(cmd, **kwargs):
+    """Write ffmpeg's output file; ffprobe calls report a 1s duration"""
+    if cmd[0] == "ffmpeg":
+        Path(cmd[-1]).write_bytes(b"audio")
+    return type("Result", (), {"returncode": 0, "stdout": "1.0", "stderr": ""})()
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    """Fake media file - content only matters for hashing"""
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"fake video bytes")
+    return path
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Engine with stub backend and a temp cache"""
+    return TranscriptionEngine(
+        backend=StubTranscriptionBackend(),
+        cache_dir=tmp_path / "cache",
+        max_workers=4
+    )
+
+
+class TestPlanChunks:
+    """Chunk boundary planning"""
+
+    def test_short_audio_single_chunk(self):
+        assert plan_chunks(120.0, [], max_chunk_seconds=600) == [(0.0, 120.0)]
+
+    def test_cuts_inside_silence(self):
+        silences = [(290.0, 292.0), (580.0, 584.0), (900.0, 901.0)]
+        chunks = plan_chunks(1000.0, silences, max_chunk_seconds=600)
+
+        assert chunks[0] == (0.0, 582.0)
+        assert chunks[-1][1] == 1000.0
+        assert all(end - start <= 600 for start, end in chunks)
+
+    def test_hard_cut_without_silence(self):
+        chunks = plan_chunks(1500.0, [], max_chunk_seconds=600)
+        assert chunks == [(0.0, 600.0), (600.0, 1200.0), (1200.0, 1500.0)]
+
+    def test_chunks_are_contiguous(self):
+        silences = [(s, s + 1) for s in range(100, 3000, 250)]
+        chunks = plan_chunks(3000.0, silences, max_chunk_seconds=700)
+        for (_, prev_end), (next_start, _) in zip(chunks, chunks[1:]):
+            assert prev_end == next_start
+
+
+class TestMergeChunkResults:
+    """Timestamp stitching"""
+
+    def test_offsets_words_and_segments(self):
+        first = AudioChunk(index=0, path=Path("a.mp3"), start=0.0, end=10.0)
+        second = AudioChunk(index=1, path=Path("b.mp3"), start=10.0, end=20.0)
+        result = merge_chunk_results([
+            (second, {"text": "world", "words": [{"word": "world", "start": 1.0, "end": 1.5}],
+                      "segments": [{"id": 0, "start": 0.0, "end": 2.0, "text": "world"}]}),
+            (first, {"text": "hello", "language": "en", "words": [{"word": "hello", "start": 2.0, "end": 2.5}],
+                     "segments": [{"id": 0, "start": 1.0, "end": 3.0, "text": "hello"}]}),
+        ])
+
+        assert result["text"] == "hello world"
+        assert result["language"] == "en"
+        assert [w["start"] for w in result["words"]] == [2.0, 11.0]
+        assert [s["id"] for s in result["segments"]] == [0, 1]
+        assert result["segments"][1]["end"] == 12.0
+        assert result["duration"] == 20.0
+
+
+class TestTranscriptionEngine:
+    """End-to-end engine behaviour with ffmpeg steps stubbed"""
+
+    def _fake_chunks(self, engine, tmp_path, count, length=30.0):
+        chunks = []
+        for i in range(count):
+            path = tmp_path / f"chunk{i}.mp3"
+            path.write_bytes(b"audio")
+            engine.backend.durations[path.name] = length
+            chunks.append(AudioChunk(index=i, path=path, start=i * length, end=(i + 1) * length))
+        return chunks
+
+    def test_transcribes_chunks_concurrently_and_stitches(self, engine, media_file, tmp_path, monkeypatch):
+        chunks = self._fake_chunks(engine, tmp_path, 3)
+        monkeypatch.setattr(engine, "extract_audio", lambda path, content_hash=None, keep=True: tmp_path / "audio.mp3")
+        monkeypatch.setattr(engine, "prepare_chunks", lambda audio_path: chunks)
+
+        result = engine.transcribe(media_file)
+
+        assert result["chunks"] == 3
+        assert len(result["words"]) == 90
+        assert result["words"][30]["start"] == 30.0
+        assert len(engine.backend.calls) == 3
+
+    def test_second_run_hits_cache(self, engine, media_file, tmp_path, monkeypatch):
+        chunks = self._fake_chunks(engine, tmp_path, 2)
+        monkeypatch.setattr(engine, "extract_audio", lambda path, content_hash=None, keep=True: tmp_path / "audio.mp3")
+        monkeypatch.setattr(engine, "prepare_chunks", lambda audio_path: chunks)
+
+        first = engine.transcribe(media_file)
+        calls_after_first = len(engine.backend.calls)
+        second = engine.transcribe(media_file)
+
+        assert second == first
+        assert len(engine.backend.calls) == calls_after_first
+        assert engine.get_cached_transcript(media_file) == first
+
+    def test_cache_is_keyed_by_language(self, engine, media_file, tmp_path, monkeypatch):
+        chunks = self._fake_chunks(engine, tmp_path, 1)
+        monkeypatch.setattr(engine, "extract_audio", lambda path, content_hash=None, keep=True: tmp_path / "audio.mp3")
+        monkeypatch.setattr(engine, "prepare_chunks", lambda audio_path: chunks)
+
+        engine.transcribe(media_file, language="en")
+        engine.transcribe(media_file, language="es")
+
+        assert len(engine.backend.calls) == 2
+
+    def test_missing_file_raises(self, engine, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            engine.transcribe(tmp_path / "missing.mp4")
+
+    def test_cache_is_keyed_by_backend_identity(self, engine, media_file, tmp_path, monkeypatch):
+        chunks = self._fake_chunks(engine, tmp_path, 1)
+        monkeypatch.setattr(engine, "extract_audio", lambda path, content_hash=None, keep=True: tmp_path / "audio.mp3")
+        monkeypatch.setattr(engine, "prepare_chunks", lambda audio_path: chunks)
+
+        engine.transcribe(media_file)
+        monkeypatch.setattr(type(engine.backend), "identity", property(lambda self: "stub-large-v3"))
+        engine.transcribe(media_file)
+
+        assert len(engine.backend.calls) == 2
+
+    def test_audio_removed_unless_kept(self, engine, media_file, tmp_path, monkeypatch):
+        extracted = []
+
+        def fake_extract(path, content_hash=None, keep=True):
+            audio = engine.audio_dir / (f"{content_hash}.mp3" if keep else f"{content_hash}.tmp1.mp3")
+            audio.write_bytes(b"audio")
+            extracted.append(audio)
+            return audio
+
+        monkeypatch.setattr(engine, "extract_audio", fake_extract)
+        monkeypatch.setattr(engine, "prepare_chunks", lambda audio_path: [AudioChunk(0, audio_path, 0.0, 2.0)])
+
+        engine.transcribe(media_file, keep_audio=False)
+        engine.transcribe(media_file, language="es", keep_audio=True)
+
+        assert not extracted[0].exists()
+        assert extracted[1].exists()
+
+    def test_cached_audio_survives_keep_audio_false(self, engine, media_file, monkeypatch):
+        monkeypatch.setattr(engine, "prepare_chunks", lambda audio_path: [AudioChunk(0, audio_path, 0.0, 2.0)])
+        cached = engine.audio_dir / f"{file_content_hash(media_file)}.mp3"
+        cached.write_bytes(b"audio")
+
+        engine.transcribe(media_file, keep_audio=False)
+
+        assert cached.exists()
+
+    def test_split_audio_uses_private_chunk_dir(self, engine, tmp_path, monkeypatch):
+        audio = engine.audio_dir / "track.mp3"
+        audio.write_bytes(b"audio")
+
+        monkeypatch.setattr("services.transcription_engine.subprocess.run", fake_ffmpeg)
+        boundaries = [(0.0, 1.0), (1.0, 2.0)]
+
+        first = engine.split_audio(audio, boundaries)
+        second = engine.split_audio(audio, boundaries)
+
+        assert first[0].path.parent != second[0].path.parent
+        assert {c.path.name for c in first} == {c.path.name for c in second}
+        assert audio.exists()
+
+    def test_chunk_dir_removed_after_transcribe(self, engine, media_file, monkeypatch):
+        monkeypatch.setattr("services.transcription_engine.subprocess.run", fake_ffmpeg)
+        monkeypatch.setattr(
+            engine, "prepare_chunks",
+            lambda audio_path: engine.split_audio(audio_path, [(0.0, 1.0), (1.0, 2.0)])
+        )
+
+        engine.transcribe(media_file, keep_audio=True)
+
+        assert list(engine.audio_dir.glob("*.chunks")) == []
+
+    def test_uploads_media_directly_when_extraction_fails(self, engine, media_file, monkeypatch):
+        def no_ffmpeg(cmd, **kwargs):
+            raise FileNotFoundError(cmd[0])
+
+        monkeypatch.setattr("services.transcription_engine.subprocess.run", no_ffmpeg)
+
+        result = engine.transcribe(media_file, keep_audio=False)
+
+        assert engine.backend.calls == [media_file]
+        assert result["chunks"] == 1
+        assert result["duration"] == 1.0
+        assert media_file.exists()
+
+    def test_oversized_media_still_needs_extraction(self, tmp_path, media_file, monkeypatch):
+        engine = TranscriptionEngine(
+            backend=StubTranscriptionBackend(),
+            cache_dir=tmp_path / "cache",
+            max_upload_bytes=4
+        )
+
+        def no_ffmpeg(cmd, **kwargs):
+            raise FileNotFoundError(cmd[0])
+
+        monkeypatch.setattr("services.transcription_engine.subprocess.run", no_ffmpeg)
+
+        with pytest.raises(FileNotFoundError):
+            engine.transcribe(media_file)
+        assert engine.backend.calls == []
@@ -0,0 +1,270 @@
+"""
+Tests for vision image preprocessing and pHash result reuse
+"""
+import base64
+import random
+import uuid
+
+import pytest
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import MagicMock, AsyncMock, patch
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from modules.ai_analysis.image_preprocessor import (
+    VisionResultCache,
+    hamming_distance,
+    perceptual_hash,
+    prepare_image,
+    target_size,
+)
+from modules.ai_analysis.vision_analyzer import VisionAnalyzer
+
+
+def make_scene(seed: int, size=(4032, 3024)) -> Image.Image:
+    """Smooth random scene, large like an iPhone photo"""
+    rng = np.random.default_rng(seed)
+    small = Image.fromarray(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8))
+    return small.resize(size, Image.Resampling.BICUBIC)
+
+
+def save_jpeg(img: Image.Image, path: Path, quality: int = 95) -> Path:
+    img.save(path, "JPEG", quality=quality)
+    return path
+
+
+class TestPreprocessing:
+    def test_target_size_high_detail(self):
+        assert target_size(4032, 3024) == (1024, 768)
+        assert target_size(1080, 1920) == (768, 1365)
+        assert target_size(640, 480) == (640, 480)
+
+    def test_target_size_low_detail(self):
+        assert target_size(4032, 3024, detail="low") == (512, 384)
+
+    def test_prepare_image_shrinks_payload(self, tmp_path):
+        path = save_jpeg(make_scene(1), tmp_path / "photo.jpg")
+
+        prepared = prepare_image(path)
+
+        assert (prepared.width, prepared.height) == (1024, 768)
+        assert len(prepared.data) < prepared.original_bytes / 4
+        assert prepared.data_url.startswith("data:image/jpeg;base64,")
+
+    def test_prepare_image_applies_exif_orientation(self):
+        img = make_scene(2, size=(400, 300))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotate 90 CW on display
+        buffer = BytesIO()
+        img.save(buffer, "JPEG", exif=exif)
+
+        prepared = prepare_image(buffer.getvalue())
+
+        assert (prepared.width, prepared.height) == (300, 400)
+
+
+class TestPerceptualHash:
+    def test_near_duplicates_are_close(self):
+        img = make_scene(3, size=(1280, 720))
+        brighter = ImageEnhance.Brightness(img).enhance(1.08)
+        rescaled = img.resize((640, 360))
+
+        assert hamming_distance(perceptual_hash(img), perceptual_hash(brighter)) <= 6
+        assert hamming_distance(perceptual_hash(img), perceptual_hash(rescaled)) <= 6
+
+    def test_different_scenes_are_far(self):
+        a = perceptual_hash(make_scene(4, size=(640, 480)))
+        b = perceptual_hash(make_scene(5, size=(640, 480)))
+
+        assert hamming_distance(a, b) > 12
+
+
+class TestVisionResultCache:
+    def test_hit_within_threshold(self):
+        cache = VisionResultCache(threshold=4)
+        cache.put(0b1111, "scope", {"description": "a"})
+
+        assert cache.get(0b1110, "scope") == {"description": "a"}
+        assert cache.get(0b11110000, "scope") is None
+        assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+    def test_scopes_are_isolated(self):
+        cache = VisionResultCache(threshold=4)
+        cache.put(42, cache.scope_key("model", "prompt A"), {"description": "a"})
+
+        assert cache.get(42, cache.scope_key("model", "prompt B")) is None
+
+    def test_lru_eviction(self):
+        cache = VisionResultCache(threshold=0, max_entries=2)
+        cache.put(1, "s", {"n": 1})
+        cache.put(2, "s", {"n": 2})
+        cache.get(1, "s")
+        cache.put(3, "s", {"n": 3})
+
+        assert cache.get(2, "s") is None
+        assert cache.get(1, "s") == {"n": 1}
+
+    def test_tenants_are_isolated(self):
+        cache = VisionResultCache(threshold=4)
+        cache.put(42, "scope", {"description": "a"}, tenant="workspace-a")
+
+        assert cache.get(42, "scope", tenant="workspace-b") is None
+        assert cache.get(43, "scope", tenant="workspace-a") == {"description": "a"}
+
+    @pytest.mark.parametrize("threshold", [1, 6, 10])
+    def test_banded_lookup_matches_linear_scan(self, threshold):
+        rng = random.Random(threshold)
+        cache = VisionResultCache(threshold=threshold)
+        stored = [rng.getrandbits(64) for _ in range(500)]
+        for phash in stored:
+            cache.put(phash, "s", {"hash": phash})
+
+        for base in rng.sample(stored, 100):
+            query = base
+            for bit in rng.sample(range(64), rng.randint(1, threshold + 3)):
+                query ^= 1 << bit
+            nearest = min(stored, key=lambda h: hamming_distance(query, h))
+            expected = nearest if hamming_distance(query, nearest) <= threshold else None
+
+            result = cache.get(query, "s")
+            if expected is None:
+                assert result is None
+            else:
+                assert hamming_distance(query, result["hash"]) == hamming_distance(query, expected)
+
+    def test_eviction_drops_hash_from_index(self):
+        cache = VisionResultCache(threshold=6, max_entries=1)
+        cache.put(0, "s", {"n": 0})
+        cache.put(2 ** 64 - 1, "s", {"n": 1})
+
+        assert cache.get(1, "s") is None
+        partition = cache._partitions[(None, "s")]
+        assert all(0 not in bucket for band in partition.bands for bucket in band.values())
+
+
+def mock_completion(text="A person on a beach"):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = text
+    response.usage.prompt_tokens = 800
+    response.usage.completion_tokens = 50
+    response.usage.total_tokens = 850
+    return response
+
+
+class TestVisionAnalyzerDedup:
+    def test_near_duplicate_frames_share_one_call(self, tmp_path):
+        scene = make_scene(6, size=(1920, 1080))
+        frames = [
+            {"path": save_jpeg(scene, tmp_path / "f0.jpg"), "timestamp": 0.0},
+            {"path": save_jpeg(ImageEnhance.Brightness(scene).enhance(1.05), tmp_path / "f1.jpg"), "timestamp": 1.0},
+            {"path": save_jpeg(make_scene(7, size=(1920, 1080)), tmp_path / "f2.jpg"), "timestamp": 2.0},
+        ]
+
+        analyzer = VisionAnalyzer(api_key="test-key", cache=VisionResultCache(threshold=6), tenant="workspace-a")
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.return_value = mock_completion()
+
+        results = analyzer.analyze_frames_batch(frames)
+
+        assert analyzer.client.chat.completions.create.call_count == 2
+        assert results[1]["duplicate_of"] == str(frames[0]["path"])
+        assert results[1]["usage"]["total_tokens"] == 0
+        assert results[1]["timestamp"] == 1.0
+        assert results[0]["timestamp"] == 0.0
+        assert analyzer.stats["cache_hits"] == 1
+        assert analyzer.stats["bytes_sent"] < analyzer.stats["bytes_original"]
+
+    def test_no_reuse_without_tenant(self, tmp_path):
+        scene = make_scene(6, size=(1920, 1080))
+        frames = [
+            {"path": save_jpeg(scene, tmp_path / "f0.jpg"), "timestamp": 0.0},
+            {"path": save_jpeg(scene, tmp_path / "f1.jpg"), "timestamp": 1.0},
+        ]
+        cache = VisionResultCache(threshold=6)
+
+        analyzer = VisionAnalyzer(api_key="test-key", cache=cache)
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.return_value = mock_completion()
+
+        analyzer.analyze_frames_batch(frames)
+
+        assert analyzer.client.chat.completions.create.call_count == 2
+        assert analyzer.stats["cache_hits"] == 0
+        assert cache.stats()["entries"] == 0
+
+    def test_sends_downsized_jpeg(self, tmp_path):
+        path = save_jpeg(make_scene(8), tmp_path / "photo.jpg")
+        analyzer = VisionAnalyzer(api_key="test-key", cache=VisionResultCache())
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create.return_value = mock_completion()
+
+        analyzer.analyze_frame(path)
+
+        content = analyzer.client.chat.completions.create.call_args.kwargs["messages"][0]["content"]
+        url = content[1]["image_url"]["url"]
+        assert len(url) < path.stat().st_size
+
+
+class TestUploadEndpoint:
+    @pytest.mark.asyncio
+    async def test_upload_reuses_analysis_for_near_duplicate(self, monkeypatch):
+        from api import image_analysis
+
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(image_analysis, "get_vision_cache", lambda: cache)
+        cache = VisionResultCache(threshold=6)
+        workspace_id = uuid.uuid4()
+
+        scene = make_scene(9, size=(2000, 1500))
+        uploads = []
+        for img in (scene, ImageEnhance.Contrast(scene).enhance(1.05)):
+            buffer = BytesIO()
+            img.save(buffer, "JPEG", quality=95)
+            uploads.append(buffer.getvalue())
+
+        analysis = await image_analysis.analyze_with_mock([])
+        openai_call = AsyncMock(return_value=analysis)
+        with patch.object(image_analysis, "analyze_with_openai", openai_call):
+            for raw in uploads:
+                upload = MagicMock()
+                upload.read = AsyncMock(return_value=raw)
+                result = await image_analysis.analyze_uploaded_image(
+                    file=upload, custom_fields="", focus_areas="", analysis_depth="detailed",
+                    workspace_id=workspace_id,
+                )
+                assert result.title == analysis["title"]
+
+        assert openai_call.await_count == 1
+        sent_base64 = openai_call.await_args.args[0]
+        assert len(sent_base64) * 3 / 4 < len(uploads[0])
+
+    @pytest.mark.asyncio
+    async def test_base64_accepts_data_url(self, monkeypatch):
+        from api import image_analysis
+
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        received = []
+
+        async def analyze_bytes(raw, **kwargs):
+            received.append((raw, kwargs["tenant"]))
+            return await image_analysis.analyze_with_mock([])
+
+        monkeypatch.setattr(image_analysis, "analyze_image_bytes", analyze_bytes)
+        payload = b"\xff\xd8 jpeg bytes"
+        encoded = base64.b64encode(payload).decode()
+        workspace_id = uuid.uuid4()
+
+        for image_base64 in (encoded, f"data:image/jpeg;base64,{encoded}"):
+            request = image_analysis.AnalysisRequest(image_base64=image_base64)
+            await image_analysis.analyze_image(request, workspace_id=workspace_id)
+
+        assert received == [(payload, str(workspace_id))] * 2
+
+        with pytest.raises(image_analysis.HTTPException) as error:
+            await image_analysis.analyze_image(
+                image_analysis.AnalysisRequest(image_base64="data:image/png,rawpixels"), workspace_id=workspace_id
+            )
+        assert error.value.status_code == 400
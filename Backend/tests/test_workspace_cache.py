@@ -0,0 +1,159 @@
+"""
+Tests for cached workspace resolution
+"""
+import json
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+
+from middleware import workspace_cache as cache_module
+from middleware.workspace_cache import (
+    DEFAULT_KEY,
+    INVALIDATION_CHANNEL,
+    WorkspaceCache,
+    handle_invalidation,
+    publish_workspace_change,
+    workspace_cache,
+)
+from middleware.workspace_context import get_current_workspace_id
+
+
+class FakeSession:
+    """Session whose `workspaces` table holds the given ids"""
+
+    def __init__(self, workspace_ids=()):
+        self.workspace_ids = list(workspace_ids)
+        self.queries = 0
+
+    async def execute(self, statement, params=None):
+        self.queries += 1
+        result = MagicMock()
+        if "ORDER BY created_at" in str(statement):
+            result.fetchall.return_value = [(self.workspace_ids[0],)] if self.workspace_ids else []
+        else:
+            result.fetchall.return_value = [(1,)] if params["id"] in self.workspace_ids else []
+        return result
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    workspace_cache.invalidate()
+    yield
+    workspace_cache.invalidate()
+
+
+class TestWorkspaceCache:
+    def test_entries_expire(self):
+        cache = WorkspaceCache(ttl_seconds=0)
+        cache.put("a", uuid.uuid4())
+
+        assert cache.get("a") == (False, None)
+
+    def test_invalidating_a_workspace_drops_the_default(self):
+        cache = WorkspaceCache()
+        ws, other = uuid.uuid4(), uuid.uuid4()
+        cache.put(str(ws), ws)
+        cache.put(str(other), other)
+        cache.put(DEFAULT_KEY, other)
+
+        cache.invalidate(ws)
+
+        assert cache.get(str(ws)) == (False, None)
+        assert cache.get(DEFAULT_KEY) == (False, None)
+        assert cache.get(str(other)) == (True, other)
+
+
+class TestGetCurrentWorkspaceId:
+    @pytest.mark.asyncio
+    async def test_header_lookup_queries_once(self):
+        ws = uuid.uuid4()
+        session = FakeSession([ws])
+
+        for _ in range(5):
+            assert await get_current_workspace_id(str(ws), session) == ws
+
+        assert session.queries == 1
+
+    @pytest.mark.asyncio
+    async def test_default_workspace_cached(self):
+        ws = uuid.uuid4()
+        session = FakeSession([ws])
+
+        assert await get_current_workspace_id(None, session) == ws
+        assert await get_current_workspace_id(None, session) == ws
+        assert session.queries == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_workspace_cached_as_miss(self):
+        session = FakeSession()
+        missing = str(uuid.uuid4())
+
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc:
+                await get_current_workspace_id(missing, session)
+            assert exc.value.status_code == 404
+
+        assert session.queries == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_id_never_queries(self):
+        session = FakeSession()
+
+        with pytest.raises(HTTPException) as exc:
+            await get_current_workspace_id("not-a-uuid", session)
+
+        assert exc.value.status_code == 400
+        assert session.queries == 0
+
+
+class TestInvalidation:
+    @pytest.mark.asyncio
+    async def test_publish_invalidates_locally_and_broadcasts(self):
+        ws = uuid.uuid4()
+        workspace_cache.put(str(ws), ws)
+        redis = MagicMock(publish=AsyncMock())
+
+        with patch.object(cache_module, "_get_redis", return_value=redis):
+            await publish_workspace_change(ws)
+
+        assert workspace_cache.get(str(ws)) == (False, None)
+        redis.publish.assert_awaited_once_with(INVALIDATION_CHANNEL, json.dumps({"workspace_id": str(ws)}))
+
+    @pytest.mark.asyncio
+    async def test_publish_failure_is_not_raised(self):
+        redis = MagicMock(publish=AsyncMock(side_effect=ConnectionError("down")))
+
+        with patch.object(cache_module, "_get_redis", return_value=redis):
+            await publish_workspace_change(uuid.uuid4())
+
+    def test_message_from_another_worker(self):
+        ws, other = uuid.uuid4(), uuid.uuid4()
+        workspace_cache.put(str(ws), ws)
+        workspace_cache.put(str(other), other)
+
+        handle_invalidation(json.dumps({"workspace_id": str(ws)}))
+        assert workspace_cache.get(str(ws)) == (False, None)
+        assert workspace_cache.get(str(other)) == (True, other)
+
+        handle_invalidation("garbage")
+        assert workspace_cache.get(str(other)) == (False, None)
+
+
+class TestWorkspaceWrites:
+    @pytest.mark.asyncio
+    async def test_update_of_missing_workspace_publishes_nothing(self):
+        from api.endpoints.workspaces import WorkspaceUpdate, update_workspace
+
+        role = MagicMock(fetchone=MagicMock(return_value=MagicMock(role="owner")))
+        missing = MagicMock(fetchone=MagicMock(return_value=None))
+        db = MagicMock(execute=AsyncMock(side_effect=[role, missing]), commit=AsyncMock(), rollback=AsyncMock())
+        publish = AsyncMock()
+
+        with patch("api.endpoints.workspaces.publish_workspace_change", publish):
+            with pytest.raises(HTTPException) as exc:
+                await update_workspace(uuid.uuid4(), WorkspaceUpdate(name="renamed"), db=db)
+
+        assert exc.value.status_code == 404
+        publish.assert_not_awaited()
@@ -0,0 +1,14 @@
+-- =====================================================
+-- Calendar read path index for scheduled_posts
+-- Covers month/week range scans that also filter on
+-- status and platform (CalendarService.get_calendar_posts)
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_scheduled_posts_calendar
+    ON scheduled_posts(scheduled_time, status, platform);
+
+-- Superseded by the composite index above
+DROP INDEX IF EXISTS idx_scheduled_posts_scheduled_time;
+
+-- Join keys used by the calendar projection
+CREATE INDEX IF NOT EXISTS idx_scheduled_posts_variant ON scheduled_posts(content_variant_id);
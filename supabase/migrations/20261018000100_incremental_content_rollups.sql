@@ -0,0 +1,105 @@
+-- ============================================================================
+-- INCREMENTAL CONTENT ROLLUPS
+-- Keeps the latest snapshot per variant in content_metrics_latest so
+-- RollupEngine only recomputes content whose variants changed since the
+-- last run, instead of scanning the whole content_metrics history.
+-- ============================================================================
+
+-- Supports "latest snapshot for variant" lookups and the backfill below
+CREATE INDEX IF NOT EXISTS idx_content_metrics_variant_time
+    ON content_metrics (variant_id, snapshot_at DESC);
+
+-- ============================================================================
+-- PART 1: LATEST SNAPSHOT TABLE
+-- snapshot_at is the variant's high-water mark; rolled_up_snapshot_at is
+-- the snapshot last folded into content_rollups.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS content_metrics_latest (
+    variant_id UUID PRIMARY KEY REFERENCES content_variants(id) ON DELETE CASCADE,
+    snapshot_at TIMESTAMPTZ NOT NULL,
+    traffic_type TEXT NOT NULL DEFAULT 'organic',
+
+    views BIGINT,
+    impressions BIGINT,
+    reach BIGINT,
+    likes BIGINT,
+    comments BIGINT,
+    shares BIGINT,
+    saves BIGINT,
+    clicks BIGINT,
+    watch_time_seconds NUMERIC,
+    sentiment_score NUMERIC,
+
+    rolled_up_snapshot_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Dirty-variant scan used by incremental rollups
+CREATE INDEX IF NOT EXISTS idx_content_metrics_latest_dirty
+    ON content_metrics_latest (snapshot_at)
+    WHERE rolled_up_snapshot_at IS DISTINCT FROM snapshot_at;
+
+COMMENT ON TABLE content_metrics_latest IS 'Latest content_metrics snapshot per variant, maintained by trigger';
+
+-- ============================================================================
+-- PART 2: MAINTAIN ON INSERT
+-- Out-of-order (backfilled) snapshots never overwrite a newer one.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION upsert_content_metrics_latest()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO content_metrics_latest (
+        variant_id, snapshot_at, traffic_type,
+        views, impressions, reach, likes, comments, shares, saves, clicks,
+        watch_time_seconds, sentiment_score, updated_at
+    ) VALUES (
+        NEW.variant_id, NEW.snapshot_at, COALESCE(NEW.traffic_type, 'organic'),
+        NEW.views, NEW.impressions, NEW.reach, NEW.likes, NEW.comments, NEW.shares,
+        NEW.saves, NEW.clicks, NEW.watch_time_seconds, NEW.sentiment_score, NOW()
+    )
+    ON CONFLICT (variant_id) DO UPDATE SET
+        snapshot_at = EXCLUDED.snapshot_at,
+        traffic_type = EXCLUDED.traffic_type,
+        views = EXCLUDED.views,
+        impressions = EXCLUDED.impressions,
+        reach = EXCLUDED.reach,
+        likes = EXCLUDED.likes,
+        comments = EXCLUDED.comments,
+        shares = EXCLUDED.shares,
+        saves = EXCLUDED.saves,
+        clicks = EXCLUDED.clicks,
+        watch_time_seconds = EXCLUDED.watch_time_seconds,
+        sentiment_score = EXCLUDED.sentiment_score,
+        updated_at = NOW()
+    WHERE content_metrics_latest.snapshot_at <= EXCLUDED.snapshot_at;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_content_metrics_latest ON content_metrics;
+CREATE TRIGGER trg_content_metrics_latest
+    AFTER INSERT ON content_metrics
+    FOR EACH ROW
+    EXECUTE FUNCTION upsert_content_metrics_latest();
+
+-- ============================================================================
+-- PART 3: BACKFILL FROM EXISTING HISTORY
+-- One-time DISTINCT ON pass; rolled_up_snapshot_at stays NULL so the first
+-- incremental run rebuilds every rollup with corrected watch-time averages.
+-- ============================================================================
+
+INSERT INTO content_metrics_latest (
+    variant_id, snapshot_at, traffic_type,
+    views, impressions, reach, likes, comments, shares, saves, clicks,
+    watch_time_seconds, sentiment_score
+)
+SELECT DISTINCT ON (variant_id)
+    variant_id, snapshot_at, COALESCE(traffic_type, 'organic'),
+    views, impressions, reach, likes, comments, shares, saves, clicks,
+    watch_time_seconds, sentiment_score
+FROM content_metrics
+ORDER BY variant_id, snapshot_at DESC
+ON CONFLICT (variant_id) DO NOTHING;
@@ -0,0 +1,14 @@
+-- ============================================================================
+-- RECOMPUTE WATERMARKS
+-- Highest source row id folded in by the last batch recompute, so incremental
+-- runs only revisit people/followers with events recorded after it.
+--   person_lens / person_insights -> person_events.id
+--   follower_engagement            -> follower_interactions.id
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS recompute_watermarks (
+    name TEXT PRIMARY KEY,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
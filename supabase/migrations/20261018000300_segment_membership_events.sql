@@ -0,0 +1,19 @@
+-- ============================================================================
+-- SEGMENT MEMBERSHIP EVENTS
+-- SegmentEngine now applies only the membership diff on refresh; each person
+-- added to or removed from a segment is logged here so downstream triggers
+-- (emails, automations) can consume changes by id.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS segment_membership_events (
+    id BIGSERIAL PRIMARY KEY,
+    segment_id UUID NOT NULL REFERENCES segments(id) ON DELETE CASCADE,
+    person_id UUID NOT NULL REFERENCES people(id) ON DELETE CASCADE,
+    change TEXT NOT NULL CHECK (change IN ('added', 'removed')),
+    occurred_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_segment_membership_events_segment
+    ON segment_membership_events (segment_id, id);
+
+ALTER TABLE segment_membership_events ENABLE ROW LEVEL SECURITY;
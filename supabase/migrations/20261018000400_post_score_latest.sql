@@ -0,0 +1,71 @@
+-- ============================================================================
+-- POST SCORE LATEST
+-- Latest post-social score per post, grouped by (account, platform,
+-- media_type) for percentile ranking. Maintained by trigger from the
+-- viral_score written onto social_media_post_analytics snapshots, so ranking
+-- no longer scans every sibling post's snapshot history.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS post_score_latest (
+    post_id INTEGER PRIMARY KEY REFERENCES social_media_posts(id) ON DELETE CASCADE,
+    account_id INTEGER NOT NULL,
+    platform VARCHAR(50) NOT NULL,
+    media_type VARCHAR(50) NOT NULL,
+    score NUMERIC(10,2) NOT NULL,
+    snapshot_date DATE NOT NULL,
+    snapshot_hour INTEGER NOT NULL DEFAULT -1,  -- -1 when the snapshot has no hour
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_post_score_latest_group
+    ON post_score_latest (account_id, platform, media_type, score);
+
+-- ============================================================================
+-- TRIGGER: keep the row in step with the post's newest scored snapshot
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION sync_post_score_latest()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO post_score_latest (post_id, account_id, platform, media_type, score, snapshot_date, snapshot_hour)
+    SELECT p.id, p.account_id, p.platform, COALESCE(p.media_type, 'video'),
+           COALESCE(NEW.viral_score, 0), NEW.snapshot_date, COALESCE(NEW.snapshot_hour, -1)
+    FROM social_media_posts p
+    WHERE p.id = NEW.post_id
+    ON CONFLICT (post_id) DO UPDATE SET
+        score = EXCLUDED.score,
+        snapshot_date = EXCLUDED.snapshot_date,
+        snapshot_hour = EXCLUDED.snapshot_hour,
+        updated_at = NOW()
+    WHERE (post_score_latest.snapshot_date, post_score_latest.snapshot_hour)
+       <= (EXCLUDED.snapshot_date, EXCLUDED.snapshot_hour);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Scoring writes viral_score with an UPDATE; raw snapshots arrive with the
+-- column at its default of 0 and must not reset an existing score
+DROP TRIGGER IF EXISTS trg_post_score_latest_update ON social_media_post_analytics;
+CREATE TRIGGER trg_post_score_latest_update
+    AFTER UPDATE OF viral_score ON social_media_post_analytics
+    FOR EACH ROW EXECUTE FUNCTION sync_post_score_latest();
+
+DROP TRIGGER IF EXISTS trg_post_score_latest_insert ON social_media_post_analytics;
+CREATE TRIGGER trg_post_score_latest_insert
+    AFTER INSERT ON social_media_post_analytics
+    FOR EACH ROW WHEN (NEW.viral_score > 0)
+    EXECUTE FUNCTION sync_post_score_latest();
+
+-- ============================================================================
+-- BACKFILL: newest scored snapshot per post
+-- ============================================================================
+
+INSERT INTO post_score_latest (post_id, account_id, platform, media_type, score, snapshot_date, snapshot_hour)
+SELECT DISTINCT ON (a.post_id)
+    a.post_id, p.account_id, p.platform, COALESCE(p.media_type, 'video'),
+    a.viral_score, a.snapshot_date, COALESCE(a.snapshot_hour, -1)
+FROM social_media_post_analytics a
+JOIN social_media_posts p ON p.id = a.post_id
+WHERE a.viral_score > 0
+ORDER BY a.post_id, a.snapshot_date DESC, a.snapshot_hour DESC NULLS LAST
+ON CONFLICT (post_id) DO NOTHING;
@@ -0,0 +1,54 @@
+-- ============================================================================
+-- ADAPTIVE CHECK-BACKS
+-- social_media_posts.next_check_at becomes a shared priority queue: each
+-- post's next check is computed from its view velocity and age
+-- (services/checkback_queue.py), claimed per provider with FOR UPDATE SKIP
+-- LOCKED, and paced against the provider's monthly API budget.
+-- ============================================================================
+
+ALTER TABLE social_media_posts
+ADD COLUMN IF NOT EXISTS last_checked_at TIMESTAMP;
+
+ALTER TABLE social_media_posts
+ADD COLUMN IF NOT EXISTS last_check_views BIGINT;
+
+ALTER TABLE social_media_posts
+ADD COLUMN IF NOT EXISTS check_velocity DOUBLE PRECISION;
+
+ALTER TABLE social_media_posts
+ADD COLUMN IF NOT EXISTS check_decision JSONB;
+
+ALTER TABLE social_media_posts
+ADD COLUMN IF NOT EXISTS check_claimed_until TIMESTAMP;
+
+-- Due posts per provider, in queue order
+CREATE INDEX IF NOT EXISTS idx_posts_checkback_due
+ON social_media_posts(platform, next_check_at)
+WHERE tracking_complete = FALSE AND next_check_at IS NOT NULL;
+
+-- In-flight claims counted against the provider budget
+CREATE INDEX IF NOT EXISTS idx_posts_checkback_claimed
+ON social_media_posts(platform, check_claimed_until)
+WHERE check_claimed_until IS NOT NULL;
+
+COMMENT ON COLUMN social_media_posts.check_decision IS 'Explanation of how next_check_at was chosen (age, velocity, interval)';
+COMMENT ON COLUMN social_media_posts.check_claimed_until IS 'Lease held by the worker currently checking this post';
+
+-- ============================================================================
+-- API CALL LOG (budget source; previously created by the ORM at runtime)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS api_call_logs (
+    id SERIAL PRIMARY KEY,
+    api_name VARCHAR,
+    endpoint VARCHAR,
+    timestamp TIMESTAMP DEFAULT NOW(),
+    cost DOUBLE PRECISION DEFAULT 1.0,
+    success BOOLEAN DEFAULT TRUE,
+    cache_hit BOOLEAN DEFAULT FALSE,
+    response_time_ms DOUBLE PRECISION,
+    call_metadata VARCHAR
+);
+
+CREATE INDEX IF NOT EXISTS idx_api_call_logs_budget
+ON api_call_logs(api_name, timestamp);
@@ -0,0 +1,63 @@
+-- ============================================================================
+-- AI CHAT CONTEXT SNAPSHOTS
+-- Precomputed, token-budgeted summaries per workspace and section that the
+-- chat endpoint reads instead of querying the source tables per message
+-- (services/chat_context.py). Writes to a source table mark the matching
+-- section stale for every workspace; the refresh beat rebuilds it.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS ai_context_snapshots (
+    workspace_id UUID NOT NULL REFERENCES workspaces(id) ON DELETE CASCADE,
+    section VARCHAR(20) NOT NULL,  -- media | analytics | schedule | coaching
+    content TEXT NOT NULL,
+    token_count INTEGER NOT NULL DEFAULT 0,
+    item_count INTEGER NOT NULL DEFAULT 0,
+    stale BOOLEAN NOT NULL DEFAULT FALSE,
+    stale_at TIMESTAMPTZ,
+    computed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    build_ms REAL,
+    PRIMARY KEY (workspace_id, section)
+);
+
+-- Lets the stale trigger touch only rows that are not already stale
+CREATE INDEX IF NOT EXISTS idx_ai_context_snapshots_fresh
+    ON ai_context_snapshots (section) WHERE NOT stale;
+
+-- ============================================================================
+-- TRIGGERS: statement-level, so bulk writes mark a section stale once
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION mark_ai_context_stale()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE ai_context_snapshots
+    SET stale = TRUE, stale_at = NOW()
+    WHERE section = TG_ARGV[0] AND NOT stale;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_ai_context_media ON original_videos;
+CREATE TRIGGER trg_ai_context_media
+    AFTER INSERT OR UPDATE OR DELETE ON original_videos
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_ai_context_stale('media');
+
+DROP TRIGGER IF EXISTS trg_ai_context_analytics ON content_rollups;
+CREATE TRIGGER trg_ai_context_analytics
+    AFTER INSERT OR UPDATE OR DELETE ON content_rollups
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_ai_context_stale('analytics');
+
+DROP TRIGGER IF EXISTS trg_ai_context_schedule ON scheduled_posts;
+CREATE TRIGGER trg_ai_context_schedule
+    AFTER INSERT OR UPDATE OR DELETE ON scheduled_posts
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_ai_context_stale('schedule');
+
+DROP TRIGGER IF EXISTS trg_ai_context_goals ON posting_goals;
+CREATE TRIGGER trg_ai_context_goals
+    AFTER INSERT OR UPDATE OR DELETE ON posting_goals
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_ai_context_stale('coaching');
+
+DROP TRIGGER IF EXISTS trg_ai_context_recommendations ON content_recommendations;
+CREATE TRIGGER trg_ai_context_recommendations
+    AFTER INSERT OR UPDATE OR DELETE ON content_recommendations
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_ai_context_stale('coaching');
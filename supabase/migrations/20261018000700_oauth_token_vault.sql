@@ -0,0 +1,39 @@
+-- ============================================================================
+-- OAUTH TOKEN VAULT
+-- Encrypted OAuth tokens and pending OAuth states shared by all workers
+-- (services/token_vault.py). Payloads are Fernet ciphertext and times are
+-- epoch seconds. refresh_claimed_until is the lease held by the worker
+-- refreshing a token, so no token is refreshed twice concurrently.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS oauth_tokens (
+    user_id TEXT NOT NULL,
+    provider VARCHAR(50) NOT NULL,
+    ciphertext TEXT NOT NULL,
+    expires_at DOUBLE PRECISION NOT NULL,
+    refresh_due_at DOUBLE PRECISION,
+    refresh_claimed_until DOUBLE PRECISION,
+    refresh_failures INTEGER NOT NULL DEFAULT 0,
+    updated_at DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (user_id, provider)
+);
+
+-- Background refresher: tokens coming due, soonest first
+CREATE INDEX IF NOT EXISTS idx_oauth_tokens_refresh_due
+ON oauth_tokens(refresh_due_at)
+WHERE refresh_due_at IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS oauth_states (
+    state_key TEXT PRIMARY KEY,
+    ciphertext TEXT NOT NULL,
+    expires_at DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_oauth_states_expires ON oauth_states(expires_at);
+
+ALTER TABLE oauth_tokens ENABLE ROW LEVEL SECURITY;
+ALTER TABLE oauth_states ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE oauth_tokens IS 'Encrypted OAuth tokens (services/token_vault.py). Never store plaintext tokens here';
+COMMENT ON COLUMN oauth_tokens.refresh_claimed_until IS 'Lease held by the worker currently refreshing this token';
+COMMENT ON TABLE oauth_states IS 'Encrypted pending OAuth states (PKCE verifiers), single use, expire after 10 minutes';
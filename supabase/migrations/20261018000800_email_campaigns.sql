@@ -0,0 +1,49 @@
+-- ============================================================================
+-- EMAIL CAMPAIGNS
+-- Segment sends run as resumable campaigns (services/email_campaigns.py).
+-- The campaign row holds the templates, the keyset checkpoint and the
+-- counters. Every recipient gets one outbound_messages row, written before
+-- the send and updated with the outcome. The unique index makes a resumed
+-- campaign skip anyone it already reached.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS email_campaigns (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    segment_id UUID NOT NULL REFERENCES segments(id) ON DELETE CASCADE,
+    subject TEXT NOT NULL,
+    body_template TEXT NOT NULL,
+    goal_type TEXT,
+    variant TEXT DEFAULT 'A',
+    personalization JSONB,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending | running | completed | failed
+    cursor_person_id UUID,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    claimed_until DOUBLE PRECISION,  -- epoch seconds, lease of the running worker
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_campaigns_segment
+    ON email_campaigns (segment_id, created_at DESC);
+
+ALTER TABLE outbound_messages
+ADD COLUMN IF NOT EXISTS campaign_id UUID REFERENCES email_campaigns(id) ON DELETE SET NULL;
+
+ALTER TABLE outbound_messages
+ADD COLUMN IF NOT EXISTS delivery_status TEXT;
+
+-- One message per person per campaign
+CREATE UNIQUE INDEX IF NOT EXISTS idx_outbound_messages_campaign_person
+    ON outbound_messages (campaign_id, person_id) WHERE campaign_id IS NOT NULL;
+
+-- Rows a resumed campaign has to mark as interrupted
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_campaign_queued
+    ON outbound_messages (campaign_id) WHERE delivery_status = 'queued';
+
+ALTER TABLE email_campaigns ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE email_campaigns IS 'Segment email sends with their resume checkpoint and delivery counters';
+COMMENT ON COLUMN outbound_messages.delivery_status IS 'queued, sent, failed, skipped (SMTP not configured) or interrupted (outcome unknown, not retried)';
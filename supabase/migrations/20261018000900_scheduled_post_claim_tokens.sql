@@ -0,0 +1,26 @@
+-- ============================================================================
+-- SCHEDULED POST CLAIM TOKENS
+-- Every claim of a scheduled post (services/publisher_service.py) issues a
+-- fresh claim_token. The publish path records publish_started_at once per
+-- claim before calling the platform and refreshes heartbeat_at while the
+-- upload runs. Completion and failure writes are conditional on the token,
+-- and only claims that stopped heartbeating for their platform's lease are
+-- released for retry.
+-- ============================================================================
+
+ALTER TABLE scheduled_posts
+ADD COLUMN IF NOT EXISTS claim_token UUID;
+
+ALTER TABLE scheduled_posts
+ADD COLUMN IF NOT EXISTS publish_started_at TIMESTAMPTZ;
+
+ALTER TABLE scheduled_posts
+ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+
+-- In-flight claims scanned by release_stale_claims
+CREATE INDEX IF NOT EXISTS idx_scheduled_posts_publishing_heartbeat
+    ON scheduled_posts (heartbeat_at)
+    WHERE status = 'publishing';
+
+COMMENT ON COLUMN scheduled_posts.claim_token IS 'Issued by each publishing claim; writes by the claim holder must match it';
+COMMENT ON COLUMN scheduled_posts.heartbeat_at IS 'Last heartbeat from the worker holding the publishing claim';
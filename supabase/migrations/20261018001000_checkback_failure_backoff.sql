@@ -0,0 +1,11 @@
+-- ============================================================================
+-- CHECK-BACK FAILURE BACKOFF
+-- Consecutive failed check-backs per post. Retries back off exponentially
+-- (services/checkback_queue.py) and a post that keeps failing (deleted,
+-- private) is marked dead instead of being retried until its window ends.
+-- ============================================================================
+
+ALTER TABLE social_media_posts
+ADD COLUMN IF NOT EXISTS check_failures INTEGER NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN social_media_posts.check_failures IS 'Consecutive failed check-backs; reset by a successful check';
@@ -0,0 +1,111 @@
+-- ============================================================================
+-- AI CHAT CONTEXT: WORKSPACE-SCOPED INVALIDATION
+-- The source-table triggers from 20261018000600 marked a section stale for
+-- every workspace (and row-locked every snapshot of that section) on any
+-- write. They now read the changed rows from the statement's transition
+-- tables, resolve them to workspaces and mark only those snapshots stale.
+-- content_recommendations is not workspace-scoped, so it still invalidates
+-- the coaching section everywhere.
+-- ============================================================================
+
+-- Workspaces owning the given source keys; key_column names what the keys are
+CREATE OR REPLACE FUNCTION ai_context_workspace_ids(key_column TEXT, keys UUID[])
+RETURNS SETOF UUID AS $$
+    SELECT k FROM unnest(keys) AS k
+    WHERE key_column = 'workspace_id'
+    UNION
+    SELECT ci.workspace_id FROM content_items ci
+    WHERE key_column = 'content_id' AND ci.id = ANY(keys)
+    UNION
+    SELECT ci.workspace_id
+    FROM content_variants cv
+    JOIN content_items ci ON ci.id = cv.content_id
+    WHERE key_column = 'content_variant_id' AND cv.id = ANY(keys)
+    UNION
+    SELECT wm.workspace_id FROM workspace_members wm
+    WHERE key_column = 'user_id' AND wm.user_id = ANY(keys)
+$$ LANGUAGE sql STABLE;
+
+-- TG_ARGV[0]: section, TG_ARGV[1]: column of the changed rows to resolve.
+-- Each trigger fires for one event, so only the transition tables that event
+-- has (new_rows for INSERT/UPDATE, old_rows for UPDATE/DELETE) are read.
+CREATE OR REPLACE FUNCTION mark_ai_context_stale()
+RETURNS TRIGGER AS $$
+DECLARE
+    keys UUID[] := '{}';
+    changed UUID[];
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format('SELECT array_agg(DISTINCT %I) FROM new_rows', TG_ARGV[1]) INTO changed;
+        keys := keys || COALESCE(changed, '{}');
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE format('SELECT array_agg(DISTINCT %I) FROM old_rows', TG_ARGV[1]) INTO changed;
+        keys := keys || COALESCE(changed, '{}');
+    END IF;
+
+    UPDATE ai_context_snapshots
+    SET stale = TRUE, stale_at = NOW()
+    WHERE section = TG_ARGV[0]
+      AND NOT stale
+      AND workspace_id IN (SELECT ai_context_workspace_ids(TG_ARGV[1], keys));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Shared content: every workspace sees the same recommendations
+CREATE OR REPLACE FUNCTION mark_ai_context_stale_everywhere()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE ai_context_snapshots
+    SET stale = TRUE, stale_at = NOW()
+    WHERE section = TG_ARGV[0] AND NOT stale;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- TRIGGERS: statement-level, one per event (transition tables need that)
+-- ============================================================================
+
+DO $$
+DECLARE
+    source RECORD;
+BEGIN
+    FOR source IN
+        SELECT * FROM (VALUES
+            ('original_videos', 'media', 'media', 'workspace_id'),
+            ('content_rollups', 'analytics', 'analytics', 'content_id'),
+            ('scheduled_posts', 'schedule', 'schedule', 'content_variant_id'),
+            ('posting_goals', 'goals', 'coaching', 'user_id')
+        ) AS t(table_name, tag, section, key_column)
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_ai_context_' || source.tag, source.table_name);
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_ai_context_' || source.tag || '_insert', source.table_name);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION mark_ai_context_stale(%L, %L)',
+            'trg_ai_context_' || source.tag || '_insert', source.table_name, source.section, source.key_column
+        );
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_ai_context_' || source.tag || '_update', source.table_name);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER UPDATE ON %I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION mark_ai_context_stale(%L, %L)',
+            'trg_ai_context_' || source.tag || '_update', source.table_name, source.section, source.key_column
+        );
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_ai_context_' || source.tag || '_delete', source.table_name);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION mark_ai_context_stale(%L, %L)',
+            'trg_ai_context_' || source.tag || '_delete', source.table_name, source.section, source.key_column
+        );
+    END LOOP;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_ai_context_recommendations ON content_recommendations;
+CREATE TRIGGER trg_ai_context_recommendations
+    AFTER INSERT OR UPDATE OR DELETE ON content_recommendations
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_ai_context_stale_everywhere('coaching');
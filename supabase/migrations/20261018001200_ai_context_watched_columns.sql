@@ -0,0 +1,86 @@
+-- ============================================================================
+-- AI CHAT CONTEXT: IGNORE UPDATES TO UNWATCHED COLUMNS
+-- The UPDATE triggers from 20261018001100 fired on every update, including
+-- publish heartbeats, claim renewals and updated_at touches that never change
+-- a snapshot. Postgres does not allow transition tables on triggers with a
+-- column list (UPDATE OF ...), so the UPDATE triggers now pass the columns the
+-- context queries read and the function only resolves rows whose projection
+-- on those columns actually changed.
+-- ============================================================================
+
+-- TG_ARGV[0]: section, TG_ARGV[1]: column of the changed rows to resolve,
+-- TG_ARGV[2] (UPDATE only): comma-separated columns the section reads.
+CREATE OR REPLACE FUNCTION mark_ai_context_stale()
+RETURNS TRIGGER AS $$
+DECLARE
+    keys UUID[] := '{}';
+    changed UUID[];
+    watched TEXT;
+BEGIN
+    IF TG_OP = 'UPDATE' AND TG_NARGS > 2 THEN
+        SELECT string_agg(quote_ident(btrim(c)), ', ')
+        INTO watched
+        FROM unnest(string_to_array(TG_ARGV[1] || ',' || TG_ARGV[2], ',')) AS c;
+
+        -- Rows whose watched columns differ, on either side of the update
+        EXECUTE format(
+            'SELECT array_agg(DISTINCT %1$I) FROM ('
+            '    (SELECT %2$s FROM new_rows EXCEPT ALL SELECT %2$s FROM old_rows)'
+            '    UNION ALL'
+            '    (SELECT %2$s FROM old_rows EXCEPT ALL SELECT %2$s FROM new_rows)'
+            ') AS changed_rows',
+            TG_ARGV[1], watched
+        ) INTO changed;
+        keys := COALESCE(changed, '{}');
+        IF cardinality(keys) = 0 THEN
+            RETURN NULL;
+        END IF;
+    ELSE
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            EXECUTE format('SELECT array_agg(DISTINCT %I) FROM new_rows', TG_ARGV[1]) INTO changed;
+            keys := keys || COALESCE(changed, '{}');
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            EXECUTE format('SELECT array_agg(DISTINCT %I) FROM old_rows', TG_ARGV[1]) INTO changed;
+            keys := keys || COALESCE(changed, '{}');
+        END IF;
+    END IF;
+
+    UPDATE ai_context_snapshots
+    SET stale = TRUE, stale_at = NOW()
+    WHERE section = TG_ARGV[0]
+      AND NOT stale
+      AND workspace_id IN (SELECT ai_context_workspace_ids(TG_ARGV[1], keys));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- UPDATE TRIGGERS: recreated with the columns each section reads
+-- ============================================================================
+
+DO $$
+DECLARE
+    source RECORD;
+BEGIN
+    FOR source IN
+        SELECT * FROM (VALUES
+            ('original_videos', 'media', 'media', 'workspace_id',
+             'processing_status,duration_seconds,date_uploaded,topics,file_name'),
+            ('content_rollups', 'analytics', 'analytics', 'content_id',
+             'total_views,total_likes,total_comments,total_shares,total_saves,best_platform'),
+            ('scheduled_posts', 'schedule', 'schedule', 'content_variant_id',
+             'status,scheduled_time,published_at,platform'),
+            ('posting_goals', 'goals', 'coaching', 'user_id',
+             'status,goal_name,goal_type,end_date,priority,created_at')
+        ) AS t(table_name, tag, section, key_column, watched_columns)
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trg_ai_context_' || source.tag || '_update', source.table_name);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER UPDATE ON %I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION mark_ai_context_stale(%L, %L, %L)',
+            'trg_ai_context_' || source.tag || '_update', source.table_name,
+            source.section, source.key_column, source.watched_columns
+        );
+    END LOOP;
+END $$;